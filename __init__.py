@@ -200,6 +200,94 @@ async def get_vgm_model_config(request):
             "error": str(e)
         }, status=500)
 
+# Qwen3-VL本地模型常驻管理API端点
+async def get_qwen_vl_residency(request):
+    """获取本地Qwen3-VL模型的加载状态和耗时"""
+    try:
+        from .src.xiser_nodes.llm.residency import QWEN_VL_RESIDENCY
+
+        return aiohttp.web.json_response({"success": True, "data": QWEN_VL_RESIDENCY.status()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=500)
+
+async def update_qwen_vl_residency(request):
+    """调整常驻设置（idle_timeout秒，0为不自动卸载）"""
+    try:
+        from .src.xiser_nodes.llm.residency import QWEN_VL_RESIDENCY
+
+        data = await request.json()
+        QWEN_VL_RESIDENCY.configure(idle_timeout=data.get("idle_timeout"))
+        return aiohttp.web.json_response({"success": True, "data": QWEN_VL_RESIDENCY.status()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=400)
+
+async def preload_qwen_vl(request):
+    """后台预加载模型（可选预热），立即返回"""
+    try:
+        from .src.xiser_nodes.llm.residency import QWEN_VL_RESIDENCY
+        from .src.xiser_nodes.llm.quantization import PROFILE_AUTO, PROFILE_NONE, PROFILES
+
+        data = await request.json()
+        model = data.get("model")
+        if not model:
+            return aiohttp.web.json_response({"success": False, "error": "缺少model参数"}, status=400)
+        # 预加载必须使用与节点相同的量化配置档，否则首次运行节点时会重新加载
+        quantization = data.get("quantization", PROFILE_NONE)
+        valid_profiles = (PROFILE_NONE, PROFILE_AUTO) + PROFILES
+        if quantization not in valid_profiles:
+            return aiohttp.web.json_response({
+                "success": False,
+                "error": f"无效的quantization参数: {quantization}（可选: {', '.join(valid_profiles)}）"
+            }, status=400)
+        overrides = {
+            "model_path": model,
+            "device": data.get("device", "auto"),
+            "dtype": data.get("dtype", "auto"),
+            "flash_attention_2": bool(data.get("flash_attention_2", False)),
+            "quantization": quantization,
+        }
+        QWEN_VL_RESIDENCY.preload(overrides, warmup=bool(data.get("warmup", True)))
+        return aiohttp.web.json_response({"success": True, "data": QWEN_VL_RESIDENCY.status()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=500)
+
+async def unload_qwen_vl(request):
+    """卸载模型（使用中时跳过，force=true强制卸载）"""
+    try:
+        from .src.xiser_nodes.llm.residency import QWEN_VL_RESIDENCY
+
+        data = await request.json() if request.can_read_body else {}
+        unloaded = QWEN_VL_RESIDENCY.unload("api", force=bool(data.get("force", False)))
+        return aiohttp.web.json_response({"success": True, "unloaded": unloaded, "data": QWEN_VL_RESIDENCY.status()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=500)
+
+# 性能指标API端点
+async def get_metrics(request):
+    """获取性能采样数据，format=prometheus时返回Prometheus文本格式"""
+    try:
+        from .src.xiser_nodes.profiler import PROFILER
+
+        fmt = request.query.get("format", "")
+        if fmt == "prometheus" or (not fmt and "text/plain" in request.headers.get("Accept", "")):
+            return aiohttp.web.Response(text=PROFILER.prometheus(), content_type="text/plain", charset="utf-8")
+        return aiohttp.web.json_response({"success": True, "data": PROFILER.snapshot()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=500)
+
+async def update_metrics(request):
+    """开关性能采样（enabled、trace_memory），reset=true时清空已有数据"""
+    try:
+        from .src.xiser_nodes.profiler import PROFILER
+
+        data = await request.json() if request.can_read_body else {}
+        PROFILER.configure(enabled=data.get("enabled"), trace_memory=data.get("trace_memory"))
+        if data.get("reset"):
+            PROFILER.reset()
+        return aiohttp.web.json_response({"success": True, "data": PROFILER.snapshot()})
+    except Exception as e:
+        return aiohttp.web.json_response({"success": False, "error": str(e)}, status=400)
+
 # 注册路由
 if HAS_PROMPT_SERVER:
     try:
@@ -218,6 +306,16 @@ if HAS_PROMPT_SERVER:
         PromptServer.instance.app.router.add_get("/xiser/vgm/config", get_vgm_config)
         PromptServer.instance.app.router.add_get("/xiser/vgm/config/{model_name}", get_vgm_model_config)
 
+        # Qwen3-VL本地模型常驻管理路由
+        PromptServer.instance.app.router.add_get("/xiser/qwen-vl/residency", get_qwen_vl_residency)
+        PromptServer.instance.app.router.add_post("/xiser/qwen-vl/residency", update_qwen_vl_residency)
+        PromptServer.instance.app.router.add_post("/xiser/qwen-vl/preload", preload_qwen_vl)
+        PromptServer.instance.app.router.add_post("/xiser/qwen-vl/unload", unload_qwen_vl)
+
+        # 性能指标路由
+        PromptServer.instance.app.router.add_get("/xiser/metrics", get_metrics)
+        PromptServer.instance.app.router.add_post("/xiser/metrics", update_metrics)
+
         # Register XIS_ImageManager V3 API routes
         from .src.xiser_nodes.image_manager.api import register_routes
         register_routes()
@@ -225,6 +323,14 @@ if HAS_PROMPT_SERVER:
         # 静默注册VGM配置路由
     except Exception as e:
         print("[XISER] Failed to register routes:", str(e))
+
+    # 启动时预加载本地Qwen3-VL模型（仅在设置XISER_QWEN_VL_PRELOAD时导入transformers）
+    if os.environ.get("XISER_QWEN_VL_PRELOAD"):
+        try:
+            from .src.xiser_nodes.llm.residency import QWEN_VL_RESIDENCY
+            QWEN_VL_RESIDENCY.preload_from_env()
+        except Exception as e:
+            print("[XISER] Failed to start Qwen3-VL preload:", str(e))
 else:
     print("[XISER] 跳过路由注册（不在ComfyUI环境中）")
 
@@ -312,6 +418,11 @@ class XISERExtension(ComfyExtension):
             v3_nodes.extend(MULTIPLE_ANGLES_PROMPT_NODES)
             v3_nodes.extend(QWEN3_VL_NODES)
 
+            # 为每个节点的execute包装性能采样（未启用时直接调用原函数）
+            from .src.xiser_nodes.profiler import PROFILER
+            for node_cls in v3_nodes:
+                PROFILER.instrument_node(node_cls)
+
             # print(f"[XISER V3] 成功加载 {len(v3_nodes)} 个V3节点")  # 简化日志，不显示此信息
             # 静默加载节点
 
@@ -0,0 +1,154 @@
+"""Per-module import cost report for the XISER node modules.
+
+Each node module is imported in a fresh interpreter with ``python -X importtime``
+after pre-importing what ComfyUI has already loaded at startup (torch, numpy,
+PIL, comfy_api, ...), so the numbers show only what the module itself adds to
+server boot. Modules over the budget are listed with their heaviest imports and
+the script exits with status 1.
+
+Usage (from the repository root)::
+
+    python benchmarks/import_time.py --comfyui /path/to/ComfyUI
+    python benchmarks/import_time.py --comfyui /path/to/ComfyUI --budget-ms 150 --json report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+NODES_DIR = SRC_DIR / "xiser_nodes"
+
+# ComfyUI启动时已经导入的模块，不计入节点模块的导入开销
+PRELOADED = [
+    "torch",
+    "numpy",
+    "PIL.Image",
+    "aiohttp",
+    "folder_paths",
+    "comfy.model_management",
+    "comfy_api.v0_0_2",
+]
+
+MARKER = "--xiser-import-mark--"
+
+
+def _child_code(module: str) -> str:
+    preload = "\n".join(
+        f"try:\n    import {name}\nexcept Exception:\n    pass" for name in PRELOADED
+    )
+    return (
+        f"import sys\n{preload}\n"
+        f"sys.stderr.write({MARKER!r} + '\\n')\n"
+        f"import importlib\nimportlib.import_module({module!r})\n"
+    )
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, object]]:
+    """Return top-level import entries recorded after the preload marker."""
+
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    entries = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": depth,
+        })
+    return entries
+
+
+def measure(module: str, env: Dict[str, str]) -> Dict[str, object]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _child_code(module)],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=str(REPO_ROOT),
+    )
+    entries = _parse_importtime(proc.stderr)
+    # 输出中嵌套导入先于父模块出现，最浅的一层即为本次新增的顶层导入
+    min_depth = min((e["depth"] for e in entries), default=0)
+    top_level = [e for e in entries if e["depth"] == min_depth]
+    heaviest = sorted(
+        (e for e in entries if not str(e["module"]).startswith("xiser_nodes")),
+        key=lambda e: e["cumulative_us"],
+        reverse=True,
+    )
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+    return {
+        "module": module,
+        "total_ms": round(sum(e["cumulative_us"] for e in top_level) / 1000.0, 1),
+        "heaviest": [
+            {"module": e["module"], "cumulative_ms": round(e["cumulative_us"] / 1000.0, 1)}
+            for e in heaviest[:5]
+        ],
+        "error": error,
+    }
+
+
+def discover_modules() -> List[str]:
+    return sorted(f"xiser_nodes.{path.stem}" for path in NODES_DIR.glob("*_v3.py"))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comfyui", help="ComfyUI root (for comfy_api, folder_paths, comfy)")
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="per-module import budget")
+    parser.add_argument("--json", dest="json_path", help="write the report to this file")
+    parser.add_argument("modules", nargs="*", help="modules to measure (default: all *_v3 node modules)")
+    args = parser.parse_args(argv)
+
+    paths = [str(SRC_DIR)]
+    if args.comfyui:
+        paths.insert(0, os.path.abspath(args.comfyui))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(paths + [env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+
+    results = [measure(module, env) for module in (args.modules or discover_modules())]
+    results.sort(key=lambda r: r["total_ms"], reverse=True)
+
+    over_budget = []
+    print(f"{'module':<45} {'ms':>8}  heaviest imports")
+    for result in results:
+        heaviest = ", ".join(f"{h['module']} {h['cumulative_ms']}" for h in result["heaviest"][:3])
+        flag = ""
+        if result["error"]:
+            flag = f"  [error: {result['error']}]"
+        elif result["total_ms"] > args.budget_ms:
+            flag = "  [over budget]"
+            over_budget.append(result["module"])
+        print(f"{result['module']:<45} {result['total_ms']:>8.1f}  {heaviest}{flag}")
+
+    total = sum(r["total_ms"] for r in results)
+    print(f"\n{len(results)} modules, {total:.0f} ms total, budget {args.budget_ms:.0f} ms per module")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"budget_ms": args.budget_ms, "results": results}, f, indent=2)
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""Benchmark harness for XISER image nodes, run outside the ComfyUI server.
+
+Runs the ``execute`` methods (``XISER_Canvas.render`` for the canvas) over a
+grid of image sizes, batch sizes and layer counts, with deterministic inputs.
+For every case it records wall time (min/median over ``--repeat`` runs after a
+warm-up run), peak RSS and a checksum of the outputs, and writes everything to
+a JSON report. ``--compare`` reads an older report and prints speedups and
+checksum changes, so two commits can be compared.
+
+``folder_paths`` is replaced by ``benchmarks/stubs/folder_paths.py`` (all
+files go to a temporary directory). ``comfy_api`` still comes from ComfyUI,
+so pass its checkout with ``--comfyui`` (or set ``COMFYUI_PATH``).
+
+Usage (from the repository root)::
+
+    python benchmarks/run_benchmarks.py --comfyui /path/to/ComfyUI --out report.json
+    python benchmarks/run_benchmarks.py --comfyui ... --nodes resize,adjust --sizes 512,2048 --batches 1,4
+    python benchmarks/run_benchmarks.py --comfyui ... --out new.json --compare old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+
+DEFAULT_SIZES = [512, 1024, 2048, 4096, 8192]
+DEFAULT_BATCHES = [1, 4]
+DEFAULT_LAYERS = [1, 4, 16]
+
+
+# ----------------------------------------------------------------------
+# 环境准备
+# ----------------------------------------------------------------------
+def setup_environment(comfyui_path: Optional[str]) -> None:
+    """Put the stub folder_paths, ComfyUI (for comfy_api) and src/ on sys.path."""
+
+    os.environ.setdefault("XISER_BENCH_DIR", tempfile.mkdtemp(prefix="xiser_bench_"))
+    sys.path.insert(0, str(BENCH_DIR / "stubs"))
+    if comfyui_path:
+        sys.path.insert(1, os.path.abspath(comfyui_path))
+    sys.path.insert(1, str(REPO_ROOT / "src"))
+
+
+# ----------------------------------------------------------------------
+# 测量工具
+# ----------------------------------------------------------------------
+def _current_rss() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+
+        # 退化为进程峰值（macOS为字节，Linux为KB）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSS:
+    """Samples RSS in a background thread while the block runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRSS":
+        self.start = self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def checksum(value: Any) -> str:
+    """Stable hash of all tensors/arrays/scalars in a (nested) node output."""
+
+    import numpy as np
+    import torch
+
+    digest = hashlib.sha256()
+
+    def feed(item: Any) -> None:
+        if isinstance(item, torch.Tensor):
+            # 量化到1e-4，避免不同BLAS实现的末位差异
+            data = torch.round(item.detach().float().cpu() * 1e4).to(torch.int64).contiguous()
+            digest.update(str(tuple(item.shape)).encode())
+            digest.update(data.numpy().tobytes())
+        elif isinstance(item, np.ndarray):
+            feed(torch.from_numpy(np.ascontiguousarray(item)))
+        elif isinstance(item, dict):
+            for key in sorted(item, key=str):
+                digest.update(str(key).encode())
+                feed(item[key])
+        elif isinstance(item, (list, tuple)):
+            for element in item:
+                feed(element)
+        elif isinstance(item, (int, float, str, bool)) or item is None:
+            digest.update(repr(item).encode())
+
+    feed(value)
+    return digest.hexdigest()[:16]
+
+
+def _node_result(output: Any) -> Any:
+    # io.NodeOutput保存在args中；canvas.render返回字典
+    if isinstance(output, dict) and "result" in output:
+        return output["result"]
+    return getattr(output, "args", output)
+
+
+# ----------------------------------------------------------------------
+# 输入构造
+# ----------------------------------------------------------------------
+def make_image(batch: int, height: int, width: int, channels: int = 3, seed: int = 0):
+    """Smooth gradient plus noise, deterministic for a given seed."""
+
+    import torch
+
+    generator = torch.Generator().manual_seed(seed)
+    ys = torch.linspace(0, 1, height).view(1, height, 1, 1)
+    xs = torch.linspace(0, 1, width).view(1, 1, width, 1)
+    phase = torch.arange(channels, dtype=torch.float32).view(1, 1, 1, channels) / max(channels, 1)
+    base = (xs * 0.6 + ys * 0.4 + phase).remainder(1.0)
+    noise = torch.rand((batch, height, width, channels), generator=generator) * 0.1
+    return (base + noise).clamp(0, 1)
+
+
+def make_mask(batch: int, height: int, width: int):
+    import torch
+
+    ys = torch.linspace(-1, 1, height).view(1, height, 1)
+    xs = torch.linspace(-1, 1, width).view(1, 1, width)
+    return ((xs ** 2 + ys ** 2) < 0.6).float().expand(batch, height, width).contiguous()
+
+
+# ----------------------------------------------------------------------
+# 基准用例
+# ----------------------------------------------------------------------
+def case_canvas(size: int, batch: int, layers: int) -> Callable[[], Any]:
+    from xiser_nodes.canvas_v3 import XISER_Canvas
+
+    border = 40
+    images = [make_image(1, size // 2, size // 2, 4, seed=i)[0] for i in range(layers)]
+    states = [
+        {
+            "order": i,
+            "x": border + size * (0.25 + 0.5 * i / max(layers - 1, 1)),
+            "y": border + size / 2,
+            "scaleX": 1.0,
+            "scaleY": 1.0,
+            "rotation": 15.0 * (i % 3),
+            "opacity": 80.0,
+            "brightness": 0.1 if i % 2 else 0.0,
+            "visible": True,
+        }
+        for i in range(layers)
+    ]
+    canvas = XISER_Canvas(instance_id="benchmark")
+
+    def run():
+        return canvas.render(
+            pack_images=images,
+            board_width=size,
+            board_height=size,
+            border_width=border,
+            canvas_color="white",
+            display_scale=0.5,
+            auto_size="off",
+            image_states=json.dumps(states),
+        )
+
+    return run
+
+
+def case_adjust(size: int, batch: int, layers: int) -> Callable[[], Any]:
+    from xiser_nodes.adjust_image_v3 import XIS_ImageAdjustAndBlendV3
+
+    image = make_image(batch, size, size, 3, seed=1)
+    background = make_image(batch, size, size, 3, seed=2)
+    mask = make_mask(batch, size, size)
+
+    def run():
+        return XIS_ImageAdjustAndBlendV3.execute(
+            image, brightness=0.1, contrast=0.15, saturation=0.2, hue=10.0,
+            r_gain=1.1, g_gain=1.0, b_gain=0.9, opacity=0.8,
+            mask=mask, background_image=background, blend_mode="overlay",
+        )
+
+    return run
+
+
+def case_resize(size: int, batch: int, layers: int) -> Callable[[], Any]:
+    from xiser_nodes.resize_image_or_mask_v3 import XIS_ResizeImageOrMaskV3
+
+    image = make_image(batch, size, size, 3, seed=3)
+    mask = make_mask(batch, size, size)
+    target = max(64, size // 2 + 37)  # 非整数倍缩放
+
+    def run():
+        return XIS_ResizeImageOrMaskV3.execute(
+            "force_resize", "always", "bilinear", 16,
+            image=image, mask=mask, manual_width=target, manual_height=target,
+        )
+
+    return run
+
+
+def case_gradient(size: int, batch: int, layers: int) -> Callable[[], Any]:
+    from xiser_nodes.multi_point_gradient_v3 import XIS_MultiPointGradientV3
+
+    colors = ["#ff0000", "#00ff00", "#0000ff", "#ffff00", "#00ffff", "#ff00ff"]
+    points = [
+        {"x": (0.15 + 0.7 * (i % 3) / 2), "y": (0.2 + 0.6 * (i // 3)), "color": colors[i], "influence": 1.0}
+        for i in range(len(colors))
+    ]
+
+    def run():
+        return XIS_MultiPointGradientV3.execute(size, size, "idw", {"control_points": points})
+
+    return run
+
+
+def case_shape(size: int, batch: int, layers: int) -> Callable[[], Any]:
+    from xiser_nodes.shape_and_text_v3 import XIS_ShapeAndTextV3
+
+    shape_canvas = {
+        "position": {"x": 0.1, "y": -0.05},
+        "rotation": 20.0,
+        "scale": {"x": 1.2, "y": 0.9},
+        "skew": {"x": 0.0, "y": 0.0},
+        "shape_params": json.dumps({"sides": 6}),
+    }
+    shape_data = [{} for _ in range(batch)] if batch > 1 else None
+
+    def run():
+        return XIS_ShapeAndTextV3.execute(
+            size, size, "polygon", "#ff8800", "#ffffff", False, "#000000", 4,
+            shape_canvas=shape_canvas, shape_data=shape_data,
+        )
+
+    return run
+
+
+# 每个节点使用的维度及尺寸上限（逐像素Python实现的节点在大尺寸下耗时过长）
+CASES: Dict[str, Dict[str, Any]] = {
+    "canvas": {"factory": case_canvas, "node": "XISER_Canvas.render", "uses": ("size", "layers"), "max_size": 8192},
+    "adjust": {"factory": case_adjust, "node": "XIS_ImageAdjustAndBlendV3", "uses": ("size", "batch"), "max_size": 8192},
+    "resize": {"factory": case_resize, "node": "XIS_ResizeImageOrMaskV3", "uses": ("size", "batch"), "max_size": 8192},
+    "gradient": {"factory": case_gradient, "node": "XIS_MultiPointGradientV3", "uses": ("size",), "max_size": 1024},
+    "shape": {"factory": case_shape, "node": "XIS_ShapeAndTextV3", "uses": ("size", "batch"), "max_size": 4096},
+}
+
+
+def iter_params(name: str, sizes: List[int], batches: List[int], layer_counts: List[int], unbounded: bool):
+    spec = CASES[name]
+    uses = spec["uses"]
+    for size in sizes:
+        if not unbounded and size > spec["max_size"]:
+            continue
+        for batch in (batches if "batch" in uses else [1]):
+            for layers in (layer_counts if "layers" in uses else [1]):
+                yield {"size": size, "batch": batch, "layers": layers}
+
+
+def run_case(name: str, params: Dict[str, int], repeat: int) -> Dict[str, Any]:
+    import gc
+
+    import torch
+
+    torch.manual_seed(0)
+    result: Dict[str, Any] = {"case": name, "node": CASES[name]["node"], "params": params}
+    try:
+        run = CASES[name]["factory"](params["size"], params["batch"], params["layers"])
+        output = _node_result(run())  # 预热，同时计算校验和
+        result["checksum"] = checksum(output)
+        del output
+        timings = []
+        gc.collect()
+        with PeakRSS() as rss:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+        result.update(
+            wall_min=round(min(timings), 6),
+            wall_median=round(statistics.median(timings), 6),
+            wall_mean=round(statistics.fmean(timings), 6),
+            peak_rss_mb=round(rss.peak / 2 ** 20, 1),
+            rss_delta_mb=round((rss.peak - rss.start) / 2 ** 20, 1),
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+# ----------------------------------------------------------------------
+# 报告
+# ----------------------------------------------------------------------
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    import numpy as np
+    import torch
+
+    return {
+        "commit": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "numpy": np.__version__,
+        "repeat": args.repeat,
+    }
+
+
+def _case_key(result: Dict[str, Any]) -> str:
+    p = result["params"]
+    return f"{result['case']}:{p['size']}:{p['batch']}:{p['layers']}"
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_case_key(r): r for r in json.load(f).get("results", [])}
+    print(f"\nComparison against {baseline_path}")
+    print(f"{'case':<28} {'old ms':>10} {'new ms':>10} {'speedup':>8}  checksum")
+    for result in results:
+        old = baseline.get(_case_key(result))
+        if not old or "wall_median" not in old or "wall_median" not in result:
+            continue
+        speedup = old["wall_median"] / result["wall_median"] if result["wall_median"] else float("inf")
+        same = "same" if old.get("checksum") == result.get("checksum") else "CHANGED"
+        print(
+            f"{_case_key(result):<28} {old['wall_median'] * 1000:>10.1f} "
+            f"{result['wall_median'] * 1000:>10.1f} {speedup:>7.2f}x  {same}"
+        )
+
+
+def _parse_ints(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comfyui", default=os.environ.get("COMFYUI_PATH"), help="ComfyUI checkout (for comfy_api)")
+    parser.add_argument("--nodes", default=",".join(CASES), help=f"comma separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--sizes", type=_parse_ints, default=DEFAULT_SIZES)
+    parser.add_argument("--batches", type=_parse_ints, default=DEFAULT_BATCHES)
+    parser.add_argument("--layers", type=_parse_ints, default=DEFAULT_LAYERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, help="torch.set_num_threads for reproducible CPU timings")
+    parser.add_argument("--no-size-limit", action="store_true", help="ignore per-node max_size caps")
+    parser.add_argument("--out", default="benchmark_report.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    setup_environment(args.comfyui)
+    import torch
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    names = [name.strip() for name in args.nodes.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown nodes: {', '.join(unknown)}")
+
+    results = []
+    for name in names:
+        for params in iter_params(name, args.sizes, args.batches, args.layers, args.no_size_limit):
+            result = run_case(name, params, args.repeat)
+            results.append(result)
+            if "error" in result:
+                print(f"{_case_key(result):<28} ERROR {result['error']}")
+            else:
+                print(
+                    f"{_case_key(result):<28} {result['wall_median'] * 1000:>10.1f} ms  "
+                    f"peak {result['peak_rss_mb']:>8.1f} MB  {result['checksum']}"
+                )
+
+    report = {"meta": _metadata(args), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Minimal stand-in for ComfyUI's ``folder_paths`` used by the benchmark harness.
+
+All directories live under ``XISER_BENCH_DIR`` (a temporary directory set by
+the harness), so benchmark runs never touch a real ComfyUI installation.
+"""
+
+import os
+import tempfile
+
+base_path = os.environ.get("XISER_BENCH_DIR") or tempfile.mkdtemp(prefix="xiser_bench_")
+models_dir = os.path.join(base_path, "models")
+output_directory = os.path.join(base_path, "output")
+input_directory = os.path.join(base_path, "input")
+temp_directory = os.path.join(base_path, "temp")
+
+folder_names_and_paths = {}
+
+for _path in (models_dir, output_directory, input_directory, temp_directory):
+    os.makedirs(_path, exist_ok=True)
+
+
+def get_output_directory():
+    return output_directory
+
+
+def get_input_directory():
+    return input_directory
+
+
+def get_temp_directory():
+    return temp_directory
+
+
+def get_folder_paths(folder_name):
+    return list(folder_names_and_paths.get(folder_name, ([], set()))[0])
+
+
+def annotated_filepath(name):
+    return name, None
+
+
+def get_annotated_filepath(name, default_dir=None):
+    return os.path.join(default_dir or input_directory, name)
@@ -12,7 +12,6 @@ from aiohttp import web
 import folder_paths
 import logging
 from PIL import Image
-from torchvision import transforms
 from server import PromptServer
 
 # Import the new LLM configuration system
@@ -30,7 +29,7 @@ BASE_DIR = os.path.dirname(__file__)
 FONTS_DIR = os.path.join(BASE_DIR, "fonts")
 COLOR_PRESETS_FILE = os.path.join(BASE_DIR, "web", "xiser_color_presets.json")
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+# 不修改根日志器配置（由ComfyUI统一设置），只使用模块自身的日志器
 logger = logging.getLogger(__name__)
 
 
@@ -136,15 +135,22 @@ if BIRENET_SRC_ROOT not in sys.path:
 if BIRENET_REPO_DIR not in sys.path:
     sys.path.insert(0, BIRENET_REPO_DIR)
 
+# BiRefNet依赖timm、kornia及swin/pvt骨干网络，导入较慢，首次抠图时再加载
+BiRefNet = None
+check_state_dict = None
 BIRENET_IMPORT_ERROR = None
-try:
-    from birefnet_repo.models.birefnet import BiRefNet
-    from birefnet_repo.utils import check_state_dict
-except ImportError as exc:  # pragma: no cover
-    BiRefNet = None
-    check_state_dict = None
-    BIRENET_IMPORT_ERROR = str(exc)
-    logger.error("Failed to import BiRefNet modules: %s", exc)
+
+
+def _import_birefnet():
+    global BiRefNet, check_state_dict, BIRENET_IMPORT_ERROR
+    if BiRefNet is not None or BIRENET_IMPORT_ERROR is not None:
+        return
+    try:
+        from birefnet_repo.models.birefnet import BiRefNet
+        from birefnet_repo.utils import check_state_dict
+    except ImportError as exc:  # pragma: no cover
+        BIRENET_IMPORT_ERROR = str(exc)
+        logger.error("Failed to import BiRefNet modules: %s", exc)
 
 MODEL_CACHE = {}
 MODEL_CACHE_LOCK = threading.Lock()
@@ -216,6 +222,7 @@ def _select_model_path(model_name):
 def _load_birefnet_model(model_name=None):
     if torch is None:
         raise RuntimeError("PyTorch is required for BiRefNet")
+    _import_birefnet()
     if BiRefNet is None or check_state_dict is None:
         msg = "BiRefNet modules are not importable"
         if BIRENET_IMPORT_ERROR:
@@ -262,6 +269,8 @@ def _calculate_inference_size(orig_size, max_megapixels):
 
 
 def _prepare_tensor_from_image(image, target_size):
+    from torchvision import transforms
+
     transform = transforms.Compose(
         [
             transforms.Resize(target_size, interpolation=Image.BILINEAR),
@@ -286,6 +295,8 @@ def _save_image_to_path(image, path):
 
 
 def _run_birefnet_cutout(model, pil_image, device, max_megapixels):
+    from torchvision import transforms
+
     orig_size = pil_image.size
     target_size = _calculate_inference_size(orig_size, max_megapixels)
     tensor = _prepare_tensor_from_image(pil_image, target_size).to(device)
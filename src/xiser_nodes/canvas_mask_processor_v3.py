@@ -2,8 +2,11 @@
 
 from comfy_api.v0_0_2 import io, ui
 import torch
+from .utils import lazy_node_mappings
 
 MAX_LAYER_COUNT = 50
+# CPU上按高度分块时每块（行数×宽度）的元素数，保持分块数据在缓存内
+CHUNK_ELEMENTS = 1 << 16
 
 
 class XIS_CanvasMaskProcessorV3(io.ComfyNode):
@@ -43,6 +46,34 @@ class XIS_CanvasMaskProcessorV3(io.ComfyNode):
             ]
         )
 
+    @classmethod
+    def blend_visible_layers(cls, masks: torch.Tensor, enabled_indices) -> torch.Tensor:
+        """
+        计算启用层中未被上层遮挡的部分之和。
+
+        从最上层向下扫描一次，维护上方各层的累计最大值（反向 cummax），
+        每层只需一次 max 和一次乘加；CPU 上按高度分块以提高缓存命中，
+        临时张量只与分块大小相关，计算保持在蒙版所在设备上。
+        """
+        enabled = set(enabled_indices)
+        # 最下方启用层以下的蒙版不影响结果
+        base = min(enabled)
+        layer_count, height, width = masks.shape
+
+        output_mask = torch.empty((height, width), dtype=masks.dtype, device=masks.device)
+        rows = height if masks.is_cuda else max(1, CHUNK_ELEMENTS // max(1, width))
+        for top in range(0, height, rows):
+            bottom = min(height, top + rows)
+            upper = torch.zeros((bottom - top, width), dtype=masks.dtype, device=masks.device)
+            total = torch.zeros_like(upper)
+            for i in range(layer_count - 1, base - 1, -1):
+                layer = torch.clamp(masks[i, top:bottom], 0.0, 1.0)
+                if i in enabled:
+                    total.addcmul_(layer, 1.0 - upper)
+                torch.maximum(upper, layer, out=upper)
+            output_mask[top:bottom] = torch.clamp(total, 0.0, 1.0)
+        return output_mask
+
     @classmethod
     def execute(cls, invert_output, masks, **kwargs) -> io.NodeOutput:
         """
@@ -54,11 +85,9 @@ class XIS_CanvasMaskProcessorV3(io.ComfyNode):
         if batch_size < 1:
             raise ValueError("至少需要提供一个蒙版")
 
-        if torch.isnan(masks).any() or torch.isinf(masks).any():
+        if not torch.isfinite(masks).all():
             raise ValueError("输入蒙版包含NaN或Inf值")
 
-        masks = torch.clamp(masks, 0.0, 1.0)
-
         if cls.DEBUG:
             print(f"输入蒙版形状: {masks.shape}, 最小值: {masks.min().item()}, 最大值: {masks.max().item()}")
 
@@ -73,34 +102,14 @@ class XIS_CanvasMaskProcessorV3(io.ComfyNode):
         if masks.dim() == 2:
             masks = masks.unsqueeze(0)
 
-        shape = masks[0].shape
-        for mask in masks[1:]:
-            if mask.shape != shape:
-                raise ValueError("所有蒙版必须具有相同的尺寸")
-
-        output_mask = torch.zeros_like(masks[0])
-
-        if not any(enables):
+        enabled_indices = [i for i in range(enabled_slots) if enables[i]]
+        if not enabled_indices:
             if cls.DEBUG:
                 print("没有启用任何层，返回默认蒙版")
-            if invert_output:
-                output_mask = torch.ones_like(output_mask)
+            output_mask = torch.ones_like(masks[0]) if invert_output else torch.zeros_like(masks[0])
             return io.NodeOutput(output_mask)
 
-        for i, (mask, enable) in enumerate(zip(masks, enables[:enabled_slots])):
-            if enable:
-                upper_opacity = torch.zeros_like(mask)
-                for j in range(i + 1, batch_size):
-                    upper_opacity = torch.max(upper_opacity, masks[j])
-                visible_part = mask * (1.0 - upper_opacity)
-                if cls.DEBUG:
-                    print(
-                        f"层 {i+1}, 启用: {enable}, 上层不透明度最大值: {upper_opacity.max().item()}, "
-                        f"可见部分最大值: {visible_part.max().item()}"
-                    )
-                output_mask = output_mask + visible_part
-
-        output_mask = torch.clamp(output_mask, 0.0, 1.0)
+        output_mask = cls.blend_visible_layers(masks, enabled_indices)
         if cls.DEBUG:
             print(f"输出蒙版最小值: {output_mask.min().item()}, 最大值: {output_mask.max().item()}")
 
@@ -120,7 +129,5 @@ V3_NODE_CLASSES = [
 ]
 
 # 节点ID到类的映射（用于向后兼容或参考）
-V3_NODE_MAPPINGS = {
-    cls.define_schema().node_id: cls
-    for cls in V3_NODE_CLASSES
-}
\ No newline at end of file
+# 首次访问时再构建，避免导入模块时为每个节点调用define_schema
+__getattr__ = lazy_node_mappings(globals())
\ No newline at end of file
@@ -22,6 +22,7 @@ from comfy_api.v0_0_2 import io, ComfyExtension
 # 导入统一的调节工具模块
 from .adjustment_utils import AdjustmentUtils
 from .adjustment_algorithms import AdjustmentAlgorithms
+from .profiler import PROFILER
 
 logger = logging.getLogger("XISER_Canvas")
 logger.setLevel(logging.ERROR)
@@ -506,37 +507,40 @@ class XISER_Canvas:
         image_paths = []
         logger.info(f"Instance {self.instance_id} - Processing {len(images_list)} images")
 
-        for i, img_tensor in enumerate(images_list):
-            img = (img_tensor.cpu().numpy() * 255).clip(0, 255).astype(np.uint8)
-            pil_img = Image.fromarray(img, mode="RGBA")
+        with PROFILER.span("save_images"):
+            for i, img_tensor in enumerate(images_list):
+                img = (img_tensor.cpu().numpy() * 255).clip(0, 255).astype(np.uint8)
+                pil_img = Image.fromarray(img, mode="RGBA")
 
-            # Calculate combined hash: image content + layer index
-            # This ensures same content in different layers get different filenames
-            combined_data = img.tobytes() + str(i).encode()
-            file_hash = hashlib.md5(combined_data).hexdigest()[:8]
+                # Calculate combined hash: image content + layer index
+                # This ensures same content in different layers get different filenames
+                combined_data = img.tobytes() + str(i).encode()
+                file_hash = hashlib.md5(combined_data).hexdigest()[:8]
 
-            # Log image info
-            logger.info(f"Instance {self.instance_id} - Image {i}: shape={img.shape}, hash={file_hash}")
+                # Log image info
+                logger.debug("Instance %s - Image %d: shape=%s, hash=%s", self.instance_id, i, img.shape, file_hash)
 
-            # Generate filename with content+index hash
-            final_fname = f"xiser_image_{file_hash}.png"
-            final_path = os.path.join(self.output_dir, final_fname)
+                # Generate filename with content+index hash
+                final_fname = f"xiser_image_{file_hash}.png"
+                final_path = os.path.join(self.output_dir, final_fname)
 
-            # Check if file already exists
-            if os.path.exists(final_path):
-                # File exists, reuse it
-                logger.info(f"Instance {self.instance_id} - Reusing cached file: {final_fname}")
-            else:
-                # Save new file
-                pil_img.save(final_path, format="PNG")
-                logger.info(f"Instance {self.instance_id} - Saved new file: {final_fname}")
+                # Check if file already exists
+                if os.path.exists(final_path):
+                    # File exists, reuse it
+                    PROFILER.record_cache("canvas_image_files", True)
+                    logger.debug("Instance %s - Reusing cached file: %s", self.instance_id, final_fname)
+                else:
+                    # Save new file
+                    PROFILER.record_cache("canvas_image_files", False)
+                    pil_img.save(final_path, format="PNG")
+                    logger.debug("Instance %s - Saved new file: %s", self.instance_id, final_fname)
 
-            # Update image_states with final filename
-            if i < len(image_states) and isinstance(image_states[i], dict):
-                image_states[i]["filename"] = final_fname
+                # Update image_states with final filename
+                if i < len(image_states) and isinstance(image_states[i], dict):
+                    image_states[i]["filename"] = final_fname
 
-            self.created_files.add(final_fname)
-            image_paths.append(final_fname)
+                self.created_files.add(final_fname)
+                image_paths.append(final_fname)
 
         # Normalize lengths and ensure complete states
         if len(image_states) < len(image_paths):
@@ -588,80 +592,82 @@ class XISER_Canvas:
                 order_val = idx
             render_list.append((order_val, idx, path, st))
         render_list.sort(key=lambda tup: tup[0])
-        logger.info(
-            f"Instance {self.instance_id} - Render order (order, idx, filename): "
-            f"{[(o, idx, st.get('filename')) for o, idx, _, st in render_list]}"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Instance %s - Render order (order, idx, filename): %s",
+                self.instance_id, [(o, idx, st.get("filename")) for o, idx, _, st in render_list],
+            )
 
-        for _, i, path, state in render_list:
-            try:
-                if not state.get("visible", True):
-                    continue
-                img = Image.open(os.path.join(self.output_dir, path)).convert("RGBA")
-                brightness = state.get("brightness", 0.0)
-                contrast = state.get("contrast", 0.0)
-                saturation = state.get("saturation", 0.0)
-                opacity = state.get("opacity", 100.0)
-                if abs(brightness) > 1e-3 or abs(contrast) > 1e-3 or abs(saturation) > 1e-3:
-                    img = self._apply_brightness_contrast(img, brightness, contrast, saturation)
-                alpha = img.split()[3]
-                mask = Image.new("L", (board_width, board_height), 0)
-
-                scale_x = state.get("scaleX", 1.0)
-                scale_y = state.get("scaleY", 1.0)
-                rotation = state.get("rotation", 0.0)
-                skew_x = state.get("skewX", 0.0)
-                skew_y = state.get("skewY", 0.0)
-
-                original_width, original_height = img.size
-                if scale_x != 1.0 or scale_y != 1.0 or rotation != 0.0 or skew_x != 0.0 or skew_y != 0.0:
-                    img = self._apply_coordinate_based_transform(img, scale_x, scale_y, rotation, skew_x, skew_y)
-                    alpha_rgba = Image.merge("RGBA", (alpha, alpha, alpha, alpha))
-                    alpha_transformed = self._apply_coordinate_based_transform(
-                        alpha_rgba, scale_x, scale_y, rotation, skew_x, skew_y
-                    )
-                    alpha = alpha_transformed.split()[0]
-
-                # Frontend coordinates are in stage space (include border); convert to board space
-                frontend_x = state.get("x", border_width + board_width / 2)
-                frontend_y = state.get("y", border_width + board_height / 2)
-                canvas_x = frontend_x - border_width
-                canvas_y = frontend_y - border_width
-                backend_x = canvas_x - img.width / 2
-                backend_y = canvas_y - img.height / 2
-                paste_x = int(backend_x)
-                paste_y = int(backend_y)
-
-                visible_x1 = max(0, -paste_x)
-                visible_y1 = max(0, -paste_y)
-                visible_x2 = min(img.width, board_width - paste_x)
-                visible_y2 = min(img.height, board_height - paste_y)
-
-                if visible_x1 < visible_x2 and visible_y1 < visible_y2:
-                    img_cropped = img.crop((visible_x1, visible_y1, visible_x2, visible_y2))
-                    alpha_cropped = alpha.crop((visible_x1, visible_y1, visible_x2, visible_y2))
-                else:
+        with PROFILER.span("composite_layers"):
+            for _, i, path, state in render_list:
+                try:
+                    if not state.get("visible", True):
+                        continue
+                    img = Image.open(os.path.join(self.output_dir, path)).convert("RGBA")
+                    brightness = state.get("brightness", 0.0)
+                    contrast = state.get("contrast", 0.0)
+                    saturation = state.get("saturation", 0.0)
+                    opacity = state.get("opacity", 100.0)
+                    if abs(brightness) > 1e-3 or abs(contrast) > 1e-3 or abs(saturation) > 1e-3:
+                        img = self._apply_brightness_contrast(img, brightness, contrast, saturation)
+                    alpha = img.split()[3]
+                    mask = Image.new("L", (board_width, board_height), 0)
+
+                    scale_x = state.get("scaleX", 1.0)
+                    scale_y = state.get("scaleY", 1.0)
+                    rotation = state.get("rotation", 0.0)
+                    skew_x = state.get("skewX", 0.0)
+                    skew_y = state.get("skewY", 0.0)
+
+                    original_width, original_height = img.size
+                    if scale_x != 1.0 or scale_y != 1.0 or rotation != 0.0 or skew_x != 0.0 or skew_y != 0.0:
+                        img = self._apply_coordinate_based_transform(img, scale_x, scale_y, rotation, skew_x, skew_y)
+                        alpha_rgba = Image.merge("RGBA", (alpha, alpha, alpha, alpha))
+                        alpha_transformed = self._apply_coordinate_based_transform(
+                            alpha_rgba, scale_x, scale_y, rotation, skew_x, skew_y
+                        )
+                        alpha = alpha_transformed.split()[0]
+
+                    # Frontend coordinates are in stage space (include border); convert to board space
+                    frontend_x = state.get("x", border_width + board_width / 2)
+                    frontend_y = state.get("y", border_width + board_height / 2)
+                    canvas_x = frontend_x - border_width
+                    canvas_y = frontend_y - border_width
+                    backend_x = canvas_x - img.width / 2
+                    backend_y = canvas_y - img.height / 2
+                    paste_x = int(backend_x)
+                    paste_y = int(backend_y)
+
+                    visible_x1 = max(0, -paste_x)
+                    visible_y1 = max(0, -paste_y)
+                    visible_x2 = min(img.width, board_width - paste_x)
+                    visible_y2 = min(img.height, board_height - paste_y)
+
+                    if visible_x1 < visible_x2 and visible_y1 < visible_y2:
+                        img_cropped = img.crop((visible_x1, visible_y1, visible_x2, visible_y2))
+                        alpha_cropped = alpha.crop((visible_x1, visible_y1, visible_x2, visible_y2))
+                    else:
+                        mask_list[i] = torch.zeros((board_height, board_width), dtype=torch.float32)
+                        layer_images[i] = torch.zeros((board_height, board_width, 4), dtype=torch.float32)
+                        continue
+
+                    # 使用预乘alpha合成算法将图像合成到画布
+                    # 使用统一的透明度转换工具
+                    opacity_value = AdjustmentUtils.opacity_to_alpha(opacity)
+                    canvas_pil = AdjustmentAlgorithms.alpha_composite(canvas_pil, img_cropped, max(0, paste_x), max(0, paste_y), opacity_value)
+
+                    mask.paste(alpha_cropped, (max(0, paste_x), max(0, paste_y)))
+                    mask_list[i] = torch.from_numpy(np.array(mask, dtype=np.float32) / 255.0)
+
+                    # 创建单独的图层图像（带透明度）
+                    layer_canvas = Image.new("RGBA", (board_width, board_height), (0, 0, 0, 0))
+                    layer_canvas = AdjustmentAlgorithms.alpha_composite(layer_canvas, img_cropped, max(0, paste_x), max(0, paste_y), opacity_value)
+                    layer_rgba = torch.from_numpy(np.array(layer_canvas).astype(np.float32) / 255.0)
+                    layer_images[i] = layer_rgba
+                except Exception as e:
+                    logger.error(f"Instance {self.instance_id} - Failed to apply image {i+1}: {e}")
                     mask_list[i] = torch.zeros((board_height, board_width), dtype=torch.float32)
                     layer_images[i] = torch.zeros((board_height, board_width, 4), dtype=torch.float32)
-                    continue
-
-                # 使用预乘alpha合成算法将图像合成到画布
-                # 使用统一的透明度转换工具
-                opacity_value = AdjustmentUtils.opacity_to_alpha(opacity)
-                canvas_pil = AdjustmentAlgorithms.alpha_composite(canvas_pil, img_cropped, max(0, paste_x), max(0, paste_y), opacity_value)
-
-                mask.paste(alpha_cropped, (max(0, paste_x), max(0, paste_y)))
-                mask_list[i] = torch.from_numpy(np.array(mask, dtype=np.float32) / 255.0)
-
-                # 创建单独的图层图像（带透明度）
-                layer_canvas = Image.new("RGBA", (board_width, board_height), (0, 0, 0, 0))
-                layer_canvas = AdjustmentAlgorithms.alpha_composite(layer_canvas, img_cropped, max(0, paste_x), max(0, paste_y), opacity_value)
-                layer_rgba = torch.from_numpy(np.array(layer_canvas).astype(np.float32) / 255.0)
-                layer_images[i] = layer_rgba
-            except Exception as e:
-                logger.error(f"Instance {self.instance_id} - Failed to apply image {i+1}: {e}")
-                mask_list[i] = torch.zeros((board_height, board_width), dtype=torch.float32)
-                layer_images[i] = torch.zeros((board_height, board_width, 4), dtype=torch.float32)
 
         zero_mask = torch.zeros((board_height, board_width), dtype=torch.float32)
         zero_layer = torch.zeros((board_height, board_width, 4), dtype=torch.float32)
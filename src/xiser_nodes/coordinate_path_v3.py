@@ -10,6 +10,17 @@ import numpy as np
 from typing import List, Dict, Any
 from comfy_api.v0_0_2 import io, ui
 
+# 弧长查找表每段采样数（精度与速度的权衡）
+ARC_LENGTH_SAMPLES = {
+    "fast": 16,
+    "standard": 100,
+    "precise": 1000,
+}
+# adaptive模式的收敛阈值（相对总长度）
+ARC_LENGTH_TOLERANCE = 1e-6
+# 查找表最大条目数
+ARC_LENGTH_MAX_TABLE_SIZE = 1_000_000
+
 class XIS_CoordinatePathV3(io.ComfyNode):
     """
     A custom node for generating coordinate paths based on control points.
@@ -62,6 +73,12 @@ class XIS_CoordinatePathV3(io.ComfyNode):
                 ),
                 io.Custom("WIDGET").Input("path_canvas",
                     tooltip="包含控制点的画布数据"
+                ),
+                io.Combo.Input("arc_length_accuracy",
+                    options=list(ARC_LENGTH_SAMPLES.keys()) + ["adaptive"],
+                    default="standard",
+                    optional=True,
+                    tooltip="曲线弧长精度：fast（快速）、standard（标准）、precise（精确）或 adaptive（按收敛自动加密，适合很长的路径）"
                 )
             ],
             outputs=[
@@ -142,75 +159,71 @@ class XIS_CoordinatePathV3(io.ComfyNode):
         return path_coords
 
     @classmethod
-    def calculate_curve_path(cls, control_points: List[Dict[str, float]], segments: int, distribution_mode: str = "uniform") -> List[Dict[str, float]]:
+    def build_curve_points(cls, control_points: List[Dict[str, float]]) -> np.ndarray:
         """
-        Calculate curve path coordinates using Catmull-Rom spline with arc-length parameterization.
-        Points are distributed along the total curve length based on distribution mode.
+        Convert control points to an (N, 2) array with the virtual endpoints added.
 
         Args:
             control_points: List of control points with x, y coordinates
-            segments: Number of segments to generate
-            distribution_mode: Distribution mode for point spacing
 
         Returns:
-            List of coordinate points
+            Array of spline points including virtual endpoints
         """
-        if len(control_points) < 2:
-            return []
+        points = np.array([[p["x"], p["y"]] for p in control_points], dtype=np.float64)
 
         # 使用改进的虚拟端点生成算法，与前端保持一致
-        points = control_points.copy()
         if len(points) == 2:
             # 对于2个点，创建更平滑的虚拟端点
-            p0 = {"x": points[0]["x"] - 0.2 * (points[1]["x"] - points[0]["x"]),
-                  "y": points[0]["y"] - 0.2 * (points[1]["y"] - points[0]["y"])}
-            p3 = {"x": points[1]["x"] + 0.2 * (points[1]["x"] - points[0]["x"]),
-                  "y": points[1]["y"] + 0.2 * (points[1]["y"] - points[0]["y"])}
-            points = [p0, points[0], points[1], p3]
+            direction = points[1] - points[0]
+            head, tail = points[0] - 0.2 * direction, points[1] + 0.2 * direction
         elif len(points) == 3:
             # 对于3个点，创建更平滑的虚拟端点
-            p0 = {"x": points[0]["x"] - 0.15 * (points[1]["x"] - points[0]["x"]),
-                  "y": points[0]["y"] - 0.15 * (points[1]["y"] - points[0]["y"])}
-            p4 = {"x": points[2]["x"] + 0.15 * (points[2]["x"] - points[1]["x"]),
-                  "y": points[2]["y"] + 0.15 * (points[2]["y"] - points[1]["y"])}
-            points = [p0, points[0], points[1], points[2], p4]
+            head = points[0] - 0.15 * (points[1] - points[0])
+            tail = points[2] + 0.15 * (points[2] - points[1])
         else:
             # 对于4个及以上控制点，添加平滑的虚拟端点
-            p0 = {"x": points[0]["x"] - 0.1 * (points[1]["x"] - points[0]["x"]),
-                  "y": points[0]["y"] - 0.1 * (points[1]["y"] - points[0]["y"])}
-            p_end = {"x": points[-1]["x"] + 0.1 * (points[-1]["x"] - points[-2]["x"]),
-                    "y": points[-1]["y"] + 0.1 * (points[-1]["y"] - points[-2]["y"])}
-            points = [p0] + points + [p_end]
+            head = points[0] - 0.1 * (points[1] - points[0])
+            tail = points[-1] + 0.1 * (points[-1] - points[-2])
+        return np.vstack([head, points, tail])
 
-        # 计算曲线段数量
-        num_curve_segments = len(points) - 3
-        if num_curve_segments <= 0:
-            return []
+    @classmethod
+    def calculate_curve_path(cls, control_points: List[Dict[str, float]], segments: int, distribution_mode: str = "uniform",
+                             accuracy: str = "standard") -> List[Dict[str, float]]:
+        """
+        Calculate curve path coordinates using Catmull-Rom spline with arc-length parameterization.
+        Points are distributed along the total curve length based on distribution mode.
 
-        # 计算曲线总长度
-        total_length = cls.calculate_curve_length(points)
-        if total_length == 0:
-            return []
+        Args:
+            control_points: List of control points with x, y coordinates
+            segments: Number of segments to generate
+            distribution_mode: Distribution mode for point spacing
+            accuracy: Arc-length table accuracy (see ARC_LENGTH_SAMPLES)
 
-        path_coords = []
+        Returns:
+            List of coordinate points
+        """
+        if len(control_points) < 2:
+            return []
 
-        # 基于弧长和分布模式分布点
-        for i in range(segments):
-            # 计算目标弧长（基于分布模式）
-            if segments == 1:
-                target_arc_length = total_length / 2  # 单个点放在中间
-            else:
-                ratio = cls.calculate_distribution_ratio(i, segments, distribution_mode)
-                target_arc_length = ratio * total_length
+        points = cls.build_curve_points(control_points)
+        if len(points) - 3 <= 0:
+            return []
 
-            # 找到对应的曲线段和参数t
-            segment_index, t = cls.find_t_for_arc_length(points, target_arc_length)
+        # 每次执行只构建一次弧长表
+        params, cumulative = cls.build_arc_length_table(points, accuracy=accuracy)
+        total_length = cumulative[-1]
+        if total_length == 0:
+            return []
 
-            # 生成曲线点
-            point = cls.catmull_rom(points, segment_index, t)
-            path_coords.append(point)
+        # 计算目标弧长（基于分布模式），单个点放在中间
+        if segments == 1:
+            ratios = np.array([0.5])
+        else:
+            ratios = np.array([cls.calculate_distribution_ratio(i, segments, distribution_mode) for i in range(segments)])
+        segment_index, t = cls.invert_arc_length(params, cumulative, ratios * total_length, len(points) - 3)
 
-        return path_coords
+        coords = cls.catmull_rom_batch(points, segment_index, t)
+        return [{"x": float(x), "y": float(y)} for x, y in coords]
 
     @classmethod
     def catmull_rom(cls, points: List[Dict[str, float]], segment_index: int, t: float) -> Dict[str, float]:
@@ -256,39 +269,131 @@ class XIS_CoordinatePathV3(io.ComfyNode):
         return {"x": x, "y": y}
 
     @classmethod
-    def calculate_curve_length(cls, points: List[Dict[str, float]], samples_per_segment: int = 100) -> float:
+    def catmull_rom_batch(cls, points: np.ndarray, segment_index: np.ndarray, t: np.ndarray) -> np.ndarray:
         """
-        Calculate the total length of the Catmull-Rom curve.
+        Evaluate Catmull-Rom spline points for arrays of segments and parameters.
 
         Args:
-            points: Control points with virtual endpoints
-            samples_per_segment: Number of samples per curve segment for length calculation
+            points: (N, 2) control points with virtual endpoints
+            segment_index: Segment index per sample (broadcastable with t)
+            t: Parameter per sample (0-1)
 
         Returns:
-            Total curve length
+            Array of shape t.shape + (2,) with point coordinates
+        """
+        segment_index = np.clip(segment_index, 0, len(points) - 4)
+        p0 = points[segment_index]
+        p1 = points[segment_index + 1]
+        p2 = points[segment_index + 2]
+        p3 = points[segment_index + 3]
+
+        t = np.asarray(t, dtype=np.float64)[..., None]
+        t2 = t * t
+        t3 = t2 * t
+        return 0.5 * ((2 * p1) +
+                      (-p0 + p2) * t +
+                      (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2 +
+                      (-p0 + 3 * p1 - 3 * p2 + p3) * t3)
+
+    @classmethod
+    def _sample_arc_length(cls, points: np.ndarray, samples_per_segment: int) -> tuple:
+        num_curve_segments = len(points) - 3
+        steps = np.arange(samples_per_segment + 1) / samples_per_segment
+        seg = np.arange(num_curve_segments)[:, None]
+        # (段数, 采样数+1, 2)
+        samples = cls.catmull_rom_batch(points, np.broadcast_to(seg, (num_curve_segments, len(steps))), steps[None, :])
+        step_lengths = np.linalg.norm(np.diff(samples, axis=1), axis=-1)
+
+        params = np.concatenate([[0.0], (seg + steps[None, 1:]).ravel()])
+        cumulative = np.concatenate([[0.0], np.cumsum(step_lengths.ravel())])
+        return params, cumulative
+
+    @classmethod
+    def build_arc_length_table(cls, points: np.ndarray, samples_per_segment: int = None,
+                               accuracy: str = "standard") -> tuple:
+        """
+        Build a cumulative arc-length lookup table for the whole spline.
+
+        The table maps the global spline parameter (segment index + t) to the
+        arc length from the start of the curve. ``adaptive`` doubles the
+        samples per segment until the total length converges, which keeps
+        long paths accurate without oversampling short ones.
+
+        Args:
+            points: (N, 2) control points with virtual endpoints
+            samples_per_segment: Explicit samples per segment (overrides accuracy)
+            accuracy: Key of ARC_LENGTH_SAMPLES, or "adaptive"
+
+        Returns:
+            Tuple of (params, cumulative_lengths), both 1-D arrays
         """
         num_curve_segments = len(points) - 3
         if num_curve_segments <= 0:
-            return 0.0
+            return np.zeros(1), np.zeros(1)
+
+        # 限制查找表总大小，避免极长路径占用过多内存
+        max_samples = max(8, ARC_LENGTH_MAX_TABLE_SIZE // num_curve_segments)
+        if samples_per_segment is not None:
+            return cls._sample_arc_length(points, min(samples_per_segment, max_samples))
+
+        if accuracy != "adaptive":
+            samples = ARC_LENGTH_SAMPLES.get(accuracy, ARC_LENGTH_SAMPLES["standard"])
+            return cls._sample_arc_length(points, min(samples, max_samples))
+
+        samples = min(32, max_samples)
+        table = cls._sample_arc_length(points, samples)
+        while samples * 2 <= max_samples:
+            samples *= 2
+            refined = cls._sample_arc_length(points, samples)
+            previous_length, length = table[1][-1], refined[1][-1]
+            table = refined
+            if length == 0 or abs(length - previous_length) <= ARC_LENGTH_TOLERANCE * length:
+                break
+        return table
 
-        total_length = 0.0
+    @classmethod
+    def invert_arc_length(cls, params: np.ndarray, cumulative: np.ndarray, targets: np.ndarray,
+                          num_curve_segments: int) -> tuple:
+        """
+        Map target arc lengths to (segment_index, t) arrays using the lookup table.
 
-        for seg in range(num_curve_segments):
-            # Sample points along the curve segment
-            prev_point = cls.catmull_rom(points, seg, 0.0)
-            for j in range(1, samples_per_segment + 1):
-                t = j / samples_per_segment
-                current_point = cls.catmull_rom(points, seg, t)
+        Args:
+            params: Global spline parameters of the table entries
+            cumulative: Cumulative arc lengths of the table entries
+            targets: Target arc lengths
+            num_curve_segments: Number of spline segments
 
-                # Calculate distance between consecutive points
-                dx = current_point["x"] - prev_point["x"]
-                dy = current_point["y"] - prev_point["y"]
-                segment_length = np.sqrt(dx * dx + dy * dy)
-                total_length += segment_length
+        Returns:
+            Tuple of (segment_index, t) arrays
+        """
+        targets = np.clip(np.asarray(targets, dtype=np.float64), 0.0, cumulative[-1])
+        upper = np.clip(np.searchsorted(cumulative, targets, side="left"), 1, len(cumulative) - 1)
+        lower = upper - 1
+        step = cumulative[upper] - cumulative[lower]
+        # 零长度步（重合控制点）取步起点
+        fraction = np.divide(targets - cumulative[lower], step, out=np.zeros_like(targets), where=step > 0)
+        u = params[lower] + np.clip(fraction, 0.0, 1.0) * (params[upper] - params[lower])
+
+        segment_index = np.minimum(np.floor(u).astype(np.int64), num_curve_segments - 1)
+        t = np.clip(u - segment_index, 0.0, 1.0)
+        return segment_index, t
 
-                prev_point = current_point
+    @classmethod
+    def calculate_curve_length(cls, points: List[Dict[str, float]], samples_per_segment: int = 100) -> float:
+        """
+        Calculate the total length of the Catmull-Rom curve.
 
-        return total_length
+        Args:
+            points: Control points with virtual endpoints
+            samples_per_segment: Number of samples per curve segment for length calculation
+
+        Returns:
+            Total curve length
+        """
+        array = np.array([[p["x"], p["y"]] for p in points], dtype=np.float64)
+        if len(array) - 3 <= 0:
+            return 0.0
+        return float(cls.build_arc_length_table(array, samples_per_segment)[1][-1])
 
     @classmethod
     def find_t_for_arc_length(cls, points: List[Dict[str, float]], target_arc_length: float,
@@ -296,6 +401,9 @@ class XIS_CoordinatePathV3(io.ComfyNode):
         """
         Find the curve segment and parameter t that corresponds to a given arc length.
 
+        Builds a new lookup table on every call; use build_arc_length_table and
+        invert_arc_length when mapping many lengths on the same curve.
+
         Args:
             points: Control points with virtual endpoints
             target_arc_length: Target arc length along the curve
@@ -308,58 +416,10 @@ class XIS_CoordinatePathV3(io.ComfyNode):
         if num_curve_segments <= 0:
             return (0, 0.0)
 
-        accumulated_length = 0.0
-
-        for seg in range(num_curve_segments):
-            # Calculate segment length
-            prev_point = cls.catmull_rom(points, seg, 0.0)
-            segment_length = 0.0
-
-            for j in range(1, samples_per_segment + 1):
-                t = j / samples_per_segment
-                current_point = cls.catmull_rom(points, seg, t)
-
-                dx = current_point["x"] - prev_point["x"]
-                dy = current_point["y"] - prev_point["y"]
-                segment_length += np.sqrt(dx * dx + dy * dy)
-                prev_point = current_point
-
-            # Check if target is within this segment
-            if accumulated_length + segment_length >= target_arc_length:
-                # Find exact t within this segment
-                remaining_length = target_arc_length - accumulated_length
-
-                prev_point = cls.catmull_rom(points, seg, 0.0)
-                current_length = 0.0
-
-                for j in range(1, samples_per_segment + 1):
-                    t = j / samples_per_segment
-                    current_point = cls.catmull_rom(points, seg, t)
-
-                    dx = current_point["x"] - prev_point["x"]
-                    dy = current_point["y"] - prev_point["y"]
-                    step_length = np.sqrt(dx * dx + dy * dy)
-
-                    if current_length + step_length >= remaining_length:
-                        # Interpolate t based on remaining distance
-                        if step_length > 0:
-                            t_interp = (remaining_length - current_length) / step_length
-                            final_t = (j - 1) / samples_per_segment + t_interp / samples_per_segment
-                        else:
-                            final_t = (j - 1) / samples_per_segment
-
-                        return (seg, max(0.0, min(1.0, final_t)))
-
-                    current_length += step_length
-                    prev_point = current_point
-
-                # If we reach here, return the end of the segment
-                return (seg, 1.0)
-
-            accumulated_length += segment_length
-
-        # If target length exceeds total length, return last segment end
-        return (num_curve_segments - 1, 1.0)
+        array = np.array([[p["x"], p["y"]] for p in points], dtype=np.float64)
+        params, cumulative = cls.build_arc_length_table(array, samples_per_segment)
+        segment_index, t = cls.invert_arc_length(params, cumulative, np.array([target_arc_length]), num_curve_segments)
+        return (int(segment_index[0]), float(t[0]))
 
     @classmethod
     def calculate_distribution_ratio(cls, i: int, total_segments: int, distribution_mode: str) -> float:
@@ -405,7 +465,8 @@ class XIS_CoordinatePathV3(io.ComfyNode):
             return t
 
     @classmethod
-    def execute(cls, width: int, height: int, path_segments: int, path_mode: str, distribution_mode: str, path_canvas: Dict[str, Any]):
+    def execute(cls, width: int, height: int, path_segments: int, path_mode: str, distribution_mode: str, path_canvas: Dict[str, Any],
+                arc_length_accuracy: str = "standard"):
         """
         Execute the path coordinate generation.
 
@@ -416,6 +477,7 @@ class XIS_CoordinatePathV3(io.ComfyNode):
             path_mode: Path mode ("linear" or "curve")
             distribution_mode: Distribution mode for point spacing
             path_canvas: Canvas data containing control points
+            arc_length_accuracy: Arc-length table accuracy for curve mode
 
         Returns:
             tuple: (x_coordinates, y_coordinates, x_percent, y_percent, x_list, y_list)
@@ -433,7 +495,7 @@ class XIS_CoordinatePathV3(io.ComfyNode):
         if path_mode == "linear":
             path_coords = cls.calculate_linear_path(control_points, path_segments, distribution_mode)
         else:  # curve mode
-            path_coords = cls.calculate_curve_path(control_points, path_segments, distribution_mode)
+            path_coords = cls.calculate_curve_path(control_points, path_segments, distribution_mode, arc_length_accuracy)
 
         if not path_coords:
             # Return default coordinates if no valid path
@@ -8,9 +8,16 @@ V3架构迁移版本
 
 import re
 import math
-from typing import List, Dict, Any, Union
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Union
+
+import numpy as np
+import torch
 from comfy_api.v0_0_2 import io, ui
 
+# LUT缓存条目数（按起止值、插值方式、曲线点和尺寸缓存）
+LUT_CACHE_SIZE = 32
+
 
 class XIS_CurveEditorV3(io.ComfyNode):
     """
@@ -56,13 +63,22 @@ class XIS_CurveEditorV3(io.ComfyNode):
                              default="HSV",
                              tooltip="Color interpolation method for HEX data type"),
                 io.Custom("WIDGET").Input("curve_editor",
-                                        tooltip="Visual curve editor widget")
+                                        tooltip="Visual curve editor widget"),
+                io.Int.Input("lut_size",
+                           default=0,
+                           min=0,
+                           max=65536,
+                           step=1,
+                           optional=True,
+                           tooltip="Width of the 1D LUT image output (0 uses point_count). "
+                                   "HEX ramps are stored as colors, INT/FLOAT ramps as the normalized curve value")
             ],
             outputs=[
                 io.Int.Output(display_name="int", is_output_list=True),
                 io.Float.Output(display_name="float", is_output_list=True),
                 io.String.Output(display_name="hex", is_output_list=True),
-                io.Custom("LIST").Output(display_name="list", is_output_list=False)
+                io.Custom("LIST").Output(display_name="list", is_output_list=False),
+                io.Image.Output(display_name="lut")
             ]
         )
 
@@ -555,6 +571,199 @@ class XIS_CurveEditorV3(io.ComfyNode):
 
         return t_values
 
+    @staticmethod
+    def evaluate_curve_batch(t: np.ndarray, points: List[Dict[str, float]], interpolation_algorithm: str) -> np.ndarray:
+        """
+        Vectorized apply_custom_curve for an array of t values.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if not points:
+            return np.clip(t, 0.0, 1.0)
+
+        xs = np.array([p["x"] for p in points], dtype=np.float64)
+        ys = np.array([p["y"] for p in points], dtype=np.float64)
+        last = len(points) - 1
+
+        # 与逐点实现一致：取满足 x[i] < t <= x[i+1] 的第一段（跳过零宽度段）
+        upper = np.clip(np.searchsorted(xs, t, side="left"), 1, last)
+        lower = upper - 1
+        width = xs[upper] - xs[lower]
+        segment_t = np.divide(t - xs[lower], width, out=np.zeros_like(t), where=width > 0)
+
+        if interpolation_algorithm == "linear":
+            values = ys[lower] + (ys[upper] - ys[lower]) * segment_t
+        else:
+            p0 = ys[np.maximum(lower - 1, 0)]
+            p3 = ys[np.minimum(lower + 2, last)]
+            t2 = segment_t * segment_t
+            t3 = t2 * segment_t
+            values = 0.5 * (
+                (2 * ys[lower]) +
+                (-p0 + ys[upper]) * segment_t +
+                (2 * p0 - 5 * ys[lower] + 4 * ys[upper] - p3) * t2 +
+                (-p0 + 3 * ys[lower] - 3 * ys[upper] + p3) * t3
+            )
+
+        # 起点判断优先于终点（与逐点实现的判断顺序一致）
+        values = np.where(t >= xs[-1], ys[-1], values)
+        return np.where(t <= xs[0], ys[0], values)
+
+    @staticmethod
+    def compute_transformed_t_batch(
+        point_count: int,
+        curve_points: List[Dict[str, Any]],
+        interpolation_algorithm: str
+    ) -> np.ndarray:
+        """
+        Vectorized compute_curve_t_values, returning only the transformed t values.
+        """
+        base_t = np.arange(point_count, dtype=np.float64) / max(1, point_count - 1)
+        sanitized_points = XIS_CurveEditorV3.sanitize_curve_points(curve_points)
+        if sanitized_points:
+            base_t = XIS_CurveEditorV3.evaluate_curve_batch(base_t, sanitized_points, interpolation_algorithm)
+        return np.clip(base_t, 0.0, 1.0)
+
+    @staticmethod
+    def hsv_to_rgb_batch(h: np.ndarray, s: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """
+        Vectorized hsv_to_rgb, returning an (N, 3) integer array.
+        """
+        h = h % 360
+        h_60 = h / 60.0
+        sector = np.minimum(h_60.astype(np.int64), 5)
+        f = h_60 - sector
+        p = v * (1 - s)
+        q = v * (1 - s * f)
+        t = v * (1 - s * (1 - f))
+
+        # 每个扇区对应的(r, g, b)分量
+        table = np.stack([
+            np.stack([v, t, p], axis=-1),
+            np.stack([q, v, p], axis=-1),
+            np.stack([p, v, t], axis=-1),
+            np.stack([p, q, v], axis=-1),
+            np.stack([t, p, v], axis=-1),
+            np.stack([v, p, q], axis=-1),
+        ], axis=1)
+        rgb = table[np.arange(len(h)), sector]
+        rgb = np.clip(rgb * 255, 0, 255).astype(np.int64)
+
+        # 饱和度为0时直接取灰度
+        gray = (v * 255).astype(np.int64)[:, None]
+        return np.where((s == 0)[:, None], gray, rgb)
+
+    @staticmethod
+    def lab_to_rgb_batch(lab: np.ndarray) -> np.ndarray:
+        """
+        Vectorized lab_to_rgb for an (N, 3) array, returning an (N, 3) integer array.
+        """
+        y = (lab[:, 0] + 16) / 116
+        x = lab[:, 1] / 500 + y
+        z = y - lab[:, 2] / 200
+        xyz = np.stack([x, y, z], axis=-1)
+
+        # 立方根反变换
+        cubed = xyz ** 3
+        xyz = np.where(cubed > 0.008856, cubed, (xyz - 16 / 116) / 7.787)
+
+        # D65标准光源
+        xyz = xyz * np.array([0.95047, 1.0, 1.08883])
+
+        # 转换为RGB
+        matrix = np.array([
+            [3.2404542, -1.5371385, -0.4985314],
+            [-0.9692660, 1.8760108, 0.0415560],
+            [0.0556434, -0.2040259, 1.0572252],
+        ])
+        rgb = xyz @ matrix.T
+
+        # 应用gamma校正
+        rgb = np.where(rgb <= 0.0031308, rgb, 1.055 * np.power(np.maximum(rgb, 0.0031308), 1 / 2.4) - 0.055)
+        return (np.clip(rgb, 0, 1) * 255).astype(np.int64)
+
+    @classmethod
+    def interpolate_colors_batch(
+        cls,
+        start_rgb: List[int],
+        end_rgb: List[int],
+        t: np.ndarray,
+        color_interpolation: str
+    ) -> np.ndarray:
+        """
+        Interpolate colors for all t values at once, returning an (N, 3) integer RGB array.
+
+        Start and end colors are converted to the interpolation space only once.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        start = np.array(start_rgb, dtype=np.float64)
+        end = np.array(end_rgb, dtype=np.float64)
+
+        if color_interpolation == "RGB":
+            return (start + (end - start) * t[:, None]).astype(np.int64)
+
+        if color_interpolation == "LAB":
+            start_lab = np.array(cls.rgb_to_lab(start_rgb), dtype=np.float64)
+            end_lab = np.array(cls.rgb_to_lab(end_rgb), dtype=np.float64)
+            return cls.lab_to_rgb_batch(start_lab + (end_lab - start_lab) * t[:, None])
+
+        # HSV：分支只取决于起止颜色，逐点公式与interpolate_hsv一致
+        h1, s1, v1 = cls.rgb_to_hsv(start_rgb)
+        h2, s2, v2 = cls.rgb_to_hsv(end_rgb)
+        dh = h2 - h1
+        if abs(dh) > 180:
+            if dh > 0:
+                h1 += 360
+            else:
+                h2 += 360
+
+        eased_t = 0.5 - 0.5 * np.cos(t * np.pi)
+        h = h1 + (h2 - h1) * eased_t
+        if s1 < 0.1 or s2 < 0.1:
+            s = s1 + (s2 - s1) * t
+        elif abs(s1 - s2) > 0.5:
+            s = s1 + (s2 - s1) * eased_t
+        else:
+            s = s1 + (s2 - s1) * (t * t)
+        v = np.sqrt(v1 * v1 + (v2 * v2 - v1 * v1) * t)
+        if v1 > 0.7 and v2 > 0.7:
+            v = np.where(v < 0.6, 0.6 + (v - 0.6) * 0.5, v)
+
+        return cls.hsv_to_rgb_batch(h % 360, np.clip(s, 0.0, 1.0), np.clip(v, 0.0, 1.0))
+
+    @staticmethod
+    def rgb_array_to_hex(rgb: np.ndarray) -> List[str]:
+        """
+        Convert an (N, 3) integer RGB array to HEX strings.
+        """
+        return ["#{:02x}{:02x}{:02x}".format(r, g, b) for r, g, b in np.clip(rgb, 0, 255).tolist()]
+
+    @staticmethod
+    def normalize_hex(value: str) -> str:
+        return value if value.startswith("#") else "#" + value
+
+    @classmethod
+    def build_lut(
+        cls,
+        data_type: str,
+        start_value: str,
+        end_value: str,
+        color_interpolation: str,
+        curve_points: List[Dict[str, Any]],
+        interpolation_algorithm: str,
+        size: int
+    ) -> np.ndarray:
+        """
+        Build a (size, 3) float32 LUT in 0-1, cached on all parameters.
+        """
+        points_key = tuple(
+            (cls.safe_float(p.get("x", 0.0)), cls.safe_float(p.get("y", 0.0)))
+            for p in curve_points or [] if isinstance(p, dict)
+        )
+        if data_type != "HEX":
+            # 数值类型的LUT只取决于曲线形状
+            start_value = end_value = color_interpolation = ""
+        return _cached_lut(data_type, start_value, end_value, color_interpolation, points_key, interpolation_algorithm, size)
+
     @classmethod
     def execute(
         cls,
@@ -563,7 +772,8 @@ class XIS_CurveEditorV3(io.ComfyNode):
         end_value: str,
         point_count: int,
         color_interpolation: str,
-        curve_editor: Dict[str, Any]
+        curve_editor: Dict[str, Any],
+        lut_size: int = 0
     ) -> io.NodeOutput:
         """
         Execute the distribution calculation.
@@ -574,14 +784,15 @@ class XIS_CurveEditorV3(io.ComfyNode):
             end_value (str): End value.
             point_count (int): Number of points in distribution.
             curve_editor (Dict[str, Any]): Curve editor data.
+            lut_size (int): Width of the LUT image output (0 uses point_count).
 
         Returns:
-            io.NodeOutput: Four outputs (int_list, float_list, hex_list, list_output).
+            io.NodeOutput: Five outputs (int_list, float_list, hex_list, list_output, lut).
         """
         # Get custom curve points if available
         curve_points = curve_editor.get("curve_points", [])
         interpolation_algorithm = curve_editor.get("interpolation_algorithm", "catmull_rom")
-        curve_t_values = cls.compute_curve_t_values(point_count, curve_points, interpolation_algorithm)
+        transformed_t = cls.compute_transformed_t_batch(point_count, curve_points, interpolation_algorithm)
 
         # Initialize result lists
         int_list = []
@@ -592,52 +803,24 @@ class XIS_CurveEditorV3(io.ComfyNode):
         if data_type in ["INT", "FLOAT"]:
             start_float = cls.safe_float(start_value, 0.0)
             end_float = cls.safe_float(end_value, 1.0)
-            for t_info in curve_t_values:
-                transformed_t = t_info["transformed_t"]
-                value = start_float + (end_float - start_float) * transformed_t
-                if data_type == "INT":
-                    int_list.append(int(round(value)))
-                else:
-                    int_list.append(int(value))
-                float_list.append(float(value))
-                hex_list.append("#000000")
+            values = start_float + (end_float - start_float) * transformed_t
+            float_list = values.tolist()
+            if data_type == "INT":
+                int_list = [int(round(value)) for value in float_list]
+            else:
+                int_list = [int(value) for value in float_list]
+            hex_list = ["#000000"] * point_count
 
         elif data_type == "HEX":
-            # Normalize HEX colors
-            start_hex = start_value if start_value.startswith("#") else "#" + start_value
-            end_hex = end_value if end_value.startswith("#") else "#" + end_value
-
             # Convert to RGB for interpolation
-            start_rgb = cls.hex_to_rgb(start_hex)
-            end_rgb = cls.hex_to_rgb(end_hex)
-
-            for i in range(point_count):
-                transformed_t = curve_t_values[i]["transformed_t"] if i < len(curve_t_values) else i / max(1, point_count - 1) if point_count > 1 else 0
-
-                # 根据选择的颜色过渡方法进行插值
-                if color_interpolation == "RGB":
-                    # RGB线性插值
-                    interp_rgb = cls.interpolate_rgb(start_rgb, end_rgb, transformed_t)
-                    interp_hex = cls.rgb_to_hex(interp_rgb)
-                elif color_interpolation == "LAB":
-                    # LAB颜色空间插值（感知均匀）
-                    start_lab = cls.rgb_to_lab(start_rgb)
-                    end_lab = cls.rgb_to_lab(end_rgb)
-                    interp_lab = cls.interpolate_lab(start_lab, end_lab, transformed_t)
-                    interp_rgb = cls.lab_to_rgb(interp_lab)
-                    interp_hex = cls.rgb_to_hex(interp_rgb)
-                else:  # HSV (默认)
-                    # HSV颜色空间插值（自然的颜色过渡）
-                    start_hsv = cls.rgb_to_hsv(start_rgb)
-                    end_hsv = cls.rgb_to_hsv(end_rgb)
-                    interp_hsv = cls.interpolate_hsv(start_hsv, end_hsv, transformed_t)
-                    interp_rgb = cls.hsv_to_rgb(interp_hsv)
-                    interp_hex = cls.rgb_to_hex(interp_rgb)
-
-                # Add to all lists
-                int_list.append(0)
-                float_list.append(0.0)
-                hex_list.append(interp_hex)
+            start_rgb = cls.hex_to_rgb(cls.normalize_hex(start_value))
+            end_rgb = cls.hex_to_rgb(cls.normalize_hex(end_value))
+
+            # 根据选择的颜色过渡方法进行插值（HSV默认，RGB线性，LAB感知均匀）
+            interp_rgb = cls.interpolate_colors_batch(start_rgb, end_rgb, transformed_t, color_interpolation)
+            hex_list = cls.rgb_array_to_hex(interp_rgb)
+            int_list = [0] * point_count
+            float_list = [0.0] * point_count
 
         # 根据数据类型创建LIST输出
         if data_type == "INT":
@@ -649,7 +832,36 @@ class XIS_CurveEditorV3(io.ComfyNode):
         else:
             list_output = []
 
-        return io.NodeOutput(int_list, float_list, hex_list, list_output)
+        lut = cls.build_lut(
+            data_type, start_value, end_value, color_interpolation,
+            curve_points, interpolation_algorithm, lut_size or point_count
+        )
+        lut_image = torch.from_numpy(lut.copy()).unsqueeze(0).unsqueeze(0)
+
+        return io.NodeOutput(int_list, float_list, hex_list, list_output, lut_image)
+
+
+@lru_cache(maxsize=LUT_CACHE_SIZE)
+def _cached_lut(
+    data_type: str,
+    start_value: str,
+    end_value: str,
+    color_interpolation: str,
+    points_key: Tuple[Tuple[float, float], ...],
+    interpolation_algorithm: str,
+    size: int
+) -> np.ndarray:
+    curve_points = [{"x": x, "y": y} for x, y in points_key]
+    transformed_t = XIS_CurveEditorV3.compute_transformed_t_batch(size, curve_points, interpolation_algorithm)
+    if data_type == "HEX":
+        start_rgb = XIS_CurveEditorV3.hex_to_rgb(XIS_CurveEditorV3.normalize_hex(start_value))
+        end_rgb = XIS_CurveEditorV3.hex_to_rgb(XIS_CurveEditorV3.normalize_hex(end_value))
+        rgb = XIS_CurveEditorV3.interpolate_colors_batch(start_rgb, end_rgb, transformed_t, color_interpolation)
+        lut = np.clip(rgb, 0, 255).astype(np.float32) / 255.0
+    else:
+        lut = np.repeat(transformed_t.astype(np.float32)[:, None], 3, axis=1)
+    lut.setflags(write=False)
+    return lut
 
 
 # V3节点导出
@@ -5,6 +5,7 @@ import torch.nn.functional as F
 import numpy as np
 from typing import Optional, Tuple, Union, List
 from .utils import standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger
+from .packed_images import PackedImages, as_packed, build_pack
 import hashlib
 import uuid
 import time
@@ -99,103 +100,11 @@ class XIS_PackImagesV3(io.ComfyNode):
             logger.error("No valid images provided (all image inputs and pack_images are None)")
             raise ValueError("At least one valid image must be provided")
 
-        # 初始化输出图像列表
-        normalized_images = []
+        # 每个图像输入规范化为一个 RGBA 桶；已有的 pack_images 按 before_pack_images 放在前或后，不复制像素
+        packed = build_pack(pack_images, image_mask_pairs, invert_mask, before_pack_images)
 
-        # 根据 before_pack_images 的值决定添加顺序
-        if not before_pack_images:
-            # 默认行为：pack_images 在前，image1 到 image5 在后
-            if pack_images is not None:
-                if not isinstance(pack_images, (list, tuple)):
-                    logger.error(f"Invalid pack_images type: expected list or tuple, got {type(pack_images)}")
-                    raise ValueError("pack_images must be a list or tuple")
-                normalized_images.extend(pack_images)
-
-        # 规范化当前节点的图像和蒙版
-        for img, mask in image_mask_pairs:
-            if not isinstance(img, torch.Tensor):
-                logger.error(f"Invalid image type: expected torch.Tensor, got {type(img)}")
-                raise ValueError("All images must be torch.Tensor")
-
-            # 确保图像维度正确
-            if len(img.shape) == 3:  # (H, W, C)
-                img = img.unsqueeze(0)  # 转换为 (1, H, W, C)
-            elif len(img.shape) != 4:  # (N, H, W, C)
-                logger.error(f"Invalid image dimensions: {img.shape}")
-                raise ValueError(f"Image has invalid dimensions: {img.shape}")
-
-            # 处理每个批次中的图像
-            for i in range(img.shape[0]):
-                single_img = img[i]  # (H, W, C)
-
-                # 处理蒙版
-                alpha = None
-                if mask is not None:
-                    if not isinstance(mask, torch.Tensor):
-                        logger.error(f"Invalid mask type: expected torch.Tensor, got {type(mask)}")
-                        raise ValueError("Mask must be torch.Tensor")
-
-                    # 确保蒙版维度正确
-                    mask_dim = len(mask.shape)
-                    if mask_dim == 2:  # (H, W)
-                        mask = mask.unsqueeze(0)  # 转换为 (1, H, W)
-                    elif mask_dim == 3:  # (N, H, W)
-                        pass
-                    else:
-                        logger.error(f"Invalid mask dimensions: {mask.shape}")
-                        raise ValueError(f"Mask has invalid dimensions: {mask.shape}")
-
-                    # 获取对应批次的蒙版
-                    single_mask = mask[i] if mask.shape[0] > i else mask[0]
-
-                    # 检查是否为 64x64 全 0 蒙版
-                    if single_mask.shape == (64, 64) and torch.all(single_mask == 0):
-                        alpha = None  # 视为无蒙版输入
-                    else:
-                        # 自动调整蒙版尺寸以匹配图像尺寸（除非是 64x64 全 0）
-                        if single_mask.shape != single_img.shape[:2]:
-                            logger.info(f"Resizing mask from {single_mask.shape} to match image size {single_img.shape[:2]}")
-                            # 使用双线性插值调整蒙版尺寸
-                            single_mask = F.interpolate(
-                                single_mask.unsqueeze(0).unsqueeze(0),  # 转换为 (1, 1, H, W)
-                                size=single_img.shape[:2],
-                                mode='bilinear',
-                                align_corners=False
-                            ).squeeze(0).squeeze(0)  # 转换回 (H, W)
-
-                        # 规范化蒙版为单通道
-                        alpha = single_mask.unsqueeze(-1)  # (H, W, 1)
-                        if alpha.max() > 1.0 or alpha.min() < 0.0:
-                            alpha = (alpha - alpha.min()) / (alpha.max() - alpha.min() + 1e-8)  # 归一化到 [0,1]
-
-                        # 如果 invert_mask 为 True，进行蒙版反转
-                        if invert_mask:
-                            alpha = 1.0 - alpha
-
-                # 处理图像通道
-                if single_img.shape[-1] == 3:  # RGB
-                    if alpha is None:
-                        alpha = torch.ones_like(single_img[..., :1])  # 默认全 1 Alpha 通道
-                    single_img = torch.cat([single_img, alpha], dim=-1)  # 转换为 RGBA
-                elif single_img.shape[-1] == 4:  # RGBA
-                    if alpha is not None:
-                        # 替换 Alpha 通道
-                        single_img = torch.cat([single_img[..., :3], alpha], dim=-1)
-                else:
-                    logger.error(f"Image has invalid channels: {single_img.shape[-1]}")
-                    raise ValueError(f"Image has invalid channels: {single_img.shape[-1]}")
-
-                normalized_images.append(single_img)
-
-        # 如果 before_pack_images 为 True，将 pack_images 添加到末尾
-        if before_pack_images and pack_images is not None:
-            if not isinstance(pack_images, (list, tuple)):
-                logger.error(f"Invalid pack_images type: expected list or tuple, got {type(pack_images)}")
-                raise ValueError("pack_images must be a list or tuple")
-            normalized_images.extend(pack_images)
-
-        logger.info(f"Packed {len(normalized_images)} images for canvas")
-        return io.NodeOutput(normalized_images)
+        logger.info(f"Packed {len(packed)} images for canvas")
+        return io.NodeOutput(packed)
 
 
 class XIS_UnpackImagesV3(io.ComfyNode):
@@ -230,9 +139,6 @@ class XIS_UnpackImagesV3(io.ComfyNode):
             logger.warning("XIS_UnpackImages received empty pack_images input")
             return io.NodeOutput([], torch.empty(0, 0, 0, 4))
 
-        original_images: List[torch.Tensor] = []  # HWC RGBA, keep original sizes
-        processed_images: List[torch.Tensor] = []  # HWC RGBA for batching
-
         for idx, img in enumerate(pack_images):
             if not isinstance(img, torch.Tensor):
                 logger.error(f"pack_images[{idx}] is not a torch.Tensor: {type(img)}")
@@ -244,32 +150,35 @@ class XIS_UnpackImagesV3(io.ComfyNode):
                 logger.error(f"pack_images[{idx}] has invalid channel count {img.shape[-1]}, expected 3 or 4")
                 raise ValueError("Each pack_images item must have 3 or 4 channels")
 
+        # 按桶处理：未修改的 PackedImages 直接使用其桶，普通列表包装为视图桶（不复制）
+        packed = as_packed(pack_images)
+        image_batch = packed.as_batch()
+        if image_batch is not None and image_batch.shape[-1] == 4:
+            # 单个桶且顺序一致时，批量输出直接是该桶的视图
+            image_list = [img.unsqueeze(0) for img in packed]  # each element is a 1-batch IMAGE like MakeImageList
+            return io.NodeOutput(image_list, image_batch)
+
+        # 构建批量张量，自动调整到首张图尺寸；同尺寸的桶只插值一次
+        first = packed[0]
+        target_h, target_w = first.shape[:2]
+        image_batch = torch.empty((len(packed), target_h, target_w, 4), dtype=first.dtype, device=first.device)
+        image_list: List[Optional[torch.Tensor]] = [None] * len(packed)
+        for positions, batch in packed.groups():
             # 保证 RGBA
-            if img.shape[-1] == 3:
-                alpha = torch.ones_like(img[..., :1])
-                img = torch.cat([img, alpha], dim=-1)
-
-            original_images.append(img)
-            processed_images.append(img)
-
-        # 构建批量张量，自动调整到首张图尺寸
-        target_h, target_w = processed_images[0].shape[:2]
-        batch_tensors: List[torch.Tensor] = []
-        for idx, img in enumerate(processed_images):
-            if img.shape[0] != target_h or img.shape[1] != target_w:
-                logger.info(f"Resizing image {idx} from {img.shape[:2]} to {(target_h, target_w)} for batching")
-                resized = F.interpolate(
-                    img.permute(2, 0, 1).unsqueeze(0),
+            if batch.shape[-1] == 3:
+                batch = torch.cat([batch, torch.ones_like(batch[..., :1])], dim=-1)
+            for position, img in zip(positions, batch):
+                image_list[position] = img.unsqueeze(0)
+            if batch.shape[1] != target_h or batch.shape[2] != target_w:
+                logger.info(f"Resizing {len(positions)} image(s) from {tuple(batch.shape[1:3])} to {(target_h, target_w)} for batching")
+                batch = F.interpolate(
+                    batch.permute(0, 3, 1, 2),
                     size=(target_h, target_w),
                     mode="bilinear",
                     align_corners=False,
-                ).squeeze(0).permute(1, 2, 0)
-                batch_tensors.append(resized)
-            else:
-                batch_tensors.append(img)
+                ).permute(0, 2, 3, 1)
+            image_batch[torch.tensor(positions, device=image_batch.device)] = batch.to(device=image_batch.device, dtype=image_batch.dtype)
 
-        image_batch = torch.stack(batch_tensors, dim=0)
-        image_list = [img.unsqueeze(0) for img in original_images]  # each element is a 1-batch IMAGE like MakeImageList
         return io.NodeOutput(image_list, image_batch)
 
     @classmethod
@@ -280,6 +189,10 @@ class XIS_UnpackImagesV3(io.ComfyNode):
             hasher.update("empty".encode("utf-8"))
             return hasher.hexdigest()
 
+        # PackedImages 自带缓存的内容摘要
+        if isinstance(pack_images, PackedImages) and pack_images.is_intact():
+            return pack_images.digest()
+
         hasher.update(f"len:{len(pack_images)}".encode("utf-8"))
         for idx, img in enumerate(pack_images):
             if isinstance(img, torch.Tensor):
@@ -359,24 +272,23 @@ class XIS_MergePackImagesV3(io.ComfyNode):
             logger.info("XIS_MergePackImages - No valid pack_images inputs provided, returning empty outputs")
             return io.NodeOutput([])
 
-        # 验证输入格式并收集图像
-        merged_images = []
+        # 验证输入格式；PackedImages 只需检查桶的形状
+        packs = []
         for port_idx, pack in input_packs:
             if not all(isinstance(img, torch.Tensor) for img in pack):
                 logger.error(f"Invalid image type in pack_images_{port_idx}: expected list of torch.Tensor")
                 raise ValueError(f"pack_images_{port_idx} must contain torch.Tensor images")
-            for j, img in enumerate(pack):
-                if len(img.shape) != 3 or img.shape[-1] != 4:
-                    logger.error(f"Invalid shape for image {j} in pack_images_{port_idx}: expected [H, W, 4], got {img.shape}")
+            packed = as_packed(pack)
+            for bucket_idx, bucket in enumerate(packed.buckets):
+                if len(bucket.shape) != 4 or bucket.shape[-1] != 4:
+                    j = next(pos for pos, (b, _) in enumerate(packed.index) if b == bucket_idx)
+                    logger.error(f"Invalid shape for image {j} in pack_images_{port_idx}: expected [H, W, 4], got {bucket.shape[1:]}")
                     raise ValueError(f"Image {j} in pack_images_{port_idx} must be [H, W, 4] (RGBA)")
-                merged_images.append(img)
-                logger.debug(f"Added image {j} from pack_images_{port_idx} with size {img.shape[:2]}")
+            logger.debug(f"Added {len(packed)} images from pack_images_{port_idx} in {len(packed.buckets)} buckets")
+            packs.append(packed)
 
-        if not merged_images:
-            logger.info("XIS_MergePackImages - No images after validation, returning empty outputs")
-            return io.NodeOutput([])
-
-        return io.NodeOutput(merged_images)
+        # 只拼接索引，共享各输入的桶，不复制像素
+        return io.NodeOutput(PackedImages.concat(packs))
 
     @classmethod
     def fingerprint_inputs(cls, pack_images_1: Optional[List[torch.Tensor]] = None,
@@ -392,6 +304,10 @@ class XIS_MergePackImagesV3(io.ComfyNode):
                 if pack is None or not pack:
                     hasher.update(f"pack_images_{i}_empty".encode('utf-8'))
                     continue
+                if isinstance(pack, PackedImages) and pack.is_intact():
+                    # PackedImages 自带缓存的内容摘要
+                    hasher.update(f"pack_images_{i}_digest_{pack.digest()}".encode('utf-8'))
+                    continue
                 if not isinstance(pack, list):
                     logger.warning(f"Invalid pack_images_{i} type: {type(pack)}")
                     hasher.update(f"pack_images_{i}_invalid_{id(pack)}".encode('utf-8'))
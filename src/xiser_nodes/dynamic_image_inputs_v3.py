@@ -3,6 +3,7 @@
 from comfy_api.v0_0_2 import io, ui
 from typing import Dict, Any, List
 import torch
+from .utils import lazy_node_mappings
 
 class XIS_DynamicImageInputsV3(io.ComfyNode):
     """动态图像输入节点 - V3版本"""
@@ -73,8 +74,6 @@ V3_NODE_CLASSES = [
 ]
 
 # 节点ID到类的映射
-V3_NODE_MAPPINGS = {
-    cls.define_schema().node_id: cls
-    for cls in V3_NODE_CLASSES
-}
+# 首次访问时再构建，避免导入模块时为每个节点调用define_schema
+__getattr__ = lazy_node_mappings(globals())
 
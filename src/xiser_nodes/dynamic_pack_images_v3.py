@@ -4,6 +4,7 @@ import torch.nn.functional as F
 import numpy as np
 from typing import Optional, Tuple, Union, List
 from .utils import standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger
+from .packed_images import build_pack
 import hashlib
 import uuid
 import time
@@ -89,103 +90,11 @@ class XIS_DynamicPackImagesV3(io.ComfyNode):
             logger.error("No valid images provided (all image inputs and pack_images are None)")
             raise ValueError("At least one valid image must be provided")
 
-        # 初始化输出图像列表
-        normalized_images = []
+        # 每个图像输入规范化为一个 RGBA 桶；已有的 pack_images 按 before_pack_images 放在前或后，不复制像素
+        packed = build_pack(pack_images, image_mask_pairs, invert_mask, before_pack_images)
 
-        # 根据 before_pack_images 的值决定添加顺序
-        if not before_pack_images:
-            # 默认行为：pack_images 在前，动态image/mask对在后
-            if pack_images is not None:
-                if not isinstance(pack_images, (list, tuple)):
-                    logger.error(f"Invalid pack_images type: expected list or tuple, got {type(pack_images)}")
-                    raise ValueError("pack_images must be a list or tuple")
-                normalized_images.extend(pack_images)
-
-        # 规范化当前节点的图像和蒙版
-        for img, mask in image_mask_pairs:
-            if not isinstance(img, torch.Tensor):
-                logger.error(f"Invalid image type: expected torch.Tensor, got {type(img)}")
-                raise ValueError("All images must be torch.Tensor")
-
-            # 确保图像维度正确
-            if len(img.shape) == 3:  # (H, W, C)
-                img = img.unsqueeze(0)  # 转换为 (1, H, W, C)
-            elif len(img.shape) != 4:  # (N, H, W, C)
-                logger.error(f"Invalid image dimensions: {img.shape}")
-                raise ValueError(f"Image has invalid dimensions: {img.shape}")
-
-            # 处理每个批次中的图像
-            for i in range(img.shape[0]):
-                single_img = img[i]  # (H, W, C)
-
-                # 处理蒙版
-                alpha = None
-                if mask is not None:
-                    if not isinstance(mask, torch.Tensor):
-                        logger.error(f"Invalid mask type: expected torch.Tensor, got {type(mask)}")
-                        raise ValueError("Mask must be torch.Tensor")
-
-                    # 确保蒙版维度正确
-                    mask_dim = len(mask.shape)
-                    if mask_dim == 2:  # (H, W)
-                        mask = mask.unsqueeze(0)  # 转换为 (1, H, W)
-                    elif mask_dim == 3:  # (N, H, W)
-                        pass
-                    else:
-                        logger.error(f"Invalid mask dimensions: {mask.shape}")
-                        raise ValueError(f"Mask has invalid dimensions: {mask.shape}")
-
-                    # 获取对应批次的蒙版
-                    single_mask = mask[i] if mask.shape[0] > i else mask[0]
-
-                    # 检查是否为 64x64 全 0 蒙版
-                    if single_mask.shape == (64, 64) and torch.all(single_mask == 0):
-                        alpha = None  # 视为无蒙版输入
-                    else:
-                        # 自动调整蒙版尺寸以匹配图像尺寸（除非是 64x64 全 0）
-                        if single_mask.shape != single_img.shape[:2]:
-                            logger.info(f"Resizing mask from {single_mask.shape} to match image size {single_img.shape[:2]}")
-                            # 使用双线性插值调整蒙版尺寸
-                            single_mask = F.interpolate(
-                                single_mask.unsqueeze(0).unsqueeze(0),  # 转换为 (1, 1, H, W)
-                                size=single_img.shape[:2],
-                                mode='bilinear',
-                                align_corners=False
-                            ).squeeze(0).squeeze(0)  # 转换回 (H, W)
-
-                        # 规范化蒙版为单通道
-                        alpha = single_mask.unsqueeze(-1)  # (H, W, 1)
-                        if alpha.max() > 1.0 or alpha.min() < 0.0:
-                            alpha = (alpha - alpha.min()) / (alpha.max() - alpha.min() + 1e-8)  # 归一化到 [0,1]
-
-                        # 如果 invert_mask 为 True，进行蒙版反转
-                        if invert_mask:
-                            alpha = 1.0 - alpha
-
-                # 处理图像通道
-                if single_img.shape[-1] == 3:  # RGB
-                    if alpha is None:
-                        alpha = torch.ones_like(single_img[..., :1])  # 默认全 1 Alpha 通道
-                    single_img = torch.cat([single_img, alpha], dim=-1)  # 转换为 RGBA
-                elif single_img.shape[-1] == 4:  # RGBA
-                    if alpha is not None:
-                        # 替换 Alpha 通道
-                        single_img = torch.cat([single_img[..., :3], alpha], dim=-1)
-                else:
-                    logger.error(f"Image has invalid channels: {single_img.shape[-1]}")
-                    raise ValueError(f"Image has invalid channels: {single_img.shape[-1]}")
-
-                normalized_images.append(single_img)
-
-        # 如果 before_pack_images 为 True，将 pack_images 添加到末尾
-        if before_pack_images and pack_images is not None:
-            if not isinstance(pack_images, (list, tuple)):
-                logger.error(f"Invalid pack_images type: expected list or tuple, got {type(pack_images)}")
-                raise ValueError("pack_images must be a list or tuple")
-            normalized_images.extend(pack_images)
-
-        logger.info(f"DynamicPackImages: Packed {len(normalized_images)} images (from {len(image_mask_pairs)} image/mask pairs)")
-        return io.NodeOutput(normalized_images)
+        logger.info(f"DynamicPackImages: Packed {len(packed)} images (from {len(image_mask_pairs)} image/mask pairs)")
+        return io.NodeOutput(packed)
 
 
 # V3节点类列表
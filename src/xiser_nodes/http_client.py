@@ -0,0 +1,387 @@
+"""Pooled HTTP session shared by LLM and video providers.
+
+All outbound API traffic goes through a single ``requests.Session`` with a
+per-host connection pool, so repeated calls reuse TCP/TLS connections instead
+of paying a new handshake for every request. Transient failures (connection
+errors, 429 and 5xx) are retried with exponential backoff plus full jitter,
+honouring ``Retry-After`` when the server sends one. Non-idempotent methods
+(POST, PATCH) are only retried when the request cannot have reached the
+server - a failed connect or a 429 - so task submissions are never
+duplicated by a read timeout or a 5xx. Each provider can be
+capped to a number of concurrent in-flight requests, and per-host latency
+histograms are kept for diagnostics. A ``stream=True`` response keeps its
+provider slot, and its latency sample stays open, until the body has been
+read to the end or the response is closed.
+
+The client has no hard-coded hosts, so it can be pointed at a local stub
+server (``http://127.0.0.1:<port>``) and tuned with :meth:`configure` to use
+short backoffs.
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .profiler import PROFILER
+from .utils import logger
+
+# 默认重试的HTTP状态码（限流与服务端瞬时错误）
+RETRY_STATUS_CODES: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+# 非幂等请求只在服务端肯定未处理时重试（限流）
+NON_IDEMPOTENT_RETRY_STATUS_CODES: Tuple[int, ...] = (429,)
+
+# 可安全重发的HTTP方法
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+# 延迟直方图桶上界（秒）
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+@dataclass
+class LatencyHistogram:
+    """Cumulative latency histogram for one host."""
+
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    total: float = 0.0
+    count: int = 0
+    errors: int = 0
+    retries: int = 0
+    # 批量模式下多个线程会同时更新同一个直方图
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+            self.count += 1
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total, errors, retries = self.count, self.total, self.errors, self.retries
+        cumulative = 0
+        bucket_counts = {}
+        for bound, value in zip(list(self.buckets) + [float("inf")], counts):
+            cumulative += value
+            bucket_counts["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "errors": errors,
+            "retries": retries,
+            "buckets": bucket_counts,
+        }
+
+
+def _is_connect_error(exc: Exception) -> bool:
+    """True when the request failed while connecting, i.e. nothing was sent."""
+
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        reason = getattr(exc.args[0], "reason", exc.args[0])
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class PooledHttpClient:
+    """Thread-safe pooled HTTP client with retries and per-provider limits.
+
+    The underlying urllib3 pool manager is thread-safe; the session is only
+    used for connection reuse (no cookies or auth state are stored on it).
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 16,
+        pool_maxsize: int = 16,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        retry_statuses: Iterable[int] = RETRY_STATUS_CODES,
+        default_provider_limit: Optional[int] = 8,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_statuses = frozenset(retry_statuses)
+        self.default_provider_limit = default_provider_limit
+
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._provider_limits: Dict[str, Optional[int]] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    # ------------------------------------------------------------------
+    # 配置
+    # ------------------------------------------------------------------
+    def configure(self, **kwargs: Any) -> None:
+        """Update retry/backoff/pool settings; the session is rebuilt lazily."""
+
+        with self._lock:
+            for key, value in kwargs.items():
+                if not hasattr(self, key) or key.startswith("_"):
+                    raise AttributeError(f"Unknown HTTP client option: {key}")
+                if key == "retry_statuses":
+                    value = frozenset(value)
+                setattr(self, key, value)
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def set_provider_limit(self, provider: str, limit: Optional[int]) -> None:
+        """Cap concurrent requests for ``provider``; ``None`` disables the cap."""
+
+        with self._lock:
+            self._provider_limits[provider] = limit
+            self._semaphores.pop(provider, None)
+
+    def _get_session(self) -> requests.Session:
+        session = self._session
+        if session is not None:
+            return session
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                # 重试由本类处理，适配器只负责连接池
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def _get_semaphore(self, provider: Optional[str]) -> Optional[threading.BoundedSemaphore]:
+        if not provider:
+            return None
+        with self._lock:
+            semaphore = self._semaphores.get(provider)
+            if semaphore is None:
+                limit = self._provider_limits.get(provider, self.default_provider_limit)
+                if not limit or limit <= 0:
+                    return None
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[provider] = semaphore
+            return semaphore
+
+    def _histogram(self, host: str) -> LatencyHistogram:
+        histogram = self._histograms.get(host)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(host, LatencyHistogram())
+        return histogram
+
+    @staticmethod
+    def _hold_until_closed(
+        response: requests.Response,
+        semaphore: Optional[threading.BoundedSemaphore],
+        histogram: LatencyHistogram,
+        start: float,
+    ) -> None:
+        """Release the provider slot and record latency once a streamed body is done.
+
+        The body is done when ``iter_content`` (and so ``iter_lines``) runs to
+        the end, when the response is closed, or, as a last resort, when it is
+        garbage collected.
+        """
+
+        lock = threading.Lock()
+        done = [False]
+
+        def finish() -> None:
+            with lock:
+                if done[0]:
+                    return
+                done[0] = True
+            histogram.observe(time.perf_counter() - start)
+            if semaphore is not None:
+                semaphore.release()
+
+        close = response.close
+        iter_content = response.iter_content
+
+        def close_and_release() -> None:
+            try:
+                close()
+            finally:
+                finish()
+
+        def iter_content_and_release(*args: Any, **kwargs: Any):
+            yield from iter_content(*args, **kwargs)
+            finish()
+
+        response.close = close_and_release
+        response.iter_content = iter_content_and_release
+        weakref.finalize(response, finish)
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_cap))
+        return delay
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        provider: Optional[str] = None,
+        retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Args:
+            method: HTTP method.
+            url: Absolute URL.
+            provider: Provider name used for the concurrency limit.
+            retries: Override for the number of retries of this call.
+            **kwargs: Passed through to ``requests.Session.request``.
+
+        Returns:
+            The final ``requests.Response`` (status is not checked here).
+
+        Non-idempotent methods are only retried on connect failures and 429.
+        With ``stream=True`` the provider slot is held until the body has been
+        read to the end or the response is closed, so always close it.
+        """
+
+        max_retries = self.max_retries if retries is None else retries
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = self.retry_statuses if idempotent else self.retry_statuses.intersection(NON_IDEMPOTENT_RETRY_STATUS_CODES)
+        host = urlparse(url).netloc or "unknown"
+        histogram = self._histogram(host)
+        semaphore = self._get_semaphore(provider)
+        session = self._get_session()
+
+        stream = bool(kwargs.get("stream"))
+        attempt = 0
+        while True:
+            if semaphore is not None:
+                semaphore.acquire()
+            start = time.perf_counter()
+            handed_over = False
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                histogram.record_error()
+                if attempt >= max_retries or not (idempotent or _is_connect_error(exc)):
+                    raise
+                delay = self._backoff_delay(attempt, None)
+                logger.debug("HTTP %s %s failed (%s), retry %d in %.2fs", method, host, exc, attempt + 1, delay)
+            else:
+                final = response.status_code not in retry_statuses or attempt >= max_retries
+                if final and stream:
+                    # 流式响应：正文读完或关闭时才释放并发名额并记录耗时
+                    self._hold_until_closed(response, semaphore, histogram, start)
+                    handed_over = True
+                    return response
+                histogram.observe(time.perf_counter() - start)
+                if final:
+                    return response
+                delay = self._backoff_delay(attempt, _parse_retry_after(response.headers.get("Retry-After")))
+                logger.debug(
+                    "HTTP %s %s returned %d, retry %d in %.2fs",
+                    method, host, response.status_code, attempt + 1, delay,
+                )
+                response.close()
+            finally:
+                if semaphore is not None and not handed_over:
+                    semaphore.release()
+
+            histogram.record_retry()
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+    def metrics_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-host latency histograms as plain dictionaries."""
+
+        with self._lock:
+            items = list(self._histograms.items())
+        return {host: histogram.to_dict() for host, histogram in items}
+
+    def reset_metrics(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# 全局共享实例
+HTTP_CLIENT = PooledHttpClient()
+PROFILER.register_source("http", HTTP_CLIENT.metrics_snapshot)
+
+
+__all__ = [
+    "HTTP_CLIENT",
+    "IDEMPOTENT_METHODS",
+    "LatencyHistogram",
+    "PooledHttpClient",
+    "RETRY_STATUS_CODES",
+]
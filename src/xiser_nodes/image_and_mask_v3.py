@@ -5,11 +5,14 @@ import torch
 import torch.nn.functional as F
 import numpy as np
 from PIL import Image, ImageDraw
-import cv2
 import os
 from typing import Optional, Tuple, Union, List
 import math
-from .utils import standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger
+from .utils import (
+    standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger,
+    match_batch, per_frame_values, gaussian_blur_masks, morphology_masks,
+    lazy_node_mappings,
+)
 
 # ============================================================================
 # 图像加载节点
@@ -182,7 +185,11 @@ class XIS_CropImageV3(io.ComfyNode):
                            min=0,
                            max=1024,
                            step=1,
-                           tooltip="填充宽度")
+                           tooltip="填充宽度"),
+                io.Boolean.Input("batch_mode",
+                               default=False,
+                               optional=True,
+                               tooltip="处理整个批次，所有帧按蒙版的合并包围框统一裁剪；关闭时只处理第一帧")
             ],
             outputs=[
                 io.Image.Output(display_name="cropped_image")
@@ -192,8 +199,11 @@ class XIS_CropImageV3(io.ComfyNode):
     @classmethod
     def execute(cls, image: torch.Tensor, mask: Optional[torch.Tensor] = None,
                 invert_mask: bool = False, background_color: str = "#000000",
-                padding_width: int = 0) -> io.NodeOutput:
+                padding_width: int = 0, batch_mode: bool = False) -> io.NodeOutput:
         """执行方法：裁剪图像"""
+        if batch_mode:
+            return io.NodeOutput(cls.crop_batch(image, mask, invert_mask, background_color, padding_width))
+
         image = image[0]  # [H, W, C]
         device = image.device
 
@@ -264,6 +274,60 @@ class XIS_CropImageV3(io.ComfyNode):
 
         return io.NodeOutput(output_image.unsqueeze(0))
 
+    @classmethod
+    def crop_batch(cls, image: torch.Tensor, mask: Optional[torch.Tensor] = None,
+                   invert_mask: bool = False, background_color: str = "#000000",
+                   padding_width: int = 0) -> torch.Tensor:
+        """
+        批量裁剪：所有帧使用蒙版的合并包围框（保证输出尺寸一致），一次完成去底、背景合成和边框填充。
+        蒙版批次为 1 时广播到所有帧，单帧输入的结果与逐帧模式一致。
+        """
+        if image.dim() == 3:
+            image = image.unsqueeze(0)
+        if mask is None or not torch.is_tensor(mask) or mask.ndim == 0:
+            return image
+        device = image.device
+        batch_size, height, width, channels = image.shape
+
+        mask = mask.to(device=device, dtype=torch.float32)
+        if mask.ndim == 2:
+            mask = mask.unsqueeze(0)
+        if mask.max() > 1.0:
+            mask = mask / 255.0
+        mask = mask.clamp(0, 1)
+        if mask.shape[-2:] != (height, width):
+            mask = F.interpolate(mask.unsqueeze(1), size=(height, width), mode="bilinear",
+                                 antialias=True).squeeze(1)
+        if invert_mask:
+            mask = 1 - mask
+        mask = match_batch(mask, max(batch_size, mask.shape[0]))
+        image = match_batch(image, mask.shape[0])
+
+        rgb_color = cls.hex_to_rgb(background_color).to(device=device, dtype=image.dtype)
+        covered = mask > 0
+        if not torch.any(covered):  # 全为 0，返回纯色背景
+            return rgb_color.expand(*image.shape).clone()
+        if bool(torch.all(mask == 1)):  # 全为 1，返回原始图像
+            return image
+
+        # 合并包围框：按行、列投影一次求出
+        rows = torch.nonzero(covered.any(dim=0).any(dim=1)).flatten()
+        cols = torch.nonzero(covered.any(dim=0).any(dim=0)).flatten()
+        y_min, y_max = int(rows[0]), int(rows[-1])
+        x_min, x_max = int(cols[0]), int(cols[-1])
+        cropped_mask = mask[:, y_min:y_max + 1, x_min:x_max + 1].unsqueeze(-1)
+        cropped_image = image[:, y_min:y_max + 1, x_min:x_max + 1] * cropped_mask
+
+        # 应用蒙版并合成背景
+        output_image = cropped_image * cropped_mask + rgb_color * (1 - cropped_mask)
+
+        # 添加空白边框
+        if padding_width > 0:
+            output_image = output_image - rgb_color
+            output_image = F.pad(output_image, (0, 0, padding_width, padding_width, padding_width, padding_width))
+            output_image = output_image + rgb_color
+        return output_image
+
     @classmethod
     def hex_to_rgb(cls, hex_color):
         """HEX颜色转RGB张量"""
@@ -529,7 +593,16 @@ class XIS_MaskCompositeOperationV3(io.ComfyNode):
                             tooltip="次蒙版"),
                 io.Image.Input("reference_image",
                              optional=True,
-                             tooltip="参考图像")
+                             tooltip="参考图像"),
+                io.Custom("LIST").Input("blur_radius_list",
+                                      optional=True,
+                                      tooltip="可选的逐帧模糊半径列表（不足时重复最后一个值），连接后替代 blur_radius"),
+                io.Custom("LIST").Input("expand_shrink_list",
+                                      optional=True,
+                                      tooltip="可选的逐帧扩展/收缩量列表（不足时重复最后一个值），连接后替代 expand_shrink"),
+                io.Custom("LIST").Input("opacity_list",
+                                      optional=True,
+                                      tooltip="可选的逐帧不透明度列表（不足时重复最后一个值），连接后替代 opacity")
             ],
             outputs=[
                 io.Mask.Output(display_name="result_mask"),
@@ -541,99 +614,118 @@ class XIS_MaskCompositeOperationV3(io.ComfyNode):
     def execute(cls, mask1: torch.Tensor, operation: str, blur_radius: float,
                 expand_shrink: float, invert_mask: bool, overlay_color: str,
                 opacity: float, mask2: Optional[torch.Tensor] = None,
-                reference_image: Optional[torch.Tensor] = None) -> io.NodeOutput:
-        """执行方法：应用蒙版复合操作"""
-        # 将 mask1 转换为 NumPy 数组并获取尺寸（保持浮点数）
-        mask1_np = mask1.squeeze().cpu().numpy().astype(np.float32)
-        mask1_height, mask1_width = mask1_np.shape
-
-        # 处理 mask2
-        mask2_is_empty = False
+                reference_image: Optional[torch.Tensor] = None,
+                blur_radius_list: Optional[list] = None,
+                expand_shrink_list: Optional[list] = None,
+                opacity_list: Optional[list] = None) -> io.NodeOutput:
+        """
+        执行方法：应用蒙版复合操作
+
+        整个 [B, H, W] 批次在输入设备上处理；mask2 和 reference_image 的批次为 1 时广播。
+        连接 blur_radius_list、expand_shrink_list、opacity_list 时按帧取值，替代对应的标量参数。
+        """
+        # 逐帧列表优先于标量参数
+        if blur_radius_list is not None and len(blur_radius_list) > 0:
+            blur_radius = list(blur_radius_list)
+        if expand_shrink_list is not None and len(expand_shrink_list) > 0:
+            expand_shrink = list(expand_shrink_list)
+        if opacity_list is not None and len(opacity_list) > 0:
+            opacity = list(opacity_list)
+
+        mask1 = cls._as_mask_batch(mask1)
+        device = mask1.device
+        batch_size, mask1_height, mask1_width = mask1.shape
+
+        # 处理 mask2（64x64 全零视为未连接的空蒙版）
         if mask2 is not None:
-            mask2_np = mask2.squeeze().cpu().numpy().astype(np.float32)
-            if mask2_np.shape == (64, 64) and np.all(mask2_np == 0):
-                mask2_is_empty = True
+            mask2 = cls._as_mask_batch(mask2).to(device)
+            if mask2.shape[-2:] == (64, 64) and not torch.any(mask2):
+                mask2 = None
             else:
-                if mask2_np.shape != mask1_np.shape:
-                    mask2_pil = Image.fromarray((mask2_np * 255).astype(np.uint8))
-                    mask2_pil = mask2_pil.resize((mask1_width, mask1_height), Image.LANCZOS)
-                    mask2_np = np.array(mask2_pil).astype(np.float32) / 255.0
+                batch_size = max(batch_size, mask2.shape[0])
+        if reference_image is not None:
+            reference_image = reference_image.to(device=device, dtype=torch.float32)
+            if reference_image.dim() == 3:
+                reference_image = reference_image.unsqueeze(0)
+            batch_size = max(batch_size, reference_image.shape[0])
 
-        # 执行蒙版操作（保持浮点数）
-        if mask2 is not None and not mask2_is_empty:
+        result = match_batch(mask1, batch_size)
+        if mask2 is not None:
+            mask2 = match_batch(cls._resize_batch(mask2.unsqueeze(1), mask1_height, mask1_width).squeeze(1), batch_size)
+            # 执行蒙版操作（保持浮点数）
             if operation == "add":
-                result_np = np.clip(mask1_np + mask2_np, 0, 1)
+                result = torch.clamp(result + mask2, 0, 1)
             elif operation == "subtract":
-                result_np = np.clip(mask1_np - mask2_np, 0, 1)
+                result = torch.clamp(result - mask2, 0, 1)
             elif operation == "intersect":
-                result_np = np.minimum(mask1_np, mask2_np)
+                result = torch.minimum(result, mask2)
             elif operation == "difference":
-                result_np = np.abs(mask1_np - mask2_np)
-        else:
-            result_np = mask1_np
+                result = torch.abs(result - mask2)
 
         # 形态学操作
-        if expand_shrink != 0:
-            result_np = cls.morphological_operation(result_np, expand_shrink)
-            result_np = np.clip(result_np, 0, 1)  # 确保范围
+        if any(value != 0 for value in per_frame_values(expand_shrink, batch_size)):
+            result = torch.clamp(morphology_masks(result, expand_shrink), 0, 1)
 
         # 模糊处理
-        if blur_radius > 0:
-            result_np = cv2.GaussianBlur(result_np, (0, 0), blur_radius, borderType=cv2.BORDER_REPLICATE)
-            result_np = np.clip(result_np, 0, 1)  # 确保范围
+        if any(value > 0 for value in per_frame_values(blur_radius, batch_size)):
+            result = torch.clamp(gaussian_blur_masks(result, blur_radius), 0, 1)
 
         # 反向蒙版
         if invert_mask:
-            result_np = 1.0 - result_np
-            result_np = np.clip(result_np, 0, 1)  # 确保范围
-
-        # 转换为 PyTorch 张量
-        result_mask = torch.from_numpy(result_np).unsqueeze(0)
+            result = torch.clamp(1.0 - result, 0, 1)
+        result_mask = result.contiguous()
 
         # 生成叠加图像
-        overlay_tensor = None
         if reference_image is not None:
-            ref_img_np = reference_image[0].cpu().numpy()  # [H, W, C], 0-1 范围
-            if ref_img_np.shape[:2] != (mask1_height, mask1_width):
-                ref_img_pil = Image.fromarray((ref_img_np * 255).astype(np.uint8))
-                ref_img_pil = ref_img_pil.resize((mask1_width, mask1_height), Image.LANCZOS)
-                ref_img_np = np.array(ref_img_pil).astype(np.float32) / 255.0
+            ref_img = reference_image[..., :3]
+            if ref_img.shape[1:3] != (mask1_height, mask1_width):
+                ref_img = cls._resize_batch(ref_img.permute(0, 3, 1, 2), mask1_height, mask1_width).permute(0, 2, 3, 1)
+            ref_img = match_batch(ref_img, batch_size)
 
             # 创建颜色层（0-1 范围）
             try:
-                hex_color = overlay_color.lstrip('#').lower()  # 统一格式
-                if len(hex_color) != 6:
-                    raise ValueError("Invalid HEX color length")
-                rgb = tuple(int(hex_color[i:i+2], 16) / 255.0 for i in (0, 2, 4))
+                rgb = hex_to_rgb(overlay_color.lower(), device=device)
             except (ValueError, IndexError):
-                rgb = (1.0, 0.0, 0.0)  # 默认红色
+                rgb = torch.tensor([1.0, 0.0, 0.0], device=device)  # 默认红色
                 print(f"Warning: Invalid overlay_color '{overlay_color}', using default red")
 
-            color_layer_np = np.full((mask1_height, mask1_width, 3), rgb, dtype=np.float32)
-
             # 使用浮点数掩码进行合成
-            mask_3d = result_np[..., np.newaxis]  # [H, W, 1]
-            overlay_np = (color_layer_np * mask_3d + ref_img_np * (1 - mask_3d)) * opacity + ref_img_np * (1 - opacity)
-            overlay_np = np.clip(overlay_np, 0, 1)  # 确保范围
-
-            overlay_tensor = torch.from_numpy(overlay_np).unsqueeze(0)
+            alpha = torch.tensor(per_frame_values(opacity, batch_size), device=device).view(-1, 1, 1, 1)
+            mask_3d = result_mask.unsqueeze(-1)  # [B, H, W, 1]
+            overlay_tensor = (rgb * mask_3d + ref_img * (1 - mask_3d)) * alpha + ref_img * (1 - alpha)
+            overlay_tensor = torch.clamp(overlay_tensor, 0, 1)
         else:
             overlay_tensor = torch.zeros_like(result_mask.unsqueeze(-1).expand(-1, -1, -1, 3))
 
         return io.NodeOutput(result_mask, overlay_tensor)
 
+    @staticmethod
+    def _as_mask_batch(mask: torch.Tensor) -> torch.Tensor:
+        """统一为 float32 的 [B, H, W]"""
+        mask = mask.float()
+        if mask.dim() == 2:
+            return mask.unsqueeze(0)
+        if mask.dim() == 4:
+            return mask[..., 0] if mask.shape[-1] == 1 else mask[:, 0]
+        return mask
+
+    @staticmethod
+    def _resize_batch(tensor: torch.Tensor, height: int, width: int) -> torch.Tensor:
+        """[B, C, H, W] 抗锯齿双三次缩放（替代 PIL LANCZOS）"""
+        if tensor.shape[-2:] == (height, width):
+            return tensor
+        resized = F.interpolate(tensor, size=(height, width), mode="bicubic", align_corners=False, antialias=True)
+        return torch.clamp(resized, 0, 1)
+
     @classmethod
     def morphological_operation(cls, np_image, amount):
-        """使用 OpenCV 实现形态学操作，保持浮点数"""
-        kernel_size = int(abs(amount) * 2 + 1)
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
-
-        if amount > 0:
-            processed = cv2.dilate(np_image, kernel, iterations=1, borderType=cv2.BORDER_REPLICATE)
-        else:
-            processed = cv2.erode(np_image, kernel, iterations=1, borderType=cv2.BORDER_REPLICATE)
-
-        return processed  # 在调用处 clip
+        """形态学操作（椭圆结构元素，边界复制），保持浮点数"""
+        masks = torch.from_numpy(np.ascontiguousarray(np_image, dtype=np.float32))
+        squeeze = masks.dim() == 2
+        if squeeze:
+            masks = masks.unsqueeze(0)
+        processed = morphology_masks(masks, amount)
+        return (processed[0] if squeeze else processed).numpy()  # 在调用处 clip
 
 
 # ============================================================================
@@ -773,18 +865,35 @@ class XIS_CompositorProcessorV3(io.ComfyNode):
                            tooltip="画板高度"),
                 io.String.Input("background_color",
                               default="#FFFFFF",
-                              tooltip="画板底色（HEX 值）")
+                              tooltip="画板底色（HEX 值）"),
+                io.Boolean.Input("batch_mode",
+                               default=False,
+                               optional=True,
+                               tooltip="处理整个批次并一次完成逐帧变换；关闭时只处理第一帧"),
+                io.Custom("LIST").Input("transform_list",
+                                      optional=True,
+                                      tooltip="批处理模式下的逐帧变换列表，元素为包含 x、y、width、height、angle 的字典，缺省键使用节点参数")
             ],
             outputs=[
                 io.Image.Output(display_name="output_image")
             ]
         )
 
+    # 批处理时每次 grid_sample 的最大采样点数（帧数×区域高×区域宽）
+    GRID_CHUNK_ELEMENTS = 1 << 24
+
     @classmethod
     def execute(cls, image: torch.Tensor, x: int, y: int, width: int,
                 height: int, angle: int, canvas_width: int, canvas_height: int,
-                background_color: str) -> io.NodeOutput:
+                background_color: str, batch_mode: bool = False,
+                transform_list: Optional[List[dict]] = None) -> io.NodeOutput:
         """执行方法：图像变换和合成"""
+        if batch_mode:
+            return io.NodeOutput(cls.render_batch(
+                image, x, y, width, height, angle, canvas_width, canvas_height,
+                background_color, transform_list
+            ))
+
         # 将 ComfyUI 的 IMAGE 类型（torch.Tensor）转换为 PIL 图像
         image_tensor = image[0]  # 假设批量大小为 1，取第一张图
         image_np = image_tensor.cpu().numpy() * 255  # 转换为 0-255 范围
@@ -823,6 +932,165 @@ class XIS_CompositorProcessorV3(io.ComfyNode):
 
         return io.NodeOutput(output_tensor)
 
+    @classmethod
+    def frame_transforms(cls, frame_count: int, x, y, width, height, angle,
+                         transform_list: Optional[List[dict]] = None) -> List[dict]:
+        """
+        组合逐帧变换参数：节点参数（标量或列表）作为默认值，transform_list 中的键覆盖对应帧，
+        列表短于帧数时沿用最后一项。
+        """
+        defaults = {
+            "x": per_frame_values(x, frame_count),
+            "y": per_frame_values(y, frame_count),
+            "width": per_frame_values(width, frame_count),
+            "height": per_frame_values(height, frame_count),
+            "angle": per_frame_values(angle, frame_count),
+        }
+        transforms = []
+        for i in range(frame_count):
+            override = {}
+            if transform_list:
+                item = transform_list[min(i, len(transform_list) - 1)]
+                override = item if isinstance(item, dict) else {}
+            frame = {}
+            for key, values in defaults.items():
+                value = override.get(key, values[i])
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    value = values[i]
+                frame[key] = value
+            transforms.append({
+                "x": int(round(frame["x"])),
+                "y": int(round(frame["y"])),
+                "width": max(1, int(round(frame["width"]))),
+                "height": max(1, int(round(frame["height"]))),
+                "angle": frame["angle"],
+            })
+        return transforms
+
+    @staticmethod
+    def rotated_size(width: int, height: int, angle: float) -> Tuple[int, int]:
+        """与 PIL Image.rotate(-angle, expand=True) 相同的外接尺寸"""
+        radians = math.radians(angle)
+        a, b = round(math.cos(radians), 15), round(math.sin(radians), 15)
+        center_x, center_y = width / 2.0, height / 2.0
+        # PIL 的逆变换矩阵包含绕中心的平移，取整结果依赖于此
+        c = -a * center_x - b * center_y + center_x
+        f = b * center_x - a * center_y + center_y
+        xs, ys = [], []
+        for px, py in ((0, 0), (width, 0), (width, height), (0, height)):
+            xs.append(a * px + b * py + c)
+            ys.append(-b * px + a * py + f)
+        return math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys))
+
+    @classmethod
+    def render_batch(cls, image: torch.Tensor, x, y, width, height, angle,
+                     canvas_width: int, canvas_height: int, background_color: str,
+                     transform_list: Optional[List[dict]] = None) -> torch.Tensor:
+        """
+        批量渲染：逐帧缩放、旋转并放置到画板上，结果与单帧 PIL 路径一致（旋转外接框内的空白为黑色）。
+
+        相同缩放尺寸的帧合并为一次抗锯齿插值；无旋转的帧直接按整数偏移拷贝，
+        旋转的帧通过一次 grid_sample 批量采样。
+        """
+        if image.dim() == 3:
+            image = image.unsqueeze(0)
+        device = image.device
+        frame_count = max(image.shape[0], len(transform_list) if transform_list else 0)
+        transforms = cls.frame_transforms(frame_count, x, y, width, height, angle, transform_list)
+        frames = match_batch(image[..., :3].float(), frame_count).permute(0, 3, 1, 2)
+
+        try:
+            bg_color = hex_to_rgb(background_color, device=device)
+        except ValueError:
+            bg_color = torch.ones(3, device=device)  # 默认白色，如果 HEX 值无效
+        canvas = torch.empty((frame_count, canvas_height, canvas_width, 3), device=device)
+        canvas[:] = bg_color
+
+        groups = {}
+        for index, transform in enumerate(transforms):
+            groups.setdefault((transform["width"], transform["height"]), []).append(index)
+
+        for (target_width, target_height), indices in groups.items():
+            # 单张输入图像广播到多帧时，每种尺寸只缩放一次
+            resized = frames[:1] if image.shape[0] == 1 else frames[indices]
+            if resized.shape[-2:] != (target_height, target_width):
+                resized = F.interpolate(resized, size=(target_height, target_width), mode="bicubic",
+                                        align_corners=False, antialias=True).clamp(0, 1)
+            resized = resized.expand(len(indices), *resized.shape[1:])
+            rotated = []
+            for position, index in enumerate(indices):
+                transform = transforms[index]
+                if transform["angle"] % 360 == 0:
+                    cls._paste_integer(canvas[index], resized[position], transform["x"], transform["y"])
+                else:
+                    rotated.append((position, index))
+            if rotated:
+                cls._paste_rotated(canvas, resized, rotated, transforms)
+
+        return canvas
+
+    @staticmethod
+    def _paste_integer(canvas: torch.Tensor, frame: torch.Tensor, center_x: int, center_y: int) -> None:
+        height, width = frame.shape[-2:]
+        canvas_height, canvas_width = canvas.shape[:2]
+        left, top = center_x - width // 2, center_y - height // 2
+        x0, y0 = max(left, 0), max(top, 0)
+        x1, y1 = min(left + width, canvas_width), min(top + height, canvas_height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        canvas[y0:y1, x0:x1] = frame[:, y0 - top:y1 - top, x0 - left:x1 - left].permute(1, 2, 0)
+
+    @classmethod
+    def _paste_rotated(cls, canvas: torch.Tensor, resized: torch.Tensor,
+                       rotated: List[Tuple[int, int]], transforms: List[dict]) -> None:
+        frame_count, canvas_height, canvas_width = canvas.shape[:3]
+        source_height, source_width = resized.shape[-2:]
+        device = canvas.device
+
+        # 每帧在画板上的可见区域（旋转外接框与画板的交集）
+        regions = []
+        for position, index in rotated:
+            transform = transforms[index]
+            rot_width, rot_height = cls.rotated_size(source_width, source_height, transform["angle"])
+            left = transform["x"] - rot_width // 2
+            top = transform["y"] - rot_height // 2
+            x0, y0 = max(left, 0), max(top, 0)
+            x1, y1 = min(left + rot_width, canvas_width), min(top + rot_height, canvas_height)
+            if x1 > x0 and y1 > y0:
+                regions.append((position, index, left, top, rot_width, rot_height, x0, y0, x1, y1))
+        if not regions:
+            return
+
+        region_height = max(r[9] - r[7] for r in regions)
+        region_width = max(r[8] - r[6] for r in regions)
+        chunk = max(1, cls.GRID_CHUNK_ELEMENTS // (region_height * region_width))
+        rows = torch.arange(region_height, device=device, dtype=torch.float32)
+        cols = torch.arange(region_width, device=device, dtype=torch.float32)
+
+        for start in range(0, len(regions), chunk):
+            batch = regions[start:start + chunk]
+            params = torch.tensor([
+                [x0 - left - rot_width / 2.0, y0 - top - rot_height / 2.0, math.radians(transforms[index]["angle"])]
+                for _, index, left, top, rot_width, rot_height, x0, y0, _, _ in batch
+            ], device=device, dtype=torch.float32)
+            # 像素中心相对旋转中心的偏移
+            dx = cols.view(1, 1, -1) + 0.5 + params[:, 0].view(-1, 1, 1)
+            dy = rows.view(1, -1, 1) + 0.5 + params[:, 1].view(-1, 1, 1)
+            cos_a = torch.cos(params[:, 2]).view(-1, 1, 1)
+            sin_a = torch.sin(params[:, 2]).view(-1, 1, 1)
+            # 逆旋转回缩放后图像坐标，并归一化到 [-1, 1]
+            source_x = cos_a * dx + sin_a * dy
+            source_y = -sin_a * dx + cos_a * dy
+            grid = torch.stack([source_x * (2.0 / source_width), source_y * (2.0 / source_height)], dim=-1)
+
+            sources = resized[[region[0] for region in batch]]
+            sampled = F.grid_sample(sources, grid, mode="bicubic", padding_mode="zeros", align_corners=False)
+            sampled = sampled.clamp(0, 1).permute(0, 2, 3, 1)
+            for k, (_, index, _, _, _, _, x0, y0, x1, y1) in enumerate(batch):
+                canvas[index, y0:y1, x0:x1] = sampled[k, :y1 - y0, :x1 - x0]
+
 
 # ============================================================================
 # 节点列表（用于Extension注册）
@@ -842,7 +1110,5 @@ V3_NODE_CLASSES = [
 ]
 
 # 节点ID到类的映射（用于向后兼容或参考）
-V3_NODE_MAPPINGS = {
-    cls.define_schema().node_id: cls
-    for cls in V3_NODE_CLASSES
-}
\ No newline at end of file
+# 首次访问时再构建，避免导入模块时为每个节点调用define_schema
+__getattr__ = lazy_node_mappings(globals())
\ No newline at end of file
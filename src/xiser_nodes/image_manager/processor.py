@@ -1,4 +1,5 @@
 import os
+import functools
 import json
 import re
 import time
@@ -7,6 +8,7 @@ import torch
 from collections import defaultdict
 from PIL import Image
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from ..profiler import PROFILER
 from .constants import logger
 from .storage import (
     tensor_to_uint8_array,
@@ -17,13 +19,15 @@ from .storage import (
 
 
 def timeit(func):
-    """简单的性能计时装饰器"""
+    """简单的性能计时装饰器，启用性能采样时同时记录为span"""
+    profiled = PROFILER.profiled(f"image_manager.{func.__name__}")(func)
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.perf_counter()
-        result = func(*args, **kwargs)
+        result = profiled(*args, **kwargs)
         elapsed = time.perf_counter() - start_time
-        func_name = func.__name__
-        logger.debug(f"{func_name} executed in {elapsed:.3f} seconds")
+        logger.debug("%s executed in %.3f seconds", func.__name__, elapsed)
         return result
     return wrapper
 
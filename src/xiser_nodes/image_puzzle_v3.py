@@ -1,14 +1,21 @@
-from PIL import Image
 import torch
-import numpy as np
-from typing import Optional, List, Tuple
+import torch.nn.functional as F
+from typing import Dict, Optional, List, Tuple
 from comfy_api.v0_0_2 import io, ui
 
 
+# 矩形 (x, y, w, h)
+Rect = Tuple[int, int, int, int]
+
+# 单次插值处理的最大元素数（源帧 + 目标帧），大批量缩略图按此分块
+RESIZE_CHUNK_ELEMENTS = 1 << 26
+
+
 class XIS_ImagePuzzleV3(io.ComfyNode):
     """
-    ImagePuzzle 是基于 PIL 库开发的图片拼接工具，支持四种核心拼接布局：
+    ImagePuzzle 是图片拼接工具，支持四种核心拼接布局：
     左主右副、右主左副、上主下副、下主上副。
+    先求解所有图片的最终矩形，再将每张图缩放一次写入预分配的画布。
     V3架构版本
     """
 
@@ -52,24 +59,6 @@ class XIS_ImagePuzzleV3(io.ComfyNode):
             ]
         )
 
-    @staticmethod
-    def get_image_info(img_tensor: torch.Tensor) -> Tuple[Image.Image, int, int, float]:
-        """
-        从张量获取图片信息（尺寸、宽高比）
-        """
-        # 将张量转换为 PIL 图像
-        img_np = img_tensor.cpu().numpy() * 255
-        img_np = img_np.astype(np.uint8)
-
-        if img_tensor.shape[-1] == 4:  # RGBA
-            img = Image.fromarray(img_np, 'RGBA')
-        else:  # RGB
-            img = Image.fromarray(img_np, 'RGB').convert("RGBA")
-
-        w, h = img.size
-        ratio = w / h
-        return img, w, h, ratio
-
     @staticmethod
     def calc_main_image_size(ratio: float, main_base_width: int) -> Tuple[int, int]:
         """
@@ -80,338 +69,148 @@ class XIS_ImagePuzzleV3(io.ComfyNode):
         return display_w, display_h
 
     @staticmethod
-    def combine_sub_vertical(sub_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                           main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Tuple[Optional[Image.Image], int, int]:
-        """
-        副图竖向组合（图间间距=gap）→ 适配左主右副/右主左副
-        """
-        if not sub_imgs_info:
-            return None, 0, 0
-
-        sub_w = main_base_width
-        sub_imgs_resized = []
-        total_height = 0
-
-        # 调整副图尺寸
-        for img, _, _, ratio in sub_imgs_info:
-            resize_h = int(sub_w / ratio)
-            img_resized = img.resize((sub_w, resize_h), Image.Resampling.LANCZOS)
-            sub_imgs_resized.append(img_resized)
-            total_height += resize_h + gap  # 副图间间距
-
-        # 减去最后一个间距
-        if sub_imgs_resized:
-            total_height -= gap
-
-        # 创建副图长图画布
-        sub_long_img = Image.new("RGBA", (sub_w, total_height), bg_color)
-
-        # 拼接副图
-        current_y = 0
-        for img in sub_imgs_resized:
-            sub_long_img.paste(img, (0, current_y), img)
-            current_y += img.height + gap
-
-        return sub_long_img, sub_w, total_height
-
-    @staticmethod
-    def combine_sub_horizontal(sub_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                              main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Tuple[Optional[Image.Image], int, int]:
-        """
-        副图横向组合（图间间距=gap）→ 适配上主下副/下主上副
-        """
-        if not sub_imgs_info:
-            return None, 0, 0
-
-        # 副图高度=第一张主图的高度
-        main_img_ratio = sub_imgs_info[0][3] if sub_imgs_info else 1
-        sub_h = int(main_base_width / main_img_ratio)
-        sub_imgs_resized = []
-        total_width = 0
-
-        # 调整副图尺寸
-        for img, _, _, ratio in sub_imgs_info:
-            resize_w = int(sub_h * ratio)
-            img_resized = img.resize((resize_w, sub_h), Image.Resampling.LANCZOS)
-            sub_imgs_resized.append(img_resized)
-            total_width += resize_w + gap  # 副图间间距
-
-        # 减去最后一个间距
-        if sub_imgs_resized:
-            total_width -= gap
-
-        # 创建副图长图画布
-        sub_long_img = Image.new("RGBA", (total_width, sub_h), bg_color)
-
-        # 拼接副图
-        current_x = 0
-        for img in sub_imgs_resized:
-            sub_long_img.paste(img, (current_x, 0), img)
-            current_x += img.width + gap
-
-        return sub_long_img, total_width, sub_h
-
-    @staticmethod
-    def resize_image_keep_ratio(img: Image.Image, target_h: Optional[int] = None,
-                               target_w: Optional[int] = None) -> Tuple[Image.Image, int, int]:
+    def stack_rects(sizes: List[Tuple[int, int]], gap: int, vertical: bool) -> Tuple[List[Rect], int, int]:
         """
-        等比缩放图片
+        沿一个方向依次排列矩形（图间间距=gap），返回矩形列表 (x, y, w, h) 及整体宽高
         """
-        img_w, img_h = img.size
-
-        if target_h is not None:
-            scale = target_h / img_h
-            new_w = int(img_w * scale)
-            new_h = target_h
-        elif target_w is not None:
-            scale = target_w / img_w
-            new_w = target_w
-            new_h = int(img_h * scale)
-        else:
-            return img, img_w, img_h
-
-        resized_img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        return resized_img, new_w, new_h
+        rects = []
+        offset = 0
+        for w, h in sizes:
+            rects.append((0, offset, w, h) if vertical else (offset, 0, w, h))
+            offset += (h if vertical else w) + gap
+        extent = max(0, offset - gap)
+        if vertical:
+            return rects, max((w for w, _ in sizes), default=0), extent
+        return rects, extent, max((h for _, h in sizes), default=0)
 
     @staticmethod
-    def combine_main_vertical(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                             main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Tuple[Image.Image, int, int]:
-        """
-        主图竖向组合（图间间距=gap）→ 适配左右布局
+    def scale_rects(rects: List[Rect], scale: float, vertical: bool, cross_size: int) -> List[Rect]:
         """
-        if not main_imgs_info:
-            return Image.new("RGBA", (0, 0), bg_color), 0, 0
-
-        main_w = main_base_width
-        main_imgs_resized = []
-        total_height = 0
-
-        # 调整主图尺寸
-        for img_info in main_imgs_info:
-            img, _, _, ratio = img_info
-            resize_w, resize_h = XIS_ImagePuzzleV3.calc_main_image_size(ratio, main_base_width)
-            img_resized = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
-            main_imgs_resized.append(img_resized)
-            total_height += resize_h + gap  # 主图间间距
-
-        # 减去最后一个间距
-        if main_imgs_resized:
-            total_height -= gap
-
-        # 创建主图长图画布
-        main_long_img = Image.new("RGBA", (main_w, total_height), bg_color)
-
-        # 拼接主图
-        current_y = 0
-        for img in main_imgs_resized:
-            main_long_img.paste(img, (0, current_y), img)
-            current_y += img.height + gap
-
-        return main_long_img, main_w, total_height
-
-    @staticmethod
-    def combine_main_horizontal(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                               main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Tuple[Image.Image, int, int]:
+        将排列好的长图整体等比缩放：沿排列方向的边界四舍五入，另一方向占满 cross_size
         """
-        主图横向组合（图间间距=gap）→ 适配上下布局
-        """
-        if not main_imgs_info:
-            return Image.new("RGBA", (0, 0), bg_color), 0, 0
-
-        # 计算主图统一高度
-        main_h = 0
-        for img_info in main_imgs_info:
-            img, _, _, ratio = img_info
-            resize_w, resize_h = XIS_ImagePuzzleV3.calc_main_image_size(ratio, main_base_width)
-            main_h = max(main_h, resize_h)
-
-        main_imgs_resized = []
-        total_width = 0
-
-        # 调整主图尺寸
-        for img_info in main_imgs_info:
-            img, _, _, ratio = img_info
-            resize_w, resize_h = XIS_ImagePuzzleV3.calc_main_image_size(ratio, main_base_width)
-            # 等比缩放到统一高度
-            scale = main_h / resize_h
-            final_w = int(resize_w * scale)
-            img_resized = img.resize((final_w, main_h), Image.Resampling.LANCZOS)
-            main_imgs_resized.append(img_resized)
-            total_width += final_w + gap  # 主图间间距
-
-        # 减去最后一个间距
-        if main_imgs_resized:
-            total_width -= gap
-
-        # 创建主图长图画布
-        main_long_img = Image.new("RGBA", (total_width, main_h), bg_color)
-
-        # 拼接主图
-        current_x = 0
-        for img in main_imgs_resized:
-            main_long_img.paste(img, (current_x, 0), img)
-            current_x += img.width + gap
-
-        return main_long_img, total_width, main_h
+        scaled = []
+        for x, y, w, h in rects:
+            if vertical:
+                y0, y1 = round(y * scale), round((y + h) * scale)
+                scaled.append((0, y0, cross_size, y1 - y0))
+            else:
+                x0, x1 = round(x * scale), round((x + w) * scale)
+                scaled.append((x0, 0, x1 - x0, cross_size))
+        return scaled
 
     @staticmethod
-    def layout_left_main(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                        sub_long_img: Optional[Image.Image], sub_long_w: int, sub_long_h: int,
-                        main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Image.Image:
-        """
-        左主右副拼接（主图竖向拼接，对齐宽度，有间距）
-        """
-        # 1. 主图竖向拼接（对齐宽度，有间距）
-        main_long_img, main_area_w, main_area_h = XIS_ImagePuzzleV3.combine_main_vertical(
-            main_imgs_info, main_base_width, gap, bg_color
-        )
-
-        # 2. 副图长图等比缩放到与主图区域高度一致
-        if sub_long_img is not None and sub_long_h > 0:
-            sub_long_img, sub_long_w, sub_long_h = XIS_ImagePuzzleV3.resize_image_keep_ratio(
-                sub_long_img, target_h=main_area_h
-            )
+    def offset_rects(rects: List[Rect], dx: int, dy: int) -> List[Rect]:
+        return [(x + dx, y + dy, w, h) for x, y, w, h in rects]
 
-        # 3. 计算最终拼图尺寸
-        final_w = main_area_w + gap + sub_long_w  # 主宽 + 间距 + 副宽
-        final_h = main_area_h  # 高度=主图区高度
-
-        # 4. 创建最终拼图画布
-        final_img = Image.new("RGBA", (final_w, final_h), bg_color)
-
-        # 5. 拼接主图长图
-        final_img.paste(main_long_img, (0, 0), main_long_img)
-
-        # 6. 拼接副图长图
-        if sub_long_img is not None:
-            sub_start_x = main_area_w + gap  # 主宽 + 间距
-            final_img.paste(sub_long_img, (sub_start_x, 0), sub_long_img)
-
-        return final_img
-
-    @staticmethod
-    def layout_right_main(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                         sub_long_img: Optional[Image.Image], sub_long_w: int, sub_long_h: int,
-                         main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Image.Image:
-        """
-        右主左副拼接（主图竖向拼接，对齐宽度，有间距）
+    @classmethod
+    def solve_layout(cls, sizes: List[Tuple[int, int]], main_count: int, layout_type: str,
+                     gap: int, main_base_width: int) -> Tuple[int, int, List[Rect]]:
         """
-        # 1. 主图竖向拼接（对齐宽度，有间距）
-        main_long_img, main_area_w, main_area_h = XIS_ImagePuzzleV3.combine_main_vertical(
-            main_imgs_info, main_base_width, gap, bg_color
-        )
-
-        # 2. 副图长图等比缩放
-        if sub_long_img is not None and sub_long_h > 0:
-            sub_long_img, sub_long_w, sub_long_h = XIS_ImagePuzzleV3.resize_image_keep_ratio(
-                sub_long_img, target_h=main_area_h
-            )
-
-        # 3. 最终拼图尺寸
-        final_w = sub_long_w + gap + main_area_w
-        final_h = main_area_h
-
-        # 4. 创建画布
-        final_img = Image.new("RGBA", (final_w, final_h), bg_color)
-
-        # 5. 拼接副图长图
-        if sub_long_img is not None:
-            final_img.paste(sub_long_img, (0, 0), sub_long_img)
-
-        # 6. 拼接主图长图
-        main_start_x = sub_long_w + gap  # 主副间距
-        final_img.paste(main_long_img, (main_start_x, 0), main_long_img)
+        先按几何关系求出每张图在最终拼图中的矩形，不做任何像素操作。
 
-        return final_img
+        Args:
+            sizes (List[Tuple[int, int]]): 每张输入图的原始 (宽, 高)
+            main_count (int): 主图数量
+            layout_type (str): 布局类型
+            gap (int): 间距（同时作为外扩边框宽度）
+            main_base_width (int): 主图基准宽度
 
-    @staticmethod
-    def layout_top_main(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                       sub_long_img: Optional[Image.Image], sub_long_w: int, sub_long_h: int,
-                       main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Image.Image:
-        """
-        上主下副拼接（主图横向拼接，对齐高度，有间距）
+        Returns:
+            Tuple[int, int, List[Rect]]: (画布宽, 画布高, 按输入顺序排列的矩形 (x, y, w, h))
         """
-        # 1. 主图横向拼接（对齐高度，有间距）
-        main_long_img, main_area_w, main_area_h = XIS_ImagePuzzleV3.combine_main_horizontal(
-            main_imgs_info, main_base_width, gap, bg_color
-        )
-
-        # 2. 副图长图等比缩放到与主图区域宽度一致
-        if sub_long_img is not None and sub_long_w > 0:
-            sub_long_img, sub_long_w, sub_long_h = XIS_ImagePuzzleV3.resize_image_keep_ratio(
-                sub_long_img, target_w=main_area_w
-            )
-
-        # 3. 最终拼图尺寸
-        final_w = main_area_w
-        final_h = main_area_h + gap + sub_long_h
-
-        # 4. 创建画布
-        final_img = Image.new("RGBA", (final_w, final_h), bg_color)
-
-        # 5. 拼接主图长图
-        final_img.paste(main_long_img, (0, 0), main_long_img)
-
-        # 6. 拼接副图长图
-        if sub_long_img is not None:
-            sub_start_y = main_area_h + gap  # 主高 + 间距
-            final_img.paste(sub_long_img, (0, sub_start_y), sub_long_img)
+        main_count = min(main_count, len(sizes))
+        ratios = [w / h for w, h in sizes]
+        main_sizes = [cls.calc_main_image_size(ratio, main_base_width) for ratio in ratios[:main_count]]
+        sub_ratios = ratios[main_count:]
+        vertical = layout_type in ["left-main", "right-main"]
+
+        if not sub_ratios:
+            # 无副图：主图按展示尺寸直接堆叠，图间无间距
+            rects, width, height = cls.stack_rects(main_sizes, 0, vertical)
+        elif vertical:
+            # 左右布局：主图竖向拼接，副图竖向长图等比缩放到主图区域高度
+            main_rects, main_w, main_h = cls.stack_rects(main_sizes, gap, True)
+            sub_sizes = [(main_base_width, int(main_base_width / ratio)) for ratio in sub_ratios]
+            sub_rects, sub_w, sub_h = cls.stack_rects(sub_sizes, gap, True)
+            scale = main_h / max(1, sub_h)
+            sub_w = int(sub_w * scale)
+            sub_rects = cls.scale_rects(sub_rects, scale, True, sub_w)
+            if layout_type == "right-main":
+                main_rects = cls.offset_rects(main_rects, sub_w + gap, 0)
+            else:
+                sub_rects = cls.offset_rects(sub_rects, main_w + gap, 0)
+            rects = main_rects + sub_rects
+            width, height = main_w + gap + sub_w, main_h
+        else:
+            # 上下布局：主图等比缩放到统一高度后横向拼接，副图横向长图等比缩放到主图区域宽度
+            main_h = max(h for _, h in main_sizes)
+            main_sizes = [(int(w * (main_h / h)), main_h) for w, h in main_sizes]
+            main_rects, main_w, _ = cls.stack_rects(main_sizes, gap, False)
+            # 副图高度=第一张副图按基准宽度展示时的高度
+            sub_h = int(main_base_width / sub_ratios[0])
+            sub_sizes = [(int(sub_h * ratio), sub_h) for ratio in sub_ratios]
+            sub_rects, sub_w, sub_h = cls.stack_rects(sub_sizes, gap, False)
+            scale = main_w / max(1, sub_w)
+            sub_h = int(sub_h * scale)
+            sub_rects = cls.scale_rects(sub_rects, scale, False, sub_h)
+            if layout_type == "bottom-main":
+                main_rects = cls.offset_rects(main_rects, 0, sub_h + gap)
+            else:
+                sub_rects = cls.offset_rects(sub_rects, 0, main_h + gap)
+            rects = main_rects + sub_rects
+            width, height = main_w, main_h + gap + sub_h
 
-        return final_img
+        # 外扩边框（宽度=gap）
+        return width + 2 * gap, height + 2 * gap, cls.offset_rects(rects, gap, gap)
 
     @staticmethod
-    def layout_bottom_main(main_imgs_info: List[Tuple[Image.Image, int, int, float]],
-                          sub_long_img: Optional[Image.Image], sub_long_w: int, sub_long_h: int,
-                          main_base_width: int, gap: int, bg_color: Tuple[int, int, int]) -> Image.Image:
+    def source_batch(frames: List[torch.Tensor], batch: Optional[torch.Tensor],
+                       indices: List[int]) -> torch.Tensor:
         """
-        下主上副拼接（主图横向拼接，对齐高度，有间距）
+        取出一组输入帧：来自同一批次张量的连续帧直接切片，否则堆叠
         """
-        # 1. 主图横向拼接（对齐高度，有间距）
-        main_long_img, main_area_w, main_area_h = XIS_ImagePuzzleV3.combine_main_horizontal(
-            main_imgs_info, main_base_width, gap, bg_color
-        )
-
-        # 2. 副图长图等比缩放到与主图区域宽度一致
-        if sub_long_img is not None and sub_long_w > 0:
-            sub_long_img, sub_long_w, sub_long_h = XIS_ImagePuzzleV3.resize_image_keep_ratio(
-                sub_long_img, target_w=main_area_w
-            )
-
-        # 3. 最终拼图尺寸
-        final_w = main_area_w
-        final_h = sub_long_h + gap + main_area_h
-
-        # 4. 创建画布
-        final_img = Image.new("RGBA", (final_w, final_h), bg_color)
-
-        # 5. 拼接副图长图
-        if sub_long_img is not None:
-            final_img.paste(sub_long_img, (0, 0), sub_long_img)
-
-        # 6. 拼接主图长图
-        main_start_y = sub_long_h + gap  # 副高 + 间距
-        final_img.paste(main_long_img, (0, main_start_y), main_long_img)
-
-        return final_img
+        if batch is not None and indices[-1] - indices[0] == len(indices) - 1:
+            return batch[indices[0]:indices[-1] + 1]
+        return torch.stack([frames[i] for i in indices])
 
-    @staticmethod
-    def add_outer_border(img: Image.Image, gap: int, bg_color: Tuple[int, int, int]) -> Image.Image:
+    @classmethod
+    def render_layout(cls, frames: List[torch.Tensor], batch: Optional[torch.Tensor], rects: List[Rect],
+                      canvas_w: int, canvas_h: int, bg_rgb: Tuple[int, int, int]) -> torch.Tensor:
         """
-        为最终拼图添加外扩边框（宽度=gap，背景色）
+        按求好的矩形将每张输入图缩放一次并直接写入预分配的 RGBA 画布。
+        源尺寸和目标尺寸都相同的图共用一次插值（按 RESIZE_CHUNK_ELEMENTS 分块）。
         """
-        if gap <= 0:
-            return img
-
-        # 计算新尺寸（原图尺寸 + 2*gap）
-        new_w = img.width + 2 * gap
-        new_h = img.height + 2 * gap
-
-        # 创建带背景色的新画布
-        border_img = Image.new("RGBA", (new_w, new_h), bg_color)
-        # 将原图粘贴到画布中央（外扩gap边框）
-        border_img.paste(img, (gap, gap), img)
-
-        return border_img
+        device = frames[0].device
+        canvas = torch.empty((1, canvas_h, canvas_w, 4), dtype=torch.float32, device=device)
+        canvas[..., :3] = torch.tensor(bg_rgb, dtype=torch.float32, device=device) / 255.0
+        canvas[..., 3] = 1.0
+
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for index, (frame, (_, _, w, h)) in enumerate(zip(frames, rects)):
+            if w <= 0 or h <= 0:
+                continue
+            groups.setdefault((*frame.shape, h, w), []).append(index)
+
+        for (src_h, src_w, channels, dst_h, dst_w), indices in groups.items():
+            chunk = max(1, RESIZE_CHUNK_ELEMENTS // ((src_h * src_w + dst_h * dst_w) * channels))
+            for start in range(0, len(indices), chunk):
+                part = indices[start:start + chunk]
+                source = cls.source_batch(frames, batch, part).to(torch.float32)
+                if (src_h, src_w) != (dst_h, dst_w):
+                    source = F.interpolate(
+                        source.permute(0, 3, 1, 2), size=(dst_h, dst_w),
+                        mode="bicubic", align_corners=False, antialias=True
+                    ).permute(0, 2, 3, 1).clamp_(0, 1)
+                for frame, index in zip(source, part):
+                    x, y, w, h = rects[index]
+                    region = canvas[0, y:y + h, x:x + w]
+                    if channels == 4:
+                        # 以自身 alpha 为蒙版粘贴（与 PIL paste(img, pos, img) 相同）
+                        region.lerp_(frame, frame[..., 3:].expand_as(frame))
+                    else:
+                        region[..., :3] = frame
+
+        return canvas
 
     @staticmethod
     def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
@@ -457,107 +256,27 @@ class XIS_ImagePuzzleV3(io.ComfyNode):
             io.NodeOutput: Generated puzzle image
         """
         # 验证输入
-        if not pack_images:
+        if pack_images is None or len(pack_images) == 0:
             raise ValueError("pack_images 输入为空，请提供至少一张图片")
 
         # 转换背景色
         bg_rgb = cls.hex_to_rgb(bg_color)
 
-        # 1. 解析图片信息
-        all_imgs_info = []
-        for img_tensor in pack_images:
-            all_imgs_info.append(cls.get_image_info(img_tensor))
-
-        # 2. 分离主副图
-        if main_count > len(all_imgs_info):
-            main_count = len(all_imgs_info)
-
-        main_imgs_info = all_imgs_info[:main_count]
-        sub_imgs_info = all_imgs_info[main_count:]
-
-        # 3. 无副图时
-        if not sub_imgs_info:
-            main_imgs_resized = []
-
-            # 处理主图
-            for img_info in main_imgs_info:
-                img, _, _, ratio = img_info
-                resize_w, resize_h = cls.calc_main_image_size(ratio, main_base_width)
-                img_resized = img.resize((resize_w, resize_h), Image.Resampling.LANCZOS)
-                main_imgs_resized.append(img_resized)
-
-            # 根据布局类型决定主图堆叠方式
-            if layout_type in ["left-main", "right-main"]:
-                # 左右布局：主图垂直堆叠
-                total_height = sum(img.height for img in main_imgs_resized)
-                main_w = main_base_width
-
-                # 创建主图画布
-                final_img = Image.new("RGBA", (main_w, total_height), bg_rgb)
-                current_y = 0
-                for img in main_imgs_resized:
-                    final_img.paste(img, (0, current_y), img)
-                    current_y += img.height
-            else:
-                # 上下布局：主图水平堆叠
-                total_width = sum(img.width for img in main_imgs_resized)
-                main_h = max(img.height for img in main_imgs_resized)
-
-                # 创建主图画布
-                final_img = Image.new("RGBA", (total_width, main_h), bg_rgb)
-                current_x = 0
-                for img in main_imgs_resized:
-                    final_img.paste(img, (current_x, 0), img)
-                    current_x += img.width
-
-            # 添加外扩边框
-            final_img = cls.add_outer_border(final_img, gap, bg_rgb)
-        else:
-            # 4. 组合副图长图
-            sub_long_img, sub_long_w, sub_long_h = None, 0, 0
-            if layout_type in ["left-main", "right-main"]:
-                sub_long_img, sub_long_w, sub_long_h = cls.combine_sub_vertical(
-                    sub_imgs_info, main_base_width, gap, bg_rgb
-                )
-            else:
-                sub_long_img, sub_long_w, sub_long_h = cls.combine_sub_horizontal(
-                    sub_imgs_info, main_base_width, gap, bg_rgb
-                )
-
-            # 5. 最终拼接
-            if layout_type == "left-main":
-                final_img = cls.layout_left_main(
-                    main_imgs_info, sub_long_img, sub_long_w, sub_long_h,
-                    main_base_width, gap, bg_rgb
-                )
-            elif layout_type == "right-main":
-                final_img = cls.layout_right_main(
-                    main_imgs_info, sub_long_img, sub_long_w, sub_long_h,
-                    main_base_width, gap, bg_rgb
-                )
-            elif layout_type == "top-main":
-                final_img = cls.layout_top_main(
-                    main_imgs_info, sub_long_img, sub_long_w, sub_long_h,
-                    main_base_width, gap, bg_rgb
-                )
-            elif layout_type == "bottom-main":
-                final_img = cls.layout_bottom_main(
-                    main_imgs_info, sub_long_img, sub_long_w, sub_long_h,
-                    main_base_width, gap, bg_rgb
-                )
-            else:
-                # 默认使用左主右副布局
-                final_img = cls.layout_left_main(
-                    main_imgs_info, sub_long_img, sub_long_w, sub_long_h,
-                    main_base_width, gap, bg_rgb
-                )
-
-            # 6. 添加外扩边框
-            final_img = cls.add_outer_border(final_img, gap, bg_rgb)
+        # 1. 解析图片信息（批次张量按帧拆分为视图，不复制）
+        batch = pack_images if isinstance(pack_images, torch.Tensor) and pack_images.dim() == 4 else None
+        frames = list(pack_images)
+        for frame in frames:
+            if frame.dim() != 3 or frame.shape[-1] not in (3, 4):
+                raise ValueError(f"pack_images 中的图片必须为 (H, W, 3) 或 (H, W, 4)，实际为 {tuple(frame.shape)}")
+
+        # 2. 求解布局：先确定所有图片的最终矩形
+        canvas_w, canvas_h, rects = cls.solve_layout(
+            [(frame.shape[1], frame.shape[0]) for frame in frames],
+            main_count, layout_type, gap, main_base_width
+        )
 
-        # 7. 转换为 ComfyUI IMAGE 格式
-        final_img_np = np.array(final_img).astype(np.float32) / 255.0
-        final_tensor = torch.from_numpy(final_img_np).unsqueeze(0)
+        # 3. 每张图只缩放一次，直接写入最终画布
+        final_tensor = cls.render_layout(frames, batch, rects, canvas_w, canvas_h, bg_rgb)
 
         return io.NodeOutput(final_tensor)
 
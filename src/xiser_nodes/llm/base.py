@@ -9,10 +9,10 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-import requests
 import torch
 from PIL import Image
 
+from ..http_client import HTTP_CLIENT
 from ..utils import logger
 
 
@@ -42,7 +42,7 @@ def _to_uint8(image: torch.Tensor) -> np.ndarray:
 
 def _download_image_to_tensor(url: str) -> Optional[torch.Tensor]:
     try:
-        img_resp = requests.get(url, timeout=30)
+        img_resp = HTTP_CLIENT.get(url, timeout=30)
         img_resp.raise_for_status()
         pil_img = Image.open(io.BytesIO(img_resp.content)).convert("RGB")
         img_np = np.array(pil_img, dtype=np.float32) / 255.0
@@ -65,6 +65,27 @@ def _image_to_base64(image: torch.Tensor) -> str:
     return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
 
+def _image_to_array(image: torch.Tensor) -> np.ndarray:
+    """Convert a tensor image to a contiguous RGB uint8 array (no encoding)."""
+
+    img_np = _to_uint8(image)
+    if img_np.shape[-1] == 4:
+        img_np = img_np[..., :3]
+    return np.ascontiguousarray(img_np)
+
+
+def _encode_image_payloads(provider: "BaseLLMProvider", images: Sequence[torch.Tensor]) -> List[Any]:
+    """Prepare image payloads for ``provider``.
+
+    In-process providers (``accepts_raw_images``) receive uint8 arrays that go
+    straight to their processor; remote providers get PNG base64 strings.
+    """
+
+    if getattr(provider, "accepts_raw_images", False):
+        return [_image_to_array(img) for img in images]
+    return [_image_to_base64(img) for img in images]
+
+
 def _gather_images(image: Optional[Union[torch.Tensor, Iterable]], pack_images: Optional[Sequence]) -> List[torch.Tensor]:
     """Collect image tensors from IMAGE and pack_images inputs."""
 
@@ -89,6 +110,23 @@ def _gather_images(image: Optional[Union[torch.Tensor, Iterable]], pack_images:
     return gathered
 
 
+def _split_batch_instructions(instruction: str, separator: str) -> List[str]:
+    """Split a batch instruction on ``separator`` (``\\n`` means newline), dropping empty items."""
+
+    separator = (separator or "").replace("\\n", "\n") or "\n"
+    return [part.strip() for part in instruction.split(separator) if part.strip()]
+
+
+def _split_image_groups(pack_images: Optional[Any]) -> List[List[torch.Tensor]]:
+    """Split pack_images into image groups: one per frame of a tensor batch, one per list entry."""
+
+    if pack_images is None:
+        return []
+    if isinstance(pack_images, torch.Tensor):
+        return [[img] for img in _gather_images(pack_images, None)]
+    return [_gather_images(item, None) for item in pack_images]
+
+
 def _image_to_data_url(image: torch.Tensor) -> str:
     """Encode tensor to data URL (PNG)."""
     img_np = _to_uint8(image)
@@ -124,6 +162,9 @@ class LLMProviderConfig:
 class BaseLLMProvider(ABC):
     """Abstract provider interface."""
 
+    # 本地推理提供者设为True，直接接收uint8数组而非base64字符串
+    accepts_raw_images: bool = False
+
     def __init__(self, config: LLMProviderConfig):
         self.config = config
 
@@ -150,11 +191,12 @@ class BaseLLMProvider(ABC):
         if progress_callback:
             progress_callback("连接", 0.3)
 
-        response = requests.post(
+        response = HTTP_CLIENT.post(
             endpoint,
             headers=headers,
             json=payload,
             timeout=self.config.timeout,
+            provider=self.config.name,
         )
         response.raise_for_status()
 
@@ -179,8 +221,12 @@ __all__ = [
     "BaseLLMProvider",
     "LLMProviderConfig",
     "_download_image_to_tensor",
+    "_encode_image_payloads",
     "_gather_images",
+    "_image_to_array",
     "_image_to_base64",
     "_image_to_data_url",
     "_image_to_data_url_from_b64",
+    "_split_batch_instructions",
+    "_split_image_groups",
 ]
@@ -8,6 +8,8 @@ import hashlib
 import json
 import torch
 
+from ..profiler import PROFILER
+
 
 class SeedCache:
     """Seed结果缓存管理器（增强通用性版本）"""
@@ -131,8 +133,10 @@ class SeedCache:
             # 更新访问顺序（LRU）
             self.access_order.remove(cache_key)
             self.access_order.append(cache_key)
+            PROFILER.record_cache("llm_seed_cache", True)
             return self.cache[cache_key]
 
+        PROFILER.record_cache("llm_seed_cache", False)
         return None
 
     def set(self, seed: int, provider: str, instruction: str,
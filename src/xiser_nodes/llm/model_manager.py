@@ -1,7 +1,10 @@
 """模型管理模块 - 统一本地模型扫描和选项管理"""
 
 import os
+import json
+import time
 import logging
+import threading
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional, Set
 
@@ -84,15 +87,160 @@ def get_model_dirs() -> List[Path]:
 
     return model_dirs
 
-def scan_local_models() -> Tuple[List[str], str]:
+# 扫描深度：组织/模型 两级，外加HF缓存的 models--x/snapshots/<hash> 结构
+MAX_SCAN_DEPTH = 4
+# 不会包含模型配置的目录（HF缓存的blob存储等），扫描时跳过
+_SKIP_DIR_NAMES = {"blobs", "refs", "__pycache__", ".git", ".cache", ".locks"}
+# 后台校验索引的最小间隔（秒）
+INDEX_REFRESH_INTERVAL = 10.0
+MODEL_INDEX_PATH = Path.home() / ".comfyui_xiser_cache" / "model_index.json"
+
+
+def _scan_model_root(base_dir: str, max_depth: int = MAX_SCAN_DEPTH) -> Dict[str, object]:
+    """限深扫描单个模型根目录
+
+    包含config.json的目录视为模型，不再向下进入其权重目录。
+    返回 {"models": [相对路径], "mtimes": {目录: mtime_ns}}，mtimes记录所有访问过的目录，
+    用于判断索引是否过期（目录中增删条目会改变其mtime）。
+    """
+    models: List[str] = []
+    mtimes: Dict[str, int] = {}
+    stack = [(base_dir, 0)]
+    while stack:
+        current, depth = stack.pop()
+        try:
+            mtimes[current] = os.stat(current).st_mtime_ns
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError as e:
+            logger.debug(f"Cannot scan {current}: {e}")
+            continue
+        if depth > 0 and any(entry.name == "config.json" and entry.is_file() for entry in entries):
+            models.append(os.path.relpath(current, base_dir))
+            continue
+        if depth >= max_depth:
+            continue
+        for entry in entries:
+            if entry.name in _SKIP_DIR_NAMES or entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir():
+                    stack.append((entry.path, depth + 1))
+            except OSError:
+                continue
+    return {"models": sorted(models), "mtimes": mtimes}
+
+
+class LocalModelIndex:
+    """持久化的本地模型索引
+
+    首次查询时从磁盘读取索引立即返回结果，随后在后台线程中按目录mtime校验，
+    只重新扫描发生变化的根目录。
+    """
+
+    def __init__(self, index_path: Path = MODEL_INDEX_PATH, max_depth: int = MAX_SCAN_DEPTH):
+        self.index_path = index_path
+        self.max_depth = max_depth
+        self._roots: Optional[Dict[str, Dict[str, object]]] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_refresh = 0.0
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("max_depth") == self.max_depth:
+                return data.get("roots", {})
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save(self) -> None:
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"max_depth": self.max_depth, "roots": self._roots}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.debug(f"Failed to save model index: {e}")
+
+    @staticmethod
+    def _is_stale(entry: Dict[str, object]) -> bool:
+        for path, mtime in entry.get("mtimes", {}).items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def models(self, base_dirs: List[str]) -> List[str]:
+        """返回所有根目录下的模型相对路径（去重排序）"""
+        with self._lock:
+            if self._roots is None:
+                self._roots = self._load()
+            missing = [d for d in base_dirs if d not in self._roots]
+            # 没有索引的根目录只能同步扫描（限深，代价很小）
+            for base_dir in missing:
+                self._roots[base_dir] = _scan_model_root(base_dir, self.max_depth)
+            if missing:
+                self._save()
+            result = sorted({m for d in base_dirs for m in self._roots[d]["models"]})
+        if not missing:
+            self._schedule_refresh(base_dirs)
+        return result
+
+    def refresh(self, base_dirs: List[str], force: bool = False) -> bool:
+        """校验索引并重新扫描过期的根目录，返回是否有变化"""
+        with self._lock:
+            if self._roots is None:
+                self._roots = self._load()
+            snapshot = dict(self._roots)
+        changed = {}
+        for base_dir in base_dirs:
+            entry = snapshot.get(base_dir)
+            if force or entry is None or self._is_stale(entry):
+                changed[base_dir] = _scan_model_root(base_dir, self.max_depth)
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            if changed:
+                self._roots.update(changed)
+                self._save()
+                logger.debug(f"Model index refreshed for: {list(changed)}")
+        return bool(changed)
+
+    def _schedule_refresh(self, base_dirs: List[str]) -> None:
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._last_refresh < INDEX_REFRESH_INTERVAL:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(base_dirs)
+            except Exception as e:
+                logger.debug(f"Background model index refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="xiser-model-index", daemon=True).start()
+
+
+MODEL_INDEX = LocalModelIndex()
+
+
+def scan_local_models(refresh: bool = False) -> Tuple[List[str], str]:
     """扫描本地模型目录，返回模型路径列表和默认值
 
     扫描多个模型目录（MODEL_BASE_DIRS），只扫描本地模型，不支持Hugging Face Hub格式模型。
     参考ComfyUI-QwenVL项目，支持Transformers模型格式。
+    结果来自持久化索引（见LocalModelIndex），refresh=True时同步强制重新扫描。
     """
     try:
-        model_paths = []
-
+        base_dirs = []
         for model_base_dir in MODEL_BASE_DIRS:
             # 确保目录存在
             os.makedirs(model_base_dir, exist_ok=True)
@@ -100,23 +248,14 @@ def scan_local_models() -> Tuple[List[str], str]:
             if not os.path.isdir(model_base_dir):
                 logger.warning(f"Model directory not found: {model_base_dir}")
                 continue
+            base_dirs.append(model_base_dir)
 
-            # 递归查找包含config.json的目录（Transformers模型格式）
-            for root, dirs, files in os.walk(model_base_dir):
-                if "config.json" in files:
-                    # 使用相对路径作为显示路径，但加上目录前缀以区分来源
-                    rel_path = os.path.relpath(root, model_base_dir)
-                    # 如果rel_path是"."（即根目录本身），跳过
-                    if rel_path == ".":
-                        continue
-                    # 避免重复添加相同的相对路径
-                    if rel_path not in model_paths:
-                        model_paths.append(rel_path)
+        if refresh:
+            MODEL_INDEX.refresh(base_dirs, force=True)
+        model_paths = MODEL_INDEX.models(base_dirs)
 
         # 只返回本地模型，不添加Hugging Face选项
         if model_paths:
-            # 按字母排序，确保一致性
-            model_paths.sort()
             return model_paths, model_paths[0]  # 第一个本地模型作为默认
         else:
             logger.debug(f"No local models found in any directory: {MODEL_BASE_DIRS}")
@@ -182,9 +321,9 @@ class LocalModelScanner:
         self.local_paths_set: Set[str] = set()
         self._scan_complete = False
 
-    def scan(self) -> None:
-        """执行扫描"""
-        self.local_paths, _ = scan_local_models()
+    def scan(self, refresh: bool = False) -> None:
+        """执行扫描（默认读取索引，refresh=True时强制重新扫描磁盘）"""
+        self.local_paths, _ = scan_local_models(refresh=refresh)
         self.local_paths_set = set(self.local_paths)
         self._scan_complete = True
 
@@ -9,6 +9,9 @@ from ..utils import logger
 # 创建API实例用于进度更新
 api_sync = ComfyAPISync()
 
+# 流式文本推送的前端事件名（web/qwen_vl_stream.js监听）
+STREAM_EVENT = "xiser-llm-stream"
+
 class StageMapping:
     """阶段映射配置"""
 
@@ -181,6 +184,29 @@ class ProgressManager:
             # 进度更新失败不影响主要功能
             logger.debug(f"Progress update for Qwen-VL failed: {e}")
 
+    @staticmethod
+    def send_partial_text(text: str, node_id: str = "", done: bool = False) -> None:
+        """
+        推送流式生成的部分文本到前端（事件名见STREAM_EVENT）
+
+        Args:
+            text: 当前已生成的完整文本
+            node_id: 节点ID
+            done: 生成是否结束
+        """
+        try:
+            from server import PromptServer
+
+            server = PromptServer.instance
+            server.send_sync(
+                STREAM_EVENT,
+                {"node": node_id, "text": text, "done": done},
+                getattr(server, "client_id", None),
+            )
+        except Exception as e:
+            # 推送失败不影响主要功能
+            logger.debug(f"Partial text update failed: {e}")
+
 # 全局进度管理器实例（可选）
 _global_progress_manager: Optional[ProgressManager] = None
 
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import importlib.util
 import os
+import time
 import warnings
 import sys
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -16,12 +18,23 @@ from .base import (
     BaseLLMProvider,
     LLMProviderConfig,
     _gather_images,
+    _image_to_array,
     _image_to_base64,
     _download_image_to_tensor,
     _image_to_data_url_from_b64,
 )
 from ..utils import logger
 from .model_manager import get_model_dirs as get_model_dirs_from_manager
+from .quantization import (
+    PROFILE_AUTO,
+    PROFILE_NONE,
+    PROFILES,
+    bitsandbytes_available,
+    choose_profile,
+    profile_dtype,
+    quantize_dynamic_int8,
+)
+from .vision_cache import VISION_FEATURE_CACHE, image_cache_key, processor_signature
 
 # Import folder_paths for ComfyUI model directory management
 try:
@@ -31,12 +44,9 @@ except ImportError:
     HAS_FOLDER_PATHS = False
     logger.warning("folder_paths not available, using fallback paths")
 
-# Import huggingface_hub for model downloading
-try:
-    from huggingface_hub import snapshot_download
-    HAS_HUGGINGFACE_HUB = True
-except ImportError:
-    HAS_HUGGINGFACE_HUB = False
+# huggingface_hub for model downloading (imported when a download starts)
+HAS_HUGGINGFACE_HUB = importlib.util.find_spec("huggingface_hub") is not None
+if not HAS_HUGGINGFACE_HUB:
     logger.warning("huggingface_hub not available, model downloading disabled")
 
 # Try to import tqdm for download progress display
@@ -55,6 +65,12 @@ except ImportError:
     HAS_REQUESTS = False
     logger.warning("requests library not available")
 
+# ComfyUI中断支持（生成过程中响应取消）
+try:
+    import comfy.model_management as model_management
+except ImportError:
+    model_management = None
+
 # Hugging Face mirror support
 HF_MIRRORS = {
     "hf-mirror.com": "https://hf-mirror.com",
@@ -65,25 +81,60 @@ HF_ENDPOINTS = [
     "https://hf-mirror.com",   # Chinese mirror
 ]
 
-# Try to import transformers, but make it optional
-try:
-    from transformers import AutoModelForVision2Seq, AutoProcessor, AutoTokenizer
-    import transformers
-    # Check transformers version for Qwen3-VL support
-    TRANSFORMERS_VERSION = getattr(transformers, "__version__", "0.0.0")
-    # Qwen3-VL requires transformers >= 4.57.0
-    from packaging import version
-    if version.parse(TRANSFORMERS_VERSION) < version.parse("4.57.0"):
-        logger.warning(f"Transformers version {TRANSFORMERS_VERSION} is too old for Qwen3-VL. Need >=4.57.0")
-        TRANSFORMERS_AVAILABLE = False
-    else:
-        TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    logger.warning("Transformers library not available. Qwen3-VL local provider will not work.")
-except Exception as e:
-    TRANSFORMERS_AVAILABLE = False
-    logger.warning(f"Failed to import Qwen3-VL modules from transformers: {e}. Qwen3-VL local provider will not work.")
+# transformers导入需要数秒，首次使用本地推理时再导入（见transformers_available）
+AutoModelForVision2Seq = AutoProcessor = AutoTokenizer = StoppingCriteriaList = None
+TRANSFORMERS_VERSION: Optional[str] = None
+_TRANSFORMERS_AVAILABLE: Optional[bool] = None
+
+
+def transformers_available() -> bool:
+    """Import transformers on first call and report whether Qwen3-VL is supported."""
+    global AutoModelForVision2Seq, AutoProcessor, AutoTokenizer, StoppingCriteriaList
+    global TRANSFORMERS_VERSION, _TRANSFORMERS_AVAILABLE
+    if _TRANSFORMERS_AVAILABLE is not None:
+        return _TRANSFORMERS_AVAILABLE
+    try:
+        from transformers import AutoModelForVision2Seq, AutoProcessor, AutoTokenizer, StoppingCriteriaList
+        import transformers
+        # Check transformers version for Qwen3-VL support
+        TRANSFORMERS_VERSION = getattr(transformers, "__version__", "0.0.0")
+        # Qwen3-VL requires transformers >= 4.57.0
+        from packaging import version
+        if version.parse(TRANSFORMERS_VERSION) < version.parse("4.57.0"):
+            logger.warning(f"Transformers version {TRANSFORMERS_VERSION} is too old for Qwen3-VL. Need >=4.57.0")
+            _TRANSFORMERS_AVAILABLE = False
+        else:
+            _TRANSFORMERS_AVAILABLE = True
+    except ImportError:
+        _TRANSFORMERS_AVAILABLE = False
+        logger.warning("Transformers library not available. Qwen3-VL local provider will not work.")
+    except Exception as e:
+        _TRANSFORMERS_AVAILABLE = False
+        logger.warning(f"Failed to import Qwen3-VL modules from transformers: {e}. Qwen3-VL local provider will not work.")
+    return _TRANSFORMERS_AVAILABLE
+
+
+def __getattr__(name: str) -> Any:
+    # 兼容旧代码中的 TRANSFORMERS_AVAILABLE 常量
+    if name == "TRANSFORMERS_AVAILABLE":
+        return transformers_available()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_TRANSFORMERS_MISSING_MESSAGE = """Qwen3-VL requires transformers >= 4.57.0 and additional dependencies.
+
+To install the required dependencies, use one of these methods:
+
+1. Install the optional 'qwen-vl' dependencies for this extension:
+   pip install "ComfyUI_XISER_Nodes[qwen-vl]"
+
+2. Or install dependencies manually:
+   pip install transformers>=4.57.0 torch huggingface-hub safetensors accelerate bitsandbytes pillow numpy
+
+Note: If you already have transformers installed but version < 4.57.0, upgrade it:
+   pip install --upgrade transformers>=4.57.0
+
+For more details, see the extension documentation."""
 
 
 def get_model_dirs() -> List[Path]:
@@ -144,6 +195,8 @@ def download_with_mirror_fallback(repo_id: str, target_dir: Path) -> str:
     Returns:
         本地模型目录路径
     """
+    from huggingface_hub import snapshot_download
+
     last_error = None
     last_endpoint = None
 
@@ -348,9 +401,206 @@ def ensure_model(model_id: str) -> str:
                        f"install huggingface_hub for automatic downloading.")
 
 
+def _payload_to_array(item: Union[str, np.ndarray, torch.Tensor]) -> np.ndarray:
+    """将图像载荷统一转换为RGB uint8数组，供处理器直接使用
+
+    进程内调用传入的是uint8数组或张量，无需编解码；base64/data URL字符串
+    仅为兼容旧调用方而保留。
+    """
+    if isinstance(item, np.ndarray):
+        array = item
+        if array.dtype != np.uint8:
+            array = (np.clip(array, 0.0, 1.0) * 255.0).round().astype(np.uint8)
+        if array.ndim == 3 and array.shape[-1] == 4:
+            array = array[..., :3]
+        return np.ascontiguousarray(array)
+    if isinstance(item, torch.Tensor):
+        return _image_to_array(item[0] if item.dim() == 4 else item)
+    if isinstance(item, str):
+        import base64
+        from io import BytesIO
+        encoded = item.split(",", 1)[1] if item.startswith("data:image") else item
+        pil_image = Image.open(BytesIO(base64.b64decode(encoded))).convert("RGB")
+        return np.asarray(pil_image)
+    raise TypeError(f"Unsupported image payload type: {type(item)}")
+
+
+# 批量推理时需要左填充的序列维度张量
+_SEQUENCE_KEYS = ("input_ids", "attention_mask", "token_type_ids", "mm_token_type_ids")
+
+
+def _plan_batches(lengths: List[int], max_batch_size: int, max_batch_tokens: int, max_new_tokens: int) -> List[List[int]]:
+    """按长度分组规划批次，返回每批的下标列表
+
+    先按提示长度降序排序以减少填充，再贪心装箱：每批不超过max_batch_size条，
+    且 条数 × (批内最长提示 + max_new_tokens) 不超过max_batch_tokens（至少一条）。
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_max = 0
+    for index in order:
+        longest = max(current_max, lengths[index])
+        fits = len(current) < max(1, max_batch_size) and (len(current) + 1) * (longest + max_new_tokens) <= max_batch_tokens
+        if current and not fits:
+            batches.append(current)
+            current, longest = [], lengths[index]
+        current.append(index)
+        current_max = longest
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _collate_left_padded(processed: List[Dict[str, Any]], pad_token_id: int) -> Dict[str, torch.Tensor]:
+    """将逐条处理的输入左对齐填充并拼接为一个批次"""
+    max_len = max(int(item["input_ids"].shape[1]) for item in processed)
+    batch: Dict[str, torch.Tensor] = {}
+    keys = {key for item in processed for key in item.keys()}
+    for key in keys:
+        values = [item[key] for item in processed if torch.is_tensor(item.get(key))]
+        if not values:
+            continue
+        if key in _SEQUENCE_KEYS:
+            pad_value = pad_token_id if key == "input_ids" else 0
+            rows = []
+            for value in values:
+                pad = max_len - value.shape[1]
+                if pad > 0:
+                    value = torch.cat([value.new_full((value.shape[0], pad), pad_value), value], dim=1)
+                rows.append(value)
+            batch[key] = torch.cat(rows, dim=0)
+        else:
+            # pixel_values / image_grid_thw 等按图像顺序拼接
+            batch[key] = torch.cat(values, dim=0)
+    return batch
+
+
+def _sampling_kwargs(generation_config: Dict[str, Any]) -> Dict[str, Any]:
+    """由已校验的生成配置构建model.generate的采样参数"""
+    temperature = generation_config.get("temperature", 0.7)
+    top_p = generation_config.get("top_p", 0.8)
+    return {
+        "max_new_tokens": generation_config["max_new_tokens"],
+        "temperature": temperature if temperature > 0 else None,
+        "top_p": top_p if top_p > 0 else None,
+        "top_k": generation_config.get("top_k"),
+        "repetition_penalty": generation_config.get("repetition_penalty"),
+        "do_sample": temperature > 0,
+    }
+
+
+def _processing_interrupted() -> bool:
+    """ComfyUI是否请求中断当前任务（不抛出异常）"""
+    return model_management is not None and model_management.processing_interrupted()
+
+
+def is_interrupt_exception(exc: BaseException) -> bool:
+    """判断异常是否为ComfyUI的中断异常，这类异常需要继续向上抛出"""
+    return model_management is not None and isinstance(exc, model_management.InterruptProcessingException)
+
+
+def _truncate_at_stop(text: str, stop_strings: List[str]) -> str:
+    """在第一个停止字符串处截断文本"""
+    cut = len(text)
+    for stop in stop_strings:
+        position = text.find(stop)
+        if position != -1:
+            cut = min(cut, position)
+    return text[:cut]
+
+
+class _GenerationMonitor:
+    """生成过程监视器，同时作为model.generate的streamer和stopping criteria
+
+    streamer接口（put/end）累积新token，按节流间隔解码并回调部分文本，
+    并在尾部窗口中检查停止字符串；stopping criteria接口（__call__）在遇到
+    停止字符串或ComfyUI中断时结束生成，从而立即释放GPU。
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any = None,
+        stop_strings: Optional[List[str]] = None,
+        stream_callback: Optional[callable] = None,
+        interval: float = 0.1,
+    ):
+        self.tokenizer = tokenizer
+        self.stop_strings = [stop for stop in (stop_strings or []) if stop]
+        self.stream_callback = stream_callback
+        self.interval = interval
+        # 每个token至少一个字符，尾部窗口覆盖最长停止字符串即可
+        self._tail_tokens = max((len(stop) for stop in self.stop_strings), default=0) + 2
+        self.reset()
+
+    @property
+    def streaming(self) -> bool:
+        return self.tokenizer is not None and (self.stream_callback is not None or bool(self.stop_strings))
+
+    def reset(self) -> None:
+        self.stopped = False
+        self.interrupted = False
+        self.text = ""
+        self._token_ids: List[int] = []
+        self._prompt_skipped = False
+        self._last_emit = 0.0
+
+    # streamer接口 ---------------------------------------------------------
+    def put(self, value: torch.Tensor) -> None:
+        if not self._prompt_skipped:
+            # 第一次调用传入的是提示词token
+            self._prompt_skipped = True
+            return
+        self._token_ids.extend(value.reshape(-1).tolist())
+        if self.stop_strings and not self.stopped:
+            tail = self.tokenizer.decode(self._token_ids[-self._tail_tokens:], skip_special_tokens=True)
+            if any(stop in tail for stop in self.stop_strings):
+                self.stopped = True
+        now = time.monotonic()
+        if self.stream_callback is not None and (self.stopped or now - self._last_emit >= self.interval):
+            self._emit(now)
+
+    def end(self) -> None:
+        if self.stream_callback is not None:
+            self._emit(time.monotonic())
+
+    def _emit(self, now: float) -> None:
+        self._last_emit = now
+        self.text = _truncate_at_stop(
+            self.tokenizer.decode(self._token_ids, skip_special_tokens=True), self.stop_strings
+        )
+        try:
+            self.stream_callback(self.text, len(self._token_ids))
+        except Exception as e:  # 回调失败不影响生成
+            logger.debug(f"Stream callback failed: {e}")
+
+    # stopping criteria接口 -------------------------------------------------
+    def __call__(self, input_ids: torch.Tensor, scores: Any = None, **kwargs) -> torch.Tensor:
+        if not self.interrupted and _processing_interrupted():
+            self.interrupted = True
+            self.stopped = True
+        return torch.full((input_ids.shape[0],), self.stopped, dtype=torch.bool, device=input_ids.device)
+
+    def generate_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"stopping_criteria": StoppingCriteriaList([self])}
+        if self.streaming:
+            kwargs["streamer"] = self
+        return kwargs
+
+    def raise_if_interrupted(self) -> None:
+        """生成因中断而提前结束时释放显存并抛出ComfyUI中断异常"""
+        if self.interrupted and model_management is not None:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            model_management.throw_exception_if_processing_interrupted()
+            raise model_management.InterruptProcessingException()
+
+
 class Qwen3VLLocalProvider(BaseLLMProvider):
     """Qwen3-VL local provider for running models locally via transformers."""
 
+    accepts_raw_images = True
+
     def __init__(self):
         super().__init__(
             LLMProviderConfig(
@@ -376,14 +626,22 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
         self._dtype = None
         self._current_model_path = None
         self._flash_attention_2 = False
+        # 实际使用的量化配置档（None表示未量化，按dtype加载）
+        self._quantization: Optional[str] = None
+        self.last_memory_estimate: Optional[Dict[str, Any]] = None
+        # 按请求参数（而非解析后的路径/设备/精度）记录已加载模型，避免每次都重新加载
+        self._loaded_key: Optional[Tuple[Any, ...]] = None
+        self.last_load_seconds: Optional[float] = None
 
     def build_payload(
-        self, user_prompt: str, image_payloads: List[str], overrides: Dict[str, Any]
+        self, user_prompt: str, image_payloads: List[Union[str, np.ndarray, torch.Tensor]], overrides: Dict[str, Any]
     ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
         """Build payload for local inference.
 
         For local provider, we return a special endpoint and payload containing
-        all necessary information for local inference.
+        all necessary information for local inference. Images are kept as
+        in-process uint8 arrays under ``payload["images"]``; the messages only
+        carry image placeholders for the chat template.
         """
         # Extract parameters from overrides
         model_path = overrides.get("model_path", self.config.model)
@@ -396,11 +654,14 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
         presence_penalty = overrides.get("presence_penalty", 1.5)
         seed = overrides.get("seed")
 
-        # Model loading parameters
-        device = overrides.get("device", "auto")
-        dtype = overrides.get("dtype", "auto")
-        flash_attention_2 = overrides.get("flash_attention_2", False)
-        trust_remote_code = overrides.get("trust_remote_code", True)
+
+        # Vision feature cache settings
+        vision_cache = overrides.get("vision_cache", False)
+        vision_cache_mb = overrides.get("vision_cache_mb")
+
+        # Streaming / early-stop settings
+        stream = overrides.get("stream", False)
+        stop_strings = [stop for stop in (overrides.get("stop_strings") or []) if stop]
 
         # Build messages in Qwen3-VL format
         # Following the exact format from Qwen3-VL documentation
@@ -410,9 +671,10 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
         content: List[Dict[str, Any]] = []
 
         # Add images first (as in the documentation example)
-        for encoded in image_payloads:
-            # Convert base64 to data URL format (compatible with Qwen3-VL processor)
-            content.append({"type": "image", "image": f"data:image/png;base64,{encoded}"})
+        # 图像以数组形式直接交给处理器，消息中只保留占位符
+        images = [_payload_to_array(item) for item in image_payloads]
+        for _ in images:
+            content.append({"type": "image"})
 
         # Combine system prompt with user prompt if system prompt is provided
         full_text = user_prompt.strip()
@@ -432,6 +694,7 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
         payload: Dict[str, Any] = {
             "model_path": model_path,
             "messages": messages,
+            "images": images,
             "generation_config": {
                 "temperature": temperature,
                 "top_p": top_p,
@@ -440,11 +703,14 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
                 "repetition_penalty": repetition_penalty,
                 "presence_penalty": presence_penalty,
             },
-            "model_loading": {
-                "device": device,
-                "dtype": dtype,
-                "flash_attention_2": flash_attention_2,
-                "trust_remote_code": trust_remote_code,
+            "model_loading": self.loading_config_from(overrides),
+            "vision_cache": {
+                "enabled": bool(vision_cache),
+                "budget_mb": vision_cache_mb,
+            },
+            "streaming": {
+                "enabled": bool(stream),
+                "stop_strings": stop_strings,
             },
         }
         if seed is not None and seed >= 0:
@@ -453,26 +719,17 @@ class Qwen3VLLocalProvider(BaseLLMProvider):
         # Return a special endpoint identifier for local inference
         return "local://qwen3-vl", payload, {}
 
-    def invoke(self, user_prompt: str, image_payloads: List[str], api_key: str, overrides: Optional[Dict[str, Any]] = None, progress_callback: Optional[callable] = None) -> Dict[str, Any]:
+    def invoke(self, user_prompt: str, image_payloads: List[Union[str, np.ndarray, torch.Tensor]], api_key: str, overrides: Optional[Dict[str, Any]] = None, progress_callback: Optional[callable] = None, stream_callback: Optional[callable] = None) -> Dict[str, Any]:
         """Invoke local Qwen3-VL model.
 
         Overrides the base invoke method to perform local inference instead of HTTP request.
+        With ``overrides["stream"]`` set, ``stream_callback(text, token_count)`` receives
+        the partial response while tokens are generated. Generation stops early at any of
+        ``overrides["stop_strings"]`` and when the ComfyUI prompt is interrupted, in which
+        case the interrupt exception is re-raised.
         """
-        if not TRANSFORMERS_AVAILABLE:
-            return {"error": """Qwen3-VL requires transformers >= 4.57.0 and additional dependencies.
-
-To install the required dependencies, use one of these methods:
-
-1. Install the optional 'qwen-vl' dependencies for this extension:
-   pip install "ComfyUI_XISER_Nodes[qwen-vl]"
-
-2. Or install dependencies manually:
-   pip install transformers>=4.57.0 torch huggingface-hub safetensors accelerate bitsandbytes pillow numpy
-
-Note: If you already have transformers installed but version < 4.57.0, upgrade it:
-   pip install --upgrade transformers>=4.57.0
-
-For more details, see the extension documentation."""}
+        if not transformers_available():
+            return {"error": _TRANSFORMERS_MISSING_MESSAGE}
 
         overrides = overrides or {}
 
@@ -497,69 +754,15 @@ For more details, see the extension documentation."""}
 
         # Prepare inputs for inference
         try:
-            # Prepare messages for processor (images are already encoded as data URLs in messages)
+            # Images were converted to uint8 arrays in build_payload; messages only hold placeholders
             messages = payload["messages"]
+            images = payload["images"]
+            logger.debug(f"Messages for apply_chat_template: {messages}, images: {[img.shape for img in images]}")
 
-            # Debug: log messages content (without full base64 data)
-            def simplify_for_log(obj):
-                """Create a simplified version of messages for logging."""
-                if isinstance(obj, dict):
-                    simplified = {}
-                    for key, value in obj.items():
-                        if key == "image" and isinstance(value, str) and value.startswith("data:image/png;base64,"):
-                            # Truncate base64 string for logging
-                            truncated = value[:50] + "..." if len(value) > 50 else value
-                            simplified[key] = f"[BASE64_IMAGE_TRUNCATED: {len(value)} chars]"
-                        elif key == "content" and isinstance(value, list):
-                            # Recursively simplify content list
-                            simplified[key] = [simplify_for_log(item) for item in value]
-                        else:
-                            simplified[key] = simplify_for_log(value)
-                    return simplified
-                elif isinstance(obj, list):
-                    return [simplify_for_log(item) for item in obj]
-                else:
-                    return obj
-
-            simplified_messages = simplify_for_log(messages)
-            logger.debug(f"Messages for apply_chat_template: {simplified_messages}")
-
-            # Following the reference implementation from ComfyUI-QwenVL:
-            # 1. Extract images and text from messages
-            # 2. Convert base64 data URLs to PIL Images
-            # 3. Apply chat template with tokenize=False to get formatted chat string
-            # 4. Use processor() to process text and images together
-
-            # Extract images and text from messages
-            images = []
             text_content = ""
-
-            # messages format: [{"role": "user", "content": [{"type": "image", "image": "data:..."}, {"type": "text", "text": "..."}]}]
-            if messages and isinstance(messages, list) and len(messages) > 0:
-                first_message = messages[0]
-                if isinstance(first_message, dict) and "content" in first_message:
-                    content_items = first_message["content"]
-                    if isinstance(content_items, list):
-                        for item in content_items:
-                            if isinstance(item, dict):
-                                if item.get("type") == "image":
-                                    image_data_url = item.get("image", "")
-                                    if image_data_url.startswith("data:image/png;base64,"):
-                                        # Convert base64 data URL to PIL Image
-                                        try:
-                                            import base64
-                                            from io import BytesIO
-                                            from PIL import Image
-                                            base64_str = image_data_url[len("data:image/png;base64,"):]
-                                            image_data = base64.b64decode(base64_str)
-                                            pil_image = Image.open(BytesIO(image_data)).convert("RGB")
-                                            images.append(pil_image)
-                                            logger.debug(f"Converted base64 image to PIL, size: {pil_image.size}")
-                                        except Exception as e:
-                                            logger.error(f"Failed to convert base64 to PIL image: {e}")
-                                            raise
-                                elif item.get("type") == "text":
-                                    text_content = item.get("text", "")
+            for item in messages[0]["content"]:
+                if item.get("type") == "text":
+                    text_content = item.get("text", "")
 
             if not text_content:
                 raise ValueError("No text content found in messages")
@@ -640,73 +843,7 @@ For more details, see the extension documentation."""}
             generation_config = payload["generation_config"]
 
             # Validate and clean generation parameters to avoid CUDA errors
-            try:
-                # Ensure temperature is valid
-                temperature = generation_config.get("temperature", 0.7)
-                if temperature < 0:
-                    logger.warning(f"Temperature {temperature} is negative, setting to 0.7")
-                    temperature = 0.7
-                elif temperature == 0:
-                    logger.info("Temperature is 0, using greedy decoding")
-                elif temperature > 2.0:
-                    logger.warning(f"Temperature {temperature} is too high, clamping to 2.0")
-                    temperature = 2.0
-
-                generation_config["temperature"] = temperature
-
-                # Ensure top_p is valid
-                top_p = generation_config.get("top_p", 0.8)
-                if top_p < 0:
-                    logger.warning(f"top_p {top_p} is negative, setting to 0.8")
-                    top_p = 0.8
-                elif top_p > 1.0:
-                    logger.warning(f"top_p {top_p} > 1.0, clamping to 1.0")
-                    top_p = 1.0
-                elif top_p == 0:
-                    logger.info("top_p is 0, using no top-p sampling")
-
-                generation_config["top_p"] = top_p
-
-                # Ensure top_k is valid
-                top_k = generation_config.get("top_k")
-                if top_k is not None:
-                    if top_k <= 0:
-                        logger.warning(f"top_k {top_k} is invalid, setting to None")
-                        generation_config["top_k"] = None
-                    elif top_k > 1000:  # Reasonable upper limit
-                        logger.warning(f"top_k {top_k} is too high, clamping to 1000")
-                        generation_config["top_k"] = 1000
-
-                # Ensure repetition_penalty is valid
-                repetition_penalty = generation_config.get("repetition_penalty", 1.0)
-                if repetition_penalty < 1.0:
-                    logger.warning(f"repetition_penalty {repetition_penalty} < 1.0, setting to 1.0")
-                    generation_config["repetition_penalty"] = 1.0
-                elif repetition_penalty > 2.0:
-                    logger.warning(f"repetition_penalty {repetition_penalty} > 2.0, clamping to 2.0")
-                    generation_config["repetition_penalty"] = 2.0
-
-                # Ensure presence_penalty is valid
-                presence_penalty = generation_config.get("presence_penalty", 1.5)
-                if presence_penalty < 1.0:
-                    logger.warning(f"presence_penalty {presence_penalty} < 1.0, setting to 1.0")
-                    generation_config["presence_penalty"] = 1.0
-                elif presence_penalty > 2.0:
-                    logger.warning(f"presence_penalty {presence_penalty} > 2.0, clamping to 2.0")
-                    generation_config["presence_penalty"] = 2.0
-
-                logger.info(f"Validated generation config: {generation_config}")
-            except Exception as e:
-                logger.error(f"Failed to validate generation config: {e}, using defaults")
-                # Use safe defaults
-                generation_config = {
-                    "temperature": 0.7,
-                    "top_p": 0.8,
-                    "max_new_tokens": generation_config.get("max_new_tokens", 1024),
-                    "top_k": 20,
-                    "repetition_penalty": 1.0,
-                    "presence_penalty": 1.5,
-                }
+            generation_config = self._validate_generation_config(generation_config)
 
             logger.debug(f"Generation config: {generation_config}")
             logger.debug(f"Model inputs type: {type(model_inputs)}")
@@ -735,7 +872,24 @@ For more details, see the extension documentation."""}
                 # Remove seed from generation_config to avoid passing to model.generate
                 generation_config.pop("seed", None)
 
-            with torch.no_grad():
+            # 视觉特征缓存：相同图像跳过视觉编码器，只执行语言模型解码
+            cache_keys = None
+            if payload["vision_cache"]["enabled"] and images:
+                if payload["vision_cache"]["budget_mb"] is not None:
+                    VISION_FEATURE_CACHE.configure(device_budget_mb=payload["vision_cache"]["budget_mb"])
+                if VISION_FEATURE_CACHE.install(model):
+                    signature = processor_signature(processor, self._current_model_path, (self._dtype, self._quantization))
+                    cache_keys = [image_cache_key(img, signature) for img in images]
+
+            # 流式输出、停止字符串与中断监视
+            streaming = payload["streaming"]
+            monitor = _GenerationMonitor(
+                tokenizer=getattr(processor, "tokenizer", processor),
+                stop_strings=streaming["stop_strings"],
+                stream_callback=stream_callback if streaming["enabled"] else None,
+            )
+
+            with torch.no_grad(), VISION_FEATURE_CACHE.bind(cache_keys):
                 max_retries = 2
                 generated_ids = None
                 last_error = None
@@ -771,6 +925,7 @@ For more details, see the extension documentation."""}
                                 logger.info(f"Reduced repetition_penalty to {current_repetition_penalty}")
 
                         # Try standard generate first
+                        monitor.reset()
                         generated_ids = model.generate(
                             **generate_kwargs,
                             max_new_tokens=generation_config["max_new_tokens"],
@@ -779,6 +934,7 @@ For more details, see the extension documentation."""}
                             top_k=current_top_k,
                             repetition_penalty=current_repetition_penalty,
                             do_sample=current_temp > 0,
+                            **monitor.generate_kwargs(),
                         )
                         logger.debug(f"model.generate succeeded on attempt {retry + 1}")
                         break  # Success, exit retry loop
@@ -854,6 +1010,9 @@ For more details, see the extension documentation."""}
                 if generated_ids is None:
                     raise RuntimeError(f"Failed to generate after {max_retries} attempts: {last_error}")
 
+            # 被中断时不再解码，直接释放显存并向上抛出
+            monitor.raise_if_interrupted()
+
             logger.info(f"model.generate returned type: {type(generated_ids)}")
             if hasattr(generated_ids, "shape"):
                 logger.info(f"generated_ids shape: {generated_ids.shape}")
@@ -986,6 +1145,10 @@ For more details, see the extension documentation."""}
                     logger.error(f"Failed to extract output text from decoded_results: {type(decoded_results)} - {decoded_results}")
                     raise ValueError(f"Unexpected output format from batch_decode: {type(decoded_results)}")
 
+            # 截断停止字符串及其后的内容
+            if streaming["stop_strings"]:
+                output_text = _truncate_at_stop(output_text, streaming["stop_strings"])
+
             # Progress: completed
             if progress_callback:
                 progress_callback("完成", 1.0)
@@ -1003,36 +1166,272 @@ For more details, see the extension documentation."""}
             }
 
         except Exception as e:
+            if is_interrupt_exception(e):
+                raise
             logger.error(f"Qwen3-VL local inference failed: {e}")
             return {"error": f"Inference failed: {str(e)}"}
 
-    def _try_load_from_path(self, model_path: str, loading_config: Dict[str, Any]) -> Tuple[AutoModelForVision2Seq, AutoProcessor]:
-        """尝试从指定路径加载模型和处理器"""
-        # Determine device
-        device = loading_config.get("device", "auto")
-        if device == "auto":
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-        # Convert to torch.device object to ensure compatibility
-        device = torch.device(device)
+    def invoke_batch(
+        self,
+        items: List[Tuple[str, List[Union[str, np.ndarray, torch.Tensor]]]],
+        overrides: Optional[Dict[str, Any]] = None,
+        max_batch_size: int = 8,
+        max_batch_tokens: int = 32768,
+        progress_callback: Optional[callable] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run many conversations through batched ``model.generate`` calls.
+
+        Each item is ``(user_prompt, image_payloads)``. Items are processed once
+        to get exact prompt lengths, grouped into left-padded batches bounded by
+        ``max_batch_size`` and ``max_batch_tokens`` (rows x (prompt + new tokens)),
+        and responses are returned in input order in the same format as
+        :meth:`invoke`. Failed items are returned as ``{"error": ...}``.
+        """
+        if not transformers_available():
+            return [{"error": _TRANSFORMERS_MISSING_MESSAGE} for _ in items]
 
-        # Determine dtype
-        dtype_str = loading_config.get("dtype", "auto")
+        overrides = overrides or {}
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        payloads: List[Tuple[int, Dict[str, Any]]] = []
+        for index, (user_prompt, image_payloads) in enumerate(items):
+            try:
+                payloads.append((index, self.build_payload(user_prompt, image_payloads, overrides)[1]))
+            except Exception as e:
+                results[index] = {"error": str(e)}
+        if not payloads:
+            return results
+
+        if progress_callback:
+            progress_callback("准备", 0.2)
+
+        first_payload = payloads[0][1]
+        try:
+            model, processor = self._load_model(first_payload["model_loading"], first_payload["model_path"])
+        except Exception as e:
+            logger.error(f"Failed to load Qwen3-VL model: {e}")
+            for index, _ in payloads:
+                results[index] = {"error": f"Failed to load model: {str(e)}"}
+            return results
+
+        if progress_callback:
+            progress_callback("准备", 0.5)
+
+        # 逐条处理一次，得到准确的提示长度
+        encoded: List[Tuple[int, Dict[str, Any], List[np.ndarray]]] = []
+        for index, payload in payloads:
+            try:
+                chat_text = processor.apply_chat_template(
+                    payload["messages"], tokenize=False, add_generation_prompt=True
+                )
+                processed = processor(text=[chat_text], images=payload["images"] or None, return_tensors="pt")
+                encoded.append((index, dict(processed.items()), payload["images"]))
+            except Exception as e:
+                logger.error(f"Failed to process batch item {index}: {e}")
+                results[index] = {"error": f"Inference failed: {str(e)}"}
+
+        generation_config = self._validate_generation_config(dict(first_payload["generation_config"]))
+        seed = generation_config.pop("seed", None)
+        if seed is not None:
+            torch.manual_seed(seed)
+        sampling = _sampling_kwargs(generation_config)
+
+        batches = _plan_batches(
+            [int(item[1]["input_ids"].shape[1]) for item in encoded],
+            max_batch_size,
+            max_batch_tokens,
+            sampling["max_new_tokens"],
+        )
+        logger.info(f"Qwen3-VL batch inference: {len(encoded)} items in {len(batches)} batches")
+
+        tokenizer = getattr(processor, "tokenizer", processor)
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+        vision_settings = first_payload["vision_cache"]
+        signature = None
+        if vision_settings["enabled"] and any(item[2] for item in encoded):
+            if vision_settings["budget_mb"] is not None:
+                VISION_FEATURE_CACHE.configure(device_budget_mb=vision_settings["budget_mb"])
+            if VISION_FEATURE_CACHE.install(model):
+                signature = processor_signature(processor, self._current_model_path, (self._dtype, self._quantization))
+
+        # 批量模式只监视中断；停止字符串在解码后截断
+        stop_strings = first_payload["streaming"]["stop_strings"]
+        monitor = _GenerationMonitor()
+
+        for batch_number, batch in enumerate(batches, start=1):
+            rows = [encoded[position] for position in batch]
+            try:
+                inputs = _collate_left_padded([row[1] for row in rows], pad_token_id)
+                inputs = {key: value.to(model.device) for key, value in inputs.items()}
+                cache_keys = None
+                if signature is not None:
+                    cache_keys = [image_cache_key(img, signature) for row in rows for img in row[2]]
+                with torch.no_grad(), VISION_FEATURE_CACHE.bind(cache_keys):
+                    generated_ids = model.generate(
+                        **inputs, **sampling, pad_token_id=pad_token_id, **monitor.generate_kwargs()
+                    )
+                monitor.raise_if_interrupted()
+                prompt_length = inputs["input_ids"].shape[1]
+                texts = processor.batch_decode(
+                    generated_ids[:, prompt_length:], skip_special_tokens=True, clean_up_tokenization_spaces=False
+                )
+                for row, text in zip(rows, texts):
+                    text = _truncate_at_stop(text, stop_strings)
+                    results[row[0]] = {"choices": [{"message": {"role": "assistant", "content": text}}]}
+            except Exception as e:
+                if is_interrupt_exception(e):
+                    raise
+                logger.error(f"Qwen3-VL batch {batch_number}/{len(batches)} failed: {e}")
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                for row in rows:
+                    results[row[0]] = {"error": f"Inference failed: {str(e)}"}
+
+            if progress_callback:
+                progress_callback("处理", batch_number / len(batches))
+
+        if progress_callback:
+            progress_callback("完成", 1.0)
+
+        return results
 
+    def _validate_generation_config(self, generation_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and clean generation parameters to avoid CUDA errors."""
+        try:
+            # Ensure temperature is valid
+            temperature = generation_config.get("temperature", 0.7)
+            if temperature < 0:
+                logger.warning(f"Temperature {temperature} is negative, setting to 0.7")
+                temperature = 0.7
+            elif temperature == 0:
+                logger.info("Temperature is 0, using greedy decoding")
+            elif temperature > 2.0:
+                logger.warning(f"Temperature {temperature} is too high, clamping to 2.0")
+                temperature = 2.0
+
+            generation_config["temperature"] = temperature
+
+            # Ensure top_p is valid
+            top_p = generation_config.get("top_p", 0.8)
+            if top_p < 0:
+                logger.warning(f"top_p {top_p} is negative, setting to 0.8")
+                top_p = 0.8
+            elif top_p > 1.0:
+                logger.warning(f"top_p {top_p} > 1.0, clamping to 1.0")
+                top_p = 1.0
+            elif top_p == 0:
+                logger.info("top_p is 0, using no top-p sampling")
+
+            generation_config["top_p"] = top_p
+
+            # Ensure top_k is valid
+            top_k = generation_config.get("top_k")
+            if top_k is not None:
+                if top_k <= 0:
+                    logger.warning(f"top_k {top_k} is invalid, setting to None")
+                    generation_config["top_k"] = None
+                elif top_k > 1000:  # Reasonable upper limit
+                    logger.warning(f"top_k {top_k} is too high, clamping to 1000")
+                    generation_config["top_k"] = 1000
+
+            # Ensure repetition_penalty is valid
+            repetition_penalty = generation_config.get("repetition_penalty", 1.0)
+            if repetition_penalty < 1.0:
+                logger.warning(f"repetition_penalty {repetition_penalty} < 1.0, setting to 1.0")
+                generation_config["repetition_penalty"] = 1.0
+            elif repetition_penalty > 2.0:
+                logger.warning(f"repetition_penalty {repetition_penalty} > 2.0, clamping to 2.0")
+                generation_config["repetition_penalty"] = 2.0
+
+            # Ensure presence_penalty is valid
+            presence_penalty = generation_config.get("presence_penalty", 1.5)
+            if presence_penalty < 1.0:
+                logger.warning(f"presence_penalty {presence_penalty} < 1.0, setting to 1.0")
+                generation_config["presence_penalty"] = 1.0
+            elif presence_penalty > 2.0:
+                logger.warning(f"presence_penalty {presence_penalty} > 2.0, clamping to 2.0")
+                generation_config["presence_penalty"] = 2.0
+
+            logger.info(f"Validated generation config: {generation_config}")
+        except Exception as e:
+            logger.error(f"Failed to validate generation config: {e}, using defaults")
+            # Use safe defaults
+            generation_config = {
+                "temperature": 0.7,
+                "top_p": 0.8,
+                "max_new_tokens": generation_config.get("max_new_tokens", 1024),
+                "top_k": 20,
+                "repetition_penalty": 1.0,
+                "presence_penalty": 1.5,
+            }
+
+        return generation_config
+
+    def _resolve_profile(
+        self, model_path: str, loading_config: Dict[str, Any], device: torch.device
+    ) -> Tuple[Optional[str], torch.dtype]:
+        """根据quantization设置确定加载配置档和计算精度，返回(配置档或None, dtype)"""
+        quantization = loading_config.get("quantization", PROFILE_NONE)
+        self.last_memory_estimate = None
+
+        if quantization == PROFILE_AUTO:
+            choice = choose_profile(model_path, str(device))
+            self.last_memory_estimate = choice
+            quantization = choice["profile"]
+
+        if quantization in PROFILES:
+            if quantization == "nf4" and device.type != "cuda":
+                logger.warning("nf4 requires CUDA, using dynamic int8 quantization on CPU instead")
+                quantization = "int8"
+            if quantization in ("int8", "nf4") and device.type == "cuda" and not bitsandbytes_available():
+                raise ImportError(f"{quantization} quantization requires bitsandbytes: pip install bitsandbytes")
+            if quantization == "int8" and device.type != "cuda":
+                return quantization, torch.float32
+            return quantization, profile_dtype(quantization)
+
+        # 未启用量化，沿用dtype设置
+        dtype_str = loading_config.get("dtype", "auto")
         if dtype_str == "auto":
             dtype = torch.bfloat16 if torch.cuda.is_available() and torch.cuda.is_bf16_supported() else torch.float16
         elif dtype_str == "bfloat16":
             dtype = torch.bfloat16
         elif dtype_str == "float16":
             dtype = torch.float16
-        elif dtype_str == "float32":
-            dtype = torch.float32
         else:
             dtype = torch.float32
+        return None, dtype
+
+    @staticmethod
+    def _move_to_device(model: Any, device: torch.device) -> Any:
+        """手动将模型移动到设备，处理可能的meta tensor问题"""
+        try:
+            model = model.to(device)
+            logger.info(f"Model manually moved to device: {device}")
+        except RuntimeError as e:
+            if "Cannot copy out of meta tensor" in str(e) or "no data" in str(e):
+                logger.warning(f"Meta tensor detected, using to_empty() instead: {e}")
+                # 使用to_empty()方法将模型从meta设备移动到目标设备
+                model = model.to_empty(device=device, recurse=True)
+                logger.info(f"Model moved from meta to device {device} using to_empty()")
+            else:
+                raise
+        return model
+
+    def _try_load_from_path(self, model_path: str, loading_config: Dict[str, Any]) -> Tuple[Any, Any]:
+        """尝试从指定路径加载模型和处理器"""
+        # Determine device
+        device = loading_config.get("device", "auto")
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Convert to torch.device object to ensure compatibility
+        device = torch.device(device)
 
+        profile, dtype = self._resolve_profile(model_path, loading_config, device)
         flash_attention_2 = loading_config.get("flash_attention_2", False)
         trust_remote_code = loading_config.get("trust_remote_code", True)
 
-        logger.info(f"Attempting to load model from: {model_path}")
+        logger.info(f"Attempting to load model from: {model_path} (profile: {profile or 'none'}, dtype: {dtype})")
 
         # Load processor
         processor = AutoProcessor.from_pretrained(
@@ -1040,78 +1439,139 @@ For more details, see the extension documentation."""}
             trust_remote_code=trust_remote_code
         )
 
+        model_kwargs: Dict[str, Any] = {
+            "torch_dtype": dtype,
+            "device_map": None,  # 禁用自动设备映射，避免meta tensor问题
+            "low_cpu_mem_usage": False,  # 禁用低CPU内存模式，避免meta tensor
+            "trust_remote_code": trust_remote_code,
+            "use_safetensors": True,
+        }
+        bitsandbytes = profile in ("int8", "nf4") and device.type == "cuda"
+        dynamic_int8 = profile == "int8" and device.type != "cuda"
+        if bitsandbytes:
+            from transformers import BitsAndBytesConfig
+
+            if profile == "nf4":
+                quantization_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_use_double_quant=True,
+                    bnb_4bit_compute_dtype=dtype,
+                )
+            else:
+                quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+            # bitsandbytes模型必须在加载时直接放到目标设备，不能再调用to()
+            model_kwargs.update(
+                quantization_config=quantization_config,
+                device_map={"": device},
+                low_cpu_mem_usage=True,
+            )
+        elif dynamic_int8:
+            # 先以半精度加载，再逐层量化，避免完整float32副本
+            model_kwargs.update(torch_dtype=torch.bfloat16, low_cpu_mem_usage=True)
+
         # Load model with appropriate settings
         attn_implementation = "flash_attention_2" if flash_attention_2 else "eager"
 
         try:
             model = AutoModelForVision2Seq.from_pretrained(
                 model_path,
-                torch_dtype=dtype,
-                device_map=None,  # 禁用自动设备映射，避免meta tensor问题
-                low_cpu_mem_usage=False,  # 禁用低CPU内存模式，避免meta tensor
                 attn_implementation=attn_implementation,
-                trust_remote_code=trust_remote_code,
-                use_safetensors=True
+                **model_kwargs
             )
-
-            # 手动将模型移动到设备，处理可能的meta tensor问题
-            try:
-                model = model.to(device)
-                logger.info(f"Model manually moved to device: {device}")
-            except RuntimeError as e:
-                if "Cannot copy out of meta tensor" in str(e) or "no data" in str(e):
-                    logger.warning(f"Meta tensor detected, using to_empty() instead: {e}")
-                    # 使用to_empty()方法将模型从meta设备移动到目标设备
-                    model = model.to_empty(device=device, recurse=True)
-                    logger.info(f"Model moved from meta to device {device} using to_empty()")
-                else:
-                    raise
         except Exception as e:
             # Fallback to eager attention if flash attention fails
             logger.warning(f"Failed to load with {attn_implementation}, falling back to eager: {e}")
-            model = AutoModelForVision2Seq.from_pretrained(
-                model_path,
-                torch_dtype=dtype,
-                device_map=None,  # 禁用自动设备映射，避免meta tensor问题
-                low_cpu_mem_usage=False,  # 禁用低CPU内存模式，避免meta tensor
-                trust_remote_code=trust_remote_code,
-                use_safetensors=True
-            )
+            model = AutoModelForVision2Seq.from_pretrained(model_path, **model_kwargs)
 
-            # 手动将模型移动到设备，处理可能的meta tensor问题
-            try:
-                model = model.to(device)
-                logger.info(f"Model manually moved to device: {device}")
-            except RuntimeError as e:
-                if "Cannot copy out of meta tensor" in str(e) or "no data" in str(e):
-                    logger.warning(f"Meta tensor detected, using to_empty() instead: {e}")
-                    # 使用to_empty()方法将模型从meta设备移动到目标设备
-                    model = model.to_empty(device=device, recurse=True)
-                    logger.info(f"Model moved from meta to device {device} using to_empty()")
-                else:
-                    raise
+        if dynamic_int8:
+            model = quantize_dynamic_int8(model)
+        elif not bitsandbytes:
+            model = self._move_to_device(model, device)
 
+        self._quantization = profile
+        self._dtype = dtype
         return model, processor
 
-    def _load_model(self, loading_config: Dict[str, Any], model_path: str) -> Tuple[AutoModelForVision2Seq, AutoProcessor]:
+    @staticmethod
+    def loading_config_from(overrides: Dict[str, Any]) -> Dict[str, Any]:
+        """Model loading parameters taken from node overrides."""
+        return {
+            "device": overrides.get("device", "auto"),
+            "dtype": overrides.get("dtype", "auto"),
+            "quantization": overrides.get("quantization", PROFILE_NONE),
+            "flash_attention_2": overrides.get("flash_attention_2", False),
+            "trust_remote_code": overrides.get("trust_remote_code", True),
+        }
+
+    @staticmethod
+    def _loading_key(model_path: str, loading_config: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (
+            model_path,
+            loading_config.get("dtype", "auto"),
+            loading_config.get("quantization", PROFILE_NONE),
+            bool(loading_config.get("flash_attention_2", False)),
+            bool(loading_config.get("trust_remote_code", True)),
+        )
+
+    @staticmethod
+    def _resolve_device(device: str) -> str:
+        if device == "auto":
+            return "cuda" if torch.cuda.is_available() else "cpu"
+        return device
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None and self._processor is not None
+
+    def unload(self) -> None:
+        """Release the model, processor and cached vision features."""
+        if self._model is not None:
+            del self._model
+            self._model = None
+        if self._processor is not None:
+            del self._processor
+            self._processor = None
+        self._loaded_key = None
+        self._quantization = None
+        # 缓存的视觉特征属于旧模型，一并释放
+        VISION_FEATURE_CACHE.clear()
+        torch.cuda.empty_cache() if torch.cuda.is_available() else None
+
+    def _load_model(self, loading_config: Dict[str, Any], model_path: str) -> Tuple[Any, Any]:
         """Load or get cached model and processor with retry across multiple directories."""
+        # 驻留管理器会在 invoke 之前加载模型，这里同样需要先导入 transformers
+        if not transformers_available():
+            raise ImportError(_TRANSFORMERS_MISSING_MESSAGE)
+
+        requested_key = self._loading_key(model_path, loading_config)
+        requested_device = self._resolve_device(loading_config.get("device", "auto"))
+
+        # 只有设备不同时直接迁移已加载的模型，无需重新加载
+        # bitsandbytes量化模型不能迁移，需要在新设备上重新加载
+        if (
+            self.is_loaded
+            and self._loaded_key == requested_key
+            and self._device != requested_device
+            and self._quantization in ("int8", "nf4")
+        ):
+            self.unload()
+        if self.is_loaded and self._loaded_key == requested_key and self._device != requested_device:
+            logger.info(f"Moving Qwen3-VL model from {self._device} to {requested_device}")
+            self._model = self._model.to(torch.device(requested_device))
+            VISION_FEATURE_CACHE.clear()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            self._device = requested_device
+
         # Check if we need to load a new model
-        if (self._model is None or self._processor is None or
-            self._current_model_path != model_path or
-            self._device != loading_config.get("device") or
-            self._dtype != loading_config.get("dtype") or
-            self._flash_attention_2 != loading_config.get("flash_attention_2", False)):
+        if not self.is_loaded or self._loaded_key != requested_key:
 
             logger.info(f"Loading Qwen3-VL model from {model_path}")
+            load_start = time.perf_counter()
 
             # Clear previous model from memory
-            if self._model is not None:
-                del self._model
-                self._model = None
-            if self._processor is not None:
-                del self._processor
-                self._processor = None
-            torch.cuda.empty_cache() if torch.cuda.is_available() else None
+            self.unload()
 
             # 尝试从多个目录加载模型
             success = False
@@ -1188,27 +1648,14 @@ For more details, see the extension documentation."""}
                     raise RuntimeError(f"Failed to load model {model_path} from any location")
 
             # 存储加载配置
-            device = loading_config.get("device", "auto")
-            if device == "auto":
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-
-            dtype_str = loading_config.get("dtype", "auto")
-
-            if dtype_str == "auto":
-                self._dtype = torch.bfloat16 if torch.cuda.is_available() and torch.cuda.is_bf16_supported() else torch.float16
-            elif dtype_str == "bfloat16":
-                self._dtype = torch.bfloat16
-            elif dtype_str == "float16":
-                self._dtype = torch.float16
-            elif dtype_str == "float32":
-                self._dtype = torch.float32
-            else:
-                self._dtype = torch.float32
+            device = requested_device
 
             self._device = device
             self._flash_attention_2 = loading_config.get("flash_attention_2", False)
+            self._loaded_key = requested_key
+            self.last_load_seconds = time.perf_counter() - load_start
 
-            logger.info(f"Qwen3-VL model loaded on {device} with dtype {self._dtype}")
+            logger.info(f"Qwen3-VL model loaded on {device} with dtype {self._dtype} (profile: {self._quantization or 'none'}) in {self.last_load_seconds:.1f}s")
 
         return self._model, self._processor
 
@@ -1235,4 +1682,6 @@ For more details, see the extension documentation."""}
 
 __all__ = [
     "Qwen3VLLocalProvider",
+    "is_interrupt_exception",
+    "transformers_available",
 ]
\ No newline at end of file
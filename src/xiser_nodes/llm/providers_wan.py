@@ -3,12 +3,12 @@
 from __future__ import annotations
 
 import json
-import time
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
 import torch
 
+from ..http_client import HTTP_CLIENT
+from ..task_poller import TASK_POLLER, PollPolicy, PollUpdate
 from .base import (
     BaseLLMProvider,
     LLMProviderConfig,
@@ -196,11 +196,12 @@ class WanImageProvider(BaseLLMProvider):
     def _invoke_async(self, endpoint: str, headers: Dict[str, str], payload: Dict[str, Any], progress_callback: Optional[callable] = None) -> Dict[str, Any]:
         """Handle async task polling for image_edit mode."""
         # Submit async task
-        response = requests.post(
+        response = HTTP_CLIENT.post(
             endpoint,
             headers=headers,
             json=payload,
             timeout=self.config.timeout,
+            provider=self.config.name,
         )
         response.raise_for_status()
         task_response = response.json()
@@ -214,114 +215,102 @@ class WanImageProvider(BaseLLMProvider):
             return task_response
 
         task_id = task_response["output"]["task_id"]
+        task_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
 
-        # Poll task status
-        max_attempts = 30  # 30 attempts * 2 seconds = 60 seconds max
-        poll_interval = 2  # seconds
-
-        for attempt in range(max_attempts):
-            time.sleep(poll_interval)
-
-            # 进度：轮询阶段
-            if progress_callback:
-                progress = (attempt + 1) / max_attempts
-                progress_callback("轮询", progress)
-
-            # Query task status
-            task_url = f"https://dashscope.aliyuncs.com/api/v1/tasks/{task_id}"
-            task_resp = requests.get(
+        def query_task() -> Dict[str, Any]:
+            task_resp = HTTP_CLIENT.get(
                 task_url,
                 headers=headers,
                 timeout=self.config.timeout,
+                provider=self.config.name,
             )
             task_resp.raise_for_status()
-            task_status = task_resp.json()
-
-            # Check task status
-            if "output" in task_status and "task_status" in task_status["output"]:
-                status = task_status["output"]["task_status"]
-                if status == "SUCCEEDED":
-                    # 进度：轮询完成
-                    if progress_callback:
-                        progress_callback("轮询", 1.0)
-                    return task_status
-                elif status in ["FAILED", "CANCELED"]:
-                    raise RuntimeError(f"Task {task_id} failed with status: {status}")
-                # PENDING or RUNNING - continue polling
-
-            # If no task_status found, assume it's the final response
-            if "output" in task_status and "choices" in task_status["output"]:
-                # 进度：轮询完成
-                if progress_callback:
-                    progress_callback("轮询", 1.0)
-                return task_status
-
-        raise TimeoutError(f"Task {task_id} did not complete within {max_attempts * poll_interval} seconds")
+            return task_resp.json()
+
+        policy = PollPolicy(min_interval=1.0, max_interval=5.0, timeout=60.0)
+
+        def on_update(update: PollUpdate) -> None:
+            # 进度：轮询阶段
+            if progress_callback:
+                progress = update.progress if update.progress is not None else update.elapsed / policy.timeout
+                progress_callback("轮询", min(progress, 0.99))
+
+        task_status = TASK_POLLER.poll(query_task, task_id=task_id, policy=policy, on_update=on_update)
+
+        # 进度：轮询完成
+        if progress_callback:
+            progress_callback("轮询", 1.0)
+        return task_status
 
     def _invoke_streaming(self, endpoint: str, headers: Dict[str, str], payload: Dict[str, Any], progress_callback: Optional[callable] = None) -> Dict[str, Any]:
         """Handle SSE streaming for interleave mode."""
-        response = requests.post(
+        response = HTTP_CLIENT.post(
             endpoint,
             headers=headers,
             json=payload,
             timeout=self.config.timeout,
             stream=True,
+            provider=self.config.name,
         )
-        response.raise_for_status()
-
-        # 进度：连接完成
-        if progress_callback:
-            progress_callback("连接", 1.0)
+        # 流式响应占用并发名额直到关闭，异常时也要关闭
+        try:
+            response.raise_for_status()
 
-        # 收集所有SSE事件的内容
-        all_content = []
-        final_usage = {}
-        event_count = 0
-        content_event_count = 0
-
-        for line in response.iter_lines():
-            if line:
-                event_count += 1
-                line_str = line.decode('utf-8')
-
-                # 进度：流式处理阶段
-                if progress_callback and event_count % 10 == 0:  # 每10个事件更新一次进度
-                    progress = min(event_count / 100, 0.9)  # 假设最多100个事件
-                    progress_callback("流式", progress)
-
-                # 修复：检查 data: 开头（有或没有空格）
-                if line_str.startswith('data:'):
-                    # 移除 'data:' 前缀
-                    if line_str.startswith('data: '):
-                        event_data = line_str[6:]  # 移除 'data: '（有空格）
-                    else:
-                        event_data = line_str[5:]  # 移除 'data:'（没有空格）
-
-                    if event_data == '[DONE]':
-                        # 进度：流式处理完成
-                        if progress_callback:
-                            progress_callback("流式", 1.0)
-                        break
-
-                    try:
-                        event_json = json.loads(event_data)
-                        content_event_count += 1
-
-                        # 提取content
-                        if "output" in event_json and "choices" in event_json["output"]:
-                            choices = event_json["output"]["choices"]
-                            if choices and "message" in choices[0]:
-                                content = choices[0]["message"].get("content", [])
-                                if isinstance(content, list) and content:
-                                    # 每个事件只包含一个content项，需要累积
-                                    all_content.extend(content)
-
-                                    # 检查是否结束并保存usage统计
-                                    if (event_json["output"].get("finished") == True or
-                                        choices[0].get("finish_reason") != "null"):
-                                        final_usage = event_json["output"].get("usage", {})
-                    except json.JSONDecodeError:
-                        continue
+            # 进度：连接完成
+            if progress_callback:
+                progress_callback("连接", 1.0)
+
+            # 收集所有SSE事件的内容
+            all_content = []
+            final_usage = {}
+            event_count = 0
+            content_event_count = 0
+
+            for line in response.iter_lines():
+                if line:
+                    event_count += 1
+                    line_str = line.decode('utf-8')
+
+                    # 进度：流式处理阶段
+                    if progress_callback and event_count % 10 == 0:  # 每10个事件更新一次进度
+                        progress = min(event_count / 100, 0.9)  # 假设最多100个事件
+                        progress_callback("流式", progress)
+
+                    # 修复：检查 data: 开头（有或没有空格）
+                    if line_str.startswith('data:'):
+                        # 移除 'data:' 前缀
+                        if line_str.startswith('data: '):
+                            event_data = line_str[6:]  # 移除 'data: '（有空格）
+                        else:
+                            event_data = line_str[5:]  # 移除 'data:'（没有空格）
+
+                        if event_data == '[DONE]':
+                            # 进度：流式处理完成
+                            if progress_callback:
+                                progress_callback("流式", 1.0)
+                            break
+
+                        try:
+                            event_json = json.loads(event_data)
+                            content_event_count += 1
+
+                            # 提取content
+                            if "output" in event_json and "choices" in event_json["output"]:
+                                choices = event_json["output"]["choices"]
+                                if choices and "message" in choices[0]:
+                                    content = choices[0]["message"].get("content", [])
+                                    if isinstance(content, list) and content:
+                                        # 每个事件只包含一个content项，需要累积
+                                        all_content.extend(content)
+
+                                        # 检查是否结束并保存usage统计
+                                        if (event_json["output"].get("finished") == True or
+                                            choices[0].get("finish_reason") != "null"):
+                                            final_usage = event_json["output"].get("usage", {})
+                        except json.JSONDecodeError:
+                            continue
+        finally:
+            response.close()
 
         # 构建最终的响应结构
         merged_response = {
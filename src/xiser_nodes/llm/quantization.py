@@ -0,0 +1,320 @@
+"""Quantized loading profiles and a pre-load memory estimator for local models.
+
+Profiles:
+
+* ``bf16`` / ``fp16`` / ``fp32`` - plain half/full precision weights;
+* ``int8`` - bitsandbytes LLM.int8() on CUDA, dynamic int8 ``nn.Linear``
+  quantization (``torch.ao``) on CPU;
+* ``nf4`` - bitsandbytes 4-bit NormalFloat with double quantization (CUDA).
+
+The estimator counts parameters from the safetensors headers (only the JSON
+header of each shard is read, never the tensor data), falling back to
+``config.json`` when no header is readable. ``choose_profile`` picks the
+highest-precision profile whose estimated footprint fits the memory that is
+currently available, and the choice is cached per model path in
+``~/.comfyui_xiser_cache/qwen_vl_profiles.json``.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import struct
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from ..utils import logger
+
+PROFILE_NONE = "none"
+PROFILE_AUTO = "auto"
+PROFILES = ("bf16", "fp16", "fp32", "int8", "nf4")
+PROFILE_CHOICES = [PROFILE_NONE, PROFILE_AUTO, "bf16", "fp16", "int8", "nf4"]
+
+# 各精度下可量化权重每个参数的字节数（含量化常数开销）
+_QUANTIZED_BYTES = {"bf16": 2.0, "fp16": 2.0, "fp32": 4.0, "int8": 1.05, "nf4": 0.56}
+# 不参与量化的张量（嵌入、输出头、归一化、偏置等）每个参数的字节数
+_DENSE_BYTES = {"bf16": 2.0, "fp16": 2.0, "fp32": 4.0, "int8": 2.0, "nf4": 2.0}
+# CPU动态int8路径中未量化部分为float32
+_CPU_DENSE_BYTES = {"int8": 4.0}
+
+_CACHE_FILE = Path.home() / ".comfyui_xiser_cache" / "qwen_vl_profiles.json"
+_cache_lock = threading.Lock()
+
+GIB = 1024 ** 3
+
+
+@dataclass
+class MemoryEstimate:
+    """Parameter counts of a model split by whether they can be quantized."""
+
+    quantizable_params: int
+    dense_params: int
+    source: str
+
+    @property
+    def total_params(self) -> int:
+        return self.quantizable_params + self.dense_params
+
+    def weight_bytes(self, profile: str, device_type: str = "cuda") -> float:
+        dense_bytes = _DENSE_BYTES[profile]
+        if device_type == "cpu":
+            dense_bytes = _CPU_DENSE_BYTES.get(profile, dense_bytes)
+        return self.quantizable_params * _QUANTIZED_BYTES[profile] + self.dense_params * dense_bytes
+
+    def required_bytes(self, profile: str, device_type: str = "cuda") -> float:
+        """Weights plus runtime headroom for activations, KV cache and vision features."""
+
+        weights = self.weight_bytes(profile, device_type)
+        return weights + max(1.5 * GIB, 0.15 * weights)
+
+
+def _is_quantizable(name: str, shape: List[int]) -> bool:
+    # 与bitsandbytes默认行为一致：只量化二维Linear权重，跳过嵌入和输出头
+    return (
+        len(shape) == 2
+        and name.endswith(".weight")
+        and "embed" not in name
+        and "lm_head" not in name
+    )
+
+
+def _read_safetensors_header(path: Path) -> Dict[str, Any]:
+    with open(path, "rb") as handle:
+        (length,) = struct.unpack("<Q", handle.read(8))
+        return json.loads(handle.read(length))
+
+
+def _estimate_from_safetensors(model_dir: Path) -> Optional[MemoryEstimate]:
+    files = sorted(model_dir.glob("*.safetensors"))
+    if not files:
+        return None
+    quantizable = dense = 0
+    for path in files:
+        try:
+            header = _read_safetensors_header(path)
+        except Exception as e:
+            logger.debug(f"Cannot read safetensors header {path}: {e}")
+            return None
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            count = 1
+            for dim in info.get("shape", []):
+                count *= int(dim)
+            if _is_quantizable(name, info.get("shape", [])):
+                quantizable += count
+            else:
+                dense += count
+    return MemoryEstimate(quantizable, dense, "safetensors")
+
+
+def _estimate_from_config(model_dir: Path) -> Optional[MemoryEstimate]:
+    config_path = model_dir / "config.json"
+    if not config_path.exists():
+        return None
+    with open(config_path, "r", encoding="utf-8") as handle:
+        config = json.load(handle)
+    text = config.get("text_config", config)
+    hidden = int(text.get("hidden_size", 0))
+    layers = int(text.get("num_hidden_layers", 0))
+    intermediate = int(text.get("intermediate_size", hidden * 4))
+    vocab = int(text.get("vocab_size", 0))
+    heads = int(text.get("num_attention_heads", 1)) or 1
+    kv_heads = int(text.get("num_key_value_heads", heads))
+    head_dim = int(text.get("head_dim", hidden // heads))
+    if not hidden or not layers:
+        return None
+    attention = hidden * head_dim * heads * 2 + hidden * head_dim * kv_heads * 2
+    mlp = 3 * hidden * intermediate
+    quantizable = layers * (attention + mlp)
+    tied = bool(config.get("tie_word_embeddings", text.get("tie_word_embeddings", False)))
+    dense = vocab * hidden * (1 if tied else 2) + layers * 2 * hidden
+
+    vision = config.get("vision_config") or {}
+    v_hidden = int(vision.get("hidden_size", 0))
+    v_depth = int(vision.get("depth", vision.get("num_hidden_layers", 0)))
+    if v_hidden and v_depth:
+        v_intermediate = int(vision.get("intermediate_size", v_hidden * 4))
+        quantizable += v_depth * (4 * v_hidden * v_hidden + 2 * v_hidden * v_intermediate)
+    return MemoryEstimate(quantizable, dense, "config")
+
+
+def estimate_model_memory(model_dir: str) -> Optional[MemoryEstimate]:
+    """Estimate parameter counts from safetensors headers or config.json."""
+
+    path = Path(model_dir)
+    try:
+        return _estimate_from_safetensors(path) or _estimate_from_config(path)
+    except Exception as e:
+        logger.warning(f"Memory estimate failed for {model_dir}: {e}")
+        return None
+
+
+def bitsandbytes_available() -> bool:
+    return importlib.util.find_spec("bitsandbytes") is not None
+
+
+def available_memory(device: str) -> int:
+    """Free bytes on ``device`` (CUDA free memory, or available system RAM for CPU)."""
+
+    device_obj = torch.device(device)
+    if device_obj.type == "cuda" and torch.cuda.is_available():
+        free, _ = torch.cuda.mem_get_info(device_obj)
+        return int(free)
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pages = os.sysconf("SC_AVPHYS_PAGES") if hasattr(os, "sysconf") else 0
+        return int(pages * os.sysconf("SC_PAGE_SIZE")) if pages else 0
+
+
+def candidate_profiles(device_type: str) -> List[str]:
+    """Profiles to try on a device, highest precision first."""
+
+    if device_type == "cuda":
+        half = "bf16" if torch.cuda.is_available() and torch.cuda.is_bf16_supported() else "fp16"
+        profiles = [half]
+        if bitsandbytes_available():
+            profiles += ["int8", "nf4"]
+        return profiles
+    return ["fp32", "bf16", "int8"]
+
+
+def _load_cache() -> Dict[str, Any]:
+    try:
+        with open(_CACHE_FILE, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: Dict[str, Any]) -> None:
+    try:
+        _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _CACHE_FILE.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(cache, handle, indent=2)
+        os.replace(tmp_path, _CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"Cannot write quantization profile cache: {e}")
+
+
+def choose_profile(model_dir: str, device: str, free_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Pick the best profile that fits ``device`` for the model at ``model_dir``.
+
+    Returns a dict with ``profile``, ``required_bytes``, ``available_bytes`` and
+    ``estimate``. A cached choice for the same model/device is reused while it
+    still fits the currently available memory.
+    """
+
+    device_type = torch.device(device).type
+    free_bytes = available_memory(device) if free_bytes is None else free_bytes
+    cache_key = f"{os.path.abspath(model_dir)}|{device_type}"
+
+    with _cache_lock:
+        cache = _load_cache()
+    cached = cache.get(cache_key)
+    estimate: Optional[MemoryEstimate] = None
+    if cached and cached.get("estimate"):
+        estimate = MemoryEstimate(**cached["estimate"])
+        profile = cached.get("profile")
+        if profile in PROFILES and estimate.required_bytes(profile, device_type) <= free_bytes:
+            return dict(cached, available_bytes=free_bytes, cached=True)
+
+    if estimate is None:
+        estimate = estimate_model_memory(model_dir)
+    candidates = candidate_profiles(device_type)
+    if estimate is None:
+        # 无法估算时使用最高精度，交由加载过程报错
+        choice = {"profile": candidates[0], "required_bytes": None, "available_bytes": free_bytes, "estimate": None}
+        return choice
+
+    chosen = candidates[-1]
+    for profile in candidates:
+        if estimate.required_bytes(profile, device_type) <= free_bytes:
+            chosen = profile
+            break
+    else:
+        logger.warning(
+            f"No profile fits {free_bytes / GIB:.1f} GiB free on {device_type}; "
+            f"trying the smallest ({chosen}, ~{estimate.required_bytes(chosen, device_type) / GIB:.1f} GiB)"
+        )
+
+    choice = {
+        "profile": chosen,
+        "required_bytes": int(estimate.required_bytes(chosen, device_type)),
+        "available_bytes": free_bytes,
+        "estimate": asdict(estimate),
+    }
+    with _cache_lock:
+        cache = _load_cache()
+        cache[cache_key] = choice
+        _save_cache(cache)
+    logger.info(
+        f"Selected {chosen} for {model_dir} on {device_type}: "
+        f"~{choice['required_bytes'] / GIB:.1f} GiB needed, {free_bytes / GIB:.1f} GiB available"
+    )
+    return choice
+
+
+def quantize_dynamic_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Replace ``nn.Linear`` layers with dynamic int8 layers for CPU inference.
+
+    Layers are converted one at a time so peak memory stays close to the
+    half-precision model plus one float32 layer. The remaining parameters are
+    cast to float32, as dynamic quantized layers expect float32 activations.
+    """
+
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+    from torch.ao.quantization import default_dynamic_qconfig
+
+    targets = [
+        (name, module)
+        for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and "lm_head" not in name
+    ]
+    for name, module in targets:
+        parent_name, _, child_name = name.rpartition(".")
+        parent = model.get_submodule(parent_name) if parent_name else model
+        module = module.float()
+        module.qconfig = default_dynamic_qconfig
+        setattr(parent, child_name, DynamicLinear.from_float(module))
+    logger.info(f"Dynamic int8 quantization applied to {len(targets)} Linear layers")
+    return model.float()
+
+
+def profile_dtype(profile: str) -> torch.dtype:
+    """Compute dtype used with ``profile``."""
+
+    if profile == "bf16":
+        return torch.bfloat16
+    if profile == "fp16":
+        return torch.float16
+    if profile == "fp32":
+        return torch.float32
+    # 量化权重的计算精度
+    if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16
+
+
+__all__ = [
+    "MemoryEstimate",
+    "PROFILE_AUTO",
+    "PROFILE_CHOICES",
+    "PROFILE_NONE",
+    "PROFILES",
+    "available_memory",
+    "bitsandbytes_available",
+    "choose_profile",
+    "estimate_model_memory",
+    "profile_dtype",
+    "quantize_dynamic_int8",
+]
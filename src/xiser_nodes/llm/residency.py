@@ -0,0 +1,320 @@
+"""Residency manager for the local Qwen3-VL model.
+
+Keeps one shared provider (and therefore one loaded model) across node
+executions and decides when it is loaded and unloaded:
+
+* optional preload at server start (``XISER_QWEN_VL_PRELOAD=<model id>``),
+  followed by a short warm-up generation that triggers kernel compilation;
+* idle unload after ``XISER_QWEN_VL_IDLE_TIMEOUT`` seconds without use
+  (0 disables it);
+* unload under memory pressure: ComfyUI's ``free_memory`` and
+  ``unload_all_models`` are wrapped so an idle Qwen3-VL model is released
+  when diffusion models need the VRAM.
+
+Load/unload state and timings are available from :meth:`status`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from ..profiler import PROFILER
+from ..utils import logger
+from .providers_qwen_local import Qwen3VLLocalProvider, transformers_available
+
+try:
+    import comfy.model_management as model_management
+except ImportError:  # 不在ComfyUI环境中
+    model_management = None
+
+DEFAULT_IDLE_TIMEOUT = 1800.0
+
+# 预热时使用的最小生成参数
+_WARMUP_OVERRIDES = {
+    "max_new_tokens": 1,
+    "temperature": 0.0,
+    "vision_cache": False,
+    "stream": False,
+    "seed": 0,
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Invalid value for {name}, using {default}")
+        return default
+
+
+class ModelResidencyManager:
+    """Owns the shared local provider and its load/unload lifecycle."""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, check_interval: float = 30.0):
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self._provider: Optional[Qwen3VLLocalProvider] = None
+        self._lock = threading.RLock()
+        # 加载可能耗时数分钟，单独加锁以免阻塞状态查询
+        self._load_lock = threading.Lock()
+        self._active = 0
+        self._state = "unloaded"
+        self._last_used: Optional[float] = None
+        self._loaded_at: Optional[float] = None
+        self._load_seconds: Optional[float] = None
+        self._warmup_seconds: Optional[float] = None
+        self._load_count = 0
+        self._unload_count = 0
+        self._last_unload_reason: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._overrides: Dict[str, Any] = {}
+        self._watchdog: Optional[threading.Thread] = None
+        self._hooks_installed = False
+
+    @property
+    def provider(self) -> Qwen3VLLocalProvider:
+        with self._lock:
+            if self._provider is None:
+                self._provider = Qwen3VLLocalProvider()
+                self._install_memory_hooks()
+            return self._provider
+
+    # ------------------------------------------------------------------
+    # 加载与使用
+    # ------------------------------------------------------------------
+    def ensure_loaded(self, overrides: Dict[str, Any]) -> None:
+        """Load the model described by ``overrides`` unless it is already resident."""
+
+        provider = self.provider
+        model_path = overrides.get("model_path", provider.config.model)
+        loading_config = provider.loading_config_from(overrides)
+        with self._load_lock:
+            with self._lock:
+                was_loaded = provider.is_loaded
+                previous_key = provider._loaded_key
+                self._state = "loading"
+            try:
+                provider._load_model(loading_config, model_path)
+            except Exception as e:
+                with self._lock:
+                    self._state = "loaded" if provider.is_loaded else "unloaded"
+                    self._last_error = str(e)
+                raise
+            with self._lock:
+                if not was_loaded or provider._loaded_key != previous_key:
+                    self._load_count += 1
+                    self._loaded_at = time.time()
+                    self._load_seconds = provider.last_load_seconds
+                    self._warmup_seconds = None
+                    self._last_error = None
+                self._overrides = dict(overrides)
+                self._state = "loaded"
+                self._last_used = time.time()
+        self._start_watchdog()
+
+    @contextlib.contextmanager
+    def use(self, overrides: Dict[str, Any]) -> Iterator[Qwen3VLLocalProvider]:
+        """Ensure the model is loaded and mark it busy while the block runs."""
+
+        with self._lock:
+            self._active += 1
+        try:
+            self.ensure_loaded(overrides)
+            yield self.provider
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_used = time.time()
+
+    def warmup(self) -> Optional[float]:
+        """Run a one-token generation with a small image to compile kernels."""
+
+        provider = self.provider
+        if not provider.is_loaded:
+            return None
+        overrides = dict(self._overrides, **_WARMUP_OVERRIDES)
+        image = np.full((64, 64, 3), 127, dtype=np.uint8)
+        with self._lock:
+            self._active += 1
+            self._state = "warming"
+        start = time.perf_counter()
+        try:
+            response = provider.invoke("Hi", [image], "", overrides)
+            if "error" in response:
+                logger.warning(f"Qwen3-VL warm-up failed: {response['error']}")
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active -= 1
+                self._warmup_seconds = elapsed
+                self._state = "loaded" if provider.is_loaded else "unloaded"
+                self._last_used = time.time()
+        logger.info(f"Qwen3-VL warm-up finished in {elapsed:.1f}s")
+        return elapsed
+
+    def preload(self, overrides: Dict[str, Any], warmup: bool = True, background: bool = True) -> None:
+        """Load (and optionally warm up) a model, by default in a daemon thread."""
+
+        def run():
+            try:
+                self.ensure_loaded(overrides)
+                if warmup:
+                    self.warmup()
+            except Exception as e:
+                logger.error(f"Qwen3-VL preload failed: {e}")
+
+        if not transformers_available():
+            logger.warning("Qwen3-VL preload skipped: transformers is not available")
+            return
+        if background:
+            threading.Thread(target=run, name="xiser-qwen-vl-preload", daemon=True).start()
+        else:
+            run()
+
+    def preload_from_env(self) -> bool:
+        """Start a background preload when ``XISER_QWEN_VL_PRELOAD`` is set."""
+
+        model_id = os.environ.get("XISER_QWEN_VL_PRELOAD", "").strip()
+        if not model_id:
+            return False
+        overrides = {
+            "model_path": model_id,
+            "device": os.environ.get("XISER_QWEN_VL_DEVICE", "auto"),
+            "dtype": os.environ.get("XISER_QWEN_VL_DTYPE", "auto"),
+            "quantization": os.environ.get("XISER_QWEN_VL_QUANTIZATION", "none"),
+        }
+        warmup = os.environ.get("XISER_QWEN_VL_WARMUP", "1").strip().lower() not in ("0", "false", "no")
+        logger.info(f"Preloading Qwen3-VL model {model_id} (warm-up: {warmup})")
+        self.preload(overrides, warmup=warmup)
+        return True
+
+    # ------------------------------------------------------------------
+    # 卸载
+    # ------------------------------------------------------------------
+    def unload(self, reason: str = "manual", force: bool = False) -> bool:
+        """Unload the model unless it is in use (or ``force`` is set)."""
+
+        if not self._load_lock.acquire(blocking=force):
+            logger.debug(f"Qwen3-VL unload ({reason}) skipped: model is loading")
+            return False
+        try:
+            with self._lock:
+                provider = self._provider
+                if provider is None or not provider.is_loaded:
+                    return False
+                if self._active and not force:
+                    logger.debug(f"Qwen3-VL unload ({reason}) skipped: model in use")
+                    return False
+                provider.unload()
+                self._state = "unloaded"
+                self._unload_count += 1
+                self._last_unload_reason = reason
+                self._loaded_at = None
+        finally:
+            self._load_lock.release()
+        logger.info(f"Qwen3-VL model unloaded ({reason})")
+        return True
+
+    def _idle_for(self) -> float:
+        return time.time() - self._last_used if self._last_used else 0.0
+
+    def _start_watchdog(self) -> None:
+        with self._lock:
+            if self._watchdog is not None and self._watchdog.is_alive():
+                return
+            self._watchdog = threading.Thread(target=self._watch_idle, name="xiser-qwen-vl-idle", daemon=True)
+            self._watchdog.start()
+
+    def _watch_idle(self) -> None:
+        while True:
+            time.sleep(self.check_interval)
+            with self._lock:
+                provider = self._provider
+                if provider is None or not provider.is_loaded:
+                    # 模型已卸载，下次加载时再启动
+                    self._watchdog = None
+                    return
+                expired = self.idle_timeout > 0 and not self._active and self._idle_for() >= self.idle_timeout
+            if expired:
+                self.unload("idle timeout")
+
+    def _install_memory_hooks(self) -> None:
+        """Release the idle model when ComfyUI frees memory for other models."""
+
+        if self._hooks_installed or model_management is None:
+            return
+        self._hooks_installed = True
+        original_free_memory = model_management.free_memory
+        original_unload_all = model_management.unload_all_models
+        manager = self
+
+        def free_memory(memory_required, device, *args, **kwargs):
+            result = original_free_memory(memory_required, device, *args, **kwargs)
+            try:
+                if manager._holds_device(device) and model_management.get_free_memory(device) < memory_required:
+                    manager.unload("memory pressure")
+            except Exception as e:
+                logger.debug(f"Qwen3-VL memory pressure check failed: {e}")
+            return result
+
+        def unload_all_models(*args, **kwargs):
+            result = original_unload_all(*args, **kwargs)
+            manager.unload("unload_all_models")
+            return result
+
+        model_management.free_memory = free_memory
+        model_management.unload_all_models = unload_all_models
+
+    def _holds_device(self, device: Any) -> bool:
+        provider = self._provider
+        if provider is None or not provider.is_loaded:
+            return False
+        return str(getattr(device, "type", device)).split(":")[0] == str(provider._device).split(":")[0]
+
+    # ------------------------------------------------------------------
+    # 状态
+    # ------------------------------------------------------------------
+    def configure(self, idle_timeout: Optional[float] = None) -> None:
+        if idle_timeout is not None:
+            self.idle_timeout = max(0.0, float(idle_timeout))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            provider = self._provider
+            loaded = provider is not None and provider.is_loaded
+            return {
+                "state": self._state if loaded or self._state == "loading" else "unloaded",
+                "model_path": provider._current_model_path if loaded else None,
+                "device": str(provider._device) if loaded else None,
+                "dtype": str(provider._dtype) if loaded else None,
+                "quantization": provider._quantization if loaded else None,
+                "memory_estimate": provider.last_memory_estimate if loaded else None,
+                "active": self._active,
+                "loaded_at": self._loaded_at,
+                "last_used": self._last_used,
+                "idle_seconds": round(self._idle_for(), 1) if loaded else None,
+                "idle_timeout": self.idle_timeout,
+                "load_seconds": self._load_seconds,
+                "warmup_seconds": self._warmup_seconds,
+                "load_count": self._load_count,
+                "unload_count": self._unload_count,
+                "last_unload_reason": self._last_unload_reason,
+                "last_error": self._last_error,
+            }
+
+
+# 全局共享实例
+QWEN_VL_RESIDENCY = ModelResidencyManager(idle_timeout=_env_float("XISER_QWEN_VL_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+PROFILER.register_source("qwen_vl_residency", QWEN_VL_RESIDENCY.status)
+
+
+__all__ = [
+    "ModelResidencyManager",
+    "QWEN_VL_RESIDENCY",
+]
@@ -0,0 +1,298 @@
+"""Vision-tower feature cache for local vision-language models.
+
+Captioning and QA workflows often send the same image with many prompts. The
+cache wraps the model's ``get_image_features`` so each image's visual
+embeddings are computed once and reused; on a full hit the vision encoder is
+skipped and only language-model decoding runs.
+
+Entries are keyed by the image content hash, the processor settings and the
+loaded model, and live in a two-tier LRU: a device tier bounded by a VRAM
+budget and a host tier bounded by a RAM budget. Entries evicted from the
+device tier are demoted to host memory and promoted again on a hit.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from ..profiler import PROFILER
+from ..utils import logger
+
+# 单张图像的缓存条目：(image_embeds, deepstack_embeds或None)
+FeatureEntry = Tuple[torch.Tensor, Optional[List[torch.Tensor]]]
+
+# 参与缓存键的图像处理器设置
+_PROCESSOR_SETTING_KEYS = (
+    "min_pixels",
+    "max_pixels",
+    "size",
+    "patch_size",
+    "temporal_patch_size",
+    "merge_size",
+    "image_mean",
+    "image_std",
+)
+
+
+def processor_signature(processor: Any, model_id: str, dtype: Any) -> str:
+    """Describe the settings that affect pixel values and vision outputs."""
+
+    image_processor = getattr(processor, "image_processor", processor)
+    parts = [str(model_id), str(dtype)]
+    for key in _PROCESSOR_SETTING_KEYS:
+        parts.append(f"{key}={getattr(image_processor, key, None)!r}")
+    return "|".join(parts)
+
+
+def image_cache_key(image: np.ndarray, signature: str) -> str:
+    """Content hash of one uint8 image combined with the processor signature."""
+
+    digest = hashlib.sha256()
+    digest.update(signature.encode("utf-8"))
+    digest.update(str(image.shape).encode("utf-8"))
+    digest.update(np.ascontiguousarray(image).tobytes())
+    return digest.hexdigest()
+
+
+def _entry_bytes(entry: FeatureEntry) -> int:
+    embeds, deepstack = entry
+    total = embeds.numel() * embeds.element_size()
+    for tensor in deepstack or ():
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _entry_to(entry: FeatureEntry, device: Any) -> FeatureEntry:
+    embeds, deepstack = entry
+    moved = [tensor.to(device, non_blocking=True) for tensor in deepstack] if deepstack is not None else None
+    return embeds.to(device, non_blocking=True), moved
+
+
+def _split_output(output: Any, token_counts: Sequence[int]) -> Optional[List[FeatureEntry]]:
+    """Split a ``get_image_features`` result into per-image entries.
+
+    Supports the Qwen3-VL format ``(per_image_embeds, deepstack_list)`` and the
+    Qwen2.5-VL format (a tuple of per-image embeddings). Returns ``None`` for
+    unknown formats so the caller can bypass the cache.
+    """
+
+    count = len(token_counts)
+    if (
+        isinstance(output, tuple)
+        and len(output) == 2
+        and isinstance(output[0], (list, tuple))
+        and isinstance(output[1], (list, tuple))
+        and len(output[0]) == count
+    ):
+        embeds, deepstack = output
+        offsets = np.cumsum([0] + list(token_counts)).tolist()
+        entries = []
+        for index in range(count):
+            start, end = offsets[index], offsets[index + 1]
+            layers = [layer[start:end].detach().clone() for layer in deepstack]
+            entries.append((embeds[index].detach().clone(), layers))
+        return entries
+    if isinstance(output, (list, tuple)) and len(output) == count and all(torch.is_tensor(t) for t in output):
+        return [(tensor.detach().clone(), None) for tensor in output]
+    return None
+
+
+def _merge_entries(entries: Sequence[FeatureEntry]) -> Any:
+    """Rebuild the ``get_image_features`` result from per-image entries."""
+
+    embeds = tuple(entry[0] for entry in entries)
+    if entries[0][1] is None:
+        return embeds
+    layer_count = len(entries[0][1])
+    deepstack = [torch.cat([entry[1][layer] for entry in entries], dim=0) for layer in range(layer_count)]
+    return embeds, deepstack
+
+
+class VisionFeatureCache:
+    """Two-tier (device/host) LRU cache of per-image vision features."""
+
+    def __init__(self, device_budget_mb: int = 1024, host_budget_mb: int = 2048):
+        self.device_budget = int(device_budget_mb) * 1024 * 1024
+        self.host_budget = int(host_budget_mb) * 1024 * 1024
+        self._device: "OrderedDict[str, FeatureEntry]" = OrderedDict()
+        self._host: "OrderedDict[str, FeatureEntry]" = OrderedDict()
+        self._device_bytes = 0
+        self._host_bytes = 0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # 配置与统计
+    # ------------------------------------------------------------------
+    def configure(self, device_budget_mb: Optional[int] = None, host_budget_mb: Optional[int] = None) -> None:
+        with self._lock:
+            if device_budget_mb is not None:
+                self.device_budget = int(device_budget_mb) * 1024 * 1024
+            if host_budget_mb is not None:
+                self.host_budget = int(host_budget_mb) * 1024 * 1024
+            self._enforce_budgets()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._device.clear()
+            self._host.clear()
+            self._device_bytes = 0
+            self._host_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "device_entries": len(self._device),
+                "host_entries": len(self._host),
+                "device_bytes": self._device_bytes,
+                "host_bytes": self._host_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # ------------------------------------------------------------------
+    # 存取
+    # ------------------------------------------------------------------
+    def get(self, key: str, device: Any) -> Optional[FeatureEntry]:
+        with self._lock:
+            entry = self._device.get(key)
+            if entry is not None:
+                self._device.move_to_end(key)
+                return entry
+            entry = self._host.pop(key, None)
+            if entry is None:
+                return None
+            self._host_bytes -= _entry_bytes(entry)
+        # 从主机内存提升回设备
+        entry = _entry_to(entry, device)
+        self._store(key, entry)
+        return entry
+
+    def put(self, key: str, entry: FeatureEntry) -> None:
+        self._store(key, entry)
+
+    def _store(self, key: str, entry: FeatureEntry) -> None:
+        size = _entry_bytes(entry)
+        with self._lock:
+            if key in self._device:
+                self._device_bytes -= _entry_bytes(self._device.pop(key))
+            if size > self.device_budget:
+                self._store_host(key, entry, size)
+                return
+            self._device[key] = entry
+            self._device_bytes += size
+            self._enforce_budgets()
+
+    def _store_host(self, key: str, entry: FeatureEntry, size: int) -> None:
+        if size > self.host_budget:
+            return
+        if key in self._host:
+            self._host_bytes -= _entry_bytes(self._host.pop(key))
+        self._host[key] = _entry_to(entry, "cpu")
+        self._host_bytes += size
+
+    def _enforce_budgets(self) -> None:
+        # 设备层超出预算时降级到主机层，主机层超出预算时丢弃
+        while self._device and self._device_bytes > self.device_budget:
+            key, entry = self._device.popitem(last=False)
+            size = _entry_bytes(entry)
+            self._device_bytes -= size
+            self._store_host(key, entry, size)
+        while self._host and self._host_bytes > self.host_budget:
+            _, entry = self._host.popitem(last=False)
+            self._host_bytes -= _entry_bytes(entry)
+
+    # ------------------------------------------------------------------
+    # 与模型集成
+    # ------------------------------------------------------------------
+    @contextlib.contextmanager
+    def bind(self, keys: Optional[Sequence[str]]) -> Iterator[None]:
+        """Associate cache keys with the images of the next vision forward on this thread."""
+
+        previous = getattr(self._local, "keys", None)
+        self._local.keys = list(keys) if keys else None
+        try:
+            yield
+        finally:
+            self._local.keys = previous
+
+    def install(self, model: Any) -> bool:
+        """Wrap ``get_image_features`` on ``model`` (idempotent).
+
+        Returns ``False`` if the model does not expose a compatible method.
+        """
+
+        target = getattr(model, "model", model)
+        if not hasattr(target, "get_image_features"):
+            target = model
+        original = getattr(target, "get_image_features", None)
+        if original is None:
+            return False
+        if getattr(original, "_xiser_vision_cache", False):
+            return True
+
+        visual = getattr(target, "visual", None) or getattr(model, "visual", None)
+        merge_size = int(getattr(visual, "spatial_merge_size", 2) or 2)
+        cache = self
+
+        def cached_get_image_features(pixel_values, image_grid_thw=None, *args, **kwargs):
+            keys = getattr(cache._local, "keys", None)
+            if not keys or image_grid_thw is None or len(keys) != int(image_grid_thw.shape[0]):
+                return original(pixel_values, image_grid_thw, *args, **kwargs)
+
+            patch_counts = image_grid_thw.prod(-1).tolist()
+            token_counts = [count // (merge_size ** 2) for count in patch_counts]
+            entries: List[Optional[FeatureEntry]] = [cache.get(key, pixel_values.device) for key in keys]
+            missing = [index for index, entry in enumerate(entries) if entry is None]
+            cache.hits += len(keys) - len(missing)
+            cache.misses += len(missing)
+
+            if missing:
+                offsets = np.cumsum([0] + patch_counts).tolist()
+                if len(missing) == len(keys):
+                    sub_pixels, sub_grid = pixel_values, image_grid_thw
+                else:
+                    sub_pixels = torch.cat([pixel_values[offsets[i]:offsets[i + 1]] for i in missing], dim=0)
+                    sub_grid = image_grid_thw[missing]
+                output = original(sub_pixels, sub_grid, *args, **kwargs)
+                computed = _split_output(output, [token_counts[i] for i in missing])
+                if computed is None:
+                    logger.debug("Unsupported get_image_features output, vision cache bypassed")
+                    if len(missing) == len(keys):
+                        return output
+                    return original(pixel_values, image_grid_thw, *args, **kwargs)
+                for index, entry in zip(missing, computed):
+                    entries[index] = entry
+                    cache.put(keys[index], entry)
+                if len(missing) == len(keys):
+                    return output
+            else:
+                logger.debug(f"Vision cache hit for all {len(keys)} images, skipping visual encoder")
+
+            return _merge_entries(entries)
+
+        cached_get_image_features._xiser_vision_cache = True
+        target.get_image_features = cached_get_image_features
+        return True
+
+
+# 全局共享实例
+VISION_FEATURE_CACHE = VisionFeatureCache()
+PROFILER.register_source("vision_cache", VISION_FEATURE_CACHE.stats)
+
+
+__all__ = [
+    "VISION_FEATURE_CACHE",
+    "VisionFeatureCache",
+    "image_cache_key",
+    "processor_signature",
+]
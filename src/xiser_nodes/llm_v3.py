@@ -5,10 +5,11 @@ from typing import Dict, List, Optional, Any, Tuple
 import torch
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # import sys  # 调试日志已关闭
 from comfy_execution.utils import get_executing_context
 
-from .llm.base import _gather_images, _image_to_base64
+from .llm.base import _encode_image_payloads, _gather_images, _split_batch_instructions, _split_image_groups
 from .llm.registry import _validate_inputs, build_default_registry
 from .config import get_llm_config_loader
 from .llm import SEED_CACHE  # 从llm模块导入缓存
@@ -30,6 +31,16 @@ def _dummy_image_tensor():
     return torch.zeros((1, 1, 1, 3), dtype=torch.float32)
 
 
+def _error_output(message: str) -> io.NodeOutput:
+    """返回错误信息输出"""
+    return io.NodeOutput(
+        message,                  # response
+        [_dummy_image_tensor()],  # images
+        [],                       # image_urls
+        [message],                # responses
+    )
+
+
 def _update_progress(stage: str, progress: float, total_stages: int = 8, node_id: str = ""):
     """更新进度显示 - 使用ProgressManager统一处理
 
@@ -43,6 +54,54 @@ def _update_progress(stage: str, progress: float, total_stages: int = 8, node_id
     ProgressManager.update_progress(stage, progress, total_stages, node_id)
 
 
+def _build_cache_params(provider: str, mode: str, gen_image: int, **params) -> Dict[str, Any]:
+    """构建缓存参数，与提供者实际使用的参数保持一致"""
+    cache_params = dict(params, gen_image=gen_image, mode=mode)
+    # 特殊处理：wan2.6在image_edit模式下使用'n_images'参数，而不是'gen_image'
+    if provider == 'wan2.6-image' and mode == 'image_edit':
+        cache_params['n_images'] = gen_image
+    return cache_params
+
+
+def _invoke_provider(provider_impl, instruction: str, image_payloads: List[str], api_key: str,
+                     overrides: Dict[str, Any], progress_callback=None) -> Tuple[str, List[torch.Tensor], List[str]]:
+    """调用提供者并解析响应，错误以文本形式返回"""
+    try:
+        response = provider_impl.invoke(instruction, image_payloads, api_key, overrides, progress_callback)
+
+        # 进度：解析响应
+        if progress_callback:
+            progress_callback("解析", 0.3)
+
+        text = provider_impl.extract_text(response)
+        images = provider_impl.extract_images(response)
+        image_urls = provider_impl.extract_image_urls(response)
+
+        # 进度：解析完成
+        if progress_callback:
+            progress_callback("解析", 1.0)
+    except requests.HTTPError as exc:
+        err_detail = exc.response.text if exc.response is not None else str(exc)
+        text = f"LLM request failed: {exc}: {err_detail}"
+        images = []
+        image_urls = []
+    except Exception as exc:
+        text = f"Error: {exc}"
+        images = []
+        image_urls = []
+    return text, images, image_urls
+
+
+def _is_cacheable_text(text: str) -> bool:
+    """只缓存成功的结果"""
+    return bool(text) and not text.startswith("Error:") and not text.startswith("LLM request failed:")
+
+
+def _is_dummy_image(image: torch.Tensor) -> bool:
+    """判断是否为占位用的虚拟图像"""
+    return tuple(image.shape) == (1, 1, 1, 3) and not bool(image.any())
+
+
 class XIS_LLMOrchestratorV3(io.ComfyNode):
     """LLM编排器节点 - V3版本"""
 
@@ -78,6 +137,7 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
 • 多尺寸支持：提供所有视觉模型支持的图像尺寸预设
 • 固定种子：默认使用固定种子(42)确保可重复性
 • 智能缓存：seed≥0时自动缓存结果，相同参数直接返回缓存内容
+• 批量模式：多条指令/多组图像并发调用，结果按输入顺序输出到文本响应列表
 
 使用说明：
 1. 选择提供者：根据需求选择文本对话或图像生成模型
@@ -252,11 +312,33 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
                     optional=True,
                     tooltip="启用seed缓存：固定seed（≥0）的结果会自动缓存，相同参数直接返回缓存内容，避免重复调用API。缓存最大容量50个结果（LRU淘汰）。"
                 ),
+                io.Boolean.Input(
+                    "batch_mode",
+                    default=False,
+                    optional=True,
+                    tooltip="批量模式：按分隔符将instruction拆分为多条指令，pack_images中每张图像（或每个列表元素）作为一个图像组，逐项并发调用提供者并按输入顺序返回结果。单条指令或单个图像组会广播到所有项。"
+                ),
+                io.String.Input(
+                    "batch_separator",
+                    default="\\n",
+                    optional=True,
+                    tooltip="批量模式下拆分instruction的分隔符，\\n表示换行"
+                ),
+                io.Int.Input(
+                    "max_concurrency",
+                    default=4,
+                    min=1,
+                    max=16,
+                    step=1,
+                    optional=True,
+                    tooltip="批量模式的最大并发请求数（同时受提供者级别并发上限约束）"
+                ),
             ],
             outputs=[
                 io.String.Output("response", display_name="文本响应"),
                 io.Image.Output("images", display_name="图像列表", is_output_list=True),
                 io.String.Output("image_urls", display_name="图像URL列表", is_output_list=True),
+                io.String.Output("responses", display_name="文本响应列表", is_output_list=True),
             ]
         )
 
@@ -283,6 +365,9 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
         prompt_extend: bool = True,
         mode: str = "chat",
         enable_cache: bool = True,
+        batch_mode: bool = False,
+        batch_separator: str = "\\n",
+        max_concurrency: int = 4,
     ) -> io.NodeOutput:
         """执行LLM调用"""
         # 获取节点ID用于进度更新
@@ -302,18 +387,10 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
             # 这样后续代码就不需要区分 provider 和 actual_provider 了
             provider = actual_provider
         except KeyError:
-            return io.NodeOutput(
-                f"Error: unknown provider '{provider}'",  # response
-                [_dummy_image_tensor()],                   # images
-                []                                         # image_urls
-            )
+            return _error_output(f"Error: unknown provider '{provider}'")
 
         if not instruction.strip():
-            return io.NodeOutput(
-                "Error: instruction is empty. Provide a prompt to run the node.",  # response
-                [_dummy_image_tensor()],                                           # images
-                []                                                                 # image_urls
-            )
+            return _error_output("Error: instruction is empty. Provide a prompt to run the node.")
 
         # 进度：验证阶段
         _update_progress("验证", 0.3, node_id=node_id)
@@ -327,30 +404,11 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
             if resolved_key:
                 profile_clean = provider
         if not resolved_key:
-            return io.NodeOutput(
-                "Error: API key is missing. Open 'API key management' and select an API key for this node.",  # response
-                [_dummy_image_tensor()],                                                                      # images
-                []                                                                                            # image_urls
-            )
+            return _error_output("Error: API key is missing. Open 'API key management' and select an API key for this node.")
 
         # 处理种子：seed已经是整数
         resolved_seed = seed if (seed is not None and seed >= 0) else None
 
-        # 进度：数据处理阶段
-        _update_progress("处理", 0.1, node_id=node_id)
-
-        # 收集图像
-        gathered = _gather_images(image, pack_images)
-        max_provider_images = provider_impl.config.max_images
-        if max_provider_images >= 0 and len(gathered) > max_provider_images:
-            gathered = gathered[:max_provider_images]
-
-        # 转换图像为Base64
-        image_payloads = [_image_to_base64(img) for img in gathered]
-
-        # 进度：数据处理完成
-        _update_progress("处理", 0.5, node_id=node_id)
-
         # 修正image_size值，确保对当前提供者有效（必须在缓存检查前计算）
         config_loader = get_llm_config_loader()
         model_config = config_loader.get_model(provider)
@@ -381,54 +439,28 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
         if allowed_sizes and len(allowed_sizes) == 1 and allowed_sizes[0] == "":
             corrected_image_size = ""
 
-        # 检查缓存（只对固定seed≥0且启用缓存的情况）
-        if seed >= 0 and enable_cache:
-            # 直接使用输入参数构建缓存参数，避免使用locals()的动态性
-            # 对于wan2.6模型，需要确保参数与提供者实际使用的参数一致
-            cache_params = {
-                'model_override': model_override,
-                'key_profile': key_profile,
-                'temperature': temperature,
-                'top_p': top_p,
-                'max_tokens': max_tokens,
-                'enable_thinking': enable_thinking,
-                'thinking_budget': thinking_budget,
-                'negative_prompt': negative_prompt,
-                'image_size': corrected_image_size,  # 使用修正后的image_size确保一致性
-                'gen_image': gen_image,
-                'max_images': max_images,
-                'watermark': watermark,
-                'prompt_extend': prompt_extend,
-                'mode': mode,
-                'profile_clean': profile_clean,
-                'resolved_seed': resolved_seed,
-            }
-
-            # 特殊处理：对于wan2.6-image提供者，需要调整参数名称以匹配实际使用
-            if provider == 'wan2.6-image':
-                # wan2.6在image_edit模式下使用'n_images'参数，而不是'gen_image'
-                # 确保缓存参数与提供者实际使用的参数一致
-                if mode == 'image_edit':
-                    cache_params['n_images'] = gen_image
-                # 对于interleave模式，使用max_images参数
-
-            # 缓存检查
-            cached_result = SEED_CACHE.get(
-                seed=seed,
-                provider=provider,
-                instruction=instruction,
-                images=gathered,
-                **cache_params
-            )
-            if cached_result:
-                # 进度：从缓存返回
-                _update_progress("完成", 1.0, node_id=node_id)
-                text, images_out, urls_out = cached_result
-                return io.NodeOutput(
-                    text or "",      # response
-                    images_out,      # images
-                    urls_out         # image_urls
-                )
+        # 缓存只对固定seed≥0且启用缓存的情况生效
+        cache_enabled = seed >= 0 and enable_cache
+        # 直接使用输入参数构建缓存参数，避免使用locals()的动态性
+        cache_params = _build_cache_params(
+            provider,
+            mode,
+            gen_image,
+            model_override=model_override,
+            key_profile=key_profile,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            enable_thinking=enable_thinking,
+            thinking_budget=thinking_budget,
+            negative_prompt=negative_prompt,
+            image_size=corrected_image_size,  # 使用修正后的image_size确保一致性
+            max_images=max_images,
+            watermark=watermark,
+            prompt_extend=prompt_extend,
+            profile_clean=profile_clean,
+            resolved_seed=resolved_seed,
+        )
 
         # 构建覆盖参数
         overrides: Dict[str, Any] = {
@@ -449,96 +481,85 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
             "mode": mode,
         }
 
+        if batch_mode:
+            return cls._execute_batch(
+                provider=provider,
+                provider_impl=provider_impl,
+                instruction=instruction,
+                image=image,
+                pack_images=pack_images,
+                api_key=resolved_key,
+                overrides=overrides,
+                seed=seed,
+                cache_enabled=cache_enabled,
+                cache_params=cache_params,
+                batch_separator=batch_separator,
+                max_concurrency=max_concurrency,
+                node_id=node_id,
+            )
+
+        # 进度：数据处理阶段
+        _update_progress("处理", 0.1, node_id=node_id)
+
+        # 收集图像
+        gathered = _gather_images(image, pack_images)
+        max_provider_images = provider_impl.config.max_images
+        if max_provider_images >= 0 and len(gathered) > max_provider_images:
+            gathered = gathered[:max_provider_images]
+
+        # 检查缓存
+        if cache_enabled:
+            cached_result = SEED_CACHE.get(
+                seed=seed,
+                provider=provider,
+                instruction=instruction,
+                images=gathered,
+                **cache_params
+            )
+            if cached_result:
+                # 进度：从缓存返回
+                _update_progress("完成", 1.0, node_id=node_id)
+                text, images_out, urls_out = cached_result
+                return io.NodeOutput(
+                    text or "",      # response
+                    images_out,      # images
+                    urls_out,        # image_urls
+                    [text or ""],    # responses
+                )
+
+        # 转换图像载荷（缓存未命中时才编码；本地提供者直接使用数组）
+        image_payloads = _encode_image_payloads(provider_impl, gathered)
+
+        # 进度：数据处理完成
+        _update_progress("处理", 0.5, node_id=node_id)
+
         # 验证输入
         validation_error = _validate_inputs(provider, instruction, gathered, overrides)
         if validation_error:
-            return io.NodeOutput(
-                f"Error: {validation_error}",  # response
-                [_dummy_image_tensor()],       # images
-                []                             # image_urls
-            )
+            return _error_output(f"Error: {validation_error}")
 
         # 进度：验证完成
         _update_progress("验证", 0.8, node_id=node_id)
 
-        try:
-            # 进度：调用提供者
-            _update_progress("连接", 0.1, node_id=node_id)
-
-            # 创建进度回调函数
-            def progress_callback(stage: str, progress: float):
-                _update_progress(stage, progress, node_id=node_id)
+        # 进度：调用提供者
+        _update_progress("连接", 0.1, node_id=node_id)
 
-            # 调用提供者
-            response = provider_impl.invoke(instruction, image_payloads, resolved_key, overrides, progress_callback)
+        # 创建进度回调函数
+        def progress_callback(stage: str, progress: float):
+            _update_progress(stage, progress, node_id=node_id)
 
-            # 进度：解析响应
-            _update_progress("解析", 0.3, node_id=node_id)
-
-            text = provider_impl.extract_text(response)
-            images = provider_impl.extract_images(response)
-            image_urls = provider_impl.extract_image_urls(response)
-
-            # 进度：解析完成
-            _update_progress("解析", 1.0, node_id=node_id)
-        except requests.HTTPError as exc:
-            err_detail = exc.response.text if exc.response is not None else str(exc)
-            text = f"LLM request failed: {exc}: {err_detail}"
-            images = []
-            image_urls = []
-        except Exception as exc:
-            text = f"Error: {exc}"
-            images = []
-            image_urls = []
+        # 调用提供者
+        text, images, image_urls = _invoke_provider(
+            provider_impl, instruction, image_payloads, resolved_key, overrides, progress_callback
+        )
 
         # 确保至少返回一个虚拟图像
         images_out = images if images else [_dummy_image_tensor()]
         urls_out = image_urls if image_urls else []
 
         # 缓存结果（只对固定seed≥0、启用缓存且成功的情况）
-
-        if seed >= 0 and enable_cache and text and not text.startswith("Error:") and not text.startswith("LLM request failed:"):
+        if cache_enabled and _is_cacheable_text(text):
             try:
-                # 使用与缓存检查相同的参数构建方式
-                cache_params = {
-                    'model_override': model_override,
-                    'key_profile': key_profile,
-                    'temperature': temperature,
-                    'top_p': top_p,
-                    'max_tokens': max_tokens,
-                    'enable_thinking': enable_thinking,
-                    'thinking_budget': thinking_budget,
-                    'negative_prompt': negative_prompt,
-                    'image_size': corrected_image_size,  # 使用修正后的image_size确保一致性
-                    'gen_image': gen_image,
-                    'max_images': max_images,
-                    'watermark': watermark,
-                    'prompt_extend': prompt_extend,
-                    'mode': mode,
-                    'profile_clean': profile_clean,
-                    'resolved_seed': resolved_seed,
-                }
-
-                # 特殊处理：对于wan2.6-image提供者，需要调整参数名称以匹配实际使用
-                if provider == 'wan2.6-image':
-                    # wan2.6在image_edit模式下使用'n_images'参数，而不是'gen_image'
-                    # 确保缓存参数与提供者实际使用的参数一致
-                    if mode == 'image_edit':
-                        cache_params['n_images'] = gen_image
-                    # 对于interleave模式，使用max_images参数
-
-                # 调试：计算并显示缓存键信息（临时启用）
-                try:
-                    # 计算图像哈希
-                    image_hash = SEED_CACHE._hash_images(gathered)
-                    # 计算参数哈希
-                    params_hash = SEED_CACHE._hash_params(**cache_params)
-                    # 生成缓存键
-                    cache_key = SEED_CACHE._generate_cache_key(seed, provider, instruction, image_hash, params_hash)
-
-                except Exception:
-                    pass  # 缓存键计算错误不影响主要功能
-
                 SEED_CACHE.set(
                     seed=seed,
                     provider=provider,
@@ -547,11 +568,6 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
                     result=(text, images_out, urls_out),
                     **cache_params
                 )
-                # 调试信息：记录缓存设置（已关闭）
-                # try:
-                #     print(f"[XISER LLM] 缓存设置成功，seed={seed}, provider={provider}, 当前缓存大小: {SEED_CACHE.size()}", file=sys.stderr)
-                # except:
-                #     pass
             except Exception:
                 # 缓存失败不影响主要功能
                 pass
@@ -562,7 +578,122 @@ class XIS_LLMOrchestratorV3(io.ComfyNode):
         return io.NodeOutput(
             text or "",      # response
             images_out,      # images
-            urls_out         # image_urls
+            urls_out,        # image_urls
+            [text or ""],    # responses
+        )
+
+    @classmethod
+    def _execute_batch(
+        cls,
+        provider: str,
+        provider_impl,
+        instruction: str,
+        image: Optional[torch.Tensor],
+        pack_images: Optional[List[torch.Tensor]],
+        api_key: str,
+        overrides: Dict[str, Any],
+        seed: int,
+        cache_enabled: bool,
+        cache_params: Dict[str, Any],
+        batch_separator: str,
+        max_concurrency: int,
+        node_id: str,
+    ) -> io.NodeOutput:
+        """批量模式：逐项检查缓存后，通过有界线程池并发调用提供者，结果按输入顺序返回"""
+        _update_progress("处理", 0.1, node_id=node_id)
+
+        instructions = _split_batch_instructions(instruction, batch_separator)
+        groups = _split_image_groups(pack_images)
+        shared_images = _gather_images(image, None)
+
+        item_count = max(len(instructions), len(groups))
+        if len(instructions) not in (1, item_count) or len(groups) not in (0, 1, item_count):
+            return _error_output(
+                f"Error: batch mode got {len(instructions)} instructions and {len(groups)} image groups; "
+                "counts must match, or one side must have a single entry."
+            )
+
+        # 组装批量项：单条指令或单个图像组广播到所有项
+        max_provider_images = provider_impl.config.max_images
+        items: List[Tuple[str, List[torch.Tensor]]] = []
+        for index in range(item_count):
+            item_instruction = instructions[index if len(instructions) > 1 else 0]
+            item_images = shared_images + (groups[index if len(groups) > 1 else 0] if groups else [])
+            if max_provider_images >= 0 and len(item_images) > max_provider_images:
+                item_images = item_images[:max_provider_images]
+            items.append((item_instruction, item_images))
+
+        # 派发前逐项检查缓存和验证输入
+        results: List[Optional[Tuple[str, List[torch.Tensor], List[str]]]] = [None] * item_count
+        pending: List[int] = []
+        for index, (item_instruction, item_images) in enumerate(items):
+            if cache_enabled:
+                cached_result = SEED_CACHE.get(
+                    seed=seed,
+                    provider=provider,
+                    instruction=item_instruction,
+                    images=item_images,
+                    **cache_params
+                )
+                if cached_result:
+                    results[index] = cached_result
+                    continue
+            validation_error = _validate_inputs(provider, item_instruction, item_images, overrides)
+            if validation_error:
+                results[index] = (f"Error: {validation_error}", [], [])
+                continue
+            pending.append(index)
+
+        _update_progress("验证", 0.8, node_id=node_id)
+
+        def run_item(index: int) -> Tuple[str, List[torch.Tensor], List[str]]:
+            item_instruction, item_images = items[index]
+            image_payloads = _encode_image_payloads(provider_impl, item_images)
+            return _invoke_provider(provider_impl, item_instruction, image_payloads, api_key, dict(overrides))
+
+        if pending:
+            # 并发上限同时受HTTP客户端的提供者级别限制约束
+            _update_progress("连接", 0.1, node_id=node_id)
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pending)))) as executor:
+                futures = {executor.submit(run_item, index): index for index in pending}
+                for completed, future in enumerate(as_completed(futures), start=1):
+                    index = futures[future]
+                    text, images, image_urls = future.result()
+                    images_out = images if images else [_dummy_image_tensor()]
+                    results[index] = (text, images_out, image_urls)
+
+                    if cache_enabled and _is_cacheable_text(text):
+                        try:
+                            SEED_CACHE.set(
+                                seed=seed,
+                                provider=provider,
+                                instruction=items[index][0],
+                                images=items[index][1],
+                                result=(text, images_out, image_urls),
+                                **cache_params
+                            )
+                        except Exception:
+                            # 缓存失败不影响主要功能
+                            pass
+
+                    _update_progress("连接", completed / len(pending), node_id=node_id)
+
+        # 按输入顺序展开结果
+        texts: List[str] = []
+        images_flat: List[torch.Tensor] = []
+        urls_flat: List[str] = []
+        for text, images, image_urls in results:
+            texts.append(text or "")
+            images_flat.extend(img for img in images if not _is_dummy_image(img))
+            urls_flat.extend(image_urls or [])
+
+        _update_progress("完成", 1.0, node_id=node_id)
+
+        return io.NodeOutput(
+            "\n\n".join(texts),                         # response
+            images_flat or [_dummy_image_tensor()],     # images
+            urls_flat,                                  # image_urls
+            texts,                                      # responses
         )
 
 
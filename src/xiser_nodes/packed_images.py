@@ -0,0 +1,264 @@
+"""Packed storage for ``pack_images``.
+
+``pack_images`` has always been a plain list of HWC RGBA tensors and every
+consumer treats it as one. :class:`PackedImages` keeps that contract - it is a
+``list`` whose items are views - but the pixels live in stacked
+``(N, H, W, C)`` buckets, with an index mapping each position to its bucket
+and row. Concatenating containers only joins their indexes, a bucket can be
+handed out as an image batch without stacking, and the content digest used
+for fingerprinting is cached on the container until a bucket is modified in
+place (tracked through the tensors' version counters). CPU buckets are hashed
+in full; buckets on other devices hash a fixed-size strided sample so a
+fingerprint never copies a whole GPU pack to host.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from .utils import logger
+
+# (bucket, row)
+IndexEntry = Tuple[int, int]
+
+# 非 CPU 桶参与摘要的采样元素数
+DEVICE_SAMPLE_SIZE = 4096
+
+
+def _bucket_bytes(bucket: torch.Tensor):
+    """Bytes hashed for one bucket: all of it on CPU, a strided sample elsewhere."""
+    data = bucket.detach()
+    if data.device.type != "cpu":
+        flat = data.reshape(-1)
+        step = max(1, flat.numel() // DEVICE_SAMPLE_SIZE)
+        data = flat[::step][:DEVICE_SAMPLE_SIZE].cpu()
+    return data.contiguous().reshape(-1).view(torch.uint8).numpy()
+
+
+class PackedImages(list):
+    """List of HWC image views backed by stacked per-size buckets."""
+
+    def __init__(self, buckets: Sequence[torch.Tensor] = (), index: Sequence[IndexEntry] = ()):
+        self.buckets: List[torch.Tensor] = list(buckets)
+        self.index: List[IndexEntry] = list(index)
+        super().__init__(self.buckets[bucket][row] for bucket, row in self.index)
+        self._views = tuple(self)
+        self._digest: Optional[str] = None
+        self._digest_key: Optional[tuple] = None
+        self._parts: Tuple["PackedImages", ...] = ()
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_batches(cls, batches: Iterable[torch.Tensor]) -> "PackedImages":
+        """Use each (N, H, W, C) batch as a bucket, in order (no copy)."""
+        buckets = [batch for batch in batches if batch.shape[0] > 0]
+        index = [(b, row) for b, batch in enumerate(buckets) for row in range(batch.shape[0])]
+        return cls(buckets, index)
+
+    @classmethod
+    def from_images(cls, images: Sequence[torch.Tensor], copy: bool = True) -> "PackedImages":
+        """
+        Pack HWC tensors. With ``copy`` equal-shaped images are stacked into
+        one bucket each; without it every image becomes a one-row view bucket.
+        """
+        if not copy:
+            return cls.from_batches(img.unsqueeze(0) for img in images)
+
+        groups: Dict[tuple, List[int]] = {}
+        for position, img in enumerate(images):
+            groups.setdefault((tuple(img.shape), img.dtype, img.device), []).append(position)
+        buckets, index = [], [None] * len(images)
+        for positions in groups.values():
+            for row, position in enumerate(positions):
+                index[position] = (len(buckets), row)
+            buckets.append(torch.stack([images[p] for p in positions]))
+        return cls(buckets, index)
+
+    @classmethod
+    def concat(cls, packs: Sequence["PackedImages"]) -> "PackedImages":
+        """Join containers by their indexes; buckets are shared, not copied."""
+        buckets, index = [], []
+        for pack in packs:
+            offset = len(buckets)
+            buckets.extend(pack.buckets)
+            index.extend((bucket + offset, row) for bucket, row in pack.index)
+        packed = cls(buckets, index)
+        packed._parts = tuple(packs)
+        return packed
+
+    # ------------------------------------------------------------------
+    # 访问
+    # ------------------------------------------------------------------
+    def is_intact(self) -> bool:
+        """False once the list has been modified in place and no longer matches the index."""
+        return len(self) == len(self._views) and all(a is b for a, b in zip(self, self._views))
+
+    def groups(self) -> List[Tuple[List[int], torch.Tensor]]:
+        """
+        Return ``(positions, batch)`` per bucket. ``batch`` is a slice of the
+        bucket when the rows are consecutive, otherwise a gathered copy.
+        """
+        rows: Dict[int, Tuple[List[int], List[int]]] = {}
+        for position, (bucket, row) in enumerate(self.index):
+            entry = rows.setdefault(bucket, ([], []))
+            entry[0].append(position)
+            entry[1].append(row)
+        groups = []
+        for bucket, (positions, bucket_rows) in rows.items():
+            tensor = self.buckets[bucket]
+            if bucket_rows == list(range(bucket_rows[0], bucket_rows[0] + len(bucket_rows))):
+                groups.append((positions, tensor[bucket_rows[0]:bucket_rows[0] + len(bucket_rows)]))
+            else:
+                groups.append((positions, tensor[torch.tensor(bucket_rows, device=tensor.device)]))
+        return groups
+
+    def as_batch(self) -> Optional[torch.Tensor]:
+        """The whole container as one (N, H, W, C) view when it is a single bucket in order."""
+        if len(self.buckets) == 1 and self.index == [(0, row) for row in range(self.buckets[0].shape[0])]:
+            return self.buckets[0]
+        return None
+
+    def _content_key(self) -> tuple:
+        # 视图与底层张量共享版本计数器，原地修改任一行都会改变该键
+        return tuple((bucket.data_ptr(), bucket._version) for bucket in self.buckets)
+
+    def digest(self) -> str:
+        """
+        SHA-256 of the index and bucket contents. After concat it is derived
+        from the parts' digests; otherwise it is cached until a bucket changes.
+        """
+        if self._parts:
+            hasher = hashlib.sha256()
+            for part in self._parts:
+                hasher.update(part.digest().encode("utf-8"))
+            return hasher.hexdigest()
+        key = self._content_key()
+        if self._digest is None or self._digest_key != key:
+            hasher = hashlib.sha256()
+            hasher.update(f"index:{self.index}".encode("utf-8"))
+            for bucket in self.buckets:
+                hasher.update(f"{tuple(bucket.shape)}:{bucket.dtype}:{bucket.device.type}".encode("utf-8"))
+                hasher.update(_bucket_bytes(bucket))
+            self._digest, self._digest_key = hasher.hexdigest(), key
+        return self._digest
+
+
+def as_packed(images: Optional[Sequence[torch.Tensor]], copy: bool = False) -> PackedImages:
+    """Return ``images`` if it is an unmodified container, otherwise pack it."""
+    if isinstance(images, PackedImages) and images.is_intact():
+        return images
+    return PackedImages.from_images(list(images or []), copy=copy)
+
+
+def normalize_pack_pair(img: torch.Tensor, mask: Optional[torch.Tensor], invert_mask: bool) -> torch.Tensor:
+    """
+    Normalize one image input (and optional mask) into a new RGBA bucket (N, H, W, 4).
+
+    A 64x64 all-zero mask counts as no mask; other masks are resized
+    bilinearly to the image, rescaled when outside [0, 1] and optionally
+    inverted before replacing the alpha channel.
+    """
+    if not isinstance(img, torch.Tensor):
+        logger.error(f"Invalid image type: expected torch.Tensor, got {type(img)}")
+        raise ValueError("All images must be torch.Tensor")
+
+    # 确保图像维度正确
+    if len(img.shape) == 3:  # (H, W, C)
+        img = img.unsqueeze(0)  # 转换为 (1, H, W, C)
+    elif len(img.shape) != 4:  # (N, H, W, C)
+        logger.error(f"Invalid image dimensions: {img.shape}")
+        raise ValueError(f"Image has invalid dimensions: {img.shape}")
+
+    if img.shape[-1] not in (3, 4):
+        logger.error(f"Image has invalid channels: {img.shape[-1]}")
+        raise ValueError(f"Image has invalid channels: {img.shape[-1]}")
+
+    batch_size, height, width, channels = img.shape
+    packed = torch.empty((batch_size, height, width, 4), dtype=img.dtype, device=img.device)
+    packed[..., :3] = img[..., :3]
+    if channels == 4:
+        packed[..., 3] = img[..., 3]
+    else:
+        packed[..., 3] = 1.0  # 默认全 1 Alpha 通道
+
+    if mask is None:
+        return packed
+
+    if not isinstance(mask, torch.Tensor):
+        logger.error(f"Invalid mask type: expected torch.Tensor, got {type(mask)}")
+        raise ValueError("Mask must be torch.Tensor")
+
+    # 确保蒙版维度正确
+    mask_dim = len(mask.shape)
+    if mask_dim == 2:  # (H, W)
+        mask = mask.unsqueeze(0)  # 转换为 (1, H, W)
+    elif mask_dim != 3:  # (N, H, W)
+        logger.error(f"Invalid mask dimensions: {mask.shape}")
+        raise ValueError(f"Mask has invalid dimensions: {mask.shape}")
+
+    for i in range(batch_size):
+        # 获取对应批次的蒙版
+        single_mask = mask[i] if mask.shape[0] > i else mask[0]
+
+        # 检查是否为 64x64 全 0 蒙版，视为无蒙版输入
+        if single_mask.shape == (64, 64) and torch.all(single_mask == 0):
+            continue
+
+        # 自动调整蒙版尺寸以匹配图像尺寸
+        if single_mask.shape != (height, width):
+            logger.info(f"Resizing mask from {single_mask.shape} to match image size {(height, width)}")
+            single_mask = F.interpolate(
+                single_mask.unsqueeze(0).unsqueeze(0),  # 转换为 (1, 1, H, W)
+                size=(height, width),
+                mode='bilinear',
+                align_corners=False
+            ).squeeze(0).squeeze(0)  # 转换回 (H, W)
+
+        alpha = single_mask
+        if alpha.max() > 1.0 or alpha.min() < 0.0:
+            alpha = (alpha - alpha.min()) / (alpha.max() - alpha.min() + 1e-8)  # 归一化到 [0,1]
+
+        # 如果 invert_mask 为 True，进行蒙版反转
+        if invert_mask:
+            alpha = 1.0 - alpha
+
+        packed[i, ..., 3] = alpha
+
+    return packed
+
+
+def build_pack(pack_images: Optional[Sequence[torch.Tensor]], image_mask_pairs: Sequence[tuple],
+               invert_mask: bool, before_pack_images: bool) -> PackedImages:
+    """
+    Shared body of the pack nodes: one bucket per image input, with the
+    incoming ``pack_images`` placed before or after them. Incoming pixels are
+    never copied - an intact container shares its buckets, a plain list is
+    wrapped in view buckets.
+    """
+    if pack_images is not None and not isinstance(pack_images, (list, tuple)):
+        logger.error(f"Invalid pack_images type: expected list or tuple, got {type(pack_images)}")
+        raise ValueError("pack_images must be a list or tuple")
+
+    new_images = PackedImages.from_batches(
+        normalize_pack_pair(img, mask, invert_mask) for img, mask in image_mask_pairs
+    )
+    if pack_images is None:
+        return new_images
+    existing = as_packed(pack_images)
+    # 默认行为：pack_images 在前，当前节点的图像在后
+    parts = [new_images, existing] if before_pack_images else [existing, new_images]
+    return PackedImages.concat(parts)
+
+
+__all__ = [
+    "PackedImages",
+    "as_packed",
+    "build_pack",
+    "normalize_pack_pair",
+]
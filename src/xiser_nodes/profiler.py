@@ -0,0 +1,299 @@
+"""Lightweight span profiler for XISER nodes.
+
+Spans record wall time, CPU time (of the calling thread) and memory per node
+and per stage; nested spans are aggregated under
+``"<parent>/<child>"`` names. Cache hit/miss counters and external stats
+sources (vision feature cache, HTTP latency histograms, model residency) are
+collected into the same snapshot, which the ``/xiser/metrics`` route serves
+as JSON or Prometheus text.
+
+Profiling is off by default and a disabled span is a shared no-op context
+manager, so instrumentation can stay in hot paths. Enable it with
+``XISER_PROFILE=1`` or ``POST /xiser/metrics {"enabled": true}``.
+
+Memory is reported as two separate figures:
+
+* ``cuda_bytes_allocated`` - bytes the CUDA caching allocator handed out
+  during the span (the delta of its cumulative ``allocated_bytes`` counter),
+  so temporaries freed before the span ends are counted too. The counter is
+  process-wide, so allocations of concurrently running spans are included.
+* ``python_bytes_retained`` - net growth of the Python heap as seen by
+  ``tracemalloc`` while it is tracing (``XISER_PROFILE=memory`` starts it).
+  torch's CPU allocator is invisible to ``tracemalloc``, so CPU tensors are
+  not counted here; this only shows Python objects left behind by a span.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import torch
+
+from .utils import logger
+
+
+class SpanStats:
+    """Aggregated timings of one span name."""
+
+    __slots__ = ("count", "wall", "cpu", "max_wall", "cuda_bytes", "python_bytes", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_wall = 0.0
+        self.cuda_bytes = 0
+        self.python_bytes = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "wall_seconds": round(self.wall, 6),
+            "cpu_seconds": round(self.cpu, 6),
+            "max_wall_seconds": round(self.max_wall, 6),
+            "mean_wall_seconds": round(self.wall / self.count, 6) if self.count else 0.0,
+            "cuda_bytes_allocated": self.cuda_bytes,
+            "python_bytes_retained": self.python_bytes,
+            "errors": self.errors,
+        }
+
+
+def _cuda_allocated_total() -> int:
+    """Cumulative bytes ever allocated through the CUDA caching allocator (0 without CUDA)."""
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        return torch.cuda.memory_stats().get("allocated_bytes.all.allocated", 0)
+    return 0
+
+
+def _python_traced_bytes() -> int:
+    """Python heap currently traced by ``tracemalloc`` (0 when not tracing)."""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+class SpanProfiler:
+    """Collects span timings, cache counters and external stats sources."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._spans: Dict[str, SpanStats] = {}
+        self._caches: Dict[str, List[int]] = {}
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        # 每个线程/异步任务各自的 span 嵌套栈
+        self._stack: contextvars.ContextVar = contextvars.ContextVar(f"xiser_span_stack_{id(self)}", default=())
+        self._started = time.time()
+
+    # ------------------------------------------------------------------
+    # 配置
+    # ------------------------------------------------------------------
+    def configure(self, enabled: Optional[bool] = None, trace_memory: Optional[bool] = None) -> None:
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if trace_memory is True and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif trace_memory is False and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._caches.clear()
+            self._started = time.time()
+
+    def register_source(self, name: str, source: Callable[[], Dict[str, Any]]) -> None:
+        """Add a callable whose dict result is included in every snapshot."""
+        self._sources[name] = source
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def span(self, name: str):
+        """Context manager timing ``name`` (nested under the current span)."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name: str) -> Iterator[None]:
+        stack = self._stack.get()
+        full_name = f"{stack[-1]}/{name}" if stack else name
+        token = self._stack.set(stack + (full_name,))
+        cuda_before = _cuda_allocated_total()
+        python_before = _python_traced_bytes()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            cuda_bytes = max(0, _cuda_allocated_total() - cuda_before)
+            python_bytes = max(0, _python_traced_bytes() - python_before)
+            self._stack.reset(token)
+            with self._lock:
+                stats = self._spans.get(full_name)
+                if stats is None:
+                    stats = self._spans[full_name] = SpanStats()
+                stats.count += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.max_wall = max(stats.max_wall, wall)
+                stats.cuda_bytes += cuda_bytes
+                stats.python_bytes += python_bytes
+                stats.errors += int(failed)
+
+    def profiled(self, name: Optional[str] = None) -> Callable:
+        """Decorator form of :meth:`span`; coroutine functions are awaited inside the span."""
+
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self._span(span_name):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(span_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record_cache(self, name: str, hit: bool) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self._caches.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def instrument_node(self, node_cls: type) -> type:
+        """Wrap a V3 node's ``execute`` classmethod in a span named after the node (idempotent)."""
+        execute = node_cls.__dict__.get("execute")
+        if not isinstance(execute, classmethod) or getattr(execute.__func__, "_xiser_profiled", False):
+            return node_cls
+        wrapped = self.profiled(node_cls.__name__)(execute.__func__)
+        wrapped._xiser_profiled = True
+        node_cls.execute = classmethod(wrapped)
+        return node_cls
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {name: stats.to_dict() for name, stats in sorted(self._spans.items())}
+            caches = {
+                name: {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+                for name, (hits, misses) in sorted(self._caches.items())
+            }
+        sources = {}
+        for name, source in list(self._sources.items()):
+            try:
+                sources[name] = source()
+            except Exception as e:
+                logger.debug("Metrics source %s failed: %s", name, e)
+        return {
+            "enabled": self.enabled,
+            "since": self._started,
+            "spans": spans,
+            "caches": caches,
+            "sources": sources,
+        }
+
+    def prometheus(self) -> str:
+        """Render the snapshot in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, samples: List[tuple], help_text: str = "") -> None:
+            if not samples:
+                return
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        spans = snap["spans"].items()
+        metric("xiser_span_calls_total", "counter", [({"span": n}, s["count"]) for n, s in spans])
+        metric("xiser_span_wall_seconds_total", "counter", [({"span": n}, s["wall_seconds"]) for n, s in spans])
+        metric("xiser_span_cpu_seconds_total", "counter", [({"span": n}, s["cpu_seconds"]) for n, s in spans])
+        metric("xiser_span_max_wall_seconds", "gauge", [({"span": n}, s["max_wall_seconds"]) for n, s in spans])
+        metric("xiser_span_cuda_bytes_allocated_total", "counter",
+               [({"span": n}, s["cuda_bytes_allocated"]) for n, s in spans],
+               "Bytes allocated by the CUDA caching allocator during the span, including freed temporaries.")
+        metric("xiser_span_python_bytes_retained_total", "counter",
+               [({"span": n}, s["python_bytes_retained"]) for n, s in spans],
+               "Net Python heap growth seen by tracemalloc; torch CPU tensors are not counted.")
+        metric("xiser_span_errors_total", "counter", [({"span": n}, s["errors"]) for n, s in spans])
+        caches = snap["caches"].items()
+        metric("xiser_cache_hits_total", "counter", [({"cache": n}, c["hits"]) for n, c in caches])
+        metric("xiser_cache_misses_total", "counter", [({"cache": n}, c["misses"]) for n, c in caches])
+
+        # 外部来源中的数值字段按 xiser_<来源>{key="a.b"} 导出
+        for source, values in snap["sources"].items():
+            samples = [({"key": key}, value) for key, value in _flatten_numbers(values)]
+            metric(f"xiser_{_metric_name(source)}", "gauge", samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _flatten_numbers(values: Any, prefix: str = "") -> Iterator[tuple]:
+    if isinstance(values, dict):
+        for key, value in values.items():
+            yield from _flatten_numbers(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(values, bool):
+        yield prefix, int(values)
+    elif isinstance(values, (int, float)):
+        yield prefix, values
+
+
+def _profile_mode() -> str:
+    return os.environ.get("XISER_PROFILE", "").strip().lower()
+
+
+# 全局共享实例
+PROFILER = SpanProfiler(enabled=_profile_mode() not in ("", "0", "false", "no"))
+if _profile_mode() == "memory":
+    PROFILER.configure(trace_memory=True)
+
+
+__all__ = [
+    "PROFILER",
+    "SpanProfiler",
+    "SpanStats",
+]
@@ -2,7 +2,6 @@ import os
 import torch
 import numpy as np
 from PIL import Image
-from psd_tools import PSDImage
 import folder_paths
 import logging
 import shutil
@@ -99,6 +98,9 @@ class XIS_PSDLayerExtractorV3(io.ComfyNode):
 
         # 加载 PSD 文件
         try:
+            # psd_tools导入较慢，仅在执行时加载
+            from psd_tools import PSDImage
+
             psd = PSDImage.open(file_path)
             logger.debug(f"Loaded PSD file: {file_path}, canvas size: ({psd.width}, {psd.height})")
         except Exception as e:
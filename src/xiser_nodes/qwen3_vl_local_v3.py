@@ -6,8 +6,10 @@ import torch
 import os
 from comfy_execution.utils import get_executing_context
 
-from .llm.base import _gather_images, _image_to_base64
-from .llm.providers_qwen_local import Qwen3VLLocalProvider
+from .llm.base import _encode_image_payloads, _gather_images, _split_batch_instructions, _split_image_groups
+from .llm.providers_qwen_local import Qwen3VLLocalProvider, is_interrupt_exception
+from .llm.quantization import PROFILE_CHOICES
+from .llm.residency import QWEN_VL_RESIDENCY
 from .utils import logger
 
 # Import folder_paths for ComfyUI model directory management
@@ -43,6 +45,11 @@ def _update_progress(stage: str, progress: float, total_stages: int = 6, node_id
     ProgressManager.update_progress_for_qwen_vl(stage, progress, node_id)
 
 
+def _text_output(text: str, responses: Optional[List[str]] = None) -> io.NodeOutput:
+    """返回文本输出：response为单条文本，responses为文本列表"""
+    return io.NodeOutput(text, responses if responses is not None else [text])
+
+
 class XIS_QwenVLInferenceV3(io.ComfyNode):
     """Qwen3-VL Local Node - V3 version
 
@@ -119,6 +126,13 @@ Generation parameters: temperature (0-2), top_p (0-1), max_tokens (16-16384), et
                     optional=True,
                     tooltip="Model precision: auto (automatic selection), bfloat16 (GPU recommended), float16, float32"
                 ),
+                io.Combo.Input(
+                    "quantization",
+                    options=PROFILE_CHOICES,
+                    default="none",
+                    optional=True,
+                    tooltip="Loading profile: none (use dtype), auto (pick the highest precision that fits free memory), bf16, fp16, int8, nf4 (int8/nf4 need bitsandbytes on CUDA; int8 on CPU uses dynamic quantization)"
+                ),
                 io.Boolean.Input(
                     "flash_attention_2",
                     default=False,
@@ -199,11 +213,70 @@ Generation parameters: temperature (0-2), top_p (0-1), max_tokens (16-16384), et
                     "enable_cache",
                     default=True,
                     optional=True,
-                    tooltip="Enable model caching to avoid repeated loading"
+                    tooltip="Keep the model loaded between runs (it is still released after the idle timeout or when VRAM is needed); disable to unload after each run"
+                ),
+                io.Boolean.Input(
+                    "vision_cache",
+                    default=True,
+                    optional=True,
+                    tooltip="Cache vision encoder outputs per image; repeated images with new prompts skip the visual encoder"
+                ),
+                io.Int.Input(
+                    "vision_cache_mb",
+                    default=1024,
+                    min=64,
+                    max=16384,
+                    step=64,
+                    optional=True,
+                    tooltip="VRAM budget (MB) for cached vision features; overflow is moved to system memory"
+                ),
+                io.Boolean.Input(
+                    "stream",
+                    default=True,
+                    optional=True,
+                    tooltip="Stream partial text to the node while generating; interrupting the prompt stops generation immediately"
+                ),
+                io.String.Input(
+                    "stop_strings",
+                    default="",
+                    multiline=True,
+                    optional=True,
+                    tooltip="Stop strings, one per line; generation ends at the first match and the output is cut before it"
+                ),
+                io.Boolean.Input(
+                    "batch_mode",
+                    default=False,
+                    optional=True,
+                    tooltip="Batch mode: split instruction by the separator, treat each pack_images frame (or list entry) as one image group, and run all items through batched generation. A single instruction or image group is broadcast to every item; results keep input order"
+                ),
+                io.String.Input(
+                    "batch_separator",
+                    default="\\n",
+                    optional=True,
+                    tooltip="Separator used to split instruction in batch mode (\\n means newline)"
+                ),
+                io.Int.Input(
+                    "max_batch_size",
+                    default=8,
+                    min=1,
+                    max=64,
+                    step=1,
+                    optional=True,
+                    tooltip="Maximum number of conversations per generate call in batch mode"
+                ),
+                io.Int.Input(
+                    "max_batch_tokens",
+                    default=32768,
+                    min=1024,
+                    max=1048576,
+                    step=1024,
+                    optional=True,
+                    tooltip="Token budget per generate call in batch mode: rows x (prompt tokens + max_tokens)"
                 ),
             ],
             outputs=[
                 io.String.Output("response", display_name="Model Response"),
+                io.String.Output("responses", display_name="Model Responses", is_output_list=True),
             ]
         )
 
@@ -217,6 +290,7 @@ Generation parameters: temperature (0-2), top_p (0-1), max_tokens (16-16384), et
         system_prompt: str = "You are Qwen3-VL, a helpful vision-language assistant.",
         device: str = "auto",
         dtype: str = "auto",
+        quantization: str = "none",
         flash_attention_2: bool = False,
         trust_remote_code: bool = True,
         temperature: float = 0.7,
@@ -227,6 +301,14 @@ Generation parameters: temperature (0-2), top_p (0-1), max_tokens (16-16384), et
         presence_penalty: float = 1.5,
         seed: int = 42,
         enable_cache: bool = True,
+        vision_cache: bool = True,
+        vision_cache_mb: int = 1024,
+        stream: bool = True,
+        stop_strings: str = "",
+        batch_mode: bool = False,
+        batch_separator: str = "\\n",
+        max_batch_size: int = 8,
+        max_batch_tokens: int = 32768,
     ) -> io.NodeOutput:
         """执行Qwen3-VL本地推理"""
         # 获取节点ID用于进度更新
@@ -271,7 +353,7 @@ Generation parameters: temperature (0-2), top_p (0-1), max_tokens (16-16384), et
                 from packaging import version
                 TRANSFORMERS_VERSION = getattr(transformers, "__version__", "0.0.0")
                 if version.parse(TRANSFORMERS_VERSION) < version.parse("4.57.0"):
-                    return io.NodeOutput(f"""Error: Transformers version {TRANSFORMERS_VERSION} is too old for Qwen3-VL.
+                    return _text_output(f"""Error: Transformers version {TRANSFORMERS_VERSION} is too old for Qwen3-VL.
 
 Qwen3-VL requires transformers >= 4.57.0. Please upgrade:
 
@@ -283,7 +365,7 @@ Qwen3-VL requires transformers >= 4.57.0. Please upgrade:
 
 For full dependency list, see extension documentation.""")
             except ImportError:
-                return io.NodeOutput("""Error: Transformers library not available.
+                return _text_output("""Error: Transformers library not available.
 
 Qwen3-VL requires additional dependencies. To install:
 
@@ -296,7 +378,7 @@ Qwen3-VL requires additional dependencies. To install:
 For more details, see the extension documentation.""")
             except Exception as e:
                 # 可能是版本不兼容或其他导入错误
-                return io.NodeOutput(f"""Error: Failed to import Qwen3-VL modules.
+                return _text_output(f"""Error: Failed to import Qwen3-VL modules.
 
 Full error: {str(e)}
 
@@ -310,26 +392,8 @@ This may require transformers >= 4.57.0. Please install/upgrade dependencies:
 
 For more details, see the extension documentation.""")
 
-            # 进度：收集图像
-            _update_progress("准备", 0.3, node_id=node_id)
-
-            # 收集图像
-            gathered = _gather_images(image, pack_images)
-            if len(gathered) > MAX_IMAGES:
-                gathered = gathered[:MAX_IMAGES]
-                logger.warning(f"Too many images ({len(gathered)}), keeping first {MAX_IMAGES}")
-
-            if not gathered and not instruction.strip():
-                return io.NodeOutput("Error: at least one image or instruction is required.")
-
-            # 转换图像为Base64
-            image_payloads = [_image_to_base64(img) for img in gathered]
-
-            # 进度：数据处理完成
-            _update_progress("准备", 0.5, node_id=node_id)
-
-            # 创建提供者实例
-            provider = Qwen3VLLocalProvider()
+            # 使用常驻管理器中的共享提供者，模型在多次执行间保持加载
+            provider = QWEN_VL_RESIDENCY.provider
 
             # 构建覆盖参数
             overrides: Dict[str, Any] = {
@@ -337,6 +401,7 @@ For more details, see the extension documentation.""")
                 "system_prompt": system_prompt,
                 "device": device,
                 "dtype": dtype,
+                "quantization": quantization,
                 "flash_attention_2": flash_attention_2,
                 "trust_remote_code": trust_remote_code,
                 "temperature": temperature,
@@ -346,11 +411,12 @@ For more details, see the extension documentation.""")
                 "repetition_penalty": repetition_penalty,
                 "presence_penalty": presence_penalty,
                 "seed": seed if seed >= 0 else None,
+                "vision_cache": vision_cache,
+                "vision_cache_mb": vision_cache_mb,
+                "stream": stream,
+                "stop_strings": [line for line in stop_strings.splitlines() if line.strip()],
             }
 
-            # 进度：加载模型阶段
-            _update_progress("加载模型", 0.1, node_id=node_id)
-
             # 创建进度回调函数
             def progress_callback(stage: str, progress: float):
                 if stage == "准备":
@@ -364,26 +430,145 @@ For more details, see the extension documentation.""")
                 elif stage == "完成":
                     _update_progress("完成", 1.0, node_id=node_id)
 
+            if batch_mode:
+                return cls._execute_batch(
+                    provider=provider,
+                    instruction=instruction,
+                    image=image,
+                    pack_images=pack_images,
+                    overrides=overrides,
+                    batch_separator=batch_separator,
+                    max_batch_size=max_batch_size,
+                    max_batch_tokens=max_batch_tokens,
+                    progress_callback=progress_callback,
+                    keep_loaded=enable_cache,
+                    node_id=node_id,
+                )
+
+            # 进度：收集图像
+            _update_progress("准备", 0.3, node_id=node_id)
+
+            # 收集图像
+            gathered = _gather_images(image, pack_images)
+            if len(gathered) > MAX_IMAGES:
+                gathered = gathered[:MAX_IMAGES]
+                logger.warning(f"Too many images ({len(gathered)}), keeping first {MAX_IMAGES}")
+
+            if not gathered and not instruction.strip():
+                return _text_output("Error: at least one image or instruction is required.")
+
+            # 本地推理直接传递uint8数组，跳过PNG/base64编解码
+            image_payloads = _encode_image_payloads(provider, gathered)
+
+            # 进度：数据处理完成
+            _update_progress("准备", 0.5, node_id=node_id)
+
+            # 进度：加载模型阶段
+            _update_progress("加载模型", 0.1, node_id=node_id)
+
             try:
                 # 调用提供者（本地推理）
                 # 对于本地提供者，api_key参数不是必需的
-                response = provider.invoke(instruction, image_payloads, "", overrides, progress_callback)
+                # 流式回调：推送部分文本，并按已生成token数更新推理进度
+                def stream_callback(text: str, token_count: int):
+                    ProgressManager.send_partial_text(text, node_id)
+                    _update_progress("推理", min(token_count / max(max_tokens, 1), 1.0), node_id=node_id)
+
+                try:
+                    with QWEN_VL_RESIDENCY.use(overrides):
+                        response = provider.invoke(
+                            instruction, image_payloads, "", overrides, progress_callback, stream_callback=stream_callback
+                        )
+                finally:
+                    # 关闭模型缓存时执行后立即释放显存
+                    if not enable_cache:
+                        QWEN_VL_RESIDENCY.unload("enable_cache disabled")
 
                 # 提取文本响应
                 text = provider.extract_text(response)
+                if stream:
+                    ProgressManager.send_partial_text(text or "", node_id, done=True)
 
                 # 进度：完成
                 _update_progress("完成", 1.0, node_id=node_id)
 
-                return io.NodeOutput(text or "")
+                return _text_output(text or "")
 
             except Exception as exc:
+                if is_interrupt_exception(exc):
+                    raise
                 logger.error(f"Qwen3-VL local inference failed: {exc}")
-                return io.NodeOutput(f"Error: {exc}")
+                return _text_output(f"Error: {exc}")
 
         except Exception as exc:
+            # ComfyUI中断需要继续抛出，由执行器终止队列
+            if is_interrupt_exception(exc):
+                raise
             logger.error(f"Qwen3-VL node execution error: {exc}")
-            return io.NodeOutput(f"Error: {exc}")
+            return _text_output(f"Error: {exc}")
+
+
+    @classmethod
+    def _execute_batch(
+        cls,
+        provider: Qwen3VLLocalProvider,
+        instruction: str,
+        image: Optional[torch.Tensor],
+        pack_images: Optional[List[torch.Tensor]],
+        overrides: Dict[str, Any],
+        batch_separator: str,
+        max_batch_size: int,
+        max_batch_tokens: int,
+        progress_callback,
+        keep_loaded: bool,
+        node_id: str,
+    ) -> io.NodeOutput:
+        """批量模式：将多条指令/图像组合并为批次，一次generate处理多条对话，结果按输入顺序返回"""
+        _update_progress("准备", 0.3, node_id=node_id)
+
+        instructions = _split_batch_instructions(instruction, batch_separator)
+        groups = _split_image_groups(pack_images)
+        shared_images = _gather_images(image, None)
+
+        item_count = max(len(instructions), len(groups))
+        if item_count == 0:
+            return _text_output("Error: at least one image or instruction is required.")
+        if len(instructions) not in (1, item_count) or len(groups) not in (0, 1, item_count):
+            return _text_output(
+                f"Error: batch mode got {len(instructions)} instructions and {len(groups)} image groups; "
+                "counts must match, or one side must have a single entry."
+            )
+
+        # 组装批量项：单条指令或单个图像组广播到所有项
+        items = []
+        for index in range(item_count):
+            item_instruction = instructions[index if len(instructions) > 1 else 0]
+            item_images = shared_images + (groups[index if len(groups) > 1 else 0] if groups else [])
+            if len(item_images) > MAX_IMAGES:
+                logger.warning(f"Batch item {index} has {len(item_images)} images, keeping first {MAX_IMAGES}")
+                item_images = item_images[:MAX_IMAGES]
+            items.append((item_instruction, _encode_image_payloads(provider, item_images)))
+
+        _update_progress("加载模型", 0.1, node_id=node_id)
+
+        try:
+            with QWEN_VL_RESIDENCY.use(overrides):
+                responses = provider.invoke_batch(
+                    items,
+                    overrides,
+                    max_batch_size=max_batch_size,
+                    max_batch_tokens=max_batch_tokens,
+                    progress_callback=progress_callback,
+                )
+        finally:
+            if not keep_loaded:
+                QWEN_VL_RESIDENCY.unload("enable_cache disabled")
+        texts = [provider.extract_text(response) or "" for response in responses]
+
+        _update_progress("完成", 1.0, node_id=node_id)
+
+        # response输出为所有结果以空行拼接，responses为逐项列表
+        return _text_output("\n\n".join(texts), texts)
 
 
 # V3节点类列表
@@ -8,7 +8,7 @@ import torch.nn.functional as F
 import numpy as np
 from typing import Optional, Tuple, Union, List
 import math
-from .utils import standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger
+from .utils import standardize_tensor, hex_to_rgb, resize_tensor, INTERPOLATION_MODES, logger, lazy_node_mappings
 
 INTERPOLATION_MODES = {
     "nearest": "nearest",
@@ -78,7 +78,16 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
                            tooltip="手动指定高度"),
                 io.String.Input("fill_hex",
                               default="#000000",
-                              tooltip="填充颜色（HEX格式）")
+                              tooltip="填充颜色（HEX格式）"),
+                io.Boolean.Input("antialias",
+                               default=False,
+                               optional=True,
+                               tooltip="缩小时抗锯齿（bilinear/bicubic 有效）"),
+                io.Combo.Input("device",
+                             options=["cpu", "gpu"],
+                             default="cpu",
+                             optional=True,
+                             tooltip="缩放计算设备，GPU 不可用或显存不足时自动回退到 CPU")
             ],
             outputs=[
                 io.Image.Output(display_name="resized_image", is_output_list=True),  # 第一个输出是列表
@@ -94,7 +103,8 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
                 image: Optional[torch.Tensor] = None, mask: Optional[torch.Tensor] = None,
                 pack_images: Optional[List[torch.Tensor]] = None,
                 reference_image: Optional[torch.Tensor] = None, manual_width: Optional[int] = None,
-                manual_height: Optional[int] = None, fill_hex: str = "#000000") -> io.NodeOutput:
+                manual_height: Optional[int] = None, fill_hex: str = "#000000",
+                antialias: bool = False, device: str = "cpu") -> io.NodeOutput:
         """
         调整图像或蒙版的尺寸，并返回调整后的图像、蒙版以及实际的宽度和高度。
 
@@ -110,6 +120,8 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
             manual_width (Optional[int]): 手动指定的目标宽度
             manual_height (Optional[int]): 手动指定的目标高度
             fill_hex (str): 填充颜色，十六进制格式
+            antialias (bool): 缩小时是否抗锯齿
+            device (str): 缩放计算设备（"cpu" 或 "gpu"）
 
         Returns:
             io.NodeOutput: (调整后的图像列表, 调整后的蒙版, 输出宽度, 输出高度, 调整后的图像包)
@@ -135,8 +147,6 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
                 reference_image, manual_width, manual_height
             )
 
-            # 处理每个 pack_images 中的图像
-            resized_pack_images = []
             for img in pack_images:
                 if not isinstance(img, torch.Tensor):
                     logger.error(f"Invalid image type in pack_images: expected torch.Tensor, got {type(img)}")
@@ -152,21 +162,14 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
                     logger.error(f"Invalid channel count in pack_images: {img.shape[-1]}, expected 3 or 4")
                     raise ValueError("Each pack_images item must have 3 or 4 channels")
 
-                # 转换为 4D 张量用于处理
-                img_4d = img.unsqueeze(0)  # (1, H, W, C)
-
-                # 使用现有的图像处理逻辑
-                processed_img = cls._process_single_image(
-                    img_4d, resize_mode, scale_condition, interpolation, min_unit,
-                    target_width, target_height, fill_hex
-                )
-
-                if processed_img is not None:
-                    # 转换回 3D 张量
-                    resized_img_3d = processed_img.squeeze(0)
-                    resized_pack_images.append(resized_img_3d)
-                    # 添加到所有图像列表中（保持为4D张量）
-                    all_resized_images.append(processed_img)
+            # 按尺寸分桶批量缩放，结果按原顺序返回
+            processed = cls._process_pack_images(
+                list(pack_images), resize_mode, scale_condition, interpolation, max(1, min_unit),
+                target_width, target_height, fill_hex, antialias, device
+            )
+            resized_pack_images = [img.squeeze(0) for img in processed]
+            # 添加到所有图像列表中（保持为4D张量）
+            all_resized_images.extend(processed)
         else:
             logger.debug(f"pack_images is None or empty: {pack_images is None}, length: {len(pack_images) if pack_images is not None else 0}")
 
@@ -178,14 +181,7 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
         min_unit = max(1, min_unit)
 
         # 获取目标尺寸
-        if reference_image is not None:
-            if reference_image.dim() != 4:
-                raise ValueError(f"reference_image must be 4D [B, H, W, C], got {reference_image.shape}")
-            target_width, target_height = reference_image.shape[2], reference_image.shape[1]
-        elif manual_width is not None and manual_height is not None:
-            target_width, target_height = manual_width, manual_height
-        else:
-            raise ValueError("Must provide either reference_image or both manual_width and manual_height")
+        target_width, target_height = cls._get_target_size(reference_image, manual_width, manual_height)
 
         raw_target_width, raw_target_height = target_width, target_height
         target_pixels = max(1, raw_target_width * raw_target_height)
@@ -195,105 +191,11 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
         target_height = max(1, (target_height + min_unit - 1) // min_unit * min_unit)
         base_fill_rgb = hex_to_rgb(fill_hex)
 
-        def get_fill_color(num_channels: int, device, dtype):
-            """Return fill color aligned to channel count (keep alpha if present)."""
-            base = base_fill_rgb.to(device=device, dtype=dtype)
-            if num_channels == base.numel():
-                return base
-            if num_channels == 4 and base.numel() == 3:
-                # Default to transparent alpha for RGBA to preserve transparency
-                return torch.cat([base, torch.zeros(1, device=device, dtype=dtype)])
-            if base.numel() == 1:
-                return base.expand(num_channels)
-            return torch.cat([base, torch.zeros(max(0, num_channels - base.numel()), device=device, dtype=dtype)])
-
         def compute_size(orig_w: int, orig_h: int) -> Tuple[int, int, int, int]:
-            """
-            计算调整后的尺寸和偏移量。
-
-            Args:
-                orig_w (int): 原始宽度
-                orig_h (int): 原始高度
-
-            Returns:
-                Tuple[int, int, int, int]: (调整宽度, 调整高度, x偏移, y偏移)
-            """
-            aspect = orig_w / orig_h
-            if resize_mode == "force_resize":
-                return target_width, target_height, 0, 0
-            elif resize_mode in ["scale_proportionally", "limited_by_canvas"]:
-                if target_width / target_height > aspect:
-                    h = target_height
-                    w = int(h * aspect)
-                else:
-                    w = target_width
-                    h = int(w / aspect)
-                w = (w + min_unit - 1) // min_unit * min_unit
-                h = (h + min_unit - 1) // min_unit * min_unit
-                return w, h, (target_width - w) // 2, (target_height - h) // 2
-            elif resize_mode == "fill_the_canvas":
-                if target_width / target_height < aspect:
-                    h = target_height
-                    w = int(h * aspect)
-                else:
-                    w = target_width
-                    h = int(w / aspect)
-                w = (w + min_unit - 1) // min_unit * min_unit
-                h = (h + min_unit - 1) // min_unit * min_unit
-                return w, h, (w - target_width) // 2, (h - target_height) // 2
-            elif resize_mode == "total_pixels":
-                orig_pixels = max(1, orig_w * orig_h)
-                desired_pixels = target_pixels
-                base_scale = math.sqrt(desired_pixels / orig_pixels)
-                ideal_w = orig_w * base_scale
-
-                def align_to_unit(value: float) -> int:
-                    return max(min_unit, int(round(value / min_unit)) * min_unit)
-
-                candidates = []
-                base_w_aligned = align_to_unit(ideal_w)
-                # Explore small neighborhood to find closest pixel count while keeping aspect
-                for step in (-2, -1, 0, 1, 2):
-                    w_candidate = max(min_unit, base_w_aligned + step * min_unit)
-                    h_candidate = align_to_unit(w_candidate / aspect)
-                    pixels = w_candidate * h_candidate
-                    aspect_diff = abs((w_candidate / h_candidate) - aspect)
-                    candidates.append((abs(pixels - desired_pixels), aspect_diff, w_candidate, h_candidate))
-
-                candidates.sort(key=lambda x: (x[0], x[1]))
-                _, _, w, h = candidates[0]
-                return w, h, 0, 0
+            return cls._compute_size(resize_mode, min_unit, target_width, target_height, target_pixels, orig_w, orig_h)
 
         def should_resize(orig_w: int, orig_h: int, target_w: int, target_h: int) -> bool:
-            """
-            判断是否需要调整尺寸。
-
-            Args:
-                orig_w (int): 原始宽度
-                orig_h (int): 原始高度
-                target_w (int): 目标宽度
-                target_h (int): 目标高度
-
-            Returns:
-                bool: 是否需要调整尺寸
-            """
-            if resize_mode == "total_pixels":
-                orig_pixels = orig_w * orig_h
-                desired_pixels = target_pixels
-                if scale_condition == "always":
-                    return True
-                elif scale_condition == "downscale_only":
-                    return orig_pixels > desired_pixels
-                elif scale_condition == "upscale_only":
-                    return orig_pixels < desired_pixels
-            else:
-                if scale_condition == "always":
-                    return True
-                elif scale_condition == "downscale_only":
-                    return orig_w > target_w or orig_h > target_h
-                elif scale_condition == "upscale_only":
-                    return orig_w < target_w or orig_h < target_h
-            return False
+            return cls._should_resize(resize_mode, scale_condition, orig_w, orig_h, target_w, target_h, target_pixels)
 
         resized_img = None
         final_width, final_height = target_width, target_height  # 默认值
@@ -302,23 +204,12 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
             if image.dim() != 4:
                 raise ValueError(f"Image must be 4D [B, H, W, C], got {image.shape}")
             batch_size, orig_h, orig_w, channels = image.shape
-            fill_color = get_fill_color(channels, image.device, image.dtype)
+            fill_color = cls._fill_color(base_fill_rgb, channels, image.device, image.dtype)
 
             if should_resize(orig_w, orig_h, target_width, target_height):
                 w, h, offset_x, offset_y = compute_size(orig_w, orig_h)
-                resized_img = resize_tensor(image, (h, w), INTERPOLATION_MODES[interpolation])
-                if resize_mode == "limited_by_canvas":
-                    output = torch.full((batch_size, target_height, target_width, channels), 0, device=image.device, dtype=image.dtype)
-                    output.copy_(fill_color.view(1, 1, 1, -1).expand(batch_size, target_height, target_width, channels))
-                    output[:, offset_y:offset_y+h, offset_x:offset_x+w] = resized_img
-                    resized_img = output
-                elif resize_mode == "fill_the_canvas":
-                    output = torch.zeros(batch_size, target_height, target_width, channels, device=image.device, dtype=image.dtype)
-                    y_start, y_end = max(0, offset_y), min(h, offset_y + target_height)
-                    x_start, x_end = max(0, offset_x), min(w, offset_x + target_width)
-                    out_h, out_w = y_end - y_start, x_end - x_start
-                    output[:, :out_h, :out_w] = resized_img[:, y_start:y_start+out_h, x_start:x_start+out_w]
-                    resized_img = output
+                resized_img = cls._resize(image, (h, w), interpolation, antialias, device)
+                resized_img = cls._place(resized_img, resize_mode, target_width, target_height, offset_x, offset_y, fill_color)
                 resized_img.clamp_(0, 1)
             else:
                 resized_img = image
@@ -339,18 +230,10 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
 
             if should_resize(orig_w, orig_h, target_width, target_height):
                 w, h, offset_x, offset_y = compute_size(orig_w, orig_h)
-                resized_mask = resize_tensor(mask_input.unsqueeze(-1), (h, w), INTERPOLATION_MODES[interpolation]).squeeze(-1)
-                if resize_mode == "limited_by_canvas":
-                    output = torch.full((batch_size, target_height, target_width), mask_fill_value, device=mask.device, dtype=mask.dtype)
-                    output[:, offset_y:offset_y+h, offset_x:offset_x+w] = resized_mask
-                    resized_mask = output
-                elif resize_mode == "fill_the_canvas":
-                    output = torch.zeros(batch_size, target_height, target_width, device=mask.device, dtype=mask.dtype)
-                    y_start, y_end = max(0, offset_y), min(h, offset_y + target_height)
-                    x_start, x_end = max(0, offset_x), min(w, offset_x + target_width)
-                    out_h, out_w = y_end - y_start, x_end - x_start
-                    output[:, :out_h, :out_w] = resized_mask[:, y_start:y_start+out_h, x_start:x_start+out_w]
-                    resized_mask = output
+                resized_mask = cls._resize(mask_input.unsqueeze(-1), (h, w), interpolation, antialias, device)
+                resized_mask = cls._place(
+                    resized_mask, resize_mode, target_width, target_height, offset_x, offset_y, mask_fill_value.view(1)
+                ).squeeze(-1)
                 resized_mask.clamp_(0, 1)
             else:
                 resized_mask = mask_input
@@ -372,10 +255,10 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
                     if mask_for_resize.dim() == 3:
                         mask_for_resize = mask_for_resize.unsqueeze(-1)
 
-                    resized_mask = resize_tensor(
+                    resized_mask = cls._resize(
                         mask_for_resize,
                         (resized_img.shape[1], resized_img.shape[2]),
-                        INTERPOLATION_MODES[interpolation]
+                        interpolation, antialias, device
                     ).squeeze(-1)
 
                     if squeeze_batch:
@@ -422,141 +305,198 @@ class XIS_ResizeImageOrMaskV3(io.ComfyNode):
             raise ValueError("Must provide either reference_image or both manual_width and manual_height")
         return target_width, target_height
 
-    @classmethod
-    def _process_single_image(cls, image: torch.Tensor, resize_mode: str, scale_condition: str, interpolation: str,
-                            min_unit: int, target_width: int, target_height: int, fill_hex: str) -> Optional[torch.Tensor]:
-        """处理单个图像"""
-        if image.dim() != 4:
-            raise ValueError(f"Image must be 4D [B, H, W, C], got {image.shape}")
-
-        batch_size, orig_h, orig_w, channels = image.shape
-        base_fill_rgb = hex_to_rgb(fill_hex)
+    @staticmethod
+    def _fill_color(base_fill_rgb: torch.Tensor, num_channels: int, device, dtype) -> torch.Tensor:
+        """Return fill color aligned to channel count (keep alpha if present)."""
+        base = base_fill_rgb.to(device=device, dtype=dtype)
+        if num_channels == base.numel():
+            return base
+        if num_channels == 4 and base.numel() == 3:
+            # Default to transparent alpha for RGBA to preserve transparency
+            return torch.cat([base, torch.zeros(1, device=device, dtype=dtype)])
+        if base.numel() == 1:
+            return base.expand(num_channels)
+        return torch.cat([base, torch.zeros(max(0, num_channels - base.numel()), device=device, dtype=dtype)])
+
+    @staticmethod
+    def _compute_size(resize_mode: str, min_unit: int, target_width: int, target_height: int,
+                      target_pixels: int, orig_w: int, orig_h: int) -> Tuple[int, int, int, int]:
+        """
+        计算调整后的尺寸和偏移量。
 
-        def get_fill_color(num_channels: int, device, dtype):
-            """Return fill color aligned to channel count (keep alpha if present)."""
-            base = base_fill_rgb.to(device=device, dtype=dtype)
-            if num_channels == base.numel():
-                return base
-            if num_channels == 4 and base.numel() == 3:
-                # Default to transparent alpha for RGBA to preserve transparency
-                return torch.cat([base, torch.zeros(1, device=device, dtype=dtype)])
-            if base.numel() == 1:
-                return base.expand(num_channels)
-            return torch.cat([base, torch.zeros(max(0, num_channels - base.numel()), device=device, dtype=dtype)])
+        Args:
+            resize_mode (str): 调整模式
+            min_unit (int): 最小单位尺寸
+            target_width (int): 目标宽度
+            target_height (int): 目标高度
+            target_pixels (int): total_pixels 模式的目标像素数
+            orig_w (int): 原始宽度
+            orig_h (int): 原始高度
 
-        def compute_size(orig_w: int, orig_h: int) -> Tuple[int, int, int, int]:
-            """
-            计算调整后的尺寸和偏移量。
-
-            Args:
-                orig_w (int): 原始宽度
-                orig_h (int): 原始高度
-
-            Returns:
-                Tuple[int, int, int, int]: (调整宽度, 调整高度, x偏移, y偏移)
-            """
-            aspect = orig_w / orig_h
-            if resize_mode == "force_resize":
-                return target_width, target_height, 0, 0
-            elif resize_mode in ["scale_proportionally", "limited_by_canvas"]:
-                if target_width / target_height > aspect:
-                    h = target_height
-                    w = int(h * aspect)
-                else:
-                    w = target_width
-                    h = int(w / aspect)
-                w = (w + min_unit - 1) // min_unit * min_unit
-                h = (h + min_unit - 1) // min_unit * min_unit
-                return w, h, (target_width - w) // 2, (target_height - h) // 2
-            elif resize_mode == "fill_the_canvas":
-                if target_width / target_height < aspect:
-                    h = target_height
-                    w = int(h * aspect)
-                else:
-                    w = target_width
-                    h = int(w / aspect)
-                w = (w + min_unit - 1) // min_unit * min_unit
-                h = (h + min_unit - 1) // min_unit * min_unit
-                return w, h, (w - target_width) // 2, (h - target_height) // 2
-            elif resize_mode == "total_pixels":
-                orig_pixels = max(1, orig_w * orig_h)
-                desired_pixels = max(1, target_width * target_height)
-                base_scale = math.sqrt(desired_pixels / orig_pixels)
-                ideal_w = orig_w * base_scale
-
-                def align_to_unit(value: float) -> int:
-                    return max(min_unit, int(round(value / min_unit)) * min_unit)
-
-                candidates = []
-                base_w_aligned = align_to_unit(ideal_w)
-                # Explore small neighborhood to find closest pixel count while keeping aspect
-                for step in (-2, -1, 0, 1, 2):
-                    w_candidate = max(min_unit, base_w_aligned + step * min_unit)
-                    h_candidate = align_to_unit(w_candidate / aspect)
-                    pixels = w_candidate * h_candidate
-                    aspect_diff = abs((w_candidate / h_candidate) - aspect)
-                    candidates.append((abs(pixels - desired_pixels), aspect_diff, w_candidate, h_candidate))
-
-                candidates.sort(key=lambda x: (x[0], x[1]))
-                _, _, w, h = candidates[0]
-                return w, h, 0, 0
+        Returns:
+            Tuple[int, int, int, int]: (调整宽度, 调整高度, x偏移, y偏移)
+        """
+        aspect = orig_w / orig_h
+        if resize_mode == "force_resize":
+            return target_width, target_height, 0, 0
+        elif resize_mode in ["scale_proportionally", "limited_by_canvas"]:
+            if target_width / target_height > aspect:
+                h = target_height
+                w = int(h * aspect)
             else:
-                # Default fallback for unknown resize modes
-                return target_width, target_height, 0, 0
-
-        def should_resize(orig_w: int, orig_h: int, target_w: int, target_h: int) -> bool:
-            """
-            判断是否需要调整尺寸。
-
-            Args:
-                orig_w (int): 原始宽度
-                orig_h (int): 原始高度
-                target_w (int): 目标宽度
-                target_h (int): 目标高度
-
-            Returns:
-                bool: 是否需要调整尺寸
-            """
-            if resize_mode == "total_pixels":
-                orig_pixels = orig_w * orig_h
-                desired_pixels = target_w * target_h
-                if scale_condition == "always":
-                    return True
-                elif scale_condition == "downscale_only":
-                    return orig_pixels > desired_pixels
-                elif scale_condition == "upscale_only":
-                    return orig_pixels < desired_pixels
+                w = target_width
+                h = int(w / aspect)
+            w = (w + min_unit - 1) // min_unit * min_unit
+            h = (h + min_unit - 1) // min_unit * min_unit
+            return w, h, (target_width - w) // 2, (target_height - h) // 2
+        elif resize_mode == "fill_the_canvas":
+            if target_width / target_height < aspect:
+                h = target_height
+                w = int(h * aspect)
             else:
-                if scale_condition == "always":
-                    return True
-                elif scale_condition == "downscale_only":
-                    return orig_w > target_w or orig_h > target_h
-                elif scale_condition == "upscale_only":
-                    return orig_w < target_w or orig_h < target_h
-            return False
-
-        fill_color = get_fill_color(channels, image.device, image.dtype)
-
-        if should_resize(orig_w, orig_h, target_width, target_height):
-            w, h, offset_x, offset_y = compute_size(orig_w, orig_h)
-            resized_img = resize_tensor(image, (h, w), INTERPOLATION_MODES[interpolation])
-            if resize_mode == "limited_by_canvas":
-                output = torch.full((batch_size, target_height, target_width, channels), 0, device=image.device, dtype=image.dtype)
-                output.copy_(fill_color.view(1, 1, 1, -1).expand(batch_size, target_height, target_width, channels))
-                output[:, offset_y:offset_y+h, offset_x:offset_x+w] = resized_img
-                resized_img = output
-            elif resize_mode == "fill_the_canvas":
-                output = torch.zeros(batch_size, target_height, target_width, channels, device=image.device, dtype=image.dtype)
-                y_start, y_end = max(0, offset_y), min(h, offset_y + target_height)
-                x_start, x_end = max(0, offset_x), min(w, offset_x + target_width)
-                out_h, out_w = y_end - y_start, x_end - x_start
-                output[:, :out_h, :out_w] = resized_img[:, y_start:y_start+out_h, x_start:x_start+out_w]
-                resized_img = output
-            resized_img.clamp_(0, 1)
+                w = target_width
+                h = int(w / aspect)
+            w = (w + min_unit - 1) // min_unit * min_unit
+            h = (h + min_unit - 1) // min_unit * min_unit
+            return w, h, (w - target_width) // 2, (h - target_height) // 2
+        elif resize_mode == "total_pixels":
+            orig_pixels = max(1, orig_w * orig_h)
+            desired_pixels = target_pixels
+            base_scale = math.sqrt(desired_pixels / orig_pixels)
+            ideal_w = orig_w * base_scale
+
+            def align_to_unit(value: float) -> int:
+                return max(min_unit, int(round(value / min_unit)) * min_unit)
+
+            candidates = []
+            base_w_aligned = align_to_unit(ideal_w)
+            # Explore small neighborhood to find closest pixel count while keeping aspect
+            for step in (-2, -1, 0, 1, 2):
+                w_candidate = max(min_unit, base_w_aligned + step * min_unit)
+                h_candidate = align_to_unit(w_candidate / aspect)
+                pixels = w_candidate * h_candidate
+                aspect_diff = abs((w_candidate / h_candidate) - aspect)
+                candidates.append((abs(pixels - desired_pixels), aspect_diff, w_candidate, h_candidate))
+
+            candidates.sort(key=lambda x: (x[0], x[1]))
+            _, _, w, h = candidates[0]
+            return w, h, 0, 0
+        else:
+            # Default fallback for unknown resize modes
+            return target_width, target_height, 0, 0
+
+    @staticmethod
+    def _should_resize(resize_mode: str, scale_condition: str, orig_w: int, orig_h: int,
+                       target_w: int, target_h: int, target_pixels: int) -> bool:
+        """
+        判断是否需要调整尺寸。
+
+        Args:
+            resize_mode (str): 调整模式
+            scale_condition (str): 缩放条件
+            orig_w (int): 原始宽度
+            orig_h (int): 原始高度
+            target_w (int): 目标宽度
+            target_h (int): 目标高度
+            target_pixels (int): total_pixels 模式的目标像素数
+
+        Returns:
+            bool: 是否需要调整尺寸
+        """
+        if resize_mode == "total_pixels":
+            orig_pixels = orig_w * orig_h
+            if scale_condition == "always":
+                return True
+            elif scale_condition == "downscale_only":
+                return orig_pixels > target_pixels
+            elif scale_condition == "upscale_only":
+                return orig_pixels < target_pixels
         else:
-            resized_img = image
+            if scale_condition == "always":
+                return True
+            elif scale_condition == "downscale_only":
+                return orig_w > target_w or orig_h > target_h
+            elif scale_condition == "upscale_only":
+                return orig_w < target_w or orig_h < target_h
+        return False
+
+    @staticmethod
+    def _resize(tensor: torch.Tensor, size: Tuple[int, int], interpolation: str,
+                antialias: bool = False, device: str = "cpu") -> torch.Tensor:
+        """
+        缩放 [B, H, W, C] 张量，结果位于输入所在设备。
 
-        return resized_img
+        device 为 "gpu" 时在 CUDA 上计算，CUDA 不可用或显存不足时回退到 CPU。
+        """
+        mode = INTERPOLATION_MODES[interpolation]
+        source_device = tensor.device
+        if device == "gpu" and source_device.type == "cpu" and torch.cuda.is_available():
+            try:
+                resized = resize_tensor(tensor.cuda(non_blocking=True), size, mode, antialias=antialias)
+                return resized.to(source_device)
+            except torch.cuda.OutOfMemoryError:
+                logger.warning("GPU out of memory while resizing, falling back to CPU")
+                torch.cuda.empty_cache()
+        return resize_tensor(tensor, size, mode, antialias=antialias)
+
+    @staticmethod
+    def _place(resized: torch.Tensor, resize_mode: str, target_width: int, target_height: int,
+               offset_x: int, offset_y: int, fill_color: torch.Tensor) -> torch.Tensor:
+        """按调整模式将缩放结果放置到目标画布（limited_by_canvas 居中填充，fill_the_canvas 居中裁剪）"""
+        batch_size, h, w, channels = resized.shape
+        if resize_mode == "limited_by_canvas":
+            output = torch.empty((batch_size, target_height, target_width, channels), device=resized.device, dtype=resized.dtype)
+            output.copy_(fill_color.view(1, 1, 1, -1).expand(batch_size, target_height, target_width, channels))
+            output[:, offset_y:offset_y+h, offset_x:offset_x+w] = resized
+            return output
+        if resize_mode == "fill_the_canvas":
+            output = torch.zeros(batch_size, target_height, target_width, channels, device=resized.device, dtype=resized.dtype)
+            y_start, y_end = max(0, offset_y), min(h, offset_y + target_height)
+            x_start, x_end = max(0, offset_x), min(w, offset_x + target_width)
+            out_h, out_w = y_end - y_start, x_end - x_start
+            output[:, :out_h, :out_w] = resized[:, y_start:y_start+out_h, x_start:x_start+out_w]
+            return output
+        return resized
+
+    @classmethod
+    def _process_pack_images(cls, images: List[torch.Tensor], resize_mode: str, scale_condition: str,
+                             interpolation: str, min_unit: int, target_width: int, target_height: int,
+                             fill_hex: str, antialias: bool = False, device: str = "cpu") -> List[torch.Tensor]:
+        """
+        批量处理 pack_images：源尺寸、通道数、设备和类型相同的图像归入同一桶，
+        每桶只计算一次目标尺寸；在 GPU 上每桶只调用一次插值。结果按输入顺序返回（每项为 [1, H, W, C]）。
+        """
+        base_fill_rgb = hex_to_rgb(fill_hex)
+        target_pixels = max(1, target_width * target_height)
+        buckets = {}
+        for index, img in enumerate(images):
+            key = (tuple(img.shape), img.dtype, img.device)
+            buckets.setdefault(key, []).append(index)
+
+        # CPU 上堆叠整桶的拷贝比逐张插值更慢，只有在 GPU 上计算时才合并为一个批次
+        use_gpu = device == "gpu" and torch.cuda.is_available()
+        results: List[Optional[torch.Tensor]] = [None] * len(images)
+        for ((orig_h, orig_w, channels), dtype, img_device), indices in buckets.items():
+            if not cls._should_resize(resize_mode, scale_condition, orig_w, orig_h, target_width, target_height, target_pixels):
+                for index in indices:
+                    results[index] = images[index].unsqueeze(0)
+                continue
+
+            w, h, offset_x, offset_y = cls._compute_size(
+                resize_mode, min_unit, target_width, target_height, target_pixels, orig_w, orig_h
+            )
+            fill_color = cls._fill_color(base_fill_rgb, channels, img_device, dtype)
+            if use_gpu and len(indices) > 1:
+                groups = [(indices, torch.stack([images[i] for i in indices]))]
+            else:
+                groups = [([i], images[i].unsqueeze(0)) for i in indices]
+            for group, batch in groups:
+                output = cls._resize(batch, (h, w), interpolation, antialias, device)
+                output = cls._place(output, resize_mode, target_width, target_height, offset_x, offset_y, fill_color)
+                output.clamp_(0, 1)
+                for position, index in enumerate(group):
+                    results[index] = output[position:position + 1]
+        return results
 
 
 # ============================================================================
@@ -569,7 +509,5 @@ V3_NODE_CLASSES = [
 ]
 
 # 节点ID到类的映射（用于向后兼容或参考）
-V3_NODE_MAPPINGS = {
-    cls.define_schema().node_id: cls
-    for cls in V3_NODE_CLASSES
-}
\ No newline at end of file
+# 首次访问时再构建，避免导入模块时为每个节点调用define_schema
+__getattr__ = lazy_node_mappings(globals())
\ No newline at end of file
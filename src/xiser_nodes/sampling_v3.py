@@ -4,11 +4,13 @@ from comfy_api.v0_0_2 import io, ui
 import torch
 import numpy as np
 from typing import Dict, Tuple, List
-from scipy.interpolate import interp1d
 from tqdm import tqdm
 import comfy.samplers
 from .utils import logger
 
+# Latent 混合每块处理的最大元素数
+BLEND_CHUNK_ELEMENTS = 1 << 24
+
 # ============================================================================
 # 自定义动态去噪采样器
 # ============================================================================
@@ -93,7 +95,8 @@ class XIS_DynamicKSamplerV3(io.ComfyNode):
                                       tooltip="可选的CFG列表")
             ],
             outputs=[
-                io.Latent.Output(display_name="latent")
+                io.Latent.Output(display_name="latent"),
+                io.String.Output(display_name="sampling_info")
             ]
         )
 
@@ -135,6 +138,17 @@ class XIS_DynamicKSamplerV3(io.ComfyNode):
         """计算CFG值"""
         return cls.compute_interpolated_values(start_cfg, end_cfg, batch_size, curve_type, 0.0, 20.0)
 
+    @staticmethod
+    def group_batch_items(denoise_values: List[float], cfg_values: List[float]) -> List[Tuple[float, float, List[int]]]:
+        """
+        将参数完全相同的批次项归为一组（steps/sampler/scheduler 对整批相同，只需比较 denoise 和 cfg）。
+        组按首次出现的顺序排列，返回 [(denoise, cfg, 批次索引列表), ...]
+        """
+        groups: Dict[Tuple[float, float], List[int]] = {}
+        for i, (denoise, cfg) in enumerate(zip(denoise_values, cfg_values)):
+            groups.setdefault((float(denoise), float(cfg)), []).append(i)
+        return [(denoise, cfg, indices) for (denoise, cfg), indices in groups.items()]
+
     @classmethod
     def execute(cls, model, latent_image, positive, negative, start_denoise, end_denoise,
                 denoise_curve_type, steps, start_cfg, end_cfg, CFG_curve_type,
@@ -178,7 +192,6 @@ class XIS_DynamicKSamplerV3(io.ComfyNode):
         device = model.device if hasattr(model, 'device') else torch.device("cuda" if torch.cuda.is_available() else "cpu")
         latents = latents.to(device)
 
-        output_latents = []
         ksampler = comfy.samplers.KSampler(
             model=model,
             steps=steps,
@@ -189,21 +202,30 @@ class XIS_DynamicKSamplerV3(io.ComfyNode):
             model_options={}
         )
 
-        # 添加批次进度条
-        for i in tqdm(range(batch_size), desc="Sampling latents", unit="latent"):
-            current_latent = latents[i:i+1]
-            current_denoise = denoise_values[i]
-            current_cfg = cfg_values[i]
+        # 参数相同的批次项合并为一次采样调用，只在参数不同处拆分
+        groups = cls.group_batch_items(denoise_values, cfg_values)
+        final_latent = latents.clone()
+        report = []
+        sampler_calls = 0
 
+        # 添加分组进度条
+        for current_denoise, current_cfg, indices in tqdm(groups, desc="Sampling latent groups", unit="group"):
+            label = f"latents {indices}: denoise={current_denoise:.3f}, cfg={current_cfg:.3f}"
             if abs(current_denoise) < 1e-6:
-                output_latents.append(current_latent)
-                logger.info(f"Latent {i}: denoise=0, returning original latent")
+                report.append(f"{label}, skipped (denoise=0)")
+                logger.info(f"{label}, returning original latents")
                 continue
 
-            # 动态噪声尺度
+            index_tensor = torch.tensor(indices, device=device)
+            current_latent = latents.index_select(0, index_tensor)
+
+            # 动态噪声尺度；每项噪声仍按 seed + 批次索引生成，与逐项采样一致
             noise_scale = min(current_denoise * 2.0, 1.0)
-            torch.manual_seed(seed + i)
-            noise = torch.randn_like(current_latent).to(device)
+            noise_items = []
+            for i in indices:
+                torch.manual_seed(seed + i)
+                noise_items.append(torch.randn_like(latents[i:i+1]).to(device))
+            noise = torch.cat(noise_items, dim=0)
             input_latent = current_latent + current_denoise * noise_scale * noise
 
             # 跳过早期去噪步骤
@@ -218,19 +240,22 @@ class XIS_DynamicKSamplerV3(io.ComfyNode):
                     latent_image=input_latent,
                     start_step=start_step,
                     disable_pbar=False,  # 启用 KSampler 进度条
-                    seed=seed + i
+                    seed=seed + indices[0]
                 )
-                logger.info(f"Latent {i}: denoise={current_denoise:.3f}, cfg={current_cfg:.3f}, "
-                          f"noise_scale={noise_scale:.3f}, start_step={start_step}, sampled, "
+                logger.info(f"{label}, noise_scale={noise_scale:.3f}, start_step={start_step}, sampled, "
                           f"input mean={input_latent.mean().item():.4f}, output mean={sampled_latent.mean().item():.4f}")
             except Exception as e:
-                logger.error(f"Error sampling latent {i}: {e}")
+                logger.error(f"Error sampling {label}: {e}")
                 raise
 
-            output_latents.append(sampled_latent)
+            final_latent.index_copy_(0, index_tensor, sampled_latent.to(device=final_latent.device, dtype=final_latent.dtype))
+            sampler_calls += 1
+            report.append(f"{label}, start_step={start_step}, batch={len(indices)}")
 
-        final_latent = torch.cat(output_latents, dim=0)
-        return io.NodeOutput({"samples": final_latent})
+        summary = f"{batch_size} latents, {len(groups)} groups, {sampler_calls} sampler calls"
+        logger.info(f"Dynamic KSampler: {summary}")
+        sampling_info = "\n".join([summary] + report)
+        return io.NodeOutput({"samples": final_latent}, sampling_info)
 
 
 # ============================================================================
@@ -270,22 +295,74 @@ class XIS_LatentBlendNodeV3(io.ComfyNode):
                 io.Int.Input("batch_size",
                            default=16,
                            min=1,
-                           max=100,
+                           max=4096,
                            step=1,
                            tooltip="Number of output latent frames"),
                 io.Combo.Input("blend_mode",
                              options=["linear", "sigmoid", "ease_in", "ease_out", "ease_in_out"],
                              default="linear",
-                             tooltip="Blending mode for strength transition")
+                             tooltip="Blending mode for strength transition"),
+                io.Combo.Input("interpolation",
+                             options=["lerp", "slerp"],
+                             default="lerp",
+                             optional=True,
+                             tooltip="lerp = straight-line blend, slerp = spherical blend per latent (keeps magnitude)")
             ],
             outputs=[
                 io.Latent.Output(display_name="latent_batch")
             ]
         )
 
+    @staticmethod
+    def compute_blend_weights(start_strength, end_strength, batch_size, blend_mode) -> np.ndarray:
+        """计算每一帧的混合强度"""
+        if batch_size == 1:
+            return np.array([start_strength], dtype=np.float64)
+
+        t = np.linspace(0, 1, batch_size)
+        if blend_mode == "sigmoid":
+            # Sigmoid curve: smooth transition
+            t = 1 / (1 + np.exp(-10 * (t - 0.5)))  # Scaled to [0,1]
+        elif blend_mode == "ease_in":
+            # Quadratic ease-in
+            t = t ** 2
+        elif blend_mode == "ease_out":
+            # Quadratic ease-out
+            t = 1 - (1 - t) ** 2
+        elif blend_mode == "ease_in_out":
+            # Cubic ease-in-out
+            t = (t ** 3) * (t * (t * 6 - 15) + 10)
+        return start_strength + (end_strength - start_strength) * t
+
+    @staticmethod
+    def blend_coefficients(latent1_samples, latent2_samples, weights, interpolation):
+        """
+        计算混合系数 (c1, c2)，形状均为 (帧数, 批次)，输出帧 = c1 * latent1 + c2 * latent2。
+        slerp 按每个批次项的整体向量计算夹角，夹角接近 0 或向量为零时退化为 lerp。
+        """
+        device = latent1_samples.device
+        w = torch.from_numpy(np.asarray(weights, dtype=np.float64)).to(device)
+        batch = latent1_samples.shape[0]
+        c1 = (1 - w)[:, None].expand(-1, batch)
+        c2 = w[:, None].expand(-1, batch)
+        if interpolation != "slerp":
+            return c1, c2
+
+        a = latent1_samples.reshape(batch, -1).to(torch.float64)
+        b = latent2_samples.reshape(batch, -1).to(torch.float64)
+        norms = a.norm(dim=1) * b.norm(dim=1)
+        cos_omega = ((a * b).sum(dim=1) / norms.clamp_min(1e-12)).clamp(-1.0, 1.0)
+        omega = torch.arccos(cos_omega)
+        sin_omega = torch.sin(omega)
+        degenerate = (sin_omega < 1e-6) | (norms < 1e-12)
+        safe_sin = torch.where(degenerate, torch.ones_like(sin_omega), sin_omega)
+        s1 = torch.sin(c1 * omega) / safe_sin
+        s2 = torch.sin(c2 * omega) / safe_sin
+        return torch.where(degenerate, c1, s1), torch.where(degenerate, c2, s2)
+
     @classmethod
     def execute(cls, latent1, latent2, start_strength, end_strength,
-                batch_size, blend_mode) -> io.NodeOutput:
+                batch_size, blend_mode, interpolation="lerp") -> io.NodeOutput:
         """
         执行方法：混合Latent
         """
@@ -301,44 +378,28 @@ class XIS_LatentBlendNodeV3(io.ComfyNode):
         batch_size = max(1, batch_size)
 
         # Calculate blend weights based on blend_mode
-        if batch_size == 1:
-            weights = [start_strength]
-        else:
-            t = np.linspace(0, 1, batch_size)
-            if blend_mode == "linear":
-                weights = start_strength + (end_strength - start_strength) * t
-            elif blend_mode == "sigmoid":
-                # Sigmoid curve: smooth transition
-                weights = 1 / (1 + np.exp(-10 * (t - 0.5)))  # Scaled to [0,1]
-                weights = start_strength + (end_strength - start_strength) * weights
-            elif blend_mode == "ease_in":
-                # Quadratic ease-in
-                weights = t ** 2
-                weights = start_strength + (end_strength - start_strength) * weights
-            elif blend_mode == "ease_out":
-                # Quadratic ease-out
-                weights = 1 - (1 - t) ** 2
-                weights = start_strength + (end_strength - start_strength) * weights
-            elif blend_mode == "ease_in_out":
-                # Cubic ease-in-out
-                weights = (t ** 3) * (t * (t * 6 - 15) + 10)
-                weights = start_strength + (end_strength - start_strength) * weights
-
-        # Initialize output tensor
-        output_latents = []
-
-        # Perform blending for each weight
-        device = latent1_samples.device
-        for weight in weights:
-            weight = float(weight)  # Ensure weight is a scalar
-            blended = latent1_samples * (1 - weight) + latent2_samples * weight
-            output_latents.append(blended)
-
-        # Stack output latents
-        output_tensor = torch.cat(output_latents, dim=0)  # Shape: (batch_size, channels, height, width)
+        weights = cls.compute_blend_weights(start_strength, end_strength, batch_size, blend_mode)
+        c1, c2 = cls.blend_coefficients(latent1_samples, latent2_samples, weights, interpolation)
+
+        # 所有帧写入预分配的输出，形状 (帧数, 批次, ...) 与逐帧 torch.cat 的顺序一致
+        batch = latent1_samples.shape[0]
+        frame_shape = latent1_samples.shape[1:]
+        output = torch.empty((batch_size, *latent1_samples.shape),
+                             dtype=latent1_samples.dtype, device=latent1_samples.device)
+        coeff_shape = (-1, batch) + (1,) * len(frame_shape)
+        compute_dtype = latent1_samples.dtype if latent1_samples.is_floating_point() else torch.float32
+        c1 = c1.to(compute_dtype).reshape(coeff_shape)
+        c2 = c2.to(compute_dtype).reshape(coeff_shape)
+
+        # 按 BLEND_CHUNK_ELEMENTS 分块，上千帧时每块的中间结果也保持在固定内存内
+        chunk = max(1, BLEND_CHUNK_ELEMENTS // max(1, latent1_samples.numel()))
+        for start in range(0, batch_size, chunk):
+            end = min(start + chunk, batch_size)
+            torch.mul(latent1_samples, c1[start:end], out=output[start:end])
+            output[start:end].addcmul_(latent2_samples, c2[start:end])
 
         # Return in ComfyUI LATENT format
-        return io.NodeOutput({"samples": output_tensor})
+        return io.NodeOutput({"samples": output.reshape(batch_size * batch, *frame_shape)})
 
 
 # ============================================================================
@@ -22,27 +22,39 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-try:
-    from shape_generators.shape_coordinator import ShapeCoordinator
-    from shape_generators.render_utils import RenderUtils, FRONTEND_CANVAS_SCALE
-    from shape_generators.text_renderer import TextRenderer
-    from shape_generators.batch_processor import BatchProcessor
-    from shape_generators.transform_utils import TransformUtils
-    from shape_generators.param_standardizer import ParamStandardizer
-    from shape_generators.stroke_utils import StrokeUtils
-    from shape_generators.color_utils import ColorUtils
-    from shape_generators.renderer_interface import UnifiedRenderer
-except ImportError:
-    # 如果直接导入失败，尝试相对导入
-    from .shape_generators.shape_coordinator import ShapeCoordinator
-    from .shape_generators.render_utils import RenderUtils, FRONTEND_CANVAS_SCALE
-    from .shape_generators.text_renderer import TextRenderer
-    from .shape_generators.batch_processor import BatchProcessor
-    from .shape_generators.transform_utils import TransformUtils
-    from .shape_generators.param_standardizer import ParamStandardizer
-    from .shape_generators.stroke_utils import StrokeUtils
-    from .shape_generators.color_utils import ColorUtils
-    from .shape_generators.renderer_interface import UnifiedRenderer
+# shape_generators依赖shapely、fontTools和cv2，导入较慢，首次执行时再加载
+ShapeCoordinator = RenderUtils = TextRenderer = BatchProcessor = None
+TransformUtils = ParamStandardizer = StrokeUtils = ColorUtils = UnifiedRenderer = None
+FRONTEND_CANVAS_SCALE = None
+
+
+def _load_shape_generators() -> None:
+    """按需导入shape_generators模块"""
+    global ShapeCoordinator, RenderUtils, FRONTEND_CANVAS_SCALE, TextRenderer, BatchProcessor
+    global TransformUtils, ParamStandardizer, StrokeUtils, ColorUtils, UnifiedRenderer
+    if ShapeCoordinator is not None:
+        return
+    try:
+        from shape_generators.shape_coordinator import ShapeCoordinator
+        from shape_generators.render_utils import RenderUtils, FRONTEND_CANVAS_SCALE
+        from shape_generators.text_renderer import TextRenderer
+        from shape_generators.batch_processor import BatchProcessor
+        from shape_generators.transform_utils import TransformUtils
+        from shape_generators.param_standardizer import ParamStandardizer
+        from shape_generators.stroke_utils import StrokeUtils
+        from shape_generators.color_utils import ColorUtils
+        from shape_generators.renderer_interface import UnifiedRenderer
+    except ImportError:
+        # 如果直接导入失败，尝试相对导入
+        from .shape_generators.shape_coordinator import ShapeCoordinator
+        from .shape_generators.render_utils import RenderUtils, FRONTEND_CANVAS_SCALE
+        from .shape_generators.text_renderer import TextRenderer
+        from .shape_generators.batch_processor import BatchProcessor
+        from .shape_generators.transform_utils import TransformUtils
+        from .shape_generators.param_standardizer import ParamStandardizer
+        from .shape_generators.stroke_utils import StrokeUtils
+        from .shape_generators.color_utils import ColorUtils
+        from .shape_generators.renderer_interface import UnifiedRenderer
 
 # 设置日志 - 启用INFO级别日志以便调试
 logging.basicConfig(level=logging.INFO)
@@ -159,6 +171,7 @@ class XIS_ShapeAndTextV3(io.ComfyNode):
     @classmethod
     def _extract_transform(cls, shape_canvas: Dict[str, Any]):
         """提取变换参数（使用TransformUtils）"""
+        _load_shape_generators()
         return TransformUtils.extract_transform(shape_canvas)
 
     @classmethod
@@ -209,6 +222,7 @@ class XIS_ShapeAndTextV3(io.ComfyNode):
             io.NodeOutput: 包含三个输出的节点输出
         """
         # 在方法内部创建需要的组件实例
+        _load_shape_generators()
         shape_coordinator = ShapeCoordinator()
         render_utils = RenderUtils()
         text_renderer = TextRenderer()
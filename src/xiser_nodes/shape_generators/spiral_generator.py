@@ -55,34 +55,20 @@ class SpiralGenerator:
             center_points, amplified_start_width, amplified_end_width, smoothness
         )
 
-        # 计算边界范围用于调试
-        if boundary_points:
+        # 调试信息：显示所有关键参数（仅在DEBUG级别时计算）
+        if boundary_points and logger.isEnabledFor(logging.DEBUG):
             x_coords = [x for x, y in boundary_points]
             y_coords = [y for x, y in boundary_points]
             min_x, max_x = min(x_coords), max(x_coords)
             min_y, max_y = min(y_coords), max(y_coords)
-            actual_width = max_x - min_x
-            actual_height = max_y - min_y
-
-            # 调试信息：显示所有关键参数
-            logger.info(f"=== SPIRAL DEBUG INFO ===")
-            logger.info(f"Input params: cx={cx}, cy={cy}, max_radius={max_radius}")
-            logger.info(f"Original width params: start_width={start_width}, end_width={end_width}")
-            logger.info(f"Amplified width params: start_width={amplified_start_width}, end_width={amplified_end_width}")
-            logger.info(f"Shape params: turns={turns}, points_per_turn={points_per_turn}, line_length={line_length}")
-            logger.info(f"Calculated: frontend_max_radius={frontend_max_radius}, min_radius={min_radius}")
-            logger.info(f"Center points count: {len(center_points)}")
-            logger.info(f"Boundary points count: {len(boundary_points)}")
-            logger.info(f"Spiral bounds: x=[{min_x:.2f}, {max_x:.2f}], y=[{min_y:.2f}, {max_y:.2f}]")
-            logger.info(f"Spiral size: width={actual_width:.2f}, height={actual_height:.2f}")
-
-            # 检查中心点的宽度范围
-            if center_points:
-                min_width = min(p['width'] for p in center_points)
-                max_width = max(p['width'] for p in center_points)
-                logger.info(f"Width range in center points: [{min_width:.2f}, {max_width:.2f}]")
-
-            logger.info(f"=== END SPIRAL DEBUG ===")
+            logger.debug(
+                "Spiral: cx=%s, cy=%s, max_radius=%s, width=%s->%s (amplified %s->%s), turns=%s, "
+                "points_per_turn=%s, line_length=%s, frontend_max_radius=%s, min_radius=%s, "
+                "center_points=%d, boundary_points=%d, bounds x=[%.2f, %.2f] y=[%.2f, %.2f]",
+                cx, cy, max_radius, start_width, end_width, amplified_start_width, amplified_end_width,
+                turns, points_per_turn, line_length, frontend_max_radius, min_radius,
+                len(center_points), len(boundary_points), min_x, max_x, min_y, max_y,
+            )
 
         return boundary_points
 
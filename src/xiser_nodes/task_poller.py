@@ -0,0 +1,251 @@
+"""Adaptive polling engine for asynchronous provider tasks.
+
+DashScope image-edit and video tasks are created asynchronously and then
+polled until they reach a terminal state. Instead of sleeping a fixed
+interval, the poller adapts the next wait to what the provider reports:
+queued tasks back off geometrically, running tasks with a progress value are
+re-checked around the estimated completion time, and any status change resets
+the interval to the minimum.
+
+``poll_async`` runs the (blocking) query function in a worker thread, so many
+tasks can be awaited concurrently from async node ``execute`` methods.
+``poll`` is the blocking equivalent for synchronous callers. Both stop as soon
+as the ComfyUI prompt is interrupted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .utils import logger
+
+try:
+    import comfy.model_management as _model_management
+except ImportError:  # 不在ComfyUI环境中
+    _model_management = None
+
+SUCCESS_STATUSES = frozenset({"SUCCEEDED"})
+FAILURE_STATUSES = frozenset({"FAILED", "CANCELED", "UNKNOWN"})
+
+# 中断检查的最大睡眠切片（秒）
+_SLEEP_SLICE = 0.25
+
+
+class TaskFailedError(RuntimeError):
+    """Raised when a polled task ends in a failure status."""
+
+    def __init__(self, task_id: str, status: str, result: Dict[str, Any]):
+        output = result.get("output", {}) if isinstance(result, dict) else {}
+        code = output.get("code", "")
+        message = output.get("message", "")
+        super().__init__(f"Task {task_id} failed with status: {status} {code} {message}".strip())
+        self.task_id = task_id
+        self.status = status
+        self.result = result
+
+
+@dataclass
+class PollPolicy:
+    """Interval and timeout settings for one polled task."""
+
+    min_interval: float = 1.0
+    max_interval: float = 15.0
+    pending_growth: float = 1.5
+    running_growth: float = 1.25
+    timeout: float = 600.0
+
+
+@dataclass
+class PollUpdate:
+    """Snapshot passed to ``on_update`` after every query."""
+
+    task_id: str
+    status: str
+    progress: Optional[float]
+    elapsed: float
+    attempt: int
+    next_interval: float
+    result: Dict[str, Any]
+
+
+def dashscope_status(result: Dict[str, Any]) -> Tuple[str, Optional[float]]:
+    """Extract ``(status, progress)`` from a DashScope task response."""
+
+    output = result.get("output", {}) if isinstance(result, dict) else {}
+    status = str(output.get("task_status") or "")
+    if not status and "choices" in output:
+        # 部分接口直接返回最终结果
+        status = "SUCCEEDED"
+    progress = None
+    raw = output.get("progress", output.get("task_progress"))
+    if raw is not None:
+        try:
+            progress = float(str(raw).rstrip("%"))
+            if progress > 1.0:
+                progress /= 100.0
+            progress = min(max(progress, 0.0), 1.0)
+        except ValueError:
+            progress = None
+    return status, progress
+
+
+class AdaptiveInterval:
+    """Computes the wait before the next poll from the reported status."""
+
+    def __init__(self, policy: PollPolicy):
+        self.policy = policy
+        self.interval = policy.min_interval
+        self._last_status: Optional[str] = None
+        self._running_since: Optional[float] = None
+
+    def next(self, status: str, progress: Optional[float], elapsed: float) -> float:
+        policy = self.policy
+        if status != self._last_status:
+            self._last_status = status
+            self.interval = policy.min_interval
+            if status == "RUNNING":
+                self._running_since = elapsed
+        elif status == "RUNNING" and progress and progress > 0 and self._running_since is not None:
+            # 根据进度估算剩余时间，在预计完成前后再查询
+            running_for = max(elapsed - self._running_since, 1e-3)
+            remaining = running_for * (1.0 - progress) / progress
+            self.interval = remaining / 2.0
+        elif status == "RUNNING":
+            self.interval *= policy.running_growth
+        else:
+            self.interval *= policy.pending_growth
+
+        self.interval = min(max(self.interval, policy.min_interval), policy.max_interval)
+        # 不要越过超时时间
+        return max(0.0, min(self.interval, policy.timeout - elapsed))
+
+
+def _check_interrupted() -> None:
+    if _model_management is not None:
+        _model_management.throw_exception_if_processing_interrupted()
+
+
+class TaskPoller:
+    """Polls provider tasks until they succeed, fail, time out or are interrupted."""
+
+    def __init__(self, status_fn: Callable[[Dict[str, Any]], Tuple[str, Optional[float]]] = dashscope_status):
+        self.status_fn = status_fn
+
+    def _evaluate(
+        self,
+        task_id: str,
+        result: Dict[str, Any],
+        scheduler: AdaptiveInterval,
+        elapsed: float,
+        attempt: int,
+        on_update: Optional[Callable[[PollUpdate], None]],
+    ) -> Tuple[bool, float]:
+        status, progress = self.status_fn(result)
+        wait = scheduler.next(status, progress, elapsed)
+        if on_update:
+            try:
+                on_update(PollUpdate(task_id, status, progress, elapsed, attempt, wait, result))
+            except Exception as exc:  # 回调失败不影响轮询
+                logger.debug("Poll update callback failed: %s", exc)
+        if status in SUCCESS_STATUSES:
+            return True, 0.0
+        if status in FAILURE_STATUSES:
+            raise TaskFailedError(task_id, status, result)
+        return False, wait
+
+    def _timeout_error(self, task_id: str, policy: PollPolicy, result: Optional[Dict[str, Any]]) -> TimeoutError:
+        last_status = self.status_fn(result)[0] if result else "UNKNOWN"
+        error = TimeoutError(
+            f"Task {task_id} did not complete within {policy.timeout:.0f} seconds (last status: {last_status or 'UNKNOWN'})"
+        )
+        error.last_result = result
+        return error
+
+    def poll(
+        self,
+        query_fn: Callable[[], Dict[str, Any]],
+        task_id: str = "",
+        policy: Optional[PollPolicy] = None,
+        on_update: Optional[Callable[[PollUpdate], None]] = None,
+        initial_delay: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Blocking poll; returns the successful task response."""
+
+        policy = policy or PollPolicy()
+        scheduler = AdaptiveInterval(policy)
+        start = time.monotonic()
+        wait = policy.min_interval if initial_delay is None else initial_delay
+        result: Optional[Dict[str, Any]] = None
+        attempt = 0
+
+        while True:
+            deadline = time.monotonic() + wait
+            while True:
+                _check_interrupted()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, _SLEEP_SLICE))
+
+            attempt += 1
+            result = query_fn()
+            elapsed = time.monotonic() - start
+            done, wait = self._evaluate(task_id, result, scheduler, elapsed, attempt, on_update)
+            if done:
+                return result
+            if elapsed >= policy.timeout:
+                raise self._timeout_error(task_id, policy, result)
+
+    async def poll_async(
+        self,
+        query_fn: Callable[[], Dict[str, Any]],
+        task_id: str = "",
+        policy: Optional[PollPolicy] = None,
+        on_update: Optional[Callable[[PollUpdate], None]] = None,
+        initial_delay: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Async poll; the blocking query runs in a worker thread."""
+
+        policy = policy or PollPolicy()
+        scheduler = AdaptiveInterval(policy)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        wait = policy.min_interval if initial_delay is None else initial_delay
+        result: Optional[Dict[str, Any]] = None
+        attempt = 0
+
+        while True:
+            deadline = loop.time() + wait
+            while True:
+                _check_interrupted()
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, _SLEEP_SLICE))
+
+            attempt += 1
+            result = await asyncio.to_thread(query_fn)
+            elapsed = loop.time() - start
+            done, wait = self._evaluate(task_id, result, scheduler, elapsed, attempt, on_update)
+            if done:
+                return result
+            if elapsed >= policy.timeout:
+                raise self._timeout_error(task_id, policy, result)
+
+
+# 全局共享实例
+TASK_POLLER = TaskPoller()
+
+
+__all__ = [
+    "AdaptiveInterval",
+    "PollPolicy",
+    "PollUpdate",
+    "TASK_POLLER",
+    "TaskFailedError",
+    "TaskPoller",
+    "dashscope_status",
+]
@@ -3,6 +3,7 @@ import torch.nn.functional as F
 import numpy as np
 from PIL import Image
 import logging
+import math
 from typing import Optional, Tuple
 
 # 设置日志
@@ -53,7 +54,8 @@ def standardize_tensor(tensor: Optional[torch.Tensor], expected_dims: int = 4, i
         return tensor.clamp(0, 1)
     raise ValueError(f"Unexpected tensor dimensions: {tensor.shape}, expected {expected_dims}D")
 
-def resize_tensor(tensor: torch.Tensor, size: Tuple[int, int], mode: str = "nearest") -> torch.Tensor:
+def resize_tensor(tensor: torch.Tensor, size: Tuple[int, int], mode: str = "nearest",
+                  antialias: bool = False) -> torch.Tensor:
     """
     调整张量尺寸，支持多种插值模式。
 
@@ -61,6 +63,7 @@ def resize_tensor(tensor: torch.Tensor, size: Tuple[int, int], mode: str = "near
         tensor (torch.Tensor): 输入张量，3D 或 4D。
         size (Tuple[int, int]): 目标尺寸 (height, width)。
         mode (str): 插值模式，例如 "nearest", "bilinear", "lanczos"。
+        antialias (bool): 缩小时抗锯齿，仅对 bilinear/bicubic 生效（lanczos 始终抗锯齿）。
 
     Returns:
         torch.Tensor: 调整后的张量。
@@ -75,7 +78,9 @@ def resize_tensor(tensor: torch.Tensor, size: Tuple[int, int], mode: str = "near
         from torchvision.transforms.functional import resize
         resized = resize(tensor_permuted, size=list(size), interpolation=3, antialias=True)
     else:
-        resized = F.interpolate(tensor_permuted, size=size, mode=mode, align_corners=False if mode in ["bilinear", "bicubic"] else None)
+        smooth = mode in ("bilinear", "bicubic")
+        resized = F.interpolate(tensor_permuted, size=size, mode=mode, align_corners=False if smooth else None,
+                                antialias=antialias and smooth)
     output = resized.permute(0, 2, 3, 1)
     return output.squeeze(0) if needs_squeeze else output
 
@@ -86,4 +91,177 @@ INTERPOLATION_MODES = {
     "area": "area",
     "nearest_exact": "nearest-exact",
     "lanczos": "lanczos",
-}
\ No newline at end of file
+}
+
+def match_batch(tensor: torch.Tensor, batch_size: int) -> torch.Tensor:
+    """
+    将批次维度对齐到 batch_size：批次为 1 时广播，较短时重复最后一帧，较长时截断。
+
+    Args:
+        tensor (torch.Tensor): 第一维为批次的张量。
+        batch_size (int): 目标批次大小。
+
+    Returns:
+        torch.Tensor: 批次大小为 batch_size 的张量。
+    """
+    current = tensor.shape[0]
+    if current == batch_size:
+        return tensor
+    if current == 1:
+        return tensor.expand(batch_size, *tensor.shape[1:])
+    if current > batch_size:
+        return tensor[:batch_size]
+    padding = tensor[-1:].expand(batch_size - current, *tensor.shape[1:])
+    return torch.cat([tensor, padding], dim=0)
+
+def per_frame_values(values, batch_size: int) -> list:
+    """
+    将标量或逐帧参数（列表、元组、张量）展开为长度为 batch_size 的浮点列表。
+    """
+    if isinstance(values, torch.Tensor):
+        values = values.flatten().tolist()
+    elif not isinstance(values, (list, tuple)):
+        values = [values]
+    values = [float(v) for v in values] or [0.0]
+    if len(values) < batch_size:
+        values = values + [values[-1]] * (batch_size - len(values))
+    return values[:batch_size]
+
+def _cpu_cv2():
+    """CPU 张量优先使用 OpenCV（单帧 SIMD 实现在 CPU 上明显快于 torch 卷积/池化）；未安装时返回 None。"""
+    try:
+        import cv2
+    except ImportError:
+        return None
+    return cv2
+
+def _group_frames(values: list) -> dict:
+    groups = {}
+    for index, value in enumerate(values):
+        groups.setdefault(value, []).append(index)
+    return groups
+
+def gaussian_kernel1d(sigma: float, device=None, dtype=torch.float32) -> torch.Tensor:
+    """
+    与 cv2.getGaussianKernel 一致的一维高斯核（浮点图像的核尺寸规则：round(sigma*8+1)|1）。
+    """
+    ksize = int(round(sigma * 8 + 1)) | 1
+    x = torch.arange(ksize, device=device, dtype=torch.float64) - (ksize - 1) / 2
+    kernel = torch.exp(-(x * x) / (2 * sigma * sigma))
+    return (kernel / kernel.sum()).to(dtype)
+
+def gaussian_blur_masks(masks: torch.Tensor, sigma) -> torch.Tensor:
+    """
+    对 [B, H, W] 蒙版批次做可分离高斯模糊（边界复制），与 cv2.GaussianBlur(..., (0, 0), sigma) 数值接近。
+    CPU 张量在安装了 OpenCV 时逐帧调用 cv2，其余设备在原设备上批量卷积。
+
+    Args:
+        masks (torch.Tensor): 蒙版批次 [B, H, W]。
+        sigma (float | Sequence[float] | torch.Tensor): 模糊半径，可逐帧指定。
+
+    Returns:
+        torch.Tensor: 模糊后的蒙版批次，设备与输入一致。
+    """
+    sigmas = per_frame_values(sigma, masks.shape[0])
+    cv2 = _cpu_cv2() if masks.device.type == "cpu" else None
+    output = masks.clone()
+    for value, indices in _group_frames(sigmas).items():
+        if value <= 0:
+            continue
+        if cv2 is not None:
+            for index in indices:
+                frame = np.ascontiguousarray(masks[index].numpy(), dtype=np.float32)
+                blurred = cv2.GaussianBlur(frame, (0, 0), value, borderType=cv2.BORDER_REPLICATE)
+                output[index] = torch.from_numpy(blurred).to(masks.dtype)
+            continue
+        kernel = gaussian_kernel1d(value, device=masks.device, dtype=masks.dtype)
+        pad = kernel.numel() // 2
+        frames = masks[indices].unsqueeze(1)
+        frames = F.conv2d(F.pad(frames, (pad, pad, 0, 0), mode="replicate"), kernel.view(1, 1, 1, -1))
+        frames = F.conv2d(F.pad(frames, (0, 0, pad, pad), mode="replicate"), kernel.view(1, 1, -1, 1))
+        output[indices] = frames.squeeze(1)
+    return output
+
+def _ellipse_rows(ksize: int) -> list:
+    """
+    cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (ksize, ksize)) 每行的列区间 [j1, j2)。
+    """
+    r = c = ksize // 2
+    inv_r2 = 1.0 / (r * r) if r else 0.0
+    rows = []
+    for i in range(ksize):
+        dy = i - r
+        if abs(dy) <= r:
+            dx = int(round(c * math.sqrt((r * r - dy * dy) * inv_r2)))
+            rows.append((max(c - dx, 0), min(c + dx + 1, ksize)))
+        else:
+            rows.append((0, 0))
+    return rows
+
+def _dilate_ellipse(frames: torch.Tensor, ksize: int) -> torch.Tensor:
+    # 按行分解椭圆结构元素：每种行宽只做一次水平最大池化，再按行偏移取最大值
+    height, width = frames.shape[-2:]
+    anchor = ksize // 2
+    padded = F.pad(frames.unsqueeze(1), (anchor, ksize - 1 - anchor, anchor, ksize - 1 - anchor), mode="replicate")
+    rows_by_width = {}
+    for i, (j1, j2) in enumerate(_ellipse_rows(ksize)):
+        if j2 > j1:
+            rows_by_width.setdefault(j2 - j1, []).append((i, j1))
+
+    output = None
+    for row_width, rows in rows_by_width.items():
+        pooled = F.max_pool2d(padded, kernel_size=(1, row_width), stride=1) if row_width > 1 else padded
+        for i, j1 in rows:
+            shifted = pooled[:, :, i:i + height, j1:j1 + width]
+            output = shifted.clone() if output is None else torch.maximum(output, shifted, out=output)
+    return output.squeeze(1)
+
+def morphology_masks(masks: torch.Tensor, amount) -> torch.Tensor:
+    """
+    对 [B, H, W] 蒙版批次做椭圆结构元素的膨胀（amount > 0）或腐蚀（amount < 0），
+    核尺寸为 int(|amount| * 2 + 1)，边界复制，与 cv2.dilate/cv2.erode 结果一致。
+    CPU 张量在安装了 OpenCV 时逐帧调用 cv2，其余设备在原设备上批量计算。
+
+    Args:
+        masks (torch.Tensor): 蒙版批次 [B, H, W]。
+        amount (float | Sequence[float] | torch.Tensor): 扩展/收缩量，可逐帧指定。
+
+    Returns:
+        torch.Tensor: 处理后的蒙版批次，设备与输入一致。
+    """
+    amounts = per_frame_values(amount, masks.shape[0])
+    cv2 = _cpu_cv2() if masks.device.type == "cpu" else None
+    output = masks.clone()
+    for value, indices in _group_frames(amounts).items():
+        ksize = int(abs(value) * 2 + 1)
+        if value == 0 or ksize <= 1:
+            continue
+        if cv2 is not None:
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (ksize, ksize))
+            operation = cv2.dilate if value > 0 else cv2.erode
+            for index in indices:
+                frame = np.ascontiguousarray(masks[index].numpy(), dtype=np.float32)
+                processed = operation(frame, kernel, iterations=1, borderType=cv2.BORDER_REPLICATE)
+                output[index] = torch.from_numpy(processed).to(masks.dtype)
+            continue
+        frames = masks[indices]
+        if value > 0:
+            output[indices] = _dilate_ellipse(frames, ksize)
+        else:
+            output[indices] = -_dilate_ellipse(-frames, ksize)
+    return output
+
+def lazy_node_mappings(module_globals: dict):
+    """
+    生成模块级 __getattr__，在首次访问 V3_NODE_MAPPINGS 时才由 V3_NODE_CLASSES 构建映射，
+    避免导入模块时为每个节点调用 define_schema。
+
+    用法：__getattr__ = lazy_node_mappings(globals())
+    """
+    def __getattr__(name):
+        if name == "V3_NODE_MAPPINGS":
+            mappings = {cls.define_schema().node_id: cls for cls in module_globals["V3_NODE_CLASSES"]}
+            module_globals["V3_NODE_MAPPINGS"] = mappings
+            return mappings
+        raise AttributeError(f"module {module_globals['__name__']!r} has no attribute {name!r}")
+    return __getattr__
@@ -2,14 +2,16 @@
 
 from comfy_api.v0_0_2 import io, ComfyAPI, ComfyAPISync
 from typing import Dict, List, Optional, Any, Tuple
+import asyncio
 import torch
 import time
 import json
 import base64
 import io as python_io
 import hashlib
-import pickle
 import os
+import sqlite3
+from contextlib import closing
 from datetime import datetime, timedelta
 from PIL import Image
 from comfy_execution.utils import get_executing_context
@@ -17,6 +19,8 @@ from comfy_execution.utils import get_executing_context
 from .video import _gather_videos, build_default_registry, _validate_inputs
 from .key_store import KEY_STORE
 from .config import get_config_loader
+from .http_client import HTTP_CLIENT
+from .task_poller import TASK_POLLER, PollPolicy, PollUpdate, TaskFailedError
 
 # 创建API实例用于进度更新
 api = ComfyAPI()
@@ -27,7 +31,15 @@ REGISTRY = build_default_registry()
 
 # 缓存管理
 class VideoGenerationCache:
-    """视频生成缓存管理器"""
+    """视频生成缓存管理器
+
+    基于SQLite（WAL模式）存储，每次写入只影响单行，多个ComfyUI进程并发读写安全，
+    进程崩溃也不会破坏已有条目。缓存键使用图像张量完整内容的SHA-256哈希。
+    可选地把下载的视频文件保存在缓存目录中，命中时无需重新生成和下载。
+    """
+
+    # 缓存有效期（视频URL在服务端的有效期为24小时）
+    TTL = timedelta(hours=24)
 
     def __init__(self, cache_dir: str = None):
         """初始化缓存管理器
@@ -41,56 +53,54 @@ class VideoGenerationCache:
             cache_dir = os.path.join(home_dir, ".comfyui_xiser_cache")
 
         self.cache_dir = cache_dir
-        self.cache_file = os.path.join(cache_dir, "video_generation_cache.pkl")
+        self.db_file = os.path.join(cache_dir, "video_generation_cache.sqlite3")
+        self.video_dir = os.path.join(cache_dir, "videos")
 
         # 确保缓存目录存在
-        os.makedirs(cache_dir, exist_ok=True)
-
-        # 加载现有缓存
-        self.cache = self._load_cache()
-
-    def _load_cache(self) -> Dict[str, Dict]:
-        """加载缓存数据"""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
-
-                    # 清理过期缓存
-                    cleaned_cache = {}
-                    current_time = datetime.now()
-                    for cache_key, cache_entry in cache_data.items():
-                        created_time = cache_entry.get('created_time')
-                        if created_time:
-                            # 检查是否在24小时内
-                            if isinstance(created_time, str):
-                                created_time = datetime.fromisoformat(created_time)
-
-                            if current_time - created_time < timedelta(hours=24):
-                                cleaned_cache[cache_key] = cache_entry
-
-                    # 如果清理后有变化，保存清理后的缓存
-                    if len(cleaned_cache) != len(cache_data):
-                        self._save_cache(cleaned_cache)
-
-                    return cleaned_cache
-        except Exception as e:
-            print(f"[VGM Cache] 加载缓存失败: {e}")
-
-        return {}
+        os.makedirs(self.video_dir, exist_ok=True)
 
-    def _save_cache(self, cache_data: Dict[str, Dict]):
-        """保存缓存数据"""
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(cache_data, f)
+            self._init_db()
+            self.clear_expired()
         except Exception as e:
-            print(f"[VGM Cache] 保存缓存失败: {e}")
+            print(f"[VGM Cache] 初始化缓存失败: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def _init_db(self):
+        """创建数据表"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS video_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    task_id TEXT NOT NULL,
+                    video_url TEXT NOT NULL,
+                    created_time REAL NOT NULL,
+                    video_path TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_video_cache_created ON video_cache (created_time)")
+
+    @staticmethod
+    def _hash_tensor(tensor: torch.Tensor) -> str:
+        """计算张量完整内容的哈希（包含形状和数据类型）"""
+        data = tensor.detach().cpu().contiguous()
+        digest = hashlib.sha256()
+        digest.update(f"{tuple(data.shape)}|{data.dtype}".encode('utf-8'))
+        if data.numel() > 0:
+            digest.update(data.numpy().tobytes() if data.dtype != torch.bfloat16 else data.float().numpy().tobytes())
+        return digest.hexdigest()
 
     def generate_cache_key(self, **kwargs) -> str:
         """生成缓存键
 
-        基于所有输入参数生成唯一的MD5哈希值
+        基于所有输入参数生成唯一的SHA-256哈希值
         """
         # 提取关键参数用于缓存键
         cache_params = {
@@ -110,96 +120,111 @@ class VideoGenerationCache:
             'template': kwargs.get('template', ''),
         }
 
-        # 处理图像输入（pack_images）
+        # 处理图像输入（pack_images），对完整像素内容求哈希
         pack_images = kwargs.get('pack_images')
         if pack_images is not None:
-            # 对于图像张量，使用形状和部分数据生成哈希
             if isinstance(pack_images, torch.Tensor):
-                # 使用形状和部分像素值生成哈希
-                shape_str = str(tuple(pack_images.shape))
-                # 取前100个像素值（如果存在）
-                if pack_images.numel() > 0:
-                    flat_data = pack_images.flatten()[:100].cpu().numpy()
-                    data_hash = hashlib.md5(flat_data.tobytes()).hexdigest()
-                    cache_params['pack_images'] = f"{shape_str}_{data_hash}"
-                else:
-                    cache_params['pack_images'] = shape_str
+                cache_params['pack_images'] = self._hash_tensor(pack_images)
             elif isinstance(pack_images, (list, tuple)):
-                # 对于图像列表，处理每个图像
-                image_hashes = []
-                for i, img in enumerate(pack_images):
-                    if isinstance(img, torch.Tensor):
-                        shape_str = str(tuple(img.shape))
-                        if img.numel() > 0:
-                            flat_data = img.flatten()[:100].cpu().numpy()
-                            data_hash = hashlib.md5(flat_data.tobytes()).hexdigest()
-                            image_hashes.append(f"{shape_str}_{data_hash}")
-                        else:
-                            image_hashes.append(shape_str)
-                cache_params['pack_images'] = "_".join(image_hashes)
-
-        # 将参数转换为JSON字符串并生成MD5哈希
+                cache_params['pack_images'] = [
+                    self._hash_tensor(img) for img in pack_images if isinstance(img, torch.Tensor)
+                ]
+
+        # 将参数转换为JSON字符串并生成哈希
         param_str = json.dumps(cache_params, sort_keys=True, ensure_ascii=False)
-        cache_key = hashlib.md5(param_str.encode('utf-8')).hexdigest()
+        return hashlib.sha256(param_str.encode('utf-8')).hexdigest()
 
-        return cache_key
+    def video_path_for(self, cache_key: str) -> str:
+        """返回缓存键对应的本地视频文件路径"""
+        return os.path.join(self.video_dir, f"{cache_key}.mp4")
 
     def get(self, cache_key: str) -> Optional[Dict]:
         """获取缓存条目
 
         Returns:
-            缓存条目字典，包含 task_id, video_url, created_time
+            缓存条目字典，包含 task_id, video_url, created_time, video_path
             如果不存在或已过期则返回None
         """
-        cache_entry = self.cache.get(cache_key)
-        if not cache_entry:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT task_id, video_url, created_time, video_path FROM video_cache WHERE cache_key = ?",
+                    (cache_key,),
+                ).fetchone()
+        except Exception as e:
+            print(f"[VGM Cache] 读取缓存失败: {e}")
             return None
 
-        # 检查是否在24小时内
-        created_time = cache_entry.get('created_time')
-        if created_time:
-            if isinstance(created_time, str):
-                created_time = datetime.fromisoformat(created_time)
+        if not row:
+            return None
 
-            if datetime.now() - created_time >= timedelta(hours=24):
-                # 缓存过期，删除
-                del self.cache[cache_key]
-                self._save_cache(self.cache)
-                return None
+        task_id, video_url, created_time, video_path = row
+        if time.time() - created_time >= self.TTL.total_seconds():
+            # 缓存过期，删除
+            self._delete(cache_key, video_path)
+            return None
 
-        return cache_entry
+        if video_path and not os.path.exists(video_path):
+            video_path = None
 
-    def set(self, cache_key: str, task_id: str, video_url: str):
-        """设置缓存条目"""
-        cache_entry = {
+        return {
             'task_id': task_id,
             'video_url': video_url,
-            'created_time': datetime.now().isoformat()
+            'created_time': datetime.fromtimestamp(created_time).isoformat(),
+            'video_path': video_path,
         }
 
-        self.cache[cache_key] = cache_entry
-        self._save_cache(self.cache)
+    def set(self, cache_key: str, task_id: str, video_url: str, video_path: Optional[str] = None):
+        """设置缓存条目"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO video_cache (cache_key, task_id, video_url, created_time, video_path) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (cache_key, task_id, video_url, time.time(), video_path),
+                )
+        except Exception as e:
+            print(f"[VGM Cache] 保存缓存失败: {e}")
 
-    def clear_expired(self):
-        """清理过期缓存（超过24小时）"""
-        current_time = datetime.now()
-        expired_keys = []
+    def attach_video(self, cache_key: str, video_path: str):
+        """为已有条目记录本地视频文件（不改变创建时间）"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE video_cache SET video_path = ? WHERE cache_key = ?", (video_path, cache_key))
+        except Exception as e:
+            print(f"[VGM Cache] 保存缓存失败: {e}")
+
+    def _delete(self, cache_key: str, video_path: Optional[str]):
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM video_cache WHERE cache_key = ?", (cache_key,))
+        except Exception as e:
+            print(f"[VGM Cache] 删除缓存失败: {e}")
+        self._remove_file(video_path)
 
-        for cache_key, cache_entry in self.cache.items():
-            created_time = cache_entry.get('created_time')
-            if created_time:
-                if isinstance(created_time, str):
-                    created_time = datetime.fromisoformat(created_time)
+    @staticmethod
+    def _remove_file(path: Optional[str]):
+        if path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
 
-                if current_time - created_time >= timedelta(hours=24):
-                    expired_keys.append(cache_key)
+    def clear_expired(self):
+        """清理过期缓存（超过24小时）及其本地视频文件"""
+        cutoff = time.time() - self.TTL.total_seconds()
+        with closing(self._connect()) as conn, conn:
+            expired = conn.execute(
+                "SELECT video_path FROM video_cache WHERE created_time < ?", (cutoff,)
+            ).fetchall()
+            if expired:
+                conn.execute("DELETE FROM video_cache WHERE created_time < ?", (cutoff,))
 
-        for key in expired_keys:
-            del self.cache[key]
+        for (video_path,) in expired:
+            self._remove_file(video_path)
 
-        if expired_keys:
-            self._save_cache(self.cache)
-            print(f"[VGM Cache] 清理了 {len(expired_keys)} 个过期缓存")
+        if expired:
+            print(f"[VGM Cache] 清理了 {len(expired)} 个过期缓存")
 
 
 # 创建全局缓存实例
@@ -248,98 +273,209 @@ def _log_dynamic(message: str, end: str = "\n"):
     print(f"[VGM] {message}", end=end, flush=True)
 
 
-def _download_video(video_url: str, progress_callback=None) -> Tuple[torch.Tensor, Dict[str, Any], int, int, float, float, int]:
-    """下载视频并转换为张量
+# 流式下载的块大小
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# 输出精度选项
+_OUTPUT_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+}
+
 
-    从URL下载视频文件，读取视频帧，转换为ComfyUI图像批次格式
+def _download_video_file(video_url: str, dest_path: str, progress_callback=None) -> int:
+    """分块下载视频文件到本地路径
 
     Args:
-        video_url: 视频URL（如阿里云OSS链接）
-        progress_callback: 进度回调函数
+        video_url: 视频URL
+        dest_path: 保存路径
+        progress_callback: 进度回调函数，进度范围0-1
 
     Returns:
-        Tuple[视频张量, 视频信息字典]
-        视频张量形状为 [frames, height, width, channels]，数值范围0-1
-        视频信息包含: width, height, fps, frame_count, shape
+        下载的字节数
     """
-    import cv2
-    import numpy as np
-    import tempfile
-    import urllib.request
-    import os
+    response = HTTP_CLIENT.get(video_url, stream=True, timeout=60, provider="video-download")
+    try:
+        response.raise_for_status()
+        total_bytes = int(response.headers.get("Content-Length") or 0)
+        received = 0
+        with open(dest_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                received += len(chunk)
+                if progress_callback and total_bytes:
+                    progress_callback("下载视频", min(received / total_bytes, 1.0))
+    finally:
+        response.close()
+    return received
 
-    if progress_callback:
-        progress_callback("下载视频", 0.1)
 
-    # 创建临时文件保存视频
-    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp_file:
-        tmp_path = tmp_file.name
+def _scaled_size(width: int, height: int, max_side: int) -> Tuple[int, int]:
+    """按最长边限制计算缩放后的尺寸（保持宽高比）"""
+    if max_side <= 0 or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / float(max(width, height))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
 
-    try:
-        # 1. 下载视频文件
-        if progress_callback:
-            progress_callback("下载视频", 0.3)
 
-        urllib.request.urlretrieve(video_url, tmp_path)
+def _decode_video_file(
+    video_path: str,
+    frame_stride: int = 1,
+    max_side: int = 0,
+    dtype: torch.dtype = torch.float32,
+    progress_callback=None,
+) -> Tuple[torch.Tensor, float, int, int]:
+    """将视频解码到预分配的张量中
 
-        # 2. 使用OpenCV读取视频
-        if progress_callback:
-            progress_callback("读取视频", 0.5)
+    输出张量按 CAP_PROP_FRAME_COUNT 预先分配，逐帧写入，峰值内存约等于一份输出。
+    实际帧数少于预分配容量时（帧数虚报或扩容后），末尾复制一次，返回的张量不再引用多余的缓冲区。
+
+    Args:
+        video_path: 视频文件路径
+        frame_stride: 帧步长，1表示保留所有帧
+        max_side: 最长边限制，0表示保持原始尺寸
+        dtype: 输出张量精度
+        progress_callback: 进度回调函数，进度范围0-1
+
+    Returns:
+        (视频张量 [frames, height, width, 3], 原始帧率, 原始总帧数, 解码帧数)
+    """
+    import cv2
 
-        cap = cv2.VideoCapture(tmp_path)
-        if not cap.isOpened():
-            raise Exception(f"无法打开视频文件: {tmp_path}")
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception(f"无法打开视频文件: {video_path}")
 
-        # 获取视频信息
+    try:
         fps = cap.get(cv2.CAP_PROP_FPS)
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_stride = max(1, int(frame_stride))
+        out_width, out_height = _scaled_size(width, height, max_side)
 
-        # 视频信息现在在最终成功提示中显示
-
-        # 3. 读取所有帧
-        frames = []
-        frame_idx = 0
+        # 按帧数预分配输出（帧数不可靠时按需扩容）
+        capacity = max(1, (frame_count + frame_stride - 1) // frame_stride) if frame_count > 0 else 64
+        output = torch.empty((capacity, out_height, out_width, 3), dtype=dtype)
+        rgb = None
+        written = 0
+        source_index = 0
 
         while True:
-            if progress_callback:
-                progress = 0.5 + 0.4 * (frame_idx / frame_count)
-                progress_callback("读取视频", progress)
+            if source_index % frame_stride != 0:
+                # 跳过的帧只grab不解码为图像
+                if not cap.grab():
+                    break
+                source_index += 1
+                continue
 
             ret, frame = cap.read()
             if not ret:
                 break
+            source_index += 1
 
-            # 转换BGR到RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if (out_width, out_height) != (frame.shape[1], frame.shape[0]):
+                frame = cv2.resize(frame, (out_width, out_height), interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
 
-            # 归一化到0-1范围
-            frame_normalized = frame_rgb.astype(np.float32) / 255.0
+            if written >= output.shape[0]:
+                grown = torch.empty((output.shape[0] * 2, out_height, out_width, 3), dtype=dtype)
+                grown[:written] = output[:written]
+                output = grown
 
-            frames.append(frame_normalized)
-            frame_idx += 1
+            # uint8直接写入目标张量并原地归一化到0-1
+            output[written].copy_(torch.from_numpy(rgb)).div_(255.0)
+            written += 1
 
+            if progress_callback and frame_count > 0:
+                progress_callback("读取视频", min(source_index / frame_count, 1.0))
+    finally:
         cap.release()
 
-        if not frames:
-            raise Exception("视频中没有读取到任何帧")
+    if written == 0:
+        raise Exception("视频中没有读取到任何帧")
 
-        # 4. 转换为张量
-        if progress_callback:
-            progress_callback("转换格式", 0.9)
+    if written < output.shape[0]:
+        # 切片视图会让整个预分配缓冲区一直存活，复制后释放多余部分
+        output = output[:written].clone()
 
-        # 堆叠所有帧 [frames, height, width, channels]
-        video_array = np.stack(frames, axis=0)
-        video_tensor = torch.from_numpy(video_array)
+    return output, fps, frame_count, written
+
+
+def _download_video(
+    video_url: str,
+    progress_callback=None,
+    frame_stride: int = 1,
+    max_side: int = 0,
+    output_precision: str = "float32",
+    cache_path: Optional[str] = None,
+) -> Tuple[torch.Tensor, Dict[str, Any], int, int, float, float, int]:
+    """下载视频并转换为张量
 
-        # 收集视频信息
+    分块下载视频文件，再逐帧解码到预分配的张量中，支持帧步长和解码时缩放。
+    指定cache_path时视频文件保留在该路径；文件已存在则跳过下载。
+
+    Args:
+        video_url: 视频URL（如阿里云OSS链接）
+        progress_callback: 进度回调函数
+        frame_stride: 帧步长，1表示保留所有帧
+        max_side: 最长边限制，0表示保持原始尺寸
+        output_precision: 输出精度，float32 或 float16
+        cache_path: 本地视频缓存路径（可选）
+
+    Returns:
+        Tuple[视频张量, 视频信息字典, 宽, 高, 时长, 帧率, 帧数]
+        视频张量形状为 [frames, height, width, channels]，数值范围0-1
+        视频信息包含: width, height, fps, frame_count, shape
+    """
+    import tempfile
+
+    if progress_callback:
+        progress_callback("下载视频", 0.05)
+
+    if cache_path:
+        video_path = cache_path
+        tmp_path = f"{cache_path}.{os.getpid()}.part"
+    else:
+        # 创建临时文件保存视频
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+        video_path = tmp_path
+
+    try:
+        # 1. 分块下载视频文件（占总进度的前一半），本地缓存命中时跳过
+        if not (cache_path and os.path.exists(cache_path)):
+            _download_video_file(
+                video_url,
+                tmp_path,
+                progress_callback=(lambda stage, progress: progress_callback(stage, 0.05 + 0.45 * progress))
+                if progress_callback else None,
+            )
+            if cache_path:
+                # 原子替换，避免并发进程读到不完整的文件
+                os.replace(tmp_path, cache_path)
+
+        # 2. 解码到预分配张量
+        video_tensor, fps, frame_count, decoded_frames = _decode_video_file(
+            video_path,
+            frame_stride=frame_stride,
+            max_side=max_side,
+            dtype=_OUTPUT_DTYPES.get(output_precision, torch.float32),
+            progress_callback=(lambda stage, progress: progress_callback(stage, 0.5 + 0.45 * progress))
+            if progress_callback else None,
+        )
+
+        # 收集视频信息（帧率按步长换算）
+        height, width = int(video_tensor.shape[1]), int(video_tensor.shape[2])
         duration_seconds = frame_count / fps if fps > 0 else 0
+        fps = fps / max(1, int(frame_stride))
         video_info = {
             "width": width,
             "height": height,
             "fps": fps,
-            "frame_count": frame_count,
+            "frame_count": decoded_frames,
             "shape": video_tensor.shape,
             "duration": duration_seconds
         }
@@ -348,7 +484,7 @@ def _download_video(video_url: str, progress_callback=None) -> Tuple[torch.Tenso
         if progress_callback:
             progress_callback("完成", 1.0)
 
-        return video_tensor, video_info, width, height, duration_seconds, fps, frame_count
+        return video_tensor, video_info, width, height, duration_seconds, fps, decoded_frames
 
     except Exception as e:
         print(f"[VGM] 视频下载/转换错误: {e}")
@@ -367,10 +503,10 @@ def _download_video(video_url: str, progress_callback=None) -> Tuple[torch.Tenso
             "shape": dummy_tensor.shape,
             "duration": 1.0
         }
-        return dummy_tensor, dummy_info
+        return dummy_tensor, dummy_info, 1280, 720, 1.0, 30.0, 30
 
     finally:
-        # 清理临时文件
+        # 清理临时文件（缓存路径下的完整文件保留）
         try:
             os.unlink(tmp_path)
         except:
@@ -912,6 +1048,37 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
                     optional=True,
                     tooltip="视频特效模板（图生视频模式）：\n• 指定特效模板名称，如flying、rotation、squish等\n• 使用模板时prompt参数无效，建议留空\n• 支持模型：wan2.6-i2v、wan2.5-i2v-preview（部分）、wan2.2-i2v-flash（部分）\n• 特效类型：通用特效、单人特效、双人特效、首尾帧特效\n• 注意：调用前请查阅视频特效列表，以免调用失败"
                 ),
+                io.Int.Input(
+                    "frame_stride",
+                    default=1,
+                    min=1,
+                    max=16,
+                    step=1,
+                    optional=True,
+                    tooltip="解码帧步长：\n• 1：保留所有帧（默认）\n• N：每N帧保留1帧，输出帧率相应降低\n• 用于预览或降低显存/内存占用"
+                ),
+                io.Int.Input(
+                    "max_side",
+                    default=0,
+                    min=0,
+                    max=4096,
+                    step=8,
+                    optional=True,
+                    tooltip="解码时最长边限制（像素）：\n• 0：保持原始分辨率（默认）\n• 大于0：解码时按比例缩小，使最长边不超过该值\n• 在解码阶段缩放，避免先生成全尺寸图像批次"
+                ),
+                io.Combo.Input(
+                    "output_precision",
+                    options=["float32", "float16"],
+                    default="float32",
+                    optional=True,
+                    tooltip="输出图像批次精度：\n• float32：标准精度（默认）\n• float16：内存占用减半，适合长视频"
+                ),
+                io.Boolean.Input(
+                    "cache_video_file",
+                    default=False,
+                    optional=True,
+                    tooltip="本地缓存视频文件：\n• true：下载的视频保存在缓存目录中（24小时后自动清理），缓存命中时跳过生成和下载\n• false：仅缓存视频URL（默认），命中时重新下载"
+                ),
             ],
             outputs=[
                 io.Image.Output("images", display_name="images"),
@@ -921,7 +1088,7 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
         )
 
     @classmethod
-    def execute(
+    async def execute(
         cls,
         provider: str,
         prompt: str,
@@ -943,8 +1110,15 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
         resolution: str = "720P",
         prompt_extend: bool = True,
         template: str = "",
+        frame_stride: int = 1,
+        max_side: int = 0,
+        output_precision: str = "float32",
+        cache_video_file: bool = False,
     ) -> io.NodeOutput:
-        """执行视频生成"""
+        """执行视频生成
+
+        异步执行：轮询与下载不阻塞工作线程，列表输入的多个视频任务可并发进行。
+        """
         # 获取节点ID用于进度更新
         executing_context = get_executing_context()
         node_id = executing_context.node_id if executing_context else ""
@@ -981,14 +1155,26 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
                 video_url = cache_entry['video_url']
                 task_id = cache_entry['task_id']
 
+                # 优先使用本地缓存的视频文件
+                cache_path = cache_entry.get('video_path')
+                if not cache_path and cache_video_file:
+                    cache_path = VIDEO_CACHE.video_path_for(cache_key)
+
                 # 下载视频
                 _update_progress("下载", 0.1, node_id=node_id)
-                video_tensor, video_info, width, height, duration_seconds, fps, frame_count = _download_video(
+                video_tensor, video_info, width, height, duration_seconds, fps, frame_count = await asyncio.to_thread(
+                    _download_video,
                     video_url,
                     progress_callback=lambda stage, progress: _update_progress(
                         "下载", progress, node_id=node_id
-                    )
+                    ),
+                    frame_stride=frame_stride,
+                    max_side=max_side,
+                    output_precision=output_precision,
+                    cache_path=cache_path,
                 )
+                if cache_path and not cache_entry.get('video_path') and os.path.exists(cache_path):
+                    VIDEO_CACHE.attach_video(cache_key, cache_path)
 
                 # 输出合并的完成日志（缓存命中）
                 print(" " * 80, end="\r")  # 清除当前行
@@ -1210,7 +1396,8 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
 
             # 4. 创建任务
             _update_progress("创建任务", 0.1, node_id=node_id)
-            task_id, request_id = video_provider.create_task(
+            task_id, request_id = await asyncio.to_thread(
+                video_provider.create_task,
                 api_key=api_key,
                 payload=payload,
                 progress_callback=lambda stage, progress: _update_progress(
@@ -1218,55 +1405,46 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
                 )
             )
 
-            # 5. 轮询任务状态
+            # 5. 轮询任务状态（自适应间隔，不阻塞工作线程）
             start_time = time.time()
-            polling_count = 0
-            last_result = None  # 保存最后一次查询结果
+            policy = PollPolicy(
+                min_interval=float(polling_interval),
+                max_interval=max(float(polling_interval), 30.0),
+                timeout=float(max_polling_time),
+            )
+
+            def on_poll_update(update: PollUpdate) -> None:
+                _update_progress("轮询", min(0.9, update.attempt * 0.1), node_id=node_id)
+                if update.status not in ("SUCCEEDED", "FAILED", "CANCELED", "UNKNOWN"):
+                    # PENDING 或 RUNNING 状态，动态更新同一行
+                    status_display = "处理中" if update.status == "RUNNING" else "排队中"
+                    _log_dynamic(f"↻ {status_display} ({update.elapsed:.0f}s)", end="\r")
 
             # 初始化动态日志 - 使用更简洁的格式
             _log_dynamic("↻ 开始轮询任务状态...", end="\r")
 
-            while time.time() - start_time < max_polling_time:
-                polling_count += 1
-                progress = min(0.9, polling_count * 0.1)  # 最多到90%
-
-                _update_progress("轮询", progress, node_id=node_id)
-
-                # 查询任务状态
-                result = video_provider.query_task(
-                    api_key=api_key,
+            try:
+                result = await TASK_POLLER.poll_async(
+                    lambda: video_provider.query_task(
+                        api_key=api_key,
+                        task_id=task_id,
+                        progress_callback=None,  # 移除进度回调，避免与轮询计数进度冲突
+                        region=region
+                    ),
                     task_id=task_id,
-                    progress_callback=None,  # 移除进度回调，避免与轮询计数进度冲突
-                    region=region
+                    policy=policy,
+                    on_update=on_poll_update,
+                    initial_delay=0.0,
                 )
-                last_result = result  # 保存最后一次结果
-
-                task_status = result.get("output", {}).get("task_status", "")
-                elapsed_time = time.time() - start_time
-
-                # 动态更新日志 - 更简洁的格式
-                if task_status == "SUCCEEDED":
-                    # 先清除动态行
-                    print(" " * 80, end="\r")  # 清除当前行
-                    _log_dynamic(f"✓ 任务完成，耗时: {elapsed_time:.1f}秒")
-                    _update_progress("轮询", 1.0, node_id=node_id)
-                    break
-                elif task_status in ["FAILED", "CANCELED"]:
-                    error_code = result.get("output", {}).get("code", "")
-                    error_message = result.get("output", {}).get("message", "")
-                    print(" " * 80, end="\r")  # 清除当前行
-                    _log_dynamic(f"✗ 任务失败: {task_status}")
-                    raise Exception(f"任务失败，状态：{task_status}，错误代码：{error_code}，错误信息：{error_message}")
-                else:
-                    # PENDING 或 RUNNING 状态，动态更新同一行
-                    # 使用更简洁的格式，避免过长
-                    status_display = "处理中" if task_status == "RUNNING" else "排队中"
-                    _log_dynamic(f"↻ {status_display} ({elapsed_time:.0f}s)", end="\r")
-
-                time.sleep(polling_interval)
-
-            else:
+            except TaskFailedError as e:
+                error_code = e.result.get("output", {}).get("code", "")
+                error_message = e.result.get("output", {}).get("message", "")
+                print(" " * 80, end="\r")  # 清除当前行
+                _log_dynamic(f"✗ 任务失败: {e.status}")
+                raise Exception(f"任务失败，状态：{e.status}，错误代码：{error_code}，错误信息：{error_message}")
+            except TimeoutError as e:
                 # 获取最后一次查询的结果，提供更多调试信息
+                last_result = getattr(e, "last_result", None)
                 last_status = "未知"
                 if last_result:
                     last_status = last_result.get("output", {}).get("task_status", "未知")
@@ -1280,6 +1458,11 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
                     f"4. 对于大尺寸图像或复杂任务，可能需要更长时间"
                 )
 
+            elapsed_time = time.time() - start_time
+            print(" " * 80, end="\r")  # 清除当前行
+            _log_dynamic(f"✓ 任务完成，耗时: {elapsed_time:.1f}秒")
+            _update_progress("轮询", 1.0, node_id=node_id)
+
             # 6. 提取视频URL
             video_url = video_provider.extract_video_url(result)
             if not video_url:
@@ -1287,11 +1470,17 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
 
             # 7. 下载视频
             _update_progress("下载", 0.1, node_id=node_id)
-            video_tensor, video_info, width, height, duration_seconds, fps, frame_count = _download_video(
+            cache_path = VIDEO_CACHE.video_path_for(cache_key) if cache_video_file else None
+            video_tensor, video_info, width, height, duration_seconds, fps, frame_count = await asyncio.to_thread(
+                _download_video,
                 video_url,
                 progress_callback=lambda stage, progress: _update_progress(
                     "下载", progress, node_id=node_id
-                )
+                ),
+                frame_stride=frame_stride,
+                max_side=max_side,
+                output_precision=output_precision,
+                cache_path=cache_path,
             )
 
             # 8. 提取使用信息（包含API请求代码）
@@ -1299,7 +1488,12 @@ class XIS_VGMOrchestratorV3(io.ComfyNode):
             usage_json = json.dumps(usage_info, ensure_ascii=False, indent=2)
 
             # 9. 保存到缓存（24小时有效）
-            VIDEO_CACHE.set(cache_key, task_id, video_url)
+            VIDEO_CACHE.set(
+                cache_key,
+                task_id,
+                video_url,
+                video_path=cache_path if cache_path and os.path.exists(cache_path) else None,
+            )
 
             # 10. 输出合并的完成日志
             print(" " * 80, end="\r")  # 清除当前行
@@ -8,6 +8,7 @@ import torch
 import logging
 
 from .base import BaseVideoProvider, VideoProviderConfig
+from ..http_client import HTTP_CLIENT
 from ..config import get_config_loader, ModelConfig
 
 logger = logging.getLogger(__name__)
@@ -385,11 +386,12 @@ class ConfigBasedVideoProvider(BaseVideoProvider):
 
             mode_str = " | ".join(mode_info) if mode_info else "普通模式"
 
-            response = requests.post(
+            response = HTTP_CLIENT.post(
                 endpoint,
                 headers=headers,
                 json=payload,
-                timeout=30
+                timeout=30,
+                provider=self.model_name,
             )
 
             if response.status_code != 200:
@@ -452,7 +454,7 @@ class ConfigBasedVideoProvider(BaseVideoProvider):
             # 记录查询请求（简化版）
             logger.debug(f"[VGM API] 查询任务请求 - 任务ID: {task_id}")
 
-            response = requests.get(endpoint, headers=headers, timeout=10)
+            response = HTTP_CLIENT.get(endpoint, headers=headers, timeout=10, provider=self.model_name)
 
             # 记录响应状态（调试级别）
             logger.debug(f"[VGM API] 查询任务响应 - 状态码: {response.status_code}")
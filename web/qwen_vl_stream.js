@@ -0,0 +1,68 @@
+import { app } from "/scripts/app.js";
+import { api } from "/scripts/api.js";
+
+/**
+ * Qwen VL 本地推理流式预览
+ * 监听后端推送的 xiser-llm-stream 事件，在节点上实时显示已生成的文本
+ */
+
+const STREAM_EVENT = "xiser-llm-stream";
+const NODE_CLASS = "XIS_QwenVLInference";
+
+function createPreviewContainer() {
+    const textarea = document.createElement("textarea");
+    textarea.readOnly = true;
+    textarea.placeholder = "Streaming output...";
+    Object.assign(textarea.style, {
+        width: "100%",
+        height: "100%",
+        minHeight: "60px",
+        boxSizing: "border-box",
+        resize: "none",
+        background: "var(--comfy-input-bg, #222)",
+        color: "var(--input-text, #ddd)",
+        border: "1px solid var(--border-color, #444)",
+        borderRadius: "4px",
+        fontSize: "12px",
+        padding: "4px",
+    });
+    return textarea;
+}
+
+app.registerExtension({
+    name: "xiser.qwen_vl.stream_preview",
+
+    async nodeCreated(node) {
+        if (node.comfyClass !== NODE_CLASS) return;
+
+        const textarea = createPreviewContainer();
+        // 预览只用于显示，不参与工作流序列化
+        node.addDOMWidget("stream_preview", "Stream Preview", textarea, {
+            serialize: false,
+            getValue() { return null; },
+            setValue() {}
+        });
+        node.__xiserStreamPreview = textarea;
+
+        const origOnRemoved = node.onRemoved;
+        node.onRemoved = function () {
+            try {
+                textarea.remove();
+            } catch (error) {
+                // 忽略清理错误
+            }
+            return origOnRemoved?.apply(this, arguments);
+        };
+    },
+
+    async setup() {
+        api.addEventListener(STREAM_EVENT, ({ detail }) => {
+            if (!detail) return;
+            const node = app.graph?.getNodeById(Number(detail.node));
+            const textarea = node?.__xiserStreamPreview;
+            if (!textarea) return;
+            textarea.value = detail.text || "";
+            textarea.scrollTop = textarea.scrollHeight;
+        });
+    }
+});